@@ -0,0 +1,3 @@
+"""
+Performance benchmarks for the TinySol compiler and Brainfuck interpreter
+"""
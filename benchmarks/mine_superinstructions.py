@@ -0,0 +1,154 @@
+"""
+Superinstruction Mining
+
+Compiles the benchmark corpus (examples/ and the BDD test programs),
+lowers the generated Brainfuck to IR and counts how often each sequence
+of IR node shapes occurs, weighted by how often the interpreter executes
+it. The most frequent sequences form the superinstruction table the
+interpreter fuses by default, src/superinstructions.json; sequences
+without a fused implementation are listed as candidates.
+
+Usage:
+    python -m benchmarks.mine_superinstructions [--top 16] [--max-length 3]
+    python -m benchmarks.mine_superinstructions --static --output table.json
+"""
+
+import argparse
+import fnmatch
+import json
+import sys
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_ir import (
+    BLOCK, FUSERS, SUPERINSTRUCTIONS_FILE, SUPERINSTRUCTIONS_VERSION, Node, lower, shape)
+from benchmarks.run_benchmarks import DEFAULT_MAX_STEPS, collect_programs
+
+DEFAULT_TOP = 16
+DEFAULT_MAX_LENGTH = 3
+
+def node_position(node: Node) -> int:
+    """
+    Offset of the first character a node was lowered from
+    """
+    return node[7] if node[0] == BLOCK else node[2]
+
+def count_ngrams(nodes: List[Node], weights: Optional[List[int]] = None,
+                 max_length: int = DEFAULT_MAX_LENGTH) -> Counter:
+    """
+    Count the shape sequences of a lowered program
+
+    Args:
+        nodes (List[Node]): Unfused IR nodes
+        weights (Optional[List[int]]): Executions of the character at each
+            offset of the program; a sequence is weighted by the executions
+            of all of its nodes, the dispatches a superinstruction for it
+            could cover. Without weights every occurrence counts once.
+        max_length (int): Longest sequence counted (shortest is 2)
+
+    Returns:
+        Counter: Weight of every shape sequence
+    """
+    shapes = ''.join(shape(node) for node in nodes)
+    executions = [weights[node_position(node)] for node in nodes] if weights is not None else None
+    counts = Counter()
+    for index in range(len(nodes)):
+        for length in range(2, max_length + 1):
+            if index + length > len(shapes):
+                break
+            if executions is None:
+                counts[shapes[index:index + length]] += 1
+            elif executions[index]:
+                counts[shapes[index:index + length]] += sum(executions[index:index + length])
+    return counts
+
+def mine(programs: Dict[str, str], max_length: int = DEFAULT_MAX_LENGTH,
+         dynamic: bool = True, max_steps: int = DEFAULT_MAX_STEPS,
+         log: Callable[[str], None] = lambda message: None) -> Counter:
+    """
+    Count shape sequences across a corpus
+
+    Args:
+        programs (Dict[str, str]): TinySol source by program name
+        max_length (int): Longest sequence counted
+        dynamic (bool): Weight sequences by executions in a profiled run
+            instead of counting occurrences in the code
+        max_steps (int): Step limit of profiled runs
+        log (Callable): Progress messages
+
+    Returns:
+        Counter: Weight of every shape sequence
+    """
+    totals = Counter()
+    for name, source in sorted(programs.items()):
+        try:
+            brainfuck_code = TinySolToBrainfuckTranslator().compile(source)
+        except Exception as e:
+            log(f"{name}: skipped ({e})")
+            continue
+        weights = None
+        if dynamic:
+            interpreter = BrainfuckInterpreter(max_steps=max_steps, profile=True)
+            interpreter.interpret(brainfuck_code)
+            weights = interpreter.profile.counts
+        log(name)
+        totals.update(count_ngrams(lower(brainfuck_code), weights, max_length))
+    return totals
+
+def build_table(counts: Counter, top: int = DEFAULT_TOP, dynamic: bool = True) -> Dict[str, Any]:
+    """
+    Superinstruction table of the most frequent sequences
+
+    Args:
+        counts (Counter): Weight of every shape sequence
+        top (int): Sequences listed
+        dynamic (bool): Whether the weights are execution counts
+
+    Returns:
+        Dict[str, Any]: JSON-serialisable table, most frequent first
+    """
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+    return {
+        'version': SUPERINSTRUCTIONS_VERSION,
+        'weighting': 'executions' if dynamic else 'occurrences',
+        'superinstructions': [
+            {'pattern': pattern, 'count': count, 'fused': pattern in FUSERS}
+            for pattern, count in ranked
+        ],
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point
+
+    Returns:
+        int: Exit status
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default=str(SUPERINSTRUCTIONS_FILE),
+                        help='table file to write')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='sequences listed')
+    parser.add_argument('--max-length', type=int, default=DEFAULT_MAX_LENGTH,
+                        help='longest sequence counted')
+    parser.add_argument('--static', action='store_true',
+                        help='count occurrences in the code instead of executions')
+    parser.add_argument('--programs', nargs='+', default=['*'],
+                        help='glob patterns selecting programs, e.g. "examples/*"')
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS)
+    args = parser.parse_args(argv)
+
+    programs = {name: source for name, source in collect_programs().items()
+                if any(fnmatch.fnmatch(name, pattern) for pattern in args.programs)}
+    counts = mine(programs, args.max_length, not args.static, args.max_steps,
+                  log=lambda message: print(message, file=sys.stderr))
+    table = build_table(counts, args.top, not args.static)
+    with open(args.output, 'w') as table_file:
+        table_file.write(json.dumps(table, indent=2) + '\n')
+    for entry in table['superinstructions']:
+        status = 'fused' if entry['fused'] else 'candidate'
+        print(f"{entry['pattern']:>6} {entry['count']:>12} {status}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
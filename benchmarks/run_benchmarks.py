@@ -0,0 +1,285 @@
+"""
+Benchmark Suite
+
+Compiles every program in examples/ and every TinySol program of the BDD
+tests at each optimisation level, runs the result on each interpreter
+backend, and reports compile times, code size, interpreter steps, wall
+time and peak tape size as JSON. Reports can be compared against a stored
+baseline to catch regressions in generated code and interpreter speed.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--output report.json]
+    python -m benchmarks.run_benchmarks --update-baseline
+"""
+
+import argparse
+import ast
+import fnmatch
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.artifact_cache import get_artifact_cache
+from src.solidity_parser import SolidityParser
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.ast2brainfuck.optimizer import OPTIMIZATION_LEVELS
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLES_DIR = ROOT / 'examples'
+BDD_TESTS = ROOT / 'tests' / 'test_tinysol_bdd.py'
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+# Version 2 times compile() as a whole instead of translate()
+REPORT_VERSION = 2
+DEFAULT_MAX_STEPS = 1_000_000
+
+# Relative slowdown tolerated before a timing counts as a regression, and
+# the absolute difference (seconds) below which timings are ignored
+DEFAULT_TIME_TOLERANCE = 0.25
+MIN_TIME_DIFFERENCE = 0.05
+
+# Interpreter backends by name; each factory takes the step limit. The
+# 'c' backend runs on the Python backend where there is no C compiler.
+BACKENDS: Dict[str, Callable[[int], Any]] = {
+    'python': lambda max_steps: BrainfuckInterpreter(max_steps=max_steps),
+    'c': lambda max_steps: BrainfuckInterpreter(max_steps=max_steps, native=True),
+}
+
+def collect_programs(examples_dir: Path = EXAMPLES_DIR,
+                     bdd_tests: Path = BDD_TESTS) -> Dict[str, str]:
+    """
+    Gather benchmark programs: examples/*.tinysol and the `tinysol_code`
+    strings of the BDD tests
+
+    Args:
+        examples_dir (Path): Directory of example programs
+        bdd_tests (Path): BDD test module
+
+    Returns:
+        Dict[str, str]: Source code by program name
+    """
+    programs = {}
+    for path in sorted(examples_dir.glob('*.tinysol')):
+        programs[f'examples/{path.stem}'] = path.read_text()
+
+    if bdd_tests.exists():
+        tree = ast.parse(bdd_tests.read_text())
+        for function in tree.body:
+            if not isinstance(function, ast.FunctionDef):
+                continue
+            for node in ast.walk(function):
+                if (isinstance(node, ast.Assign) and
+                        any(isinstance(target, ast.Name) and target.id == 'tinysol_code'
+                            for target in node.targets) and
+                        isinstance(node.value, ast.Constant)):
+                    programs[f'bdd/{function.name}'] = node.value.value
+    return programs
+
+def _timed(function: Callable[[], Any], repeat: int,
+           prepare: Callable[[], Any] = lambda: None) -> Tuple[Any, float]:
+    """
+    Run a function with a cold artifact cache and return its result and
+    the best time in seconds. `prepare` runs after clearing the cache and
+    is not timed.
+    """
+    best = None
+    for _ in range(repeat):
+        get_artifact_cache().clear()
+        prepare()
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def benchmark_program(name: str, source: str, level: int, backends: List[str],
+                      max_steps: int = DEFAULT_MAX_STEPS, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Compile and run one program at one optimisation level
+
+    Args:
+        name (str): Program name
+        source (str): TinySol source
+        level (int): Optimisation level
+        backends (List[str]): Names of the interpreter backends to run
+        max_steps (int): Interpreter step limit
+        repeat (int): Compile phases are timed this many times, keeping
+            the best
+
+    Returns:
+        Dict[str, Any]: Benchmark record
+    """
+    record = {'program': name, 'level': level}
+    parser = SolidityParser()
+    translator = TinySolToBrainfuckTranslator(optimization_level=level)
+    try:
+        _, record['tokenize_time'] = _timed(lambda: parser.tokenize(source), repeat)
+        # Parsing starts from cached tokens, so it excludes tokenizing
+        _, record['parse_time'] = _timed(
+            lambda: parser.parse(source), repeat, prepare=lambda: parser.tokenize(source))
+        # The whole path the CLI runs: incremental compilation and linking
+        brainfuck_code, record['compile_time'] = _timed(
+            lambda: translator.compile(source), repeat)
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+
+    record['code_length'] = len(brainfuck_code)
+    record['backends'] = {}
+    for backend in backends:
+        interpreter = BACKENDS[backend](max_steps)
+        # Lowering and building the program are timed apart from the run
+        start = time.perf_counter()
+        interpreter.prepare(brainfuck_code)
+        prepare_time = time.perf_counter() - start
+        start = time.perf_counter()
+        output = interpreter.interpret(brainfuck_code)
+        wall_time = time.perf_counter() - start
+        record['backends'][backend] = {
+            'steps': interpreter.steps,
+            'prepare_time': prepare_time,
+            'wall_time': wall_time,
+            'native': interpreter.ran_native,
+            'peak_memory': interpreter.peak_memory,
+            'completed': interpreter.steps < max_steps,
+            # Programs without a return value produce the whole tape
+            'output': output if len(output) <= 16 else None,
+        }
+    return record
+
+def run_benchmarks(programs: Dict[str, str], levels: List[int] = list(OPTIMIZATION_LEVELS),
+                   backends: Optional[List[str]] = None, max_steps: int = DEFAULT_MAX_STEPS,
+                   repeat: int = 1, log: Callable[[str], None] = lambda message: None) -> Dict[str, Any]:
+    """
+    Benchmark every program at every level on every backend
+
+    Args:
+        programs (Dict[str, str]): Source code by program name
+        levels (List[int]): Optimisation levels
+        backends (Optional[List[str]]): Backend names, all by default
+        max_steps (int): Interpreter step limit
+        repeat (int): Repetitions of the compile timings
+        log (Callable[[str], None]): Progress callback
+
+    Returns:
+        Dict[str, Any]: JSON-serialisable report
+    """
+    backends = backends or list(BACKENDS)
+    results = []
+    for name, source in programs.items():
+        for level in levels:
+            log(f"{name} -O{level}")
+            results.append(benchmark_program(name, source, level, backends, max_steps, repeat))
+    return {
+        'version': REPORT_VERSION,
+        'max_steps': max_steps,
+        'backends': backends,
+        'results': results,
+    }
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any],
+                    time_tolerance: float = DEFAULT_TIME_TOLERANCE) -> List[str]:
+    """
+    List the regressions of a report against a baseline. Code size, steps
+    and peak tape size must not grow, outputs must not change, and times
+    may only grow within the tolerance. Programs missing from either
+    report are ignored.
+
+    Args:
+        report (Dict[str, Any]): Current report
+        baseline (Dict[str, Any]): Baseline report
+        time_tolerance (float): Tolerated relative slowdown
+
+    Returns:
+        List[str]: Regression descriptions, empty if there are none
+    """
+    expected = {(record['program'], record['level']): record for record in baseline['results']}
+    regressions = []
+
+    def check_time(label: str, current: float, previous: float) -> None:
+        if (current > previous * (1 + time_tolerance) and
+                current - previous > MIN_TIME_DIFFERENCE):
+            regressions.append(f"{label}: {previous:.3f}s -> {current:.3f}s")
+
+    for record in report['results']:
+        previous = expected.get((record['program'], record['level']))
+        if previous is None:
+            continue
+        label = f"{record['program']} -O{record['level']}"
+        if 'error' in record:
+            if 'error' not in previous:
+                regressions.append(f"{label}: fails to compile: {record['error']}")
+            continue
+        if 'error' in previous:
+            continue
+
+        if record['code_length'] > previous['code_length']:
+            regressions.append(
+                f"{label} code_length: {previous['code_length']} -> {record['code_length']}")
+        for phase in ['tokenize_time', 'parse_time', 'compile_time']:
+            # Baselines of another report version may time other phases
+            if phase in previous:
+                check_time(f"{label} {phase}", record[phase], previous[phase])
+
+        for backend, result in record['backends'].items():
+            old = previous['backends'].get(backend)
+            if old is None:
+                continue
+            backend_label = f"{label} [{backend}]"
+            if result['output'] != old['output']:
+                regressions.append(f"{backend_label} output: {old['output']} -> {result['output']}")
+            if old['completed'] and not result['completed']:
+                regressions.append(f"{backend_label} no longer completes")
+            for metric in ['steps', 'peak_memory']:
+                if result[metric] > old[metric]:
+                    regressions.append(f"{backend_label} {metric}: {old[metric]} -> {result[metric]}")
+            check_time(f"{backend_label} wall_time", result['wall_time'], old['wall_time'])
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point
+
+    Returns:
+        int: Exit status, 1 if regressions were found
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    parser.add_argument('--baseline', default=str(BASELINE), help='baseline report to compare against')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the report as the new baseline')
+    parser.add_argument('--levels', type=int, nargs='+', default=list(OPTIMIZATION_LEVELS),
+                        choices=OPTIMIZATION_LEVELS)
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS))
+    parser.add_argument('--programs', nargs='+', default=['*'],
+                        help='glob patterns selecting programs, e.g. "examples/*"')
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of compile timings')
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    programs = {name: source for name, source in collect_programs().items()
+                if any(fnmatch.fnmatch(name, pattern) for pattern in args.programs)}
+    report = run_benchmarks(programs, args.levels, args.backends, args.max_steps, args.repeat,
+                            log=lambda message: print(message, file=sys.stderr))
+
+    text = json.dumps(report, indent=2)
+    if args.update_baseline:
+        Path(args.baseline).write_text(text + '\n')
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    elif not args.update_baseline:
+        print(text)
+
+    if args.update_baseline or not Path(args.baseline).exists():
+        return 0
+    regressions = compare_reports(report, json.loads(Path(args.baseline).read_text()),
+                                  args.time_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
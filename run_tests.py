@@ -3,11 +3,31 @@ import sys
 
 def run_tests():
     """
-    Run TinySol Turing Completeness and BDD Tests
+    Run TinySol Turing Completeness, BDD and component tests
     """
     result = pytest.main([
         'tests/test_turing_completeness.py', 
         'tests/test_tinysol_bdd.py',
+        'tests/test_artifact_cache.py',
+        'tests/test_incremental_compilation.py',
+        'tests/test_function_calls.py',
+        'tests/test_arrays.py',
+        'tests/test_optimizer.py',
+        'tests/test_benchmarks.py',
+        'tests/test_source_maps.py',
+        'tests/test_profiler.py',
+        'tests/test_compile_stats.py',
+        'tests/test_emitter.py',
+        'tests/test_interpreter.py',
+        'tests/test_native.py',
+        'tests/test_batch.py',
+        'tests/test_async.py',
+        'tests/test_checkpoint.py',
+        'tests/test_tape.py',
+        'tests/test_mmap.py',
+        'tests/test_bytecode.py',
+        'tests/test_partial_eval.py',
+        'tests/test_bigint.py',
         '-v'  # Verbose output
     ])
     sys.exit(result)
@@ -0,0 +1,229 @@
+"""
+In-Process Artifact Cache
+
+Provides a bounded, thread-safe LRU cache shared by the TinySol front end
+and the Brainfuck interpreter. Token streams, ASTs, bracket maps and
+generated code are memoized by their source text, so identical requests in
+a long-running process skip all front-end work.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Default memory budget for cached artifacts (64 MiB)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estimate the memory footprint of a cached artifact.
+
+    Walks containers and plain objects (such as AST nodes) recursively,
+    counting every object once.
+
+    Args:
+        value (Any): Artifact to measure
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _seen) + estimate_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _seen)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+
+class ArtifactCache:
+    """
+    Bounded LRU cache of immutable compilation artifacts.
+
+    Entries are grouped by kind (e.g. 'tokens', 'ast', 'brackets',
+    'brainfuck') and evicted least-recently-used first once the estimated
+    size of all entries exceeds the memory budget. Cached values are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the artifact cache.
+
+        Args:
+            max_bytes (int): Memory budget in bytes; 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, int]]" = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up an artifact and mark it as recently used.
+
+        Args:
+            kind (str): Artifact kind
+            key (Hashable): Artifact key, usually the source text
+            default (Any): Value returned on a miss
+
+        Returns:
+            Any: Cached artifact or default
+        """
+        with self._lock:
+            entry = self._entries.get((kind, key), _MISSING)
+            if entry is _MISSING:
+                self._misses[kind] = self._misses.get(kind, 0) + 1
+                return default
+            self._entries.move_to_end((kind, key))
+            self._hits[kind] = self._hits.get(kind, 0) + 1
+            return entry[0]
+
+    def put(self, kind: str, key: Hashable, value: Any, size: Optional[int] = None) -> None:
+        """
+        Store an artifact, evicting old entries to stay within budget.
+
+        Args:
+            kind (str): Artifact kind
+            key (Hashable): Artifact key, usually the source text
+            value (Any): Artifact to cache
+            size (Optional[int]): Known size in bytes; estimated if omitted
+        """
+        if size is None:
+            size = estimate_size(value) + estimate_size(key)
+
+        with self._lock:
+            if size > self.max_bytes:
+                return
+            previous = self._entries.pop((kind, key), None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[(kind, key)] = (value, size)
+            self.current_bytes += size
+            self._evict()
+
+    def get_or_compute(self, kind: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return a cached artifact, computing and storing it on a miss.
+
+        Exceptions raised by compute propagate and nothing is cached.
+
+        Args:
+            kind (str): Artifact kind
+            key (Hashable): Artifact key, usually the source text
+            compute (Callable[[], Any]): Producer for the artifact
+
+        Returns:
+            Any: Cached or freshly computed artifact
+        """
+        value = self.get(kind, key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(kind, key, value)
+        return value
+
+    def configure(self, max_bytes: int) -> None:
+        """
+        Change the memory budget, evicting entries if necessary.
+
+        Args:
+            max_bytes (int): New memory budget in bytes; 0 disables caching
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Drop all entries and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits.clear()
+            self._misses.clear()
+            self.current_bytes = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache occupancy and per-kind hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Cache statistics
+        """
+        with self._lock:
+            kinds = sorted(set(self._hits) | set(self._misses))
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'hits': sum(self._hits.values()),
+                'misses': sum(self._misses.values()),
+                'kinds': {
+                    kind: {
+                        'hits': self._hits.get(kind, 0),
+                        'misses': self._misses.get(kind, 0)
+                    }
+                    for kind in kinds
+                }
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> None:
+        """
+        Evict least-recently-used entries until within budget.
+        Caller must hold the lock.
+        """
+        while self._entries and self.current_bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+# Cache shared by the parser, translators and interpreter
+_shared_cache = ArtifactCache()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """
+    Get the process-wide artifact cache.
+
+    Returns:
+        ArtifactCache: Shared cache instance
+    """
+    return _shared_cache
+
+
+def configure_artifact_cache(max_bytes: int = DEFAULT_MAX_BYTES) -> ArtifactCache:
+    """
+    Set the memory budget of the process-wide artifact cache.
+
+    Args:
+        max_bytes (int): Memory budget in bytes; 0 disables caching
+
+    Returns:
+        ArtifactCache: Shared cache instance
+    """
+    _shared_cache.configure(max_bytes)
+    return _shared_cache
@@ -0,0 +1,86 @@
+"""
+Code Emitter
+
+Generated programs are assembled from a great many small snippets.
+Appending them to a string with `+=` copies everything generated so far
+for every snippet, and each level of nested inlining copies the inlined
+body again. The emitter collects snippets in a list and joins them once,
+or writes them to a stream in chunks as soon as enough have accumulated,
+so assembling a program is linear in its size.
+"""
+
+from typing import Iterable, List, Optional, TextIO
+
+# Characters buffered before an emitter writes to its stream
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+class CodeEmitter:
+    """
+    Append-only buffer of generated code, optionally backed by a stream.
+    """
+    def __init__(self, stream: Optional[TextIO] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            stream (Optional[TextIO]): Write the code to this stream instead
+                of keeping it in memory
+            chunk_size (int): Characters buffered between writes to the
+                stream
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.parts: List[str] = []
+        self.buffered = 0
+        # Characters emitted in total, including those already written
+        self.size = 0
+
+    def emit(self, code: str) -> 'CodeEmitter':
+        """
+        Append code
+
+        Args:
+            code (str): Code to append
+
+        Returns:
+            CodeEmitter: This emitter, for chaining
+        """
+        if code:
+            self.parts.append(code)
+            self.buffered += len(code)
+            self.size += len(code)
+            if self.stream is not None and self.buffered >= self.chunk_size:
+                self.flush()
+        return self
+
+    def emit_all(self, codes: Iterable[str]) -> 'CodeEmitter':
+        """
+        Append several pieces of code in order
+        """
+        for code in codes:
+            self.emit(code)
+        return self
+
+    def flush(self) -> None:
+        """
+        Write the buffered code to the stream, if there is one
+        """
+        if self.stream is not None and self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts = []
+            self.buffered = 0
+
+    def getvalue(self) -> str:
+        """
+        All code emitted so far
+
+        Raises:
+            ValueError: If the code was written to a stream
+        """
+        if self.stream is not None:
+            raise ValueError("Code was written to a stream")
+        if len(self.parts) > 1:
+            self.parts = [''.join(self.parts)]
+        return self.parts[0] if self.parts else ''
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,232 @@
+"""
+Incremental Compilation
+
+Splits TinySol source into compilation units (one per function, plus the
+top-level statements) so that only units whose text changed are parsed and
+translated again. Fragments of unchanged units are reused from the shared
+artifact cache and relinked.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+from src.artifact_cache import get_artifact_cache
+from src.solidity_parser import SolidityParser
+from src.ast2brainfuck.optimizer import DEFAULT_OPTIMIZATION_LEVEL, optimize_program
+from src.ast2brainfuck.stats import count_event, measure_phase
+from src.ast2brainfuck.translators.base_translator import TranslationError
+from src.ast2brainfuck.translators.function_translator import FunctionFragment
+
+# Comments and the characters that delimit top-level units
+UNIT_DELIMITERS = re.compile(r'//[^\n]*|/\*.*?\*/|[{};]', re.DOTALL)
+# Runs of comments and whitespace, which normalize to a single space
+SEPARATORS = re.compile(r'(?://[^\n]*|/\*.*?\*/|\s)+', re.DOTALL)
+FUNCTION_HEADER = re.compile(r'int\s+(\w+)\s*\(')
+
+class CompilationUnit:
+    """
+    A top-level slice of TinySol source: one function definition or a run
+    of top-level statements.
+    """
+    def __init__(self, kind: str, name: Optional[str], text: str,
+                 offsets: Optional[List[int]] = None):
+        """
+        Args:
+            kind (str): 'function' or 'statements'
+            name (Optional[str]): Function name for function units
+            text (str): Normalized source text of the unit
+            offsets (Optional[List[int]]): Source offset of every character
+                of the normalized text
+        """
+        self.kind = kind
+        self.name = name
+        self.text = text
+        self.offsets = offsets
+
+def normalize_source(source: str) -> str:
+    """
+    Strip comments and collapse whitespace, so that edits to either do not
+    invalidate cached fragments
+
+    Args:
+        source (str): TinySol source text
+
+    Returns:
+        str: Normalized source text
+    """
+    return normalize_source_with_offsets(source)[0]
+
+def normalize_source_with_offsets(source: str, start: int = 0) -> Tuple[str, List[int]]:
+    """
+    Normalize source text like `normalize_source`, remembering where each
+    character of the result came from
+
+    Args:
+        source (str): TinySol source text
+        start (int): Offset of the text within the whole program
+
+    Returns:
+        Tuple[str, List[int]]: Normalized text and the offset of each of
+        its characters
+    """
+    characters = []
+    offsets = []
+    position = 0
+    for match in list(SEPARATORS.finditer(source)) + [None]:
+        end = match.start() if match else len(source)
+        characters.append(source[position:end])
+        offsets.extend(range(start + position, start + end))
+        if match:
+            characters.append(' ')
+            offsets.append(start + match.start())
+            position = match.end()
+    text = ''.join(characters)
+    leading = len(text) - len(text.lstrip(' '))
+    trailing = len(text.rstrip(' '))
+    return text[leading:trailing], offsets[leading:trailing]
+
+def split_compilation_units(source: str) -> List[CompilationUnit]:
+    """
+    Split TinySol source into compilation units without tokenizing it
+
+    Args:
+        source (str): TinySol source text
+
+    Returns:
+        List[CompilationUnit]: Units in source order
+    """
+    chunks = []
+    depth = 0
+    start = 0
+    for match in UNIT_DELIMITERS.finditer(source):
+        delimiter = match.group()
+        if delimiter == '{':
+            depth += 1
+        elif delimiter == '}':
+            depth -= 1
+            if depth == 0:
+                chunks.append((start, source[start:match.end()]))
+                start = match.end()
+        elif delimiter == ';' and depth == 0:
+            chunks.append((start, source[start:match.end()]))
+            start = match.end()
+    chunks.append((start, source[start:]))
+
+    units = []
+    statements = []
+    statement_offsets = []
+    for start, chunk in chunks:
+        text, offsets = normalize_source_with_offsets(chunk, start)
+        if not text:
+            continue
+        header = FUNCTION_HEADER.match(text)
+        if header:
+            units.append(CompilationUnit('function', header.group(1), text, offsets))
+        else:
+            if statements:
+                # The joining space
+                statement_offsets.append(offsets[0])
+            statements.append(text)
+            statement_offsets.extend(offsets)
+
+    # All top-level statements form a single unit
+    if statements:
+        units.append(CompilationUnit('statements', None, ' '.join(statements), statement_offsets))
+    return units
+
+class IncrementalCompiler:
+    """
+    Compiles TinySol source unit by unit, reusing the fragments of units
+    that did not change since they were last compiled.
+    """
+    def __init__(self, node_translators, optimization_level: int = DEFAULT_OPTIMIZATION_LEVEL):
+        """
+        Args:
+            node_translators (NodeTranslators): Translators used for units
+                that must be compiled
+            optimization_level (int): AST optimisation level of compiled units
+        """
+        self.node_translators = node_translators
+        self.optimization_level = optimization_level
+        self.parser = SolidityParser()
+        self.compiled_units: List[str] = []
+        self.reused_units: List[str] = []
+        # Source of the last compilation and the unit of each fragment in it
+        self.source = ''
+        self.fragment_units: Dict[str, CompilationUnit] = {}
+
+    def compile(self, source: str, options: Tuple = ()) -> Dict[str, FunctionFragment]:
+        """
+        Produce fragments for every unit of a program
+
+        Args:
+            source (str): TinySol source text
+            options (Tuple): Compiler options that affect generated code
+
+        Returns:
+            Dict[str, FunctionFragment]: Fragments by function name
+        """
+        self.compiled_units = []
+        self.reused_units = []
+        self.source = source
+        self.fragment_units = {}
+        cache = get_artifact_cache()
+        options = (self.optimization_level,) + tuple(options)
+
+        with measure_phase('split'):
+            units = split_compilation_units(source)
+
+        fragments = {}
+        for unit in units:
+            key = (unit.text, options)
+            unit_fragments = cache.get('fragment', key)
+            if unit_fragments is None:
+                unit_fragments = self._compile_unit(unit)
+                for name, fragment in unit_fragments.items():
+                    fragment.key = (name, unit.text, options)
+                cache.put('fragment', key, unit_fragments)
+                self.compiled_units.append(unit.name or 'statements')
+                count_event('units_compiled')
+            else:
+                self.reused_units.append(unit.name or 'statements')
+                count_event('units_reused')
+
+            for name, fragment in unit_fragments.items():
+                if name in fragments:
+                    raise TranslationError(f"Duplicate definition: {name}")
+                fragments[name] = fragment
+                self.fragment_units[name] = unit
+        return fragments
+
+    def locate(self, function: Optional[str], line: int, column: int) -> Tuple[int, int]:
+        """
+        Translate a position in the normalized text of a fragment's unit,
+        which is a single line, to a line and column of the last source
+
+        Args:
+            function (Optional[str]): Fragment name
+            line (int): Line in the unit text
+            column (int): Column in the unit text (1-based)
+
+        Returns:
+            Tuple[int, int]: Line and column in the source (1-based)
+        """
+        unit = self.fragment_units.get(function)
+        if unit is None or line != 1 or not 0 < column <= len(unit.offsets):
+            return line, column
+        offset = unit.offsets[column - 1]
+        return (self.source.count('\n', 0, offset) + 1,
+                offset - self.source.rfind('\n', 0, offset))
+
+    def _compile_unit(self, unit: CompilationUnit) -> Dict[str, FunctionFragment]:
+        """
+        Parse and translate a single unit
+        """
+        # Tokens are cached, so parsing afterwards does not tokenize again
+        with measure_phase('lex'):
+            self.parser.tokenize(unit.text)
+        with measure_phase('parse'):
+            program = self.parser.parse(unit.text)
+        with measure_phase('optimize'):
+            program = optimize_program(program, self.optimization_level)
+        with measure_phase('codegen'):
+            return self.node_translators.translate_fragments(program)
@@ -0,0 +1,300 @@
+"""
+Fragment Linker
+
+Assembles relocatable function fragments into a complete Brainfuck
+program and resolves their calls. Calls are inlined: the callee's frame is
+placed just above the caller's, and parameters the callee never assigns are
+bound to the caller's argument cells instead of being copied. Recursive
+functions, and functions whose inlined copies would exceed the code-size
+budget, are compiled into a shared-body dispatch loop instead.
+
+With multi-cell integers, the return value is written out in decimal.
+"""
+
+import re
+from typing import Dict, List, Optional, Set
+from src.artifact_cache import get_artifact_cache
+from src.ast2brainfuck.emitter import CodeEmitter
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.peephole import optimize
+from src.ast2brainfuck.range_analysis import ProgramRanges
+from src.ast2brainfuck.stats import count_event
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
+from src.ast2brainfuck.translators.bigint_translator import BigIntTranslator
+from src.ast2brainfuck.translators.function_translator import (
+    CallSite, FunctionFragment, FunctionTranslator, assigned_variables)
+from src.ast2brainfuck.translators.dispatch_translator import DispatchTranslator
+
+# Largest amount of Brainfuck (in instructions) a function may contribute
+# through all of its inlined copies before it gets a shared body instead
+DEFAULT_INLINE_BUDGET = 100000
+
+CALL_PATTERN = re.compile(r'\{(\d+)\}')
+
+class Linker(BaseTranslator):
+    def __init__(self, inline_budget: int = DEFAULT_INLINE_BUDGET):
+        """
+        Args:
+            inline_budget (int): Code-size budget for inlining a function
+        """
+        super().__init__(MemoryManager())
+        self.inline_budget = inline_budget
+        self.function_translator = FunctionTranslator()
+        # Value ranges the fragments were compiled with, if any
+        self.ranges: Optional[ProgramRanges] = None
+        self.fragments: Dict[str, FunctionFragment] = {}
+        # Functions compiled into the dispatch loop by the last link
+        self.dispatched: Set[str] = set()
+
+    def link(self, fragments: Dict[str, FunctionFragment], entry: str) -> str:
+        """
+        Link fragments into a program that runs the entry fragment at the
+        start of the tape and outputs its return value, if any: the cell
+        itself, or its decimal digits when compiled with value ranges, so
+        that the output does not depend on the width they give it.
+
+        Args:
+            fragments (Dict[str, FunctionFragment]): Fragments by name
+            entry (str): Name of the entry fragment
+
+        Returns:
+            str: Complete Brainfuck program
+
+        Raises:
+            TranslationError: If the entry fragment is missing or a call
+                cannot be resolved
+        """
+        if entry not in fragments:
+            raise TranslationError(f"Undefined entry point: {entry}")
+
+        self.fragments = fragments
+        self.function_translator.ranges = self.ranges
+        self.dispatched = self.plan_calls(entry)
+        count_event('functions_dispatched', len(self.dispatched))
+        if self.dispatched:
+            program = self._dispatch_program(entry)
+        else:
+            program = fragments[entry]
+
+        emitter = CodeEmitter()
+        self.emit_resolved(emitter, program.code, program.calls, program.frame_size)
+        self.output_cell = program.return_cell
+        if program.return_cell is not None and self.ranges is not None:
+            memory_manager = MemoryManager()
+            memory_manager.current_memory_pointer = program.frame_size
+            emitter.emit(BigIntTranslator(memory_manager).translate_print(
+                program.return_cell, program.return_width))
+        elif program.return_cell is not None:
+            emitter.emit(self._generate_output(program.return_cell))
+        return emitter.getvalue()
+
+    def plan_calls(self, entry: str) -> Set[str]:
+        """
+        Decide which functions get a shared body in the dispatch loop:
+        recursive functions, functions over the inlining budget, and every
+        function that calls one of those. All other calls are inlined.
+
+        Args:
+            entry (str): Name of the entry fragment
+
+        Returns:
+            Set[str]: Names of dispatched functions
+
+        Raises:
+            TranslationError: If a function with array parameters, which
+                only inlining supports, would have to be dispatched
+        """
+        call_sites = {}
+        pending = [entry]
+        while pending:
+            name = pending.pop()
+            if name in call_sites:
+                continue
+            if name not in self.fragments:
+                raise TranslationError(f"Call to undefined function: {name}")
+            call_sites[name] = [site.name for site in self.fragments[name].calls]
+            pending.extend(call_sites[name])
+
+        callers = {name: [] for name in call_sites}
+        for name, callees in call_sites.items():
+            for callee in callees:
+                callers[callee].append(name)
+
+        def reaches(start: str, goal: str) -> bool:
+            seen = set()
+            pending = list(call_sites[start])
+            while pending:
+                name = pending.pop()
+                if name == goal:
+                    return True
+                if name not in seen:
+                    seen.add(name)
+                    pending.extend(call_sites[name])
+            return False
+
+        dispatched = self._with_callers(
+            {name for name in call_sites if reaches(name, name)}, callers)
+
+        # Remaining functions form a call DAG, so sizes and copy counts are finite
+        sizes: Dict[str, int] = {}
+        copies: Dict[str, int] = {}
+
+        def inlined_size(name: str) -> int:
+            if name not in sizes:
+                # Measured after peephole optimisation, like the final program
+                sizes[name] = len(optimize(self.fragments[name].code)) + sum(
+                    inlined_size(callee) for callee in call_sites[name])
+            return sizes[name]
+
+        def copy_count(name: str) -> int:
+            if name not in copies:
+                copies[name] = sum(1 if caller in dispatched else copy_count(caller)
+                                   for caller in callers[name]) or 1
+            return copies[name]
+
+        # Array parameters are bound by reference, which only inlining supports
+        over_budget = {
+            name for name in call_sites
+            if name != entry and name not in dispatched and
+            not self._array_parameters(self.fragments[name]) and
+            inlined_size(name) * copy_count(name) > self.inline_budget
+        }
+        dispatched = self._with_callers(dispatched | over_budget, callers)
+        for name in sorted(dispatched):
+            if self._array_parameters(self.fragments[name]):
+                raise TranslationError(
+                    f"Function {name} takes an array parameter and cannot be dispatched; "
+                    f"it is recursive, or calls a recursive function or one over the inlining budget")
+        return dispatched
+
+    def resolve_calls(self, brainfuck_code: str, calls: List[CallSite], frame_size: int) -> str:
+        """
+        Replace the call placeholders of a fragment with inlined callees
+
+        Args:
+            brainfuck_code (str): Fragment code with placeholders
+            calls (List[CallSite]): Call sites the placeholders refer to
+            frame_size (int): Cells used by the calling frame
+
+        Returns:
+            str: Code without placeholders
+        """
+        emitter = CodeEmitter()
+        self.emit_resolved(emitter, brainfuck_code, calls, frame_size)
+        return emitter.getvalue()
+
+    def emit_resolved(self, emitter: CodeEmitter, brainfuck_code: str,
+                      calls: List[CallSite], frame_size: int) -> None:
+        """
+        Write fragment code to an emitter with its call placeholders
+        replaced by inlined callees. Nested callees are written in place
+        rather than built up as strings and copied into their callers.
+
+        Args:
+            emitter (CodeEmitter): Receives the resolved code
+            brainfuck_code (str): Fragment code with placeholders
+            calls (List[CallSite]): Call sites the placeholders refer to
+            frame_size (int): Cells used by the calling frame
+        """
+        position = 0
+        for match in CALL_PATTERN.finditer(brainfuck_code):
+            emitter.emit(brainfuck_code[position:match.start()])
+            self._emit_inline_call(emitter, calls[int(match.group(1))], frame_size)
+            position = match.end()
+        emitter.emit(brainfuck_code[position:])
+
+    def _with_callers(self, names: Set[str], callers: Dict[str, List[str]]) -> Set[str]:
+        """
+        Extend a set of functions with everything that calls into it
+        """
+        result = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in result:
+                result.add(name)
+                pending.extend(callers[name])
+        return result
+
+    def _emit_inline_call(self, emitter: CodeEmitter, site: CallSite, base: int) -> None:
+        """
+        Write an inlined call with the callee's frame starting at base
+        """
+        callee = self.fragments[site.name]
+        count_event('calls_inlined')
+        if site.name in self.dispatched:
+            raise TranslationError(f"Call to dispatched function {site.name} cannot be inlined")
+        if len(site.argument_cells) != len(callee.parameter_cells):
+            raise TranslationError(
+                f"{site.name} expects {len(callee.parameter_cells)} arguments, "
+                f"got {len(site.argument_cells)}")
+
+        written = assigned_variables(callee.node.body.children)
+        arrays = self._array_parameters(callee)
+        for (parameter, _), dimensions in zip(callee.parameter_cells, site.array_dimensions):
+            if arrays.get(parameter) != dimensions:
+                expected = f"an array of shape {arrays[parameter]}" if parameter in arrays else "a scalar"
+                raise TranslationError(f"{site.name} expects {expected} for {parameter}")
+        bindings = {
+            parameter: memory_index - base
+            for (parameter, _), (memory_index, _) in zip(callee.parameter_cells, site.argument_cells)
+            if parameter not in written or parameter in arrays
+        }
+        specialized = self._specialize(callee, bindings)
+
+        for (parameter, parameter_memory), (memory_index, is_temp), width in zip(
+                specialized.parameter_cells, site.argument_cells, specialized.parameter_widths):
+            if parameter in bindings:
+                continue
+            for offset in range(width):
+                if is_temp:
+                    emitter.emit(self._transfer_memory_value(
+                        memory_index + offset, [(base + parameter_memory + offset, 1)]))
+                else:
+                    emitter.emit(self._transfer_memory_value(
+                        memory_index + offset,
+                        [(base + parameter_memory + offset, 1), (site.scratch_cell, 1)]))
+                    emitter.emit(self._transfer_memory_value(
+                        site.scratch_cell, [(memory_index + offset, 1)]))
+
+        # The callee's body runs with the pointer on its frame, as `_at` would place it
+        emitter.emit(self._move(base))
+        self.emit_resolved(emitter, specialized.code, specialized.calls, specialized.frame_size)
+        emitter.emit(self._move(-base))
+        emitter.emit(self._move_number(base + specialized.return_cell, specialized.return_width,
+                                       site.target_cell, specialized.return_width))
+
+    def _array_parameters(self, fragment: FunctionFragment) -> Dict[str, List[int]]:
+        """
+        Dimensions of a function's array parameters by name
+        """
+        parameters = getattr(fragment.node, 'parameters', None) or []
+        return {parameter['name']: parameter['dimensions']
+                for parameter in parameters if parameter.get('dimensions')}
+
+    def _specialize(self, callee: FunctionFragment, bindings: Dict[str, int]) -> FunctionFragment:
+        """
+        Compile a callee with some parameters bound to caller cells
+        """
+        if not bindings:
+            return callee
+
+        compute = lambda: self.function_translator.translate_function(callee.node, bindings)
+        if callee.key is None:
+            return compute()
+        key = ('inline', callee.key, tuple(sorted(bindings.items())))
+        return get_artifact_cache().get_or_compute('fragment', key, compute)
+
+    def _dispatch_program(self, entry: str) -> FunctionFragment:
+        """
+        Compile the dispatched functions into one shared loop
+        """
+        group = {name: self.fragments[name] for name in sorted(self.dispatched)}
+        compute = lambda: DispatchTranslator(self.resolve_calls, ranges=self.ranges).translate_group(
+            group, entry)
+        if any(fragment.key is None for fragment in group.values()):
+            return compute()
+        # Inline callees are resolved into the program, so they are part of the key
+        keys = tuple(fragment.key for fragment in self.fragments.values() if fragment.key)
+        key = ('dispatch', entry, self.inline_budget, tuple(sorted(keys, key=repr)))
+        return get_artifact_cache().get_or_compute('fragment', key, compute)
@@ -1,61 +1,227 @@
+from typing import Dict, List, Optional
+from src.ast2brainfuck.stats import count_event
+
 class MemoryManager:
-    def __init__(self, initial_size=30000):
+    def __init__(self, initial_size=30000, array_base=None):
         """
         Initialize memory management for Brainfuck translation
-        
+
+        Cell indices are relative to the origin of the frame being
+        translated, so generated code can be placed anywhere on the tape.
+
         Args:
             initial_size (int): Initial memory tape size, default is 30000 cells
+            array_base (Optional[int]): First cell of a separate region for
+                arrays; by default arrays are allocated among the scalars
         """
         self.memory_size = initial_size
         self.current_memory_pointer = 0
-        self.variable_memory_map = {}
-        self.temp_memory_map = {}
-    
-    def allocate_variable(self, variable_name, initial_value=0):
+        self.variable_memory_map: Dict[str, int] = {}
+        # Cells of variables wider than one cell
+        self.variable_widths: Dict[str, int] = {}
+        self.temp_memory_map: Dict[int, int] = {}
+        self.free_temp_memory: List[int] = []
+        self.array_dimensions: Dict[str, List[int]] = {}
+        self.array_base = array_base
+        self.array_pointer = array_base or 0
+        self.array_cells = 0
+
+    def allocate_variable(self, variable_name, initial_value=0, width=1):
         """
         Allocate memory for a variable and track its memory location
-        
+
         Args:
             variable_name (str): Name of the variable
             initial_value (int): Initial value for the variable
-        
+            width (int): Number of cells holding the value, least
+                significant first
+
         Returns:
             int: Memory cell index for the variable
         """
         if variable_name in self.variable_memory_map:
             return self.variable_memory_map[variable_name]
-        
+
         memory_index = self.current_memory_pointer
         self.variable_memory_map[variable_name] = memory_index
-        self.current_memory_pointer += 1
-        
+        self.current_memory_pointer += width
+        if width > 1:
+            self.variable_widths[variable_name] = width
+        count_event('variables_allocated')
+
         return memory_index
-    
-    def get_variable_memory(self, variable_name):
+
+    def allocate_block(self, variable_name, size):
+        """
+        Allocate consecutive memory cells for a named block such as an array
+
+        Args:
+            variable_name (str): Name of the block
+            size (int): Number of cells
+
+        Returns:
+            int: Memory cell index of the first cell
+        """
+        if variable_name in self.variable_memory_map:
+            return self.variable_memory_map[variable_name]
+
+        memory_index = self.current_memory_pointer
+        self.variable_memory_map[variable_name] = memory_index
+        self.current_memory_pointer += size
+
+        return memory_index
+
+    def allocate_array(self, array_name, dimensions, size):
+        """
+        Allocate a block for an array and record its dimensions
+
+        Args:
+            array_name (str): Name of the array
+            dimensions (List[int]): Array dimension sizes
+            size (int): Number of cells occupied by the array
+
+        Returns:
+            int: Memory cell index of the first cell
+        """
+        self.array_dimensions[array_name] = list(dimensions)
+        if array_name not in self.variable_memory_map:
+            count_event('array_cells_allocated', size)
+        if self.array_base is None:
+            if array_name not in self.variable_memory_map:
+                self.array_cells += size
+            return self.allocate_block(array_name, size)
+
+        if array_name not in self.variable_memory_map:
+            self.variable_memory_map[array_name] = self.array_pointer
+            self.array_pointer += size
+        return self.variable_memory_map[array_name]
+
+    def bind_array(self, array_name, dimensions, memory_index):
+        """
+        Bind an array name to an array owned by another frame
+
+        Args:
+            array_name (str): Name of the array
+            dimensions (List[int]): Array dimension sizes
+            memory_index (int): First cell of the array relative to the frame
+        """
+        self.array_dimensions[array_name] = list(dimensions)
+        self.bind_variable(array_name, memory_index)
+
+    def bind_variable(self, variable_name, memory_index, width=1):
+        """
+        Bind a variable name to an existing memory cell, which may lie
+        outside the current frame (negative index)
+
+        Args:
+            variable_name (str): Name of the variable
+            memory_index (int): Memory cell index relative to the frame
+            width (int): Number of cells holding the value
+        """
+        self.variable_memory_map[variable_name] = memory_index
+        if width > 1:
+            self.variable_widths[variable_name] = width
+
+    def get_variable_memory(self, variable_name) -> Optional[int]:
         """
         Get memory location for a variable
-        
+
         Args:
             variable_name (str): Name of the variable
-        
+
         Returns:
-            int: Memory cell index for the variable
+            Optional[int]: Memory cell index for the variable, None if unknown
+        """
+        return self.variable_memory_map.get(variable_name)
+
+    def get_variable_width(self, variable_name) -> int:
+        """
+        Get the number of cells holding a variable's value
+
+        Args:
+            variable_name (str): Name of the variable
+
+        Returns:
+            int: Number of cells, 1 for single-cell and unknown variables
         """
-        return self.variable_memory_map.get(variable_name, -1)
-    
-    def allocate_temp_memory(self):
+        return self.variable_widths.get(variable_name, 1)
+
+    def allocate_temp_memory(self, width=1):
         """
-        Allocate a temporary memory cell
-        
+        Allocate a temporary memory cell, reusing released cells
+
+        Args:
+            width (int): Number of consecutive cells, for multi-cell
+                temporaries
+
         Returns:
             int: Memory cell index for temporary storage
         """
+        if width > 1:
+            free = set(self.free_temp_memory)
+            for temp_index in sorted(free):
+                cells = range(temp_index, temp_index + width)
+                if all(cell in free for cell in cells):
+                    self.free_temp_memory = [cell for cell in self.free_temp_memory
+                                             if cell not in cells]
+                    self.temp_memory_map[temp_index] = width
+                    count_event('temps_reused', width)
+                    return temp_index
+            return self.allocate_temp_block(width)
+        if self.free_temp_memory:
+            temp_index = self.free_temp_memory.pop()
+            count_event('temps_reused')
+        else:
+            temp_index = self.current_memory_pointer
+            self.current_memory_pointer += 1
+            count_event('temps_allocated')
+        self.temp_memory_map[temp_index] = 1
+        return temp_index
+
+    def allocate_temp_block(self, size):
+        """
+        Allocate consecutive temporary memory cells
+
+        Args:
+            size (int): Number of cells
+
+        Returns:
+            int: Memory cell index of the first cell
+        """
         temp_index = self.current_memory_pointer
-        self.current_memory_pointer += 1
+        self.current_memory_pointer += size
+        self.temp_memory_map[temp_index] = size
+        count_event('temps_allocated', size)
         return temp_index
-    
+
+    def release_temp_memory(self, temp_index):
+        """
+        Return a temporary cell or block for reuse. The generated code must
+        leave released cells at zero.
+
+        Args:
+            temp_index (int): Memory cell index returned by an allocation
+        """
+        size = self.temp_memory_map.pop(temp_index, 0)
+        self.free_temp_memory.extend(range(temp_index + size - 1, temp_index - 1, -1))
+
+    @property
+    def frame_size(self):
+        """
+        Number of cells used by the frame so far
+        """
+        return max(self.current_memory_pointer, self.array_pointer)
+
+    @property
+    def scalar_size(self):
+        """
+        Number of cells used by the frame so far, not counting arrays
+        """
+        return self.current_memory_pointer - self.array_cells
+
     def reset_temp_memory(self):
         """
         Reset temporary memory tracking
         """
         self.temp_memory_map.clear()
+        self.free_temp_memory.clear()
@@ -0,0 +1,486 @@
+"""
+AST Optimizer
+
+Rewrites TinySol syntax trees before they are translated. Optimisation
+levels follow the usual compiler flags:
+
+- -O0: no changes
+- -O1: dead-store elimination
+- -O2: -O1 plus loop-invariant code motion
+
+Parsed trees are shared through the artifact cache, so the optimizer never
+modifies a node in place; changed nodes are copied.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from src.solidity_parser import ASTNode
+
+DEFAULT_OPTIMIZATION_LEVEL = 2
+OPTIMIZATION_LEVELS = (0, 1, 2)
+
+# Name of the variable holding the n-th hoisted loop invariant
+INVARIANT_SLOT = '<invariant{}>'
+
+def parse_optimization_level(level: Union[int, str]) -> int:
+    """
+    Accept an optimisation level as a number or as a flag such as '-O2'
+
+    Args:
+        level (Union[int, str]): Level or flag
+
+    Returns:
+        int: Optimisation level
+
+    Raises:
+        ValueError: If the level is unknown
+    """
+    if isinstance(level, str) and level.startswith('-O') and level[2:].isdigit():
+        level = int(level[2:])
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown optimization level: {level}")
+    return level
+
+def optimize_program(program: Any, level: Union[int, str] = DEFAULT_OPTIMIZATION_LEVEL) -> Any:
+    """
+    Optimise every function and the top-level statements of a program
+
+    Args:
+        program (Any): Program AST node
+        level (Union[int, str]): Optimisation level
+
+    Returns:
+        Any: Optimised Program node (the input node when nothing changed)
+    """
+    level = parse_optimization_level(level)
+    if level == 0:
+        return program
+
+    children = []
+    statements = []
+    for item in program.children:
+        if item.type == 'Function':
+            children.append(optimize_function(item, level))
+        else:
+            statements.append(item)
+
+    if statements:
+        # Top-level variables stay observable in memory after the program ends
+        children.extend(optimize_statements(statements, level, live_out=written_names(statements)))
+
+    optimized = copy.copy(program)
+    optimized.children = children
+    return optimized
+
+def optimize_function(node: Any, level: int) -> Any:
+    """
+    Optimise the body of a function definition
+
+    Args:
+        node (Any): FunctionNode
+        level (int): Optimisation level
+
+    Returns:
+        Any: Optimised FunctionNode
+    """
+    arrays = {parameter['name'] for parameter in node.parameters if parameter.get('dimensions')}
+    body = copy.copy(node.body)
+    body.children = optimize_statements(node.body.children, level, set(), arrays)
+    optimized = copy.copy(node)
+    optimized.body = body
+    return optimized
+
+def optimize_statements(statements: List[Any], level: int, live_out: Set[str],
+                        arrays: Optional[Set[str]] = None) -> List[Any]:
+    """
+    Optimise a statement list
+
+    Args:
+        statements (List[Any]): Statement nodes
+        level (int): Optimisation level
+        live_out (Set[str]): Variables read after the statements finish
+        arrays (Optional[Set[str]]): Array parameters of the enclosing
+            function
+
+    Returns:
+        List[Any]: Optimised statements
+    """
+    arrays = set(arrays or ()) | declared_arrays(statements)
+    if level >= 2:
+        statements = LoopInvariantCodeMotion(arrays).hoist(statements)
+    if level >= 1:
+        statements, _ = DeadStoreElimination().eliminate(statements, live_out)
+    return statements
+
+def statement_parts(node: Any) -> List[Any]:
+    """
+    Child statements and expressions of a node, in evaluation order
+    """
+    if node is None:
+        return []
+    if isinstance(node, list):
+        return node
+    if isinstance(node.value, dict):
+        keys = ['init', 'test', 'target', 'expression', 'body', 'update', 'alternate']
+        parts = [node.value[key] for key in keys if isinstance(node.value.get(key), ASTNode)]
+        return parts + list(node.children)
+    return list(node.children)
+
+def written_names(node: Any) -> Set[str]:
+    """
+    Names of the variables and arrays a statement declares or assigns
+
+    Args:
+        node (Any): Statement AST node or list of nodes
+
+    Returns:
+        Set[str]: Written names
+    """
+    if node is None:
+        return set()
+    names = set()
+    if isinstance(node, list):
+        for item in node:
+            names |= written_names(item)
+        return names
+    if node.type == 'Assignment':
+        names.add(node.value['variable'])
+    elif node.type == 'VariableDeclaration':
+        names.add(node.value['name'])
+    elif node.type == 'Array':
+        names.add(node.name)
+    for part in statement_parts(node):
+        names |= written_names(part)
+    return names
+
+def declared_arrays(node: Any) -> Set[str]:
+    """
+    Names of the arrays declared in a statement
+    """
+    if node is None:
+        return set()
+    if isinstance(node, list):
+        return set().union(*(declared_arrays(item) for item in node))
+    names = {node.name} if node.type == 'Array' else set()
+    for part in statement_parts(node):
+        names |= declared_arrays(part)
+    return names
+
+def read_names(node: Any) -> Set[str]:
+    """
+    Names of the variables and arrays an expression reads
+    """
+    if node is None:
+        return set()
+    names = set()
+    if node.type == 'Identifier':
+        names.add(node.value)
+    elif node.type == 'ArrayAccess':
+        names.add(node.array_name)
+    for child in node.children:
+        names |= read_names(child)
+    return names
+
+def has_call(node: Any) -> bool:
+    """
+    Check whether an expression contains a function call
+    """
+    if node is None:
+        return False
+    return node.type == 'FunctionCall' or any(has_call(child) for child in node.children)
+
+def expression_key(node: Any) -> Tuple:
+    """
+    Structural key of an expression, equal for identical expressions
+    """
+    name = node.array_name if node.type == 'ArrayAccess' else node.value
+    if isinstance(name, dict):
+        name = name.get('name')
+    return (node.type, name, tuple(expression_key(child) for child in node.children))
+
+class LoopInvariantCodeMotion:
+    """
+    Moves computations whose operands do not change inside a loop to just
+    before the loop, so they run once instead of on every iteration.
+    Identical invariant expressions in the same loop share one variable.
+    """
+    def __init__(self, arrays: Set[str]):
+        """
+        Args:
+            arrays (Set[str]): Arrays visible in the function, which calls
+                may modify through their reference
+        """
+        self.arrays = arrays
+        self.count = 0
+
+    def hoist(self, statements: List[Any]) -> List[Any]:
+        """
+        Hoist invariants out of every loop in a statement list
+
+        Args:
+            statements (List[Any]): Statement nodes
+
+        Returns:
+            List[Any]: Rewritten statements
+        """
+        result = []
+        for statement in statements:
+            if statement.type in ['While', 'For']:
+                hoisted, statement = self._hoist_loop(statement)
+                result.extend(hoisted)
+            result.append(self._hoist_nested(statement))
+        return result
+
+    def _hoist_nested(self, node: Any) -> Any:
+        """
+        Process the loops inside the blocks of a statement
+        """
+        if node.type == 'Block':
+            block = copy.copy(node)
+            block.children = self.hoist(node.children)
+            return block
+        if node.type in ['If', 'While', 'For']:
+            value = dict(node.value)
+            for key in ['body', 'alternate']:
+                if value.get(key) is not None:
+                    value[key] = self._hoist_nested(value[key])
+            statement = copy.copy(node)
+            statement.value = value
+            return statement
+        return node
+
+    def _hoist_loop(self, loop: Any) -> Tuple[List[Any], Any]:
+        """
+        Replace the invariants of a loop with variables computed before it
+        """
+        variant = written_names(loop)
+        # Arrays passed to calls may be written by the callee
+        for node in self._walk(loop):
+            if node.type == 'FunctionCall':
+                variant |= {argument.value for argument in node.children
+                            if argument.type == 'Identifier' and argument.value in self.arrays}
+
+        invariants: Dict[Tuple, str] = {}
+        hoisted = []
+
+        def replace(expression: Any) -> Any:
+            if expression is None:
+                return None
+            if self._is_invariant(expression, variant) and self._is_worth_hoisting(expression):
+                key = expression_key(expression)
+                if key not in invariants:
+                    self.count += 1
+                    invariants[key] = INVARIANT_SLOT.format(self.count)
+                    declaration = ASTNode('VariableDeclaration',
+                                          {'name': invariants[key], 'value': '',
+                                           'expression': expression})
+                    # Hoisted code is attributed to its loop in source maps
+                    declaration.line, declaration.column = loop.line, loop.column
+                    hoisted.append(declaration)
+                return ASTNode('Identifier', invariants[key])
+            if not expression.children:
+                return expression
+            rewritten = copy.copy(expression)
+            rewritten.children = [replace(child) for child in expression.children]
+            return rewritten
+
+        value = dict(loop.value)
+        value['test'] = replace(value['test'])
+        value['body'] = self._rewrite(value['body'], replace)
+        if loop.type == 'For':
+            value['update'] = self._rewrite(value['update'], replace)
+        rewritten = copy.copy(loop)
+        rewritten.value = value
+        return hoisted, rewritten
+
+    def _rewrite(self, node: Any, replace) -> Any:
+        """
+        Apply an expression rewrite to every expression of a statement
+        """
+        if node is None:
+            return None
+        statement = copy.copy(node)
+        if node.type == 'Block':
+            statement.children = [self._rewrite(child, replace) for child in node.children]
+        elif node.type == 'FunctionCall':
+            statement.children = [replace(child) for child in node.children]
+        elif isinstance(node.value, dict):
+            value = dict(node.value)
+            for key in ['test', 'expression', 'target']:
+                if value.get(key) is not None:
+                    value[key] = replace(value[key])
+            for key in ['init', 'body', 'update', 'alternate']:
+                if value.get(key) is not None:
+                    value[key] = self._rewrite(value[key], replace)
+            statement.value = value
+        return statement
+
+    def _walk(self, node: Any):
+        """
+        Yield every node below a statement
+        """
+        if node is None:
+            return
+        yield node
+        for part in statement_parts(node):
+            yield from self._walk(part)
+
+    def _is_invariant(self, node: Any, variant: Set[str]) -> bool:
+        """
+        Check whether an expression has the same value on every iteration
+        and can safely be evaluated before the loop
+        """
+        if node.type == 'Literal':
+            return True
+        if node.type == 'Identifier':
+            return node.value not in variant
+        if node.type == 'ArrayAccess' and node.array_name in variant:
+            return False
+        if node.type == 'FunctionCall':
+            return False
+        if node.type == 'BinaryExpression' and node.value in ['/', '%']:
+            # Evaluating a division the loop would have skipped must not
+            # divide by zero
+            divisor = node.children[1]
+            if divisor.type != 'Literal' or divisor.value == 0:
+                return False
+        if node.type not in ['BinaryExpression', 'UnaryExpression', 'ArrayAccess']:
+            return False
+        return all(self._is_invariant(child, variant) for child in node.children)
+
+    def _is_worth_hoisting(self, node: Any) -> bool:
+        """
+        Check whether an expression costs more than reading a variable.
+        Adding a constant to a variable is as cheap as copying the result.
+        """
+        if node.type == 'ArrayAccess':
+            return True
+        if node.type == 'BinaryExpression':
+            if node.value in ['+', '-'] and any(child.type == 'Literal' for child in node.children):
+                return any(self._is_worth_hoisting(child) for child in node.children)
+            return True
+        if node.type == 'UnaryExpression':
+            return True
+        return False
+
+class DeadStoreElimination:
+    """
+    Removes assignments whose value is never read, either because the
+    variable is overwritten first or because it is not used again. Stores
+    to array elements and stores of calls, which may have side effects,
+    are kept.
+    """
+    def eliminate(self, statements: List[Any], live_out: Set[str]) -> Tuple[List[Any], Set[str]]:
+        """
+        Eliminate dead stores from a statement list
+
+        Args:
+            statements (List[Any]): Statement nodes
+            live_out (Set[str]): Variables read after the statements
+
+        Returns:
+            Tuple[List[Any], Set[str]]: Rewritten statements and the
+            variables read before being written
+        """
+        live = set(live_out)
+        result = []
+        for statement in reversed(statements):
+            statement, live = self._statement(statement, live)
+            if statement is not None:
+                result.append(statement)
+        result.reverse()
+        return result, live
+
+    def _statement(self, node: Any, live: Set[str]) -> Tuple[Optional[Any], Set[str]]:
+        """
+        Rewrite one statement given the variables live after it, and
+        return the variables live before it
+        """
+        node_type = node.type
+        if node_type == 'Block':
+            children, live = self.eliminate(node.children, live)
+            block = copy.copy(node)
+            block.children = children
+            return block, live
+
+        if node_type == 'Assignment':
+            expression = node.value['expression']
+            if 'target' in node.value:
+                return node, live | read_names(node.value['target']) | read_names(expression)
+            variable = node.value['variable']
+            if variable not in live and not has_call(expression):
+                return None, live
+            return node, (live - {variable}) | read_names(expression)
+
+        if node_type == 'VariableDeclaration':
+            expression = node.value.get('expression')
+            name = node.value['name']
+            if expression is not None and name not in live and not has_call(expression):
+                # The declaration itself is kept, later stores need the variable
+                statement = copy.copy(node)
+                statement.value = {'name': name}
+                return statement, live - {name}
+            return node, (live - {name}) | read_names(expression)
+
+        if node_type == 'Return':
+            return node, read_names(node.value.get('expression'))
+
+        if node_type == 'If':
+            body, body_live = self._block(node.value['body'], live)
+            alternate, alternate_live = self._block(node.value.get('alternate'), live)
+            statement = copy.copy(node)
+            statement.value = dict(node.value, body=body, alternate=alternate)
+            return statement, body_live | alternate_live | read_names(node.value['test'])
+
+        if node_type == 'While':
+            return self._loop(node, live, None)
+
+        if node_type == 'For':
+            statement, live = self._loop(node, live, node.value['update'])
+            if node.value['init'] is not None:
+                init, live = self._statement(node.value['init'], live)
+                statement.value['init'] = init
+            return statement, live
+
+        if node_type == 'FunctionCall':
+            return node, live | read_names(node)
+
+        # Declarations of arrays and anything unknown are kept unchanged
+        return node, live | read_names(node)
+
+    def _block(self, node: Any, live: Set[str]) -> Tuple[Any, Set[str]]:
+        """
+        Rewrite an optional block, returning the variables live before it
+        """
+        if node is None:
+            return None, set(live)
+        return self._statement(node, live)
+
+    def _loop(self, node: Any, live_out: Set[str], update: Any) -> Tuple[Any, Set[str]]:
+        """
+        Rewrite a loop. Variables read by a later iteration are live at the
+        end of the body, so liveness is iterated to a fixed point first. The
+        update of a for loop is always kept.
+        """
+        head = live_out | read_names(node.value['test'])
+        while True:
+            _, body_live = self.eliminate(node.value['body'].children,
+                                          self._live_before_update(update, head))
+            if body_live <= head:
+                break
+            head = head | body_live
+
+        body = copy.copy(node.value['body'])
+        body.children, _ = self.eliminate(node.value['body'].children,
+                                          self._live_before_update(update, head))
+        statement = copy.copy(node)
+        statement.value = dict(node.value, body=body)
+        return statement, head
+
+    def _live_before_update(self, update: Any, live: Set[str]) -> Set[str]:
+        """
+        Variables live before the update statement of a for loop
+        """
+        if update is None:
+            return live
+        return (live - {update.value['variable']}) | read_names(update.value['expression'])
@@ -0,0 +1,121 @@
+"""
+Peephole Optimizer
+
+Removes instruction pairs that cancel out in generated Brainfuck code.
+"""
+
+from typing import List, Optional, Tuple
+from src.ast2brainfuck.emitter import CodeEmitter
+from src.ast2brainfuck.source_map import (
+    LABEL_END, SCOPE_END, SCOPE_START, Scope, SourceMap, SourceRange, parse_label, strip_markers)
+
+# Instructions that undo each other when adjacent
+INVERSE = {'>': '<', '<': '>', '+': '-', '-': '+'}
+
+def optimize(brainfuck_code: str) -> str:
+    """
+    Cancel adjacent inverse instructions (<>, ><, +-, -+) and drop
+    non-instruction characters.
+
+    Translators move the pointer back to the frame origin after every
+    operation, which leaves many such pairs behind. Cancellation cascades,
+    so '>><<' disappears entirely.
+
+    Args:
+        brainfuck_code (str): Generated Brainfuck code
+
+    Returns:
+        str: Equivalent, shorter Brainfuck code
+    """
+    output = []
+    for instruction in strip_markers(brainfuck_code):
+        if instruction in INVERSE:
+            if output and output[-1] == INVERSE[instruction]:
+                output.pop()
+                continue
+        elif instruction not in '[].,':
+            continue
+        output.append(instruction)
+    return ''.join(output)
+
+def optimize_with_source_map(brainfuck_code: str) -> Tuple[str, SourceMap]:
+    """
+    Optimize like `optimize`, and map the remaining instructions to the
+    innermost function and statement scopes that generated them
+
+    Args:
+        brainfuck_code (str): Generated Brainfuck code with scope markers
+
+    Returns:
+        Tuple[str, SourceMap]: Optimized code and its source map
+    """
+    emitter = CodeEmitter()
+    source_map = emit_with_source_map(brainfuck_code, emitter)
+    return emitter.getvalue(), source_map
+
+def emit_with_source_map(brainfuck_code: str, emitter: CodeEmitter) -> SourceMap:
+    """
+    Optimize like `optimize_with_source_map`, writing the optimized code
+    to an emitter as it becomes final
+
+    Code up to a bracket, '.' or ',' can no longer change, because nothing
+    cancels those instructions, so it is handed to the emitter whenever
+    enough of it has accumulated.
+
+    Args:
+        brainfuck_code (str): Generated Brainfuck code with scope markers
+        emitter (CodeEmitter): Receives the optimized code
+
+    Returns:
+        SourceMap: Source map of the optimized code
+    """
+    # Optimized code not yet handed to the emitter
+    output = []
+    owners = []
+    # Innermost function, innermost statement scope and the whole stack of
+    # scopes for every open scope
+    scopes: List[Tuple[Optional[str], Optional[Scope], Tuple[Scope, ...]]] = [(None, None, ())]
+    index = 0
+    while index < len(brainfuck_code):
+        instruction = brainfuck_code[index]
+        index += 1
+        if instruction == SCOPE_START:
+            end = brainfuck_code.index(LABEL_END, index)
+            function, position = parse_label(brainfuck_code[index:end])
+            outer_function, _, stack = scopes[-1]
+            if function is not None:
+                scope = (function, None, None, None)
+                scopes.append((function, None, stack + (scope,)))
+            else:
+                scope = (outer_function,) + position
+                scopes.append((outer_function, scope, stack + (scope,)))
+            index = end + 1
+            continue
+        if instruction == SCOPE_END:
+            scopes.pop()
+            continue
+        if instruction in INVERSE:
+            if output and output[-1] == INVERSE[instruction]:
+                output.pop()
+                owners.pop()
+                continue
+        elif instruction not in '[].,':
+            continue
+        elif len(output) >= emitter.chunk_size:
+            emitter.emit(''.join(output))
+            output = []
+        output.append(instruction)
+        owners.append(scopes[-1])
+
+    ranges = []
+    start = 0
+    for offset in range(1, len(owners) + 1):
+        if offset < len(owners) and owners[offset] is owners[start]:
+            continue
+        function, statement, stack = owners[start]
+        if stack:
+            _, line, column, node_type = statement or (function, None, None, None)
+            ranges.append(SourceRange(start, offset, function, line, column, node_type, stack))
+        start = offset
+    emitter.emit(''.join(output))
+    return SourceMap(ranges)
@@ -0,0 +1,522 @@
+"""
+Value Range Analysis
+
+Finds an interval containing every value each variable, parameter and
+return value of a program can hold, so the code generator can give each
+of them the fewest cells that fit (see `bigint_translator.py`). Values
+are unsigned, so a subtraction that may go below zero, like a negative
+constant, wraps around and can take any value of the widest integers.
+
+Functions are analysed with abstract interpretation over intervals. Loops
+and the program's call graph are iterated to a fixed point; bounds that
+still grow after a few rounds are widened to zero or to unbounded, and a
+few narrowing rounds then recover the bounds that loop conditions imply
+(`i < n` keeps `i` below `n`). Parameters take the values of all call
+arguments, and calls evaluate to their callee's return values. Array
+elements are single cells.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# Interval of values, high may be math.inf
+Interval = Tuple[int, float]
+
+UNBOUNDED = math.inf
+# Any value, and the values of a single cell
+TOP: Interval = (0, UNBOUNDED)
+BYTE: Interval = (0, 255)
+BOOLEAN: Interval = (0, 1)
+
+# Rounds of plain iteration before growing bounds are widened
+WIDENING_DELAY = 3
+# Rounds of narrowing after a loop's widened fixed point is found
+NARROWING_ROUNDS = 2
+
+COMPARISONS = {'<', '<=', '>', '>=', '==', '!='}
+# The comparison that holds when a comparison fails, and the comparison
+# seen from its right operand
+NEGATED = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '=='}
+MIRRORED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+
+def join(left: Optional[Interval], right: Optional[Interval]) -> Optional[Interval]:
+    """
+    Smallest interval containing both intervals; None is the empty interval
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return (min(left[0], right[0]), max(left[1], right[1]))
+
+def widen(old: Optional[Interval], new: Optional[Interval]) -> Optional[Interval]:
+    """
+    Join two intervals, moving bounds that grew to zero or unbounded
+    """
+    if old is None or new is None:
+        return join(old, new)
+    return (0 if new[0] < old[0] else old[0], UNBOUNDED if new[1] > old[1] else old[1])
+
+def cells_for(interval: Optional[Interval], max_cells: int) -> int:
+    """
+    Number of cells holding every value of an interval, at most max_cells
+
+    Args:
+        interval (Optional[Interval]): Values to hold
+        max_cells (int): Width of unbounded values
+
+    Returns:
+        int: Number of cells
+    """
+    high = 0 if interval is None else interval[1]
+    cells = 1
+    while cells < max_cells and high >= 256 ** cells:
+        cells += 1
+    return cells
+
+def _divide(high: float, divisor: float) -> float:
+    return UNBOUNDED if high == UNBOUNDED else high // divisor
+
+class Signature:
+    """
+    Values entering and leaving a function.
+    """
+    def __init__(self, parameters: List[Optional[Interval]], result: Optional[Interval]):
+        """
+        Args:
+            parameters (List[Optional[Interval]]): Values of each parameter,
+                None for parameters no call has reached yet
+            result (Optional[Interval]): Return values, None if the
+                function has not returned yet
+        """
+        self.parameters = parameters
+        self.result = result
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, Signature) and other.parameters == self.parameters
+                and other.result == self.result)
+
+class FunctionAnalysis:
+    """
+    Interval analysis of one function body, given the signatures of the
+    functions it calls.
+    """
+    def __init__(self, signatures: Dict[str, Signature]):
+        """
+        Args:
+            signatures (Dict[str, Signature]): Signatures of all functions
+        """
+        self.signatures = signatures
+        # Summaries, collected only while `recording` (see `_loop`)
+        self.variables: Dict[str, Interval] = {}
+        self.result: Optional[Interval] = None
+        self.arguments: Dict[str, List[Optional[Interval]]] = {}
+        self.recording = True
+
+    def analyze(self, parameters: List[Dict[str, Any]], intervals: List[Optional[Interval]],
+                statements: List[Any]) -> 'FunctionAnalysis':
+        """
+        Analyse a function body
+
+        Args:
+            parameters (List[Dict[str, Any]]): Parameter descriptions
+            intervals (List[Optional[Interval]]): Values of each parameter
+            statements (List[Any]): Body statements
+
+        Returns:
+            FunctionAnalysis: This analysis, with its summaries filled in
+        """
+        state = {}
+        for parameter, interval in zip(parameters, intervals):
+            if not parameter.get('dimensions'):
+                state[parameter['name']] = interval or BYTE
+                self._record(parameter['name'], state[parameter['name']])
+        self._block(statements, state)
+        return self
+
+    def _record(self, name: str, interval: Optional[Interval]) -> None:
+        if self.recording:
+            self.variables[name] = join(self.variables.get(name), interval or (0, 0))
+
+    def evaluate(self, node: Any, state: Dict[str, Interval]) -> Optional[Interval]:
+        """
+        Values an expression can take in a state; None if it has none yet
+        because it depends on a call that has not returned
+        """
+        if node is None:
+            return (0, 0)
+        node_type = node.type
+        if node_type == 'Literal':
+            # Negative constants wrap around to the top
+            return (node.value, node.value) if node.value >= 0 else TOP
+        if node_type == 'Identifier':
+            return state.get(node.value, TOP)
+        if node_type == 'ArrayAccess':
+            for index in node.children:
+                self.evaluate(index, state)
+            return BYTE
+        if node_type == 'FunctionCall':
+            return self._call(node, state)
+
+        operands = [self.evaluate(child, state) for child in node.children]
+        if node.value in COMPARISONS or node.value in ['&&', '||', '!']:
+            return BOOLEAN
+        if None in operands:
+            return None
+        if node_type == 'UnaryExpression':
+            # Negation wraps around to the top of the value's width
+            return (0, 0) if operands[0] == (0, 0) else TOP
+
+        (left_low, left_high), (right_low, right_high) = operands
+        operator = node.value
+        if operator == '+':
+            return (left_low + right_low, left_high + right_high)
+        if operator == '-':
+            # A difference that may go below zero wraps around to the top
+            if left_low < right_high:
+                return TOP
+            return (left_low - right_high, left_high - right_low)
+        if operator == '*':
+            if left_high == 0 or right_high == 0:
+                return (0, 0)
+            return (left_low * right_low, left_high * right_high)
+        if operator == '/':
+            # Division by zero yields zero
+            low = 0 if right_high == UNBOUNDED or right_low == 0 else left_low // right_high
+            return (low, _divide(left_high, max(right_low, 1)))
+        if operator == '%':
+            return (0, min(left_high, max(right_high - 1, 0)))
+        return TOP
+
+    def _call(self, node: Any, state: Dict[str, Interval]) -> Optional[Interval]:
+        """
+        Record the arguments of a call and return its callee's results
+        """
+        name = node.value['name']
+        arguments = [self.evaluate(argument, state) for argument in node.children]
+        if self.recording:
+            recorded = self.arguments.setdefault(name, [None] * len(arguments))
+            for index, interval in enumerate(arguments[:len(recorded)]):
+                recorded[index] = join(recorded[index], interval)
+        signature = self.signatures.get(name)
+        return TOP if signature is None else signature.result
+
+    def _refine(self, test: Any, state: Optional[Dict[str, Interval]],
+                truth: bool) -> Optional[Dict[str, Interval]]:
+        """
+        Narrow a state to the values for which a condition has a given
+        truth value; None if there are none
+        """
+        if state is None or test is None:
+            return state
+        if test.type == 'Identifier' and test.value in state:
+            low, high = state[test.value]
+            return self._bound(state, test.value, (max(low, 1), high) if truth else (0, 0))
+        if test.type == 'UnaryExpression' and test.value == '!':
+            return self._refine(test.children[0], state, not truth)
+        if test.type != 'BinaryExpression':
+            return state
+
+        operator = test.value
+        left, right = test.children
+        if operator in ['&&', '||']:
+            if (operator == '&&') == truth:
+                return self._refine(right, self._refine(left, state, truth), truth)
+            return state
+        if operator not in COMPARISONS:
+            return state
+        if not truth:
+            operator = NEGATED[operator]
+        if left.type == 'Identifier' and left.value in state:
+            state = self._compare(state, left.value, operator, self.evaluate(right, state))
+        if state is not None and right.type == 'Identifier' and right.value in state:
+            state = self._compare(state, right.value, MIRRORED[operator],
+                                  self.evaluate(left, state))
+        return state
+
+    def _compare(self, state: Dict[str, Interval], name: str, operator: str,
+                 other: Optional[Interval]) -> Optional[Dict[str, Interval]]:
+        """
+        Narrow a variable to the values for which `name operator other`
+        can hold
+        """
+        if other is None:
+            return state
+        low, high = state[name]
+        if operator == '<':
+            high = min(high, other[1] - 1)
+        elif operator == '<=':
+            high = min(high, other[1])
+        elif operator == '>':
+            low = max(low, other[0] + 1)
+        elif operator == '>=':
+            low = max(low, other[0])
+        elif operator == '==':
+            low, high = max(low, other[0]), min(high, other[1])
+        return self._bound(state, name, (low, high))
+
+    def _bound(self, state: Dict[str, Interval], name: str,
+               interval: Interval) -> Optional[Dict[str, Interval]]:
+        if interval[0] > interval[1]:
+            return None
+        return dict(state, **{name: interval})
+
+    def _block(self, statements: List[Any],
+               state: Optional[Dict[str, Interval]]) -> Optional[Dict[str, Interval]]:
+        """
+        State after a statement list; None once every path has returned
+        """
+        for statement in statements:
+            if state is None:
+                break
+            state = self._statement(statement, state)
+        return state
+
+    def _statement(self, node: Any, state: Dict[str, Interval]) -> Optional[Dict[str, Interval]]:
+        node_type = node.type
+        if node_type == 'Block':
+            return self._block(node.children, state)
+        if node_type in ['VariableDeclaration', 'Assignment']:
+            value = self.evaluate(node.value.get('expression'), state)
+            if 'target' in node.value:
+                self.evaluate(node.value['target'], state)
+                return state
+            name = node.value['name'] if node_type == 'VariableDeclaration' else node.value['variable']
+            self._record(name, value)
+            return dict(state, **{name: value or (0, 0)})
+        if node_type == 'If':
+            test = node.value['test']
+            self.evaluate(test, state)
+            then_state = self._block(node.value['body'].children, self._refine(test, state, True))
+            else_state = self._refine(test, state, False)
+            alternate = node.value.get('alternate')
+            if alternate is not None:
+                else_state = self._block(alternate.children, else_state)
+            return join_states(then_state, else_state)
+        if node_type == 'While':
+            return self._loop(node.value['test'], node.value['body'].children, state)
+        if node_type == 'For':
+            if node.value['init'] is not None:
+                state = self._statement(node.value['init'], state)
+            body = list(node.value['body'].children) + [node.value['update']]
+            return self._loop(node.value['test'], body, state)
+        if node_type == 'Return':
+            value = self.evaluate(node.value.get('expression'), state)
+            if self.recording:
+                self.result = join(self.result, value)
+            return None
+        if node_type == 'FunctionCall':
+            self.evaluate(node, state)
+        return state
+
+    def _loop(self, test: Any, body: List[Any],
+              state: Dict[str, Interval]) -> Optional[Dict[str, Interval]]:
+        """
+        State after a loop. The loop head state is found without recording
+        anything, then the body is analysed once more from it to record
+        the values it produces.
+        """
+        recording, self.recording = self.recording, False
+        head = state
+        rounds = 0
+        while True:
+            after = join_states(state, self._block(body, self._refine(test, head, True)))
+            if rounds >= WIDENING_DELAY:
+                after = widen_states(head, after)
+            if after == head:
+                break
+            head = after
+            rounds += 1
+        for _ in range(NARROWING_ROUNDS):
+            head = join_states(state, self._block(body, self._refine(test, head, True)))
+        self.recording = recording
+
+        self.evaluate(test, head)
+        self._block(body, self._refine(test, head, True))
+        return self._refine(test, head, False)
+
+def join_states(left: Optional[Dict[str, Interval]],
+                right: Optional[Dict[str, Interval]]) -> Optional[Dict[str, Interval]]:
+    """
+    Join two states; a variable missing from one side may still be zero
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return {name: join(left.get(name, (0, 0)), right.get(name, (0, 0)))
+            for name in left.keys() | right.keys()}
+
+def widen_states(old: Dict[str, Interval], new: Dict[str, Interval]) -> Dict[str, Interval]:
+    """
+    Widen every variable of a state that grew
+    """
+    return {name: widen(old[name], interval) if name in old else interval
+            for name, interval in new.items()}
+
+class FunctionRanges:
+    """
+    Value ranges of one function: the widths the code generator gives its
+    variables, parameters and return value.
+    """
+    def __init__(self, program: 'ProgramRanges', variables: Dict[str, Interval],
+                 result: Optional[Interval]):
+        """
+        Args:
+            program (ProgramRanges): Ranges of the whole program
+            variables (Dict[str, Interval]): Values of each variable and
+                parameter anywhere in the function
+            result (Optional[Interval]): Return values
+        """
+        self.program = program
+        self.variables = variables
+        self.result = result
+
+    @property
+    def result_width(self) -> int:
+        """
+        Cells of the return value
+        """
+        return cells_for(self.result, self.program.max_cells)
+
+    def variable_width(self, name: str) -> int:
+        """
+        Cells of a variable; variables the analysis did not see get one
+        """
+        if name not in self.variables:
+            return 1
+        return cells_for(self.variables[name], self.program.max_cells)
+
+    def expression_width(self, node: Any) -> int:
+        """
+        Cells holding every value of an expression, with each variable
+        taking any value it has anywhere in the function
+        """
+        analysis = FunctionAnalysis(self.program.signatures)
+        analysis.recording = False
+        return cells_for(analysis.evaluate(node, self.variables), self.program.max_cells)
+
+    def key(self) -> Tuple:
+        return (tuple(sorted(self.variables.items())), self.result)
+
+class ProgramRanges:
+    """
+    Value ranges of every function of a program.
+    """
+    def __init__(self, max_cells: int):
+        """
+        Args:
+            max_cells (int): Cells of values without a known bound
+        """
+        self.max_cells = max_cells
+        self.signatures: Dict[str, Signature] = {}
+        self.functions: Dict[str, FunctionRanges] = {}
+        self.parameters: Dict[str, List[Dict[str, Any]]] = {}
+
+    def function(self, name: str) -> Optional[FunctionRanges]:
+        """
+        Ranges of a function, None for functions not in the program
+        """
+        return self.functions.get(name)
+
+    def parameter_widths(self, name: str) -> List[int]:
+        """
+        Cells of each parameter of a function; array parameters are
+        passed by reference in one cell
+        """
+        ranges = self.functions.get(name)
+        return [1 if ranges is None or parameter.get('dimensions') else
+                ranges.variable_width(parameter['name'])
+                for parameter in self.parameters.get(name, [])]
+
+    def result_width(self, name: str) -> int:
+        """
+        Cells of a function's return value
+        """
+        ranges = self.functions.get(name)
+        return 1 if ranges is None else ranges.result_width
+
+    def key(self) -> Tuple:
+        """
+        Hashable summary, equal for ranges that generate the same code
+        """
+        return (self.max_cells, tuple(sorted(
+            (name, ranges.key()) for name, ranges in self.functions.items())))
+
+def analyze_ranges(program: Any, max_cells: int, statements_name: str) -> ProgramRanges:
+    """
+    Analyse the value ranges of a program
+
+    Args:
+        program (Any): Program AST node
+        max_cells (int): Cells of values without a known bound
+        statements_name (str): Name under which the top-level statements
+            are analysed, like a function without parameters
+
+    Returns:
+        ProgramRanges: Ranges of every function
+    """
+    bodies = {}
+    statements = []
+    for item in program.children:
+        if item.type == 'Function':
+            bodies[item.name] = (item.parameters, item.body.children)
+        else:
+            statements.append(item)
+    if statements:
+        bodies[statements_name] = ([], statements)
+
+    called = set()
+    for parameters, body in bodies.values():
+        called |= _called_names(body)
+
+    ranges = ProgramRanges(max_cells)
+    ranges.parameters = {name: parameters for name, (parameters, _) in bodies.items()}
+    # Parameters of functions nobody calls keep single-cell values
+    signatures = ranges.signatures
+    for name, (parameters, _) in bodies.items():
+        signatures[name] = Signature([None if name in called else BYTE] * len(parameters), None)
+
+    rounds = 0
+    while True:
+        analyses = {}
+        for name, (parameters, body) in bodies.items():
+            intervals = signatures[name].parameters
+            if None not in intervals:
+                analyses[name] = FunctionAnalysis(signatures).analyze(parameters, intervals, body)
+
+        updated = {}
+        for name, (parameters, _) in bodies.items():
+            old = signatures[name]
+            arguments = list(old.parameters)
+            for analysis in analyses.values():
+                for index, interval in enumerate(analysis.arguments.get(name, [])[:len(arguments)]):
+                    arguments[index] = join(arguments[index], interval)
+            result = join(old.result, analyses[name].result if name in analyses else None)
+            if rounds >= WIDENING_DELAY:
+                arguments = [widen(before, after) for before, after in zip(old.parameters, arguments)]
+                result = widen(old.result, result)
+            updated[name] = Signature(arguments, result)
+        if all(updated[name] == signatures[name] for name in bodies):
+            break
+        signatures.update(updated)
+        rounds += 1
+
+    for name, analysis in analyses.items():
+        ranges.functions[name] = FunctionRanges(ranges, analysis.variables, analysis.result)
+    return ranges
+
+def _called_names(node: Any) -> set:
+    """
+    Names of the functions called anywhere in a statement or expression
+    """
+    if node is None:
+        return set()
+    if isinstance(node, list):
+        return set().union(*(_called_names(item) for item in node))
+    names = {node.value['name']} if node.type == 'FunctionCall' else set()
+    if isinstance(node.value, dict):
+        for item in node.value.values():
+            if hasattr(item, 'type'):
+                names |= _called_names(item)
+    return names | _called_names(node.children)
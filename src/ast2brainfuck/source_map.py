@@ -0,0 +1,239 @@
+"""
+Source Maps
+
+Translators wrap the code of every function and statement in scope markers
+that name its TinySol origin. The markers are not Brainfuck instructions;
+they survive concatenation, inlining and relinking unchanged, and the
+peephole optimizer strips them while recording which instructions each
+scope produced. The result maps ranges of the final program back to the
+statements that generated them.
+"""
+
+import bisect
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Scope markers: SCOPE_START label LABEL_END code SCOPE_END
+SCOPE_START = '\x01'
+LABEL_END = '\x02'
+SCOPE_END = '\x03'
+MARKER_PATTERN = re.compile('\x01[^\x02]*\x02|\x03')
+
+# Labels of function scopes start with this character
+FUNCTION_LABEL = '@'
+
+SOURCE_MAP_VERSION = 1
+
+def function_scope(name: str, brainfuck_code: str) -> str:
+    """
+    Mark code as belonging to a function
+
+    Args:
+        name (str): Function (fragment) name
+        brainfuck_code (str): Code generated for the function
+
+    Returns:
+        str: Marked code
+    """
+    return f"{SCOPE_START}{FUNCTION_LABEL}{name}{LABEL_END}{brainfuck_code}{SCOPE_END}"
+
+def statement_scope(node: Any, brainfuck_code: str) -> str:
+    """
+    Mark code as generated by a statement, if the statement has a source
+    position
+
+    Args:
+        node (Any): Statement AST node
+        brainfuck_code (str): Code generated for the statement
+
+    Returns:
+        str: Marked code
+    """
+    if getattr(node, 'line', None) is None or not brainfuck_code:
+        return brainfuck_code
+    return f"{SCOPE_START}{node.line}:{node.column}:{node.type}{LABEL_END}{brainfuck_code}{SCOPE_END}"
+
+def strip_markers(brainfuck_code: str) -> str:
+    """
+    Remove all scope markers from code
+    """
+    return MARKER_PATTERN.sub('', brainfuck_code)
+
+# A scope of the stack that generated some code:
+# (function, line, column, node type), with line, column and type None for
+# function scopes
+Scope = Tuple[Optional[str], Optional[int], Optional[int], Optional[str]]
+
+def describe_scope(scope: Scope) -> str:
+    """
+    Short name of a scope, e.g. 'spin' or 'While@4:5'
+    """
+    function, line, column, node_type = scope
+    if line is None:
+        return function or '?'
+    return f"{node_type}@{line}:{column}"
+
+class SourceRange:
+    """
+    A run of Brainfuck instructions generated by one statement, or by a
+    function outside of its statements (line is None then).
+    """
+    def __init__(self, start: int, end: int, function: Optional[str],
+                 line: Optional[int], column: Optional[int], node_type: Optional[str],
+                 stack: Tuple[Scope, ...] = ()):
+        """
+        Args:
+            start (int): Offset of the first instruction
+            end (int): Offset after the last instruction
+            function (Optional[str]): Function the code belongs to
+            line (Optional[int]): TinySol line of the statement (1-based)
+            column (Optional[int]): TinySol column of the statement (1-based)
+            node_type (Optional[str]): Statement type, such as 'While'
+            stack (Tuple[Scope, ...]): Enclosing scopes, outermost first,
+                including the functions inlined calls came from
+        """
+        self.start = start
+        self.end = end
+        self.function = function
+        self.line = line
+        self.column = column
+        self.node_type = node_type
+        self.stack = stack
+
+    def describe(self) -> str:
+        """
+        Human-readable location, e.g. 'line 4, column 9 (While in main)'
+        """
+        if self.line is None:
+            return f"function {self.function}"
+        context = f"{self.node_type} in {self.function}" if self.function else self.node_type
+        return f"line {self.line}, column {self.column} ({context})"
+
+class SourceMap:
+    """
+    Maps offsets of a Brainfuck program to TinySol source positions.
+    """
+    def __init__(self, ranges: List[SourceRange]):
+        """
+        Args:
+            ranges (List[SourceRange]): Non-overlapping ranges sorted by start
+        """
+        self.ranges = ranges
+        self._starts = [source_range.start for source_range in ranges]
+
+    def lookup(self, offset: int) -> Optional[SourceRange]:
+        """
+        Find the range containing a code offset
+
+        Args:
+            offset (int): Index into the Brainfuck program
+
+        Returns:
+            Optional[SourceRange]: Range of the offset, None for code that
+            no function or statement produced
+        """
+        index = bisect.bisect_right(self._starts, offset) - 1
+        if index >= 0 and offset < self.ranges[index].end:
+            return self.ranges[index]
+        return None
+
+    def describe(self, offset: int) -> Optional[str]:
+        """
+        Human-readable TinySol location of a code offset, if known
+        """
+        source_range = self.lookup(offset)
+        return source_range.describe() if source_range else None
+
+    def relocate(self, locate: Callable[[str, int, int], Tuple[int, int]]) -> 'SourceMap':
+        """
+        Translate the positions of every range, for instance from the
+        normalized text of a compilation unit to the original source
+
+        Args:
+            locate (Callable): Maps (function, line, column) to (line, column)
+
+        Returns:
+            SourceMap: Map with translated positions
+        """
+        def relocate_scope(scope: Scope) -> Scope:
+            function, line, column, node_type = scope
+            if line is not None:
+                line, column = locate(function, line, column)
+            return function, line, column, node_type
+
+        ranges = []
+        for r in self.ranges:
+            function, line, column, node_type = relocate_scope((r.function, r.line, r.column, r.node_type))
+            ranges.append(SourceRange(r.start, r.end, function, line, column, node_type,
+                                      tuple(relocate_scope(scope) for scope in r.stack)))
+        return SourceMap(ranges)
+
+    def splice(self, start: int, end: int, length: int) -> 'SourceMap':
+        """
+        Map of the program after replacing its code from start to end with
+        code of the given length, which maps to no source
+
+        Args:
+            start (int): Offset of the first replaced instruction
+            end (int): Offset after the last replaced instruction
+            length (int): Instructions of the replacement
+
+        Returns:
+            SourceMap: Map of the new program
+        """
+        shift = length - (end - start)
+        ranges = []
+        for r in self.ranges:
+            before = SourceRange(r.start, min(r.end, start), r.function, r.line, r.column,
+                                 r.node_type, r.stack)
+            after = SourceRange(max(r.start, end) + shift, r.end + shift, r.function, r.line,
+                                r.column, r.node_type, r.stack)
+            ranges += [part for part in (before, after) if part.start < part.end]
+        return SourceMap(ranges)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable form of the map
+        """
+        return {
+            'version': SOURCE_MAP_VERSION,
+            'ranges': [[r.start, r.end, r.function, r.line, r.column, r.node_type,
+                        [list(scope) for scope in r.stack]]
+                       for r in self.ranges],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SourceMap':
+        """
+        Rebuild a map from its `to_dict` form
+        """
+        if data.get('version') != SOURCE_MAP_VERSION:
+            raise ValueError(f"Unsupported source map version: {data.get('version')}")
+        return cls([SourceRange(*entry[:6], tuple(tuple(scope) for scope in entry[6]))
+                    for entry in data['ranges']])
+
+    def to_json(self) -> str:
+        """
+        Serialise the map as JSON
+        """
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str) -> 'SourceMap':
+        """
+        Load a map serialised by `to_json`
+        """
+        return cls.from_dict(json.loads(text))
+
+def parse_label(label: str) -> Tuple[Optional[str], Optional[Tuple[int, int, str]]]:
+    """
+    Split a scope label into a function name or a statement position
+
+    Returns:
+        Tuple: (function name, None) or (None, (line, column, node type))
+    """
+    if label.startswith(FUNCTION_LABEL):
+        return label[len(FUNCTION_LABEL):], None
+    line, column, node_type = label.split(':', 2)
+    return None, (int(line), int(column), node_type)
@@ -0,0 +1,247 @@
+"""
+Compile Statistics
+
+Structured instrumentation of the compile pipeline: wall time (and,
+optionally, memory allocated) per phase, code generation time per node
+type, generated code size per node type, and counters such as temporaries
+allocated by the memory manager.
+
+The translator activates a `CompileStats` for the duration of each
+compilation. Components deep in the pipeline find it with `active_stats()`
+instead of having it passed through every constructor; outside of a
+compilation `active_stats()` returns None and they record nothing.
+"""
+
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+STATS_VERSION = 1
+
+_active_stats: ContextVar[Optional['CompileStats']] = ContextVar('compile_stats', default=None)
+
+def active_stats() -> Optional['CompileStats']:
+    """
+    Statistics of the compilation in progress, if any
+
+    Returns:
+        Optional[CompileStats]: Active statistics, None outside compilations
+    """
+    return _active_stats.get()
+
+def count_event(name: str, amount: int = 1) -> None:
+    """
+    Increase a counter of the active statistics, if any
+
+    Args:
+        name (str): Counter name
+        amount (int): Increment
+    """
+    stats = _active_stats.get()
+    if stats is not None:
+        stats.count(name, amount)
+
+@contextmanager
+def measure_node(node_type: str) -> Iterator[None]:
+    """
+    Time the code generation of a node in the active statistics, if any
+
+    Args:
+        node_type (str): AST node type
+    """
+    stats = _active_stats.get()
+    if stats is None:
+        yield
+        return
+    stats.begin_node(node_type)
+    try:
+        yield
+    finally:
+        stats.end_node(node_type)
+
+@contextmanager
+def measure_phase(name: str) -> Iterator[None]:
+    """
+    Measure the enclosed code as a phase of the active statistics, if any
+
+    Args:
+        name (str): Phase name
+    """
+    stats = _active_stats.get()
+    if stats is None:
+        yield
+        return
+    with stats.phase(name):
+        yield
+
+class PhaseStats:
+    """
+    Accumulated measurements of one pipeline phase.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.wall_time = 0.0
+        # Bytes allocated and still alive at the end of the phase, and the
+        # highest allocation peak during it; only with allocation tracking
+        self.allocated_bytes = 0
+        self.peak_bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable form of the measurements
+        """
+        return {
+            'calls': self.calls,
+            'wall_time': self.wall_time,
+            'allocated_bytes': self.allocated_bytes,
+            'peak_bytes': self.peak_bytes,
+        }
+
+class CompileStats:
+    """
+    Measurements of one compilation.
+
+    Phases are 'ranges', 'split', 'lex', 'parse', 'optimize', 'codegen',
+    'link', 'peephole' and 'partial_eval'; phases that did not run (for example
+    because every unit was reused from the cache) are absent.
+    """
+    def __init__(self, track_allocations: bool = False):
+        """
+        Args:
+            track_allocations (bool): Measure memory allocated per phase
+                with tracemalloc, which slows compilation down considerably
+        """
+        self.track_allocations = track_allocations
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Counter = Counter()
+        # Code generation time per node type, excluding nested statements
+        self.node_time: Dict[str, float] = {}
+        self.node_count: Counter = Counter()
+        # Instructions of the final program generated by each node type
+        self.code_size: Counter = Counter()
+        self._node_stack: List[List[float]] = []
+
+    @contextmanager
+    def collect(self) -> Iterator['CompileStats']:
+        """
+        Make these statistics the active ones for the enclosed code
+        """
+        token = _active_stats.set(self)
+        started_tracing = self.track_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            yield self
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            _active_stats.reset(token)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measure the enclosed code as (part of) a pipeline phase
+
+        Args:
+            name (str): Phase name
+        """
+        stats = self.phases.setdefault(name, PhaseStats())
+        tracing = self.track_allocations and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.wall_time += time.perf_counter() - start
+            stats.calls += 1
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                stats.allocated_bytes += current - before
+                stats.peak_bytes = max(stats.peak_bytes, peak - before)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Increase a counter
+
+        Args:
+            name (str): Counter name
+            amount (int): Increment
+        """
+        self.counters[name] += amount
+
+    def begin_node(self, node_type: str) -> None:
+        """
+        Start timing the code generation of a node
+        """
+        self._node_stack.append([time.perf_counter(), 0.0])
+        self.node_count[node_type] += 1
+
+    def end_node(self, node_type: str) -> None:
+        """
+        Stop timing the innermost node; its time counts once, for its own
+        type, and not for the nodes enclosing it
+        """
+        start, nested = self._node_stack.pop()
+        elapsed = time.perf_counter() - start
+        self.node_time[node_type] = self.node_time.get(node_type, 0.0) + elapsed - nested
+        if self._node_stack:
+            self._node_stack[-1][1] += elapsed
+
+    def record_code_size(self, code_size: int, source_map: Any) -> None:
+        """
+        Attribute the instructions of the final program to the node types
+        that generated them. Code outside statements counts as 'Function',
+        code outside functions (such as the output) as 'Runtime'.
+
+        Args:
+            code_size (int): Instructions in the final program
+            source_map (SourceMap): Source map of the program
+        """
+        mapped = 0
+        for source_range in source_map.ranges:
+            size = source_range.end - source_range.start
+            self.code_size[source_range.node_type or 'Function'] += size
+            mapped += size
+        if code_size > mapped:
+            self.code_size['Runtime'] += code_size - mapped
+        self.counters['instructions'] = code_size
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable form of the statistics
+        """
+        return {
+            'version': STATS_VERSION,
+            'phases': {name: phase.to_dict() for name, phase in self.phases.items()},
+            'counters': dict(self.counters),
+            'nodes': {
+                node_type: {
+                    'count': self.node_count[node_type],
+                    'codegen_time': self.node_time.get(node_type, 0.0),
+                    'code_size': self.code_size.get(node_type, 0),
+                }
+                for node_type in sorted(set(self.node_count) | set(self.code_size))
+            },
+        }
+
+    def to_json(self) -> str:
+        """
+        Serialise the statistics as JSON
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def dump(self, path: str) -> None:
+        """
+        Write the statistics to a JSON file
+
+        Args:
+            path (str): Output file
+        """
+        with open(path, 'w') as stats_file:
+            stats_file.write(self.to_json() + '\n')
@@ -0,0 +1,221 @@
+import logging
+from typing import Union, Dict, Any, Optional
+from src.solidity_parser import ASTNode, SolidityParser
+from src.ast2brainfuck import peephole
+from src.ast2brainfuck.emitter import CodeEmitter
+from src.ast2brainfuck.source_map import SourceMap
+from src.ast2brainfuck.stats import CompileStats
+from src.ast2brainfuck.incremental import IncrementalCompiler
+from src.ast2brainfuck.linker import DEFAULT_INLINE_BUDGET
+from src.ast2brainfuck.optimizer import (
+    DEFAULT_OPTIMIZATION_LEVEL, optimize_program, parse_optimization_level)
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.range_analysis import ProgramRanges, analyze_ranges
+from src.ast2brainfuck.translators.node_translators import (
+    PROGRAM_FRAGMENT, NodeTranslators, TranslationError)
+
+class TinySolToBrainfuckTranslator:
+    """
+    High-level translator for converting TinySol AST to Brainfuck code
+    """
+    def __init__(self, 
+                 max_recursion_depth: int = 20, 
+                 max_iterations: int = 1000, 
+                 log_level: int = logging.WARNING,
+                 inline_budget: int = DEFAULT_INLINE_BUDGET,
+                 optimization_level: Union[int, str] = DEFAULT_OPTIMIZATION_LEVEL,
+                 track_allocations: bool = False,
+                 stats_file: Optional[str] = None,
+                 partial_eval_steps: int = 0,
+                 integer_cells: int = 1):
+        """
+        Initialize the translator with configurable parameters
+        
+        :param max_recursion_depth: Maximum allowed recursion depth
+        :param max_iterations: Maximum allowed translation iterations
+        :param log_level: Logging level
+        :param inline_budget: Brainfuck instructions a function may add
+            through inlined copies before calls share one body instead
+        :param optimization_level: AST optimisation level, 0-2 or a flag
+            such as '-O1'
+        :param track_allocations: Measure memory allocated by each compile
+            phase (slow)
+        :param stats_file: Write the statistics of every compilation to
+            this JSON file
+        :param partial_eval_steps: Run the input-free start of generated
+            programs for up to this many steps at compile time and
+            replace it with its result; 0 disables partial evaluation
+        :param integer_cells: Cells of integers whose values range
+            analysis cannot bound; variables known to stay smaller get
+            fewer. 1 keeps every value in a single cell
+        """
+        # Configure logging
+        logging.basicConfig(level=log_level)
+        self.logger = logging.getLogger(__name__)
+
+        # Initialize memory and translation managers
+        self.memory_manager = MemoryManager()
+        self.node_translators = NodeTranslators(
+            self.memory_manager, 
+            max_recursion_depth, 
+            max_iterations,
+            inline_budget
+        )
+        self.optimization_level = parse_optimization_level(optimization_level)
+        self.incremental_compiler = IncrementalCompiler(self.node_translators, self.optimization_level)
+        # Maps the last generated program back to TinySol lines
+        self.source_map: Optional[SourceMap] = None
+        # Phase timings and counters of the last compilation
+        self.track_allocations = track_allocations
+        self.stats_file = stats_file
+        self.stats = CompileStats(track_allocations)
+        self.partial_eval_steps = partial_eval_steps
+        self.integer_cells = integer_cells
+
+    def translate(self, node: Union[ASTNode, Dict, Any]) -> str:
+        """
+        Translate an AST node to Brainfuck code
+        
+        Positions in `source_map` are those of the parsed source; `stats`
+        holds the timings and counters of the translation.
+        
+        :param node: AST node to translate
+        :return: Generated Brainfuck code
+        :raises TranslationError: If translation fails
+        """
+        stats = self.stats = CompileStats(self.track_allocations)
+        try:
+            with stats.collect():
+                ranges = None
+                if getattr(node, 'type', None) == 'Program':
+                    with stats.phase('optimize'):
+                        node = optimize_program(node, self.optimization_level)
+                    ranges = self._analyze_ranges(node)
+                self.node_translators.set_ranges(ranges)
+                with stats.phase('codegen'):
+                    brainfuck_code = self.node_translators.translate_node(node)
+                with stats.phase('peephole'):
+                    brainfuck_code, self.source_map = peephole.optimize_with_source_map(brainfuck_code)
+                if self.partial_eval_steps:
+                    brainfuck_code = self._partially_evaluate(brainfuck_code)
+                stats.record_code_size(len(brainfuck_code), self.source_map)
+            self._dump_stats()
+            return brainfuck_code
+        except Exception as e:
+            self.logger.error(f"Translation failed: {e}")
+            raise TranslationError(f"Translation failed: {e}") from e
+
+    def compile(self, tinysol_code: str) -> str:
+        """
+        Compile TinySol source to Brainfuck, translating only the functions
+        whose source changed since they were last compiled and relinking
+        the cached fragments of all others. Afterwards `source_map` maps
+        the generated code to lines of `tinysol_code`, and `stats` holds
+        the timings and counters of the compilation.
+        
+        :param tinysol_code: TinySol source code
+        :return: Generated Brainfuck code
+        :raises TranslationError: If translation fails
+        """
+        emitter = CodeEmitter()
+        self._compile(tinysol_code, emitter)
+        return emitter.getvalue()
+
+    def compile_to_file(self, tinysol_code: str, path: str) -> int:
+        """
+        Compile TinySol source like `compile`, streaming the generated code
+        to a file instead of returning it
+        
+        :param tinysol_code: TinySol source code
+        :param path: Output file
+        :return: Number of Brainfuck instructions written
+        :raises TranslationError: If translation fails
+        """
+        with open(path, 'w') as output_file:
+            emitter = CodeEmitter(output_file)
+            self._compile(tinysol_code, emitter)
+            emitter.flush()
+        return len(emitter)
+
+    def _compile(self, tinysol_code: str, emitter: CodeEmitter) -> None:
+        """
+        Compile TinySol source, writing the generated code to an emitter
+        """
+        stats = self.stats = CompileStats(self.track_allocations)
+        try:
+            with stats.collect():
+                ranges = None
+                if self.integer_cells > 1:
+                    program = optimize_program(SolidityParser().parse(tinysol_code),
+                                               self.optimization_level)
+                    ranges = self._analyze_ranges(program)
+                self.node_translators.set_ranges(ranges)
+                options = () if ranges is None else (ranges.key(),)
+                fragments = self.incremental_compiler.compile(tinysol_code, options)
+                linker = self.node_translators.linker
+                with stats.phase('link'):
+                    brainfuck_code = linker.link(fragments, self.node_translators.select_entry(fragments))
+                self.node_translators.output_cell = linker.output_cell
+                # Partial evaluation needs the whole program before emitting it
+                target = CodeEmitter() if self.partial_eval_steps else emitter
+                with stats.phase('peephole'):
+                    source_map = peephole.emit_with_source_map(brainfuck_code, target)
+                    self.source_map = source_map.relocate(self.incremental_compiler.locate)
+                if self.partial_eval_steps:
+                    emitter.emit(self._partially_evaluate(target.getvalue()))
+                stats.record_code_size(len(emitter), self.source_map)
+            self._dump_stats()
+        except Exception as e:
+            self.logger.error(f"Translation failed: {e}")
+            raise TranslationError(f"Translation failed: {e}") from e
+
+    def _analyze_ranges(self, program: Any) -> Optional[ProgramRanges]:
+        """
+        Value ranges of an optimised program, which size its integers;
+        None when every integer is a single cell
+        """
+        if self.integer_cells <= 1:
+            return None
+        with self.stats.phase('ranges'):
+            return analyze_ranges(program, self.integer_cells, PROGRAM_FRAGMENT)
+
+    def _partially_evaluate(self, brainfuck_code: str) -> str:
+        """
+        Replace the input-free start of a generated program with its result
+        (see src.brainfuck_partial_eval), keeping the source map in step
+        """
+        # The interpreter depends on this package through its profiler
+        from src.brainfuck_partial_eval import partially_evaluate
+        with self.stats.phase('partial_eval'):
+            evaluation = partially_evaluate(brainfuck_code, self.partial_eval_steps)
+        self.source_map = self.source_map.splice(0, evaluation.prefix, evaluation.replacement)
+        self.stats.count('partial_eval_steps', evaluation.steps)
+        return evaluation.code
+
+    def _dump_stats(self) -> None:
+        """
+        Write the statistics of the last compilation, if a file was given
+        """
+        if self.stats_file:
+            self.stats.dump(self.stats_file)
+
+def generate_brainfuck(node: Union[ASTNode, Dict, Any], 
+                       max_recursion_depth: int = 20, 
+                       max_iterations: int = 1000, 
+                       log_level: int = logging.WARNING) -> str:
+    """
+    Convenience function to generate Brainfuck code from an AST node
+    
+    :param node: AST node to translate
+    :param max_recursion_depth: Maximum allowed recursion depth
+    :param max_iterations: Maximum allowed translation iterations
+    :param log_level: Logging level
+    :return: Generated Brainfuck code
+    :raises TranslationError: If translation fails
+    """
+    translator = TinySolToBrainfuckTranslator(
+        max_recursion_depth, 
+        max_iterations, 
+        log_level
+    )
+    return translator.translate(node)
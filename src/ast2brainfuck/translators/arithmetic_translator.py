@@ -3,124 +3,190 @@ from src.ast2brainfuck.memory.memory_manager import MemoryManager
 from src.ast2brainfuck.translators.base_translator import BaseTranslator
 
 class ArithmeticTranslator(BaseTranslator):
+    """
+    Arithmetic on single 8-bit cells. Operand cells are preserved and the
+    target cell, which must differ from both operands, is overwritten.
+    """
     def __init__(self, memory_manager: MemoryManager):
         """
         Initialize arithmetic translator
-        
+
         Args:
             memory_manager (MemoryManager): Memory management instance
         """
         super().__init__(memory_manager)
-    
+
     def translate_multiplication(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
-        Generate Brainfuck code for multiplication with improved algorithm
-        
+        Generate Brainfuck code for multiplication by repeated addition
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
+        Returns:
+            str: Brainfuck multiplication code
+        """
+        counter = self.memory_manager.allocate_temp_memory()
+
+        # Add the right operand to the target once per unit of the left operand
+        brainfuck_code = self._clear(target_memory)
+        brainfuck_code += self._copy_memory_value(left_memory, counter)
+        brainfuck_code += self._loop(counter, "".join([
+            self._add_value(counter, -1),
+            self._add_memory_value(right_memory, target_memory)
+        ]))
+
+        self.memory_manager.release_temp_memory(counter)
+        return brainfuck_code
+
+    def translate_constant_multiplication(self, source_memory: int, factor: int, target_memory: int) -> str:
+        """
+        Generate Brainfuck code for multiplication by a constant
+
+        Args:
+            source_memory (int): Operand memory cell
+            factor (int): Constant factor
+            target_memory (int): Result memory cell
+
         Returns:
             str: Brainfuck multiplication code
         """
-        # Allocate temporary memory cells
-        temp1 = self.memory_manager.allocate_temp_memory()
-        temp2 = self.memory_manager.allocate_temp_memory()
-        
-        # Clear target memory
-        brainfuck_code = self._generate_set_value(target_memory, 0)
-        
-        # Advanced multiplication algorithm
-        brainfuck_code += "".join([
-            # Copy right operand to temp1
-            f"{'>' if temp1 > 0 else ''}{'<' if temp1 < 0 else ''}[-]",
-            f"{'>' if right_memory > temp1 else ''}{'<' if right_memory < temp1 else ''}[",
-            f"{'>' if temp1 > right_memory else ''}{'<' if temp1 < right_memory else ''}+",
-            f"{'>' if right_memory > temp1 else ''}{'<' if right_memory < temp1 else ''}[-]",
-            "]",
-            
-            # Multiply by left operand
-            f"{'>' if left_memory > 0 else ''}{'<' if left_memory < 0 else ''}[",
-            f"{'>' if temp1 > left_memory else ''}{'<' if temp1 < left_memory else ''}[",
-            f"{'>' if target_memory > temp1 else ''}{'<' if target_memory < temp1 else ''}+",
-            f"{'>' if temp1 > left_memory else ''}{'<' if temp1 < left_memory else ''}[-]",
-            "]",
-            f"{'>' if left_memory > 0 else ''}{'<' if left_memory < 0 else ''}[-]",
-            "]"
+        counter = self.memory_manager.allocate_temp_memory()
+
+        brainfuck_code = self._clear(target_memory)
+        brainfuck_code += self._copy_memory_value(source_memory, counter)
+        brainfuck_code += self._loop(counter, self._add_value(counter, -1) +
+                                     self._add_value(target_memory, factor))
+
+        self.memory_manager.release_temp_memory(counter)
+        return brainfuck_code
+
+    def translate_divmod(self, left_memory: int, right_memory: int,
+                         quotient_memory: int = None, remainder_memory: int = None) -> str:
+        """
+        Generate Brainfuck code for integer division and remainder.
+
+        Counts the dividend down while a second counter tracks the distance
+        to the next multiple of the divisor, so the cost is linear in the
+        dividend. Division by zero yields zero for both results.
+
+        Args:
+            left_memory (int): Dividend memory cell
+            right_memory (int): Divisor memory cell
+            quotient_memory (int): Quotient memory cell, optional
+            remainder_memory (int): Remainder memory cell, optional
+
+        Returns:
+            str: Brainfuck division code
+        """
+        dividend = self.memory_manager.allocate_temp_memory()
+        guard = self.memory_manager.allocate_temp_memory()
+        # Countdown cell followed by the two flag cells used by the zero test
+        countdown = self.memory_manager.allocate_temp_block(3)
+        flag = countdown + 1
+
+        quotient = quotient_memory
+        if quotient is None:
+            quotient = self.memory_manager.allocate_temp_memory()
+        remainder = remainder_memory
+        if remainder is None:
+            remainder = self.memory_manager.allocate_temp_memory()
+
+        # Runs once the countdown reaches a multiple of the divisor
+        on_multiple = "".join([
+            self._add_value(quotient, 1),
+            self._clear(remainder),
+            self._add_memory_value(right_memory, countdown)
+        ])
+
+        step = "".join([
+            self._add_value(dividend, -1),
+            self._add_value(countdown, -1),
+            self._add_value(remainder, 1),
+            self._add_value(flag, 1),
+            # Non-destructive zero test on the countdown cell
+            self._at(countdown, '[>-]>[<' + self._move(-countdown) + on_multiple +
+                     self._move(countdown) + '>->]<<')
         ])
-        
+
+        brainfuck_code = self._clear(quotient) + self._clear(remainder)
+        brainfuck_code += self._copy_memory_value(right_memory, guard)
+        brainfuck_code += self._if_nonzero(guard, "".join([
+            self._copy_memory_value(left_memory, dividend),
+            self._add_memory_value(right_memory, countdown),
+            self._loop(dividend, step),
+            self._clear(countdown)
+        ]))
+
+        if quotient_memory is None:
+            brainfuck_code += self._clear(quotient)
+            self.memory_manager.release_temp_memory(quotient)
+        if remainder_memory is None:
+            brainfuck_code += self._clear(remainder)
+            self.memory_manager.release_temp_memory(remainder)
+        self.memory_manager.release_temp_memory(countdown)
+        self.memory_manager.release_temp_memory(guard)
+        self.memory_manager.release_temp_memory(dividend)
         return brainfuck_code
-    
+
+    def translate_division(self, left_memory: int, right_memory: int, target_memory: int) -> str:
+        """
+        Generate Brainfuck code for integer division
+
+        Args:
+            left_memory (int): Left operand memory cell
+            right_memory (int): Right operand memory cell
+            target_memory (int): Result memory cell
+
+        Returns:
+            str: Brainfuck division code
+        """
+        return self.translate_divmod(left_memory, right_memory, quotient_memory=target_memory)
+
     def translate_modulo(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
-        Generate Brainfuck code for modulo operation with improved algorithm
-        
+        Generate Brainfuck code for modulo operation
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
         Returns:
             str: Brainfuck modulo code
         """
-        # Allocate temporary memory cells
-        temp1 = self.memory_manager.allocate_temp_memory()
-        temp2 = self.memory_manager.allocate_temp_memory()
-        
-        # Clear target memory
-        brainfuck_code = self._generate_set_value(target_memory, 0)
-        
-        # Advanced modulo algorithm
-        brainfuck_code += "".join([
-            # Copy left operand to temp1
-            f"{'>' if temp1 > 0 else ''}{'<' if temp1 < 0 else ''}[-]",
-            f"{'>' if left_memory > temp1 else ''}{'<' if left_memory < temp1 else ''}[",
-            f"{'>' if temp1 > left_memory else ''}{'<' if temp1 < left_memory else ''}+",
-            f"{'>' if left_memory > temp1 else ''}{'<' if left_memory < temp1 else ''}[-]",
-            "]",
-            
-            # Perform modulo calculation
-            f"{'>' if temp1 > 0 else ''}{'<' if temp1 < 0 else ''}[",
-            f"{'>' if right_memory > temp1 else ''}{'<' if right_memory < temp1 else ''}[",
-            f"{'>' if temp1 > right_memory else ''}{'<' if temp1 < right_memory else ''}[-]",
-            f"{'>' if right_memory > temp1 else ''}{'<' if right_memory < temp1 else ''}[-]",
-            "]",
-            
-            # If remainder is zero, set target to zero
-            f"{'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}[-]",
-            f"{'>' if temp1 > 0 else ''}{'<' if temp1 < 0 else ''}[",
-            f"{'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+",
-            f"{'>' if temp1 > 0 else ''}{'<' if temp1 < 0 else ''}[-]",
-            "]"
-        ])
-        
-        return brainfuck_code
-    
+        return self.translate_divmod(left_memory, right_memory, remainder_memory=target_memory)
+
     def translate_addition(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
-        Generate Brainfuck code for addition with improved algorithm
-        
+        Generate Brainfuck code for addition
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
         Returns:
             str: Brainfuck addition code
         """
-        # Clear target memory first
-        brainfuck_code = self._generate_set_value(target_memory, 0)
-        
-        # Copy left value to target
-        brainfuck_code += self._copy_memory_value(left_memory, target_memory)
-        
-        # Add right value to target
-        brainfuck_code += "".join([
-            f"{'>' if right_memory > target_memory else ''}{'<' if right_memory < target_memory else ''}[",
-            f"{'>' if target_memory > right_memory else ''}{'<' if target_memory < right_memory else ''}+",
-            f"{'>' if right_memory > target_memory else ''}{'<' if right_memory < target_memory else ''}[-]",
-            "]"
-        ])
-        
+        brainfuck_code = self._copy_memory_value(left_memory, target_memory)
+        brainfuck_code += self._add_memory_value(right_memory, target_memory)
+        return brainfuck_code
+
+    def translate_subtraction(self, left_memory: int, right_memory: int, target_memory: int) -> str:
+        """
+        Generate Brainfuck code for subtraction (wrapping at 256)
+
+        Args:
+            left_memory (int): Left operand memory cell
+            right_memory (int): Right operand memory cell
+            target_memory (int): Result memory cell
+
+        Returns:
+            str: Brainfuck subtraction code
+        """
+        brainfuck_code = self._copy_memory_value(left_memory, target_memory)
+        brainfuck_code += self._add_memory_value(right_memory, target_memory, -1)
         return brainfuck_code
@@ -0,0 +1,218 @@
+from typing import List, Optional, Tuple
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
+
+def array_layout(dimensions: List[int]) -> Tuple[int, int, List[int]]:
+    """
+    Compute the tape layout of an array.
+
+    Every element occupies one cell per dimension plus two:
+    [marker, counters for later dimensions..., value, data]. An access
+    carries the index counters (and the value, for writes) from element to
+    element, leaving a trail of 1s in the marker cells to find its way
+    back. The array is preceded by a header of zero cells where the trail
+    ends.
+
+    Args:
+        dimensions (List[int]): Array dimension sizes
+
+    Returns:
+        Tuple[int, int, List[int]]: (header size, cells per element, stride
+        in cells of each dimension)
+    """
+    element_size = len(dimensions) + 2
+    strides = []
+    stride = element_size
+    for size in reversed(dimensions):
+        strides.insert(0, stride)
+        stride *= size
+    return strides[0], element_size, strides
+
+def array_size(dimensions: List[int]) -> int:
+    """
+    Number of cells occupied by an array, header included
+    """
+    header, element_size, strides = array_layout(dimensions)
+    return header + strides[0] * dimensions[0]
+
+class ArrayTranslator(BaseTranslator):
+    """
+    Generates array declarations and indexed accesses.
+
+    Constant indices become fixed cell offsets at compile time. Each
+    dynamic index walks its dimension one stride at a time, so an access
+    visits O(index) elements instead of scanning the array.
+    """
+    def declare_array(self, array_name: str, dimensions: List[int],
+                      initializer: Optional[List[int]] = None) -> str:
+        """
+        Allocate an array in the current frame and zero its elements
+
+        Args:
+            array_name (str): Array name
+            dimensions (List[int]): Array dimension sizes
+            initializer (Optional[List[int]]): Values of the first elements,
+                in row-major order
+
+        Returns:
+            str: Brainfuck code that zeroes the elements, then sets the
+            initialized ones
+        """
+        if any(size < 1 for size in dimensions):
+            raise TranslationError(f"Invalid array dimensions for {array_name}: {dimensions}")
+        base = self.memory_manager.allocate_array(array_name, dimensions, array_size(dimensions))
+        brainfuck_code = self.clear_array(array_name)
+
+        # Row-major order puts element k at k element sizes past the header
+        header, element_size, _ = array_layout(dimensions)
+        for element, value in enumerate(initializer or []):
+            brainfuck_code += self._add_value(
+                base + header + element * element_size + element_size - 1, value)
+        return brainfuck_code
+
+    def clear_array(self, array_name: str) -> str:
+        """
+        Zero the data cells of an array; all other cells are zero at rest
+
+        Args:
+            array_name (str): Array name
+
+        Returns:
+            str: Brainfuck code
+        """
+        base = self.memory_manager.get_variable_memory(array_name)
+        dimensions = self.memory_manager.array_dimensions[array_name]
+        header, element_size, strides = array_layout(dimensions)
+        element_count = strides[0] * dimensions[0] // element_size
+        # One sweep from the first data cell to the last
+        sweep = (self._clear(0) + self._move(element_size)) * (element_count - 1) + self._clear(0)
+        return self._at(base + header + element_size - 1,
+                        sweep + self._move(-element_size * (element_count - 1)))
+
+    def translate_read(self, array_name: str, indices: List[Tuple[int, bool, bool]],
+                       target_memory: int) -> str:
+        """
+        Copy an array element into a target cell
+
+        Args:
+            array_name (str): Array name
+            indices (List[Tuple[int, bool, bool]]): One (value, is_constant,
+                is_temp) triple per dimension; value is the constant index or
+                the cell holding the index
+            target_memory (int): Cell receiving the element
+
+        Returns:
+            str: Brainfuck code
+        """
+        return self._access(array_name, indices, target_memory, None, False)
+
+    def translate_write(self, array_name: str, indices: List[Tuple[int, bool, bool]],
+                        value_memory: int, value_is_temp: bool) -> str:
+        """
+        Store a cell's value in an array element
+
+        Args:
+            array_name (str): Array name
+            indices (List[Tuple[int, bool, bool]]): Index triples, as for
+                translate_read
+            value_memory (int): Cell holding the value
+            value_is_temp (bool): Whether the value cell may be consumed
+
+        Returns:
+            str: Brainfuck code
+        """
+        return self._access(array_name, indices, None, value_memory, value_is_temp)
+
+    def _access(self, array_name: str, indices: List[Tuple[int, bool, bool]],
+                target_memory: Optional[int], value_memory: Optional[int],
+                value_is_temp: bool) -> str:
+        base = self.memory_manager.get_variable_memory(array_name)
+        dimensions = self.memory_manager.array_dimensions.get(array_name)
+        if dimensions is None:
+            raise TranslationError(f"Undeclared array: {array_name}")
+        if len(indices) != len(dimensions):
+            raise TranslationError(
+                f"{array_name} has {len(dimensions)} dimensions, got {len(indices)} indices")
+
+        header, element_size, strides = array_layout(dimensions)
+        value_cell = element_size - 2
+        data_cell = element_size - 1
+
+        # Constant indices (and dimensions of size 1) fix the start element
+        start = base + header
+        dynamic = []
+        brainfuck_code = ""
+        for dimension, (index, is_constant, is_temp) in enumerate(indices):
+            if is_constant:
+                if not 0 <= index < dimensions[dimension]:
+                    raise TranslationError(f"Index {index} out of range for {array_name}")
+                start += index * strides[dimension]
+            elif dimensions[dimension] > 1:
+                dynamic.append((strides[dimension], index, is_temp))
+            elif is_temp:
+                # The only valid index of this dimension is 0
+                brainfuck_code += self._clear(index)
+
+        # Walk the innermost dimension first, so that the remaining counters
+        # are carried along the shortest strides
+        dynamic.reverse()
+
+        writing = value_memory is not None
+        if not dynamic:
+            if writing:
+                return brainfuck_code + self._store_value(
+                    value_memory, value_is_temp, start + data_cell, clear=True)
+            return brainfuck_code + self._copy_memory_value(start + data_cell, target_memory)
+
+        # Load the index counters (and the value) into the start element
+        for counter, (_, index_memory, is_temp) in enumerate(dynamic):
+            brainfuck_code += self._store_value(index_memory, is_temp, start + counter)
+        if writing:
+            brainfuck_code += self._store_value(value_memory, value_is_temp, start + value_cell)
+
+        # Walk out one dimension at a time; the pointer follows the marker
+        walk = ""
+        for counter, (stride, _, _) in enumerate(dynamic):
+            if counter:
+                walk += self._transfer_memory_value(counter, [(0, 1)])
+            carried = list(range(counter + 1, len(dynamic)))
+            if writing:
+                carried.append(value_cell)
+            step = self._add_value(0, -1)
+            step += self._transfer_memory_value(0, [(stride, 1)])
+            for cell in carried:
+                step += self._transfer_memory_value(cell, [(stride + cell, 1)])
+            step += self._add_value(0, 1) + self._move(stride)
+            walk += '[' + step + ']'
+
+        if writing:
+            walk += self._clear(data_cell) + self._transfer_memory_value(value_cell, [(data_cell, 1)])
+        else:
+            # The marker cell of the reached element is free to use as a temp
+            walk += self._transfer_memory_value(data_cell, [(value_cell, 1), (0, 1)])
+            walk += self._transfer_memory_value(0, [(data_cell, 1)])
+
+        # Follow the trail back, carrying the element value when reading
+        for stride, _, _ in reversed(dynamic):
+            step = self._add_value(0, -1)
+            if not writing:
+                step += self._transfer_memory_value(stride + value_cell, [(value_cell, 1)])
+            step += self._move(-stride)
+            walk += self._move(-stride) + '[' + step + ']' + self._move(stride)
+
+        brainfuck_code += self._at(start, walk)
+        if not writing:
+            brainfuck_code += self._clear(target_memory)
+            brainfuck_code += self._transfer_memory_value(start + value_cell, [(target_memory, 1)])
+        return brainfuck_code
+
+    def _store_value(self, source_memory: int, is_temp: bool, target_memory: int,
+                     clear: bool = False) -> str:
+        """
+        Move a temporary, or copy a variable, into a cell
+        """
+        if is_temp:
+            brainfuck_code = self._clear(target_memory) if clear else ''
+            return brainfuck_code + self._transfer_memory_value(source_memory, [(target_memory, 1)])
+        if clear:
+            return self._copy_memory_value(source_memory, target_memory)
+        return self._add_memory_value(source_memory, target_memory)
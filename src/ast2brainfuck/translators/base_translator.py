@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Tuple
 from src.ast2brainfuck.memory.memory_manager import MemoryManager
 
 class TranslationError(Exception):
@@ -6,12 +6,20 @@ class TranslationError(Exception):
     pass
 
 class BaseTranslator:
-    def __init__(self, memory_manager: MemoryManager, 
-                 max_recursion_depth: int = 20, 
+    """
+    Shared code generation helpers.
+
+    Every snippet produced by a translator starts and ends with the data
+    pointer on the frame origin (cell 0 of the frame), so snippets can be
+    concatenated freely and whole functions can be placed at any tape
+    position.
+    """
+    def __init__(self, memory_manager: MemoryManager,
+                 max_recursion_depth: int = 20,
                  max_iterations: int = 1000):
         """
         Initialize base translator with memory management and constraints
-        
+
         Args:
             memory_manager (MemoryManager): Memory management instance
             max_recursion_depth (int): Maximum allowed recursion depth
@@ -21,59 +29,206 @@ class BaseTranslator:
         self.max_recursion_depth = max_recursion_depth
         self.max_iterations = max_iterations
         self.output_cell = None  # Track the final output cell
-    
+
+    def _move(self, offset: int) -> str:
+        """
+        Generate a relative pointer movement
+
+        Args:
+            offset (int): Number of cells to move, negative for left
+
+        Returns:
+            str: Brainfuck movement code
+        """
+        return '>' * offset if offset > 0 else '<' * -offset
+
+    def _at(self, memory_index: int, code: str) -> str:
+        """
+        Run code with the pointer on a memory cell, then return to origin
+
+        Args:
+            memory_index (int): Memory cell index
+            code (str): Code to run at the cell
+
+        Returns:
+            str: Brainfuck code
+        """
+        return self._move(memory_index) + code + self._move(-memory_index)
+
+    def _loop(self, memory_index: int, body: str) -> str:
+        """
+        Generate a loop that runs while a memory cell is non-zero
+
+        Args:
+            memory_index (int): Loop condition cell
+            body (str): Origin-relative loop body
+
+        Returns:
+            str: Brainfuck loop code
+        """
+        return self._at(memory_index, '[' + self._move(-memory_index) + body +
+                        self._move(memory_index) + ']')
+
+    def _clear(self, memory_index: int, width: int = 1) -> str:
+        """
+        Generate Brainfuck code to zero a memory cell, or the cells of a
+        multi-cell value
+        """
+        return ''.join(self._at(memory_index + offset, '[-]') for offset in range(width))
+
+    def _add_value(self, memory_index: int, value: int) -> str:
+        """
+        Generate Brainfuck code to add a constant to a memory cell
+
+        Args:
+            memory_index (int): Memory cell index
+            value (int): Value to add (mod 256)
+
+        Returns:
+            str: Brainfuck code
+        """
+        value %= 256
+        if value == 0:
+            return ''
+        adjust = '+' * value if value <= 128 else '-' * (256 - value)
+        return self._at(memory_index, adjust)
+
     def _generate_set_value(self, memory_index: int, value: int) -> str:
         """
         Generate Brainfuck code to set a specific value in memory
-        
+
         Args:
             memory_index (int): Memory cell index
             value (int): Value to set
-        
+
         Returns:
             str: Brainfuck code to set value
         """
-        # Clear memory cell first
-        clear_code = f"{'>' if memory_index > 0 else ''}{'<' if memory_index < 0 else ''}[-]"
-        
-        # Set value
-        set_code = f"{'>' if memory_index > 0 else ''}{'<' if memory_index < 0 else ''}{'+'*value}"
-        
-        return clear_code + set_code
-    
+        # Clear memory cell first, then add the value
+        return self._clear(memory_index) + self._add_value(memory_index, value)
+
+    def _transfer_memory_value(self, source_memory: int,
+                               targets: Iterable[Tuple[int, int]]) -> str:
+        """
+        Generate Brainfuck code that drains a cell into other cells
+
+        Args:
+            source_memory (int): Source memory cell, zero afterwards
+            targets (Iterable[Tuple[int, int]]): (cell, sign) pairs receiving
+                the source value added (sign 1) or subtracted (sign -1)
+
+        Returns:
+            str: Brainfuck transfer code
+        """
+        body = self._add_value(source_memory, -1)
+        for memory_index, sign in targets:
+            body += self._add_value(memory_index, sign)
+        return self._loop(source_memory, body)
+
+    def _add_memory_value(self, source_memory: int, target_memory: int, sign: int = 1) -> str:
+        """
+        Generate Brainfuck code that adds (or subtracts) one cell to another
+        while preserving the source
+
+        Args:
+            source_memory (int): Source memory cell index
+            target_memory (int): Target memory cell index
+            sign (int): 1 to add, -1 to subtract
+
+        Returns:
+            str: Brainfuck code
+        """
+        temp_memory = self.memory_manager.allocate_temp_memory()
+        code = self._transfer_memory_value(source_memory, [(target_memory, sign), (temp_memory, 1)])
+        code += self._transfer_memory_value(temp_memory, [(source_memory, 1)])
+        self.memory_manager.release_temp_memory(temp_memory)
+        return code
+
+    def _move_number(self, source_memory: int, source_width: int,
+                     target_memory: int, target_width: int) -> str:
+        """
+        Generate Brainfuck code that moves a multi-cell value into other
+        cells, truncating or zero-extending it
+
+        Args:
+            source_memory (int): First cell of the source, zero afterwards
+            source_width (int): Cells of the source
+            target_memory (int): First cell of the target, overwritten
+            target_width (int): Cells of the target
+
+        Returns:
+            str: Brainfuck code
+        """
+        brainfuck_code = self._clear(target_memory, target_width)
+        for offset in range(source_width):
+            if offset < target_width:
+                brainfuck_code += self._transfer_memory_value(
+                    source_memory + offset, [(target_memory + offset, 1)])
+            else:
+                brainfuck_code += self._clear(source_memory + offset)
+        return brainfuck_code
+
     def _copy_memory_value(self, source_memory: int, target_memory: int) -> str:
         """
         Generate Brainfuck code to copy value between memory cells
-        
+
         Args:
             source_memory (int): Source memory cell index
             target_memory (int): Target memory cell index
-        
+
         Returns:
             str: Brainfuck code to copy value
         """
-        # Clear target memory first
-        clear_code = f"{'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}[-]"
-        
-        # Copy value from source to target
-        copy_code = f"""
-        {'>' if source_memory > target_memory else ''}{'<' if source_memory < target_memory else ''}[
-            {'>' if target_memory > source_memory else ''}{'<' if target_memory < source_memory else ''}+
-            {'>' if source_memory > target_memory else ''}{'<' if source_memory < target_memory else ''}[-]
-        ]
-        """
-        
-        return clear_code + copy_code
-    
+        if source_memory == target_memory:
+            return ''
+        # Clear target memory first, then add the source
+        return self._clear(target_memory) + self._add_memory_value(source_memory, target_memory)
+
+    def _if_nonzero(self, condition_memory: int, body: str) -> str:
+        """
+        Generate code that runs body once if a cell is non-zero, consuming
+        the cell
+
+        Args:
+            condition_memory (int): Condition cell, zero afterwards
+            body (str): Origin-relative code to run
+
+        Returns:
+            str: Brainfuck code
+        """
+        return self._loop(condition_memory, body + self._clear(condition_memory))
+
+    def _if_else(self, condition_memory: int, then_body: str, else_body: str) -> str:
+        """
+        Generate an if/else on a cell, consuming the cell
+
+        Args:
+            condition_memory (int): Condition cell, zero afterwards
+            then_body (str): Code run when the cell is non-zero
+            else_body (str): Code run when the cell is zero
+
+        Returns:
+            str: Brainfuck code
+        """
+        if not else_body:
+            return self._if_nonzero(condition_memory, then_body)
+
+        # The bodies are already generated, so the flag must be a fresh cell
+        else_flag = self.memory_manager.allocate_temp_block(1)
+        code = self._add_value(else_flag, 1)
+        code += self._if_nonzero(condition_memory, self._add_value(else_flag, -1) + then_body)
+        code += self._loop(else_flag, self._add_value(else_flag, -1) + else_body)
+        self.memory_manager.release_temp_memory(else_flag)
+        return code
+
     def _generate_output(self, memory_cell: int) -> str:
         """
         Generate Brainfuck code to output a memory cell's value
-        
+
         Args:
             memory_cell (int): Memory cell to output
-        
+
         Returns:
             str: Brainfuck output code
         """
-        # Output the value and then reset the cell
-        return f"{'>' if memory_cell > 0 else ''}{'<' if memory_cell < 0 else ''}.[-]"
+        return self._at(memory_cell, '.')
@@ -0,0 +1,534 @@
+from typing import Callable, List, Optional, Tuple, Union
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.translators.base_translator import BaseTranslator
+
+class BigIntTranslator(BaseTranslator):
+    """
+    Arithmetic on integers that span several cells. A value of width N
+    occupies N consecutive cells holding its base-256 digits, least
+    significant first, and wraps at 256**N. Its first cell alone holds the
+    value modulo 256, so single-cell code can read it.
+
+    Operands of different widths are zero-extended. Operand cells are
+    preserved; target cells, which must not overlap the operands, are
+    overwritten.
+    """
+    def __init__(self, memory_manager: MemoryManager):
+        """
+        Initialize multi-cell arithmetic translator
+
+        Args:
+            memory_manager (MemoryManager): Memory management instance
+        """
+        super().__init__(memory_manager)
+
+    def translate_set(self, target_memory: int, width: int, value: int) -> str:
+        """
+        Generate Brainfuck code to set a multi-cell value to a constant
+
+        Args:
+            target_memory (int): First cell of the value
+            width (int): Cells of the value
+            value (int): Constant, modulo 256**width
+
+        Returns:
+            str: Brainfuck code
+        """
+        return ''.join(self._generate_set_value(target_memory + index, (value >> 8 * index) & 255)
+                       for index in range(width))
+
+    def translate_copy(self, source_memory: int, source_width: int,
+                       target_memory: int, target_width: int) -> str:
+        """
+        Generate Brainfuck code to copy a value, truncating or zero-extending it
+
+        Args:
+            source_memory (int): First cell of the source
+            source_width (int): Cells of the source
+            target_memory (int): First cell of the target
+            target_width (int): Cells of the target
+
+        Returns:
+            str: Brainfuck code
+        """
+        if source_memory == target_memory and source_width >= target_width:
+            return ''
+        return ''.join(self._copy_memory_value(source_memory + index, target_memory + index)
+                       if index < source_width else self._clear(target_memory + index)
+                       for index in range(target_width))
+
+    def translate_truth(self, source_memory: int, width: int, target_memory: int,
+                        consume: bool = False) -> str:
+        """
+        Generate Brainfuck code that sets a cell to 1 if a value is
+        non-zero and to 0 otherwise
+
+        Args:
+            source_memory (int): First cell of the value
+            width (int): Cells of the value
+            target_memory (int): Result cell
+            consume (bool): Zero the value instead of preserving it
+
+        Returns:
+            str: Brainfuck code
+        """
+        probe = None if consume else self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self._clear(target_memory)
+        for index in range(width):
+            condition = source_memory + index
+            if probe is not None:
+                brainfuck_code += self._copy_memory_value(condition, probe)
+                condition = probe
+            brainfuck_code += self._if_nonzero(condition, self._generate_set_value(target_memory, 1))
+        if probe is not None:
+            self.memory_manager.release_temp_memory(probe)
+        return brainfuck_code
+
+    def translate_add(self, source_memory: int, source_width: int,
+                      target_memory: int, target_width: int, sign: int = 1,
+                      carry_memory: Optional[int] = None) -> str:
+        """
+        Generate Brainfuck code that adds a value to (or subtracts it from)
+        another, cell by cell with carries.
+
+        Each source digit is added to its cell in one go, while a counter
+        next to the scratch cells tracks how many units the cell could take
+        before wrapping around; running it down unit by unit finds the
+        carry into the next cell. The cost is linear in the digits of the
+        source, not in its value.
+
+        Args:
+            source_memory (int): First cell of the source
+            source_width (int): Cells of the source
+            target_memory (int): First cell of the target, updated in place
+            target_width (int): Cells of the target
+            sign (int): 1 to add, -1 to subtract
+            carry_memory (Optional[int]): Zeroed cell receiving 1 if the
+                result wrapped around, such as a borrow past the top cell
+
+        Returns:
+            str: Brainfuck code
+        """
+        source_width = min(source_width, target_width)
+        if target_width == 1 and carry_memory is None:
+            return self._add_memory_value(source_memory, target_memory, sign)
+
+        # Counter, room with the two flag cells of its zero test, carries
+        counter = self.memory_manager.allocate_temp_memory(6)
+        room = counter + 1
+        carries = [counter + 4, counter + 5]
+
+        brainfuck_code = ""
+        carry_in = None
+        for index in range(target_width):
+            cell = target_memory + index
+            if index == target_width - 1 and carry_memory is None:
+                # Carries out of the top cell wrap around
+                if index < source_width:
+                    brainfuck_code += self._add_memory_value(source_memory + index, cell, sign)
+                brainfuck_code += self._transfer_memory_value(carry_in, [(cell, sign)])
+                break
+
+            carry_out = carries[index % 2]
+            step = self._count_unit(room, carry_out)
+            # Units the cell takes before it wraps: 255 - cell up, cell down
+            if sign > 0:
+                setup = self._add_value(room, -1) + self._add_memory_value(cell, room, -1)
+            else:
+                setup = self._add_memory_value(cell, room)
+
+            if index < source_width:
+                source = source_memory + index
+                brainfuck_code += setup
+                if carry_in is not None:
+                    brainfuck_code += self._if_nonzero(carry_in, step + self._add_value(cell, sign))
+                brainfuck_code += self._transfer_memory_value(source, [(cell, sign), (counter, 1)])
+                brainfuck_code += self._loop(counter, self._add_value(counter, -1) +
+                                             self._add_value(source, 1) + step)
+                brainfuck_code += self._clear(room)
+            else:
+                # Only a carry reaches the cell
+                brainfuck_code += self._if_nonzero(
+                    carry_in, setup + step + self._add_value(cell, sign) + self._clear(room))
+            carry_in = carry_out
+
+        if carry_memory is not None:
+            brainfuck_code += self._transfer_memory_value(carry_in, [(carry_memory, 1)])
+        self.memory_manager.release_temp_memory(counter)
+        return brainfuck_code
+
+    def _count_unit(self, room: int, carry: int) -> str:
+        """
+        Take one unit off a room counter, counting a carry when it was
+        already zero. The two cells after the counter are scratch cells.
+        """
+        return self._at(room, '>+<[>-]>[<' + self._move(carry - room) + '+' +
+                        self._move(room - carry) + '>->]<<-')
+
+    def translate_add_constant(self, target_memory: int, width: int, value: int,
+                               sign: int = 1) -> str:
+        """
+        Generate Brainfuck code that adds a constant to a value in place
+
+        Args:
+            target_memory (int): First cell of the value
+            width (int): Cells of the value
+            value (int): Constant to add
+            sign (int): 1 to add, -1 to subtract
+
+        Returns:
+            str: Brainfuck code
+        """
+        value %= 256 ** width
+        if width == 1 or value == 0:
+            return self._add_value(target_memory, sign * value)
+        constant_width = (value.bit_length() + 7) // 8
+        constant = self.memory_manager.allocate_temp_memory(constant_width)
+        brainfuck_code = self.translate_set(constant, constant_width, value)
+        brainfuck_code += self.translate_add(constant, constant_width, target_memory, width, sign)
+        brainfuck_code += self._clear(constant, constant_width)
+        self.memory_manager.release_temp_memory(constant)
+        return brainfuck_code
+
+    def translate_multiplication(self, left_memory: int, left_width: int,
+                                 right_memory: int, right_width: int,
+                                 target_memory: int, width: int) -> str:
+        """
+        Generate Brainfuck code for long multiplication
+
+        Args:
+            left_memory (int): First cell of the left operand
+            left_width (int): Cells of the left operand
+            right_memory (int): First cell of the right operand
+            right_width (int): Cells of the right operand
+            target_memory (int): First cell of the result
+            width (int): Cells of the result
+
+        Returns:
+            str: Brainfuck multiplication code
+        """
+        loads = [lambda counter, digit=right_memory + index: self._copy_memory_value(digit, counter)
+                 for index in range(min(right_width, width))]
+        return self._long_multiplication(left_memory, left_width, loads, target_memory, width)
+
+    def translate_constant_multiplication(self, source_memory: int, source_width: int,
+                                          factor: int, target_memory: int, width: int) -> str:
+        """
+        Generate Brainfuck code for multiplication by a constant
+
+        Args:
+            source_memory (int): First cell of the operand
+            source_width (int): Cells of the operand
+            factor (int): Constant factor
+            target_memory (int): First cell of the result
+            width (int): Cells of the result
+
+        Returns:
+            str: Brainfuck multiplication code
+        """
+        factor %= 256 ** width
+        digits = [(factor >> 8 * index) & 255 for index in range((factor.bit_length() + 7) // 8)]
+        loads = [digit if digit < 2 else
+                 lambda counter, digit=digit: self._generate_set_value(counter, digit)
+                 for digit in digits]
+        return self._long_multiplication(source_memory, source_width, loads, target_memory, width)
+
+    def _long_multiplication(self, left_memory: int, left_width: int,
+                             right_digits: List[Union[int, Callable[[int], str]]],
+                             target_memory: int, width: int) -> str:
+        """
+        Multiply digit by digit, adding each two-cell digit product at its
+        place in the result. Right digits are code loading the digit into a
+        counter, or the constants 0 and 1.
+        """
+        # Counter, spare, room with its two flag cells, low and high digits
+        counter = self.memory_manager.allocate_temp_memory(7)
+        spare, room, low, high = counter + 1, counter + 2, counter + 5, counter + 6
+
+        brainfuck_code = self._clear(target_memory, width)
+        for right_index, load in enumerate(right_digits):
+            if load == 0:
+                continue
+            if load == 1:
+                brainfuck_code += self.translate_add(
+                    left_memory, min(left_width, width - right_index),
+                    target_memory + right_index, width - right_index)
+                continue
+            for left_index in range(min(left_width, width - right_index)):
+                place = left_index + right_index
+                # Count the product's units down from 255, carrying into high
+                brainfuck_code += self._copy_memory_value(left_memory + left_index, low)
+                brainfuck_code += self._add_value(room, -1) + load(counter)
+                brainfuck_code += self._loop(counter, self._add_value(counter, -1) + self._loop(
+                    low, self._add_value(low, -1) + self._add_value(spare, 1) +
+                    self._count_unit(room, high)) + self._transfer_memory_value(spare, [(low, 1)]))
+                brainfuck_code += self._clear(low) + self._add_value(low, -1)
+                brainfuck_code += self._transfer_memory_value(room, [(low, -1)])
+                brainfuck_code += self.translate_add(low, min(2, width - place),
+                                                     target_memory + place, width - place)
+                brainfuck_code += self._clear(low, 2)
+        self.memory_manager.release_temp_memory(counter)
+        return brainfuck_code
+
+    def translate_less_than(self, left_memory: int, left_width: int,
+                            right_memory: int, right_width: int, target_memory: int) -> str:
+        """
+        Generate Brainfuck code for left < right: subtracting right from a
+        copy of left borrows past the top cell exactly when it holds
+
+        Args:
+            left_memory (int): First cell of the left operand
+            left_width (int): Cells of the left operand
+            right_memory (int): First cell of the right operand
+            right_width (int): Cells of the right operand
+            target_memory (int): Result cell, 1 or 0
+
+        Returns:
+            str: Brainfuck comparison code
+        """
+        width = max(left_width, right_width)
+        difference = self.memory_manager.allocate_temp_memory(width)
+        brainfuck_code = self.translate_copy(left_memory, left_width, difference, width)
+        brainfuck_code += self._clear(target_memory)
+        brainfuck_code += self.translate_add(right_memory, right_width, difference, width, -1,
+                                             carry_memory=target_memory)
+        brainfuck_code += self._clear(difference, width)
+        self.memory_manager.release_temp_memory(difference)
+        return brainfuck_code
+
+    def translate_equality(self, left_memory: int, left_width: int,
+                           right_memory: int, right_width: int, target_memory: int,
+                           negate: bool = False) -> str:
+        """
+        Generate Brainfuck code for left == right (or left != right)
+
+        Args:
+            left_memory (int): First cell of the left operand
+            left_width (int): Cells of the left operand
+            right_memory (int): First cell of the right operand
+            right_width (int): Cells of the right operand
+            target_memory (int): Result cell, 1 or 0
+            negate (bool): Test for inequality instead
+
+        Returns:
+            str: Brainfuck comparison code
+        """
+        width = max(left_width, right_width)
+        difference = self.memory_manager.allocate_temp_memory(width)
+        brainfuck_code = self.translate_copy(left_memory, left_width, difference, width)
+        brainfuck_code += self.translate_add(right_memory, right_width, difference, width, -1)
+        if negate:
+            brainfuck_code += self.translate_truth(difference, width, target_memory, consume=True)
+        else:
+            differs = self.memory_manager.allocate_temp_memory()
+            brainfuck_code += self.translate_truth(difference, width, differs, consume=True)
+            brainfuck_code += self._generate_set_value(target_memory, 1)
+            brainfuck_code += self._if_nonzero(differs, self._add_value(target_memory, -1))
+            self.memory_manager.release_temp_memory(differs)
+        self.memory_manager.release_temp_memory(difference)
+        return brainfuck_code
+
+    def translate_divmod(self, left_memory: int, left_width: int,
+                         right_memory: int, right_width: int,
+                         quotient: Optional[Tuple[int, int]] = None,
+                         remainder: Optional[Tuple[int, int]] = None) -> str:
+        """
+        Generate Brainfuck code for integer division and remainder.
+        Division by zero yields zero for both results.
+
+        Args:
+            left_memory (int): First cell of the dividend
+            left_width (int): Cells of the dividend
+            right_memory (int): First cell of the divisor
+            right_width (int): Cells of the divisor
+            quotient (Optional[Tuple[int, int]]): First cell and width of
+                the quotient, optional; it may overlap the dividend
+            remainder (Optional[Tuple[int, int]]): First cell and width of
+                the remainder, optional; it may overlap the dividend
+
+        Returns:
+            str: Brainfuck division code
+        """
+        guard = self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self.translate_truth(right_memory, right_width, guard)
+        brainfuck_code += self._long_division(
+            left_memory, left_width, right_width,
+            lambda shifted, work: self._double_divisor(right_memory, right_width, shifted, work),
+            quotient, remainder, guard)
+        self.memory_manager.release_temp_memory(guard)
+        return brainfuck_code
+
+    def translate_constant_divmod(self, left_memory: int, left_width: int, divisor: int,
+                                  quotient: Optional[Tuple[int, int]] = None,
+                                  remainder: Optional[Tuple[int, int]] = None) -> str:
+        """
+        Generate Brainfuck code for division by a constant, like
+        `translate_divmod`
+
+        Args:
+            left_memory (int): First cell of the dividend
+            left_width (int): Cells of the dividend
+            divisor (int): Constant divisor
+            quotient (Optional[Tuple[int, int]]): First cell and width of
+                the quotient, optional; it may overlap the dividend
+            remainder (Optional[Tuple[int, int]]): First cell and width of
+                the remainder, optional; it may overlap the dividend
+
+        Returns:
+            str: Brainfuck division code
+        """
+        if divisor <= 0:
+            return "".join(self._clear(*result) for result in (quotient, remainder) if result)
+        if (divisor - 1) * (256 % divisor) > 256:
+            divisor_width = (divisor.bit_length() + 7) // 8
+            return self._long_division(
+                left_memory, left_width, divisor_width,
+                lambda shifted, work: "".join(self.translate_set(cell, work, divisor << bit)
+                                              for bit, cell in enumerate(shifted)),
+                quotient, remainder)
+
+        # Small divisors leave little to carry from one digit to the next
+        digits = self.memory_manager.allocate_temp_memory(left_width)
+        rest = self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self.translate_copy(left_memory, left_width, digits, left_width)
+        brainfuck_code += self._short_division(digits, left_width, divisor, rest)
+        for result, cells, width in ((quotient, digits, left_width), (remainder, rest, 1)):
+            if result is None:
+                brainfuck_code += self._clear(cells, width)
+            else:
+                brainfuck_code += self._move_number(cells, width, *result)
+        self.memory_manager.release_temp_memory(rest)
+        self.memory_manager.release_temp_memory(digits)
+        return brainfuck_code
+
+    def _short_division(self, memory_index: int, width: int, divisor: int,
+                        remainder_memory: int) -> str:
+        """
+        Divide a value in place by a small constant, from the top digit
+        down. With r the remainder so far, digit d has quotient digit
+        r * (256 // divisor) + (r * (256 % divisor) + d) // divisor; the
+        second part comes from feeding units through a countdown that
+        wraps every `divisor` units. The remainder is added to a zeroed
+        cell.
+        """
+        if divisor == 1:
+            return ""
+        # Countdown with the two flag cells of its zero test, quotient
+        # digit, remainder
+        countdown = self.memory_manager.allocate_temp_memory(5)
+        digit, rest = countdown + 3, countdown + 4
+        whole, part = divmod(256, divisor)
+        unit = self._at(countdown, '->+<[>-]>[<' + '+' * divisor + '>>>+<<<' + '>->]<<')
+
+        brainfuck_code = ""
+        for index in reversed(range(width)):
+            cell = memory_index + index
+            brainfuck_code += self._add_value(countdown, divisor)
+            brainfuck_code += self._loop(rest, self._add_value(rest, -1) +
+                                         self._add_value(digit, whole) + unit * part)
+            brainfuck_code += self._loop(cell, self._add_value(cell, -1) + unit)
+            brainfuck_code += self._transfer_memory_value(digit, [(cell, 1)])
+            # The countdown is the divisor less the units left over
+            brainfuck_code += self._add_value(rest, divisor)
+            brainfuck_code += self._transfer_memory_value(countdown, [(rest, -1)])
+        brainfuck_code += self._transfer_memory_value(rest, [(remainder_memory, 1)])
+        self.memory_manager.release_temp_memory(countdown)
+        return brainfuck_code
+
+    def _double_divisor(self, right_memory: int, right_width: int,
+                        shifted: List[int], work: int) -> str:
+        """
+        Fill in the divisor times 1, 2, 4, ... 128
+        """
+        brainfuck_code = self.translate_copy(right_memory, right_width, shifted[0], work)
+        for bit in range(1, len(shifted)):
+            brainfuck_code += self.translate_copy(shifted[bit - 1], work, shifted[bit], work)
+            brainfuck_code += self.translate_add(shifted[bit - 1], work, shifted[bit], work)
+        return brainfuck_code
+
+    def _long_division(self, left_memory: int, left_width: int, divisor_width: int,
+                       shift_divisor: Callable[[List[int], int], str],
+                       quotient: Optional[Tuple[int, int]],
+                       remainder: Optional[Tuple[int, int]],
+                       guard: Optional[int] = None) -> str:
+        """
+        Long division one dividend digit at a time. The running remainder
+        is shifted up a cell and takes the next digit, then the divisor
+        times 128, 64, ... 1 is subtracted wherever it fits, which finds
+        the quotient digit in eight trial subtractions.
+        """
+        memory_manager = self.memory_manager
+        # The remainder stays below the divisor times 256
+        work = divisor_width + 1
+        shifted = [memory_manager.allocate_temp_memory(work) for _ in range(8)]
+        partial = memory_manager.allocate_temp_memory(work)
+        digits = memory_manager.allocate_temp_memory(left_width)
+        trial = memory_manager.allocate_temp_memory(work)
+        borrow = memory_manager.allocate_temp_memory()
+
+        body = shift_divisor(shifted, work)
+        for index in reversed(range(left_width)):
+            # Bring down the next digit of the dividend
+            for offset in reversed(range(1, work)):
+                body += self._transfer_memory_value(partial + offset - 1, [(partial + offset, 1)])
+            body += self._copy_memory_value(left_memory + index, partial)
+            for bit in reversed(range(8)):
+                body += self.translate_copy(partial, work, trial, work)
+                body += self.translate_add(shifted[bit], work, trial, work, -1, carry_memory=borrow)
+                body += self._if_else(
+                    borrow, self._clear(trial, work),
+                    self._move_number(trial, work, partial, work) +
+                    self._add_value(digits + index, 1 << bit))
+        for cell in shifted:
+            body += self._clear(cell, work)
+
+        brainfuck_code = self._if_nonzero(guard, body) if guard is not None else body
+        for result, cells, width in ((quotient, digits, left_width), (remainder, partial, work)):
+            if result is None:
+                brainfuck_code += self._clear(cells, width)
+            else:
+                brainfuck_code += self._move_number(cells, width, *result)
+
+        for cell in [borrow, trial, digits, partial] + shifted[::-1]:
+            memory_manager.release_temp_memory(cell)
+        return brainfuck_code
+
+    def translate_print(self, source_memory: int, width: int) -> str:
+        """
+        Generate Brainfuck code that writes a value as decimal digits, in
+        ASCII and without leading zeros
+
+        Args:
+            source_memory (int): First cell of the value
+            width (int): Cells of the value
+
+        Returns:
+            str: Brainfuck output code
+        """
+        memory_manager = self.memory_manager
+        count = len(str(256 ** width - 1))
+        value = memory_manager.allocate_temp_memory(width)
+        digits = memory_manager.allocate_temp_memory(count)
+        started = memory_manager.allocate_temp_memory()
+        probe = memory_manager.allocate_temp_memory()
+
+        brainfuck_code = self.translate_copy(source_memory, width, value, width)
+        for index in range(count - 1):
+            brainfuck_code += self._short_division(value, width, 10, digits + index)
+        # What is left is the most significant digit
+        brainfuck_code += self._move_number(value, width, digits + count - 1, 1)
+
+        write = lambda cell: (self._add_value(cell, ord('0')) + self._generate_output(cell) +
+                              self._add_value(cell, -ord('0')))
+        for index in reversed(range(1, count)):
+            digit = digits + index
+            brainfuck_code += self._copy_memory_value(digit, probe)
+            brainfuck_code += self._if_nonzero(probe, self._generate_set_value(started, 1))
+            brainfuck_code += self._copy_memory_value(started, probe)
+            brainfuck_code += self._if_nonzero(probe, write(digit))
+        brainfuck_code += write(digits)
+        brainfuck_code += self._clear(digits, count) + self._clear(started)
+
+        for cell in [probe, started, digits, value]:
+            memory_manager.release_temp_memory(cell)
+        return brainfuck_code
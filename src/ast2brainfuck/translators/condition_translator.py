@@ -1,179 +1,205 @@
 from typing import Dict, Any
-from src.ast2brainfuck.translators.base_translator import BaseTranslator
-from src.ast2brainfuck.translators.expression_translator import ExpressionTranslator
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
 
 class ConditionTranslator(BaseTranslator):
+    """
+    Comparison and logical operators on single cells. Results are 1 for
+    true and 0 for false; operand cells are preserved.
+    """
     def __init__(self, memory_manager, *args, **kwargs):
         super().__init__(memory_manager, *args, **kwargs)
-        self.expression_translator = ExpressionTranslator(memory_manager)
-    
-    def translate_binary_condition(self, node: Dict[str, Any], target_memory: int) -> str:
+
+    def translate_binary_condition(self, operator: str, left_memory: int,
+                                   right_memory: int, target_memory: int) -> str:
         """
-        Translate binary conditions (==, <=, <, >, >=)
-        
+        Translate binary conditions (==, !=, <, <=, >, >=, &&, ||)
+
         Args:
-            node (Dict[str, Any]): Condition node
+            operator (str): Condition operator
+            left_memory (int): Left operand memory cell
+            right_memory (int): Right operand memory cell
             target_memory (int): Memory cell to store condition result
-        
+
         Returns:
             str: Brainfuck code for condition
         """
-        operator = node.get('operator', '')
-        left_node = node.get('left', {})
-        right_node = node.get('right', {})
-        
-        # Allocate temporary memory for operands
-        left_memory = self.memory_manager.allocate_temp_memory()
-        right_memory = self.memory_manager.allocate_temp_memory()
-        
-        # Translate left and right operands
-        brainfuck_code = self.expression_translator.translate_expression(left_node, left_memory)
-        brainfuck_code += self.expression_translator.translate_expression(right_node, right_memory)
-        
-        # Clear target memory
-        brainfuck_code += self._generate_set_value(target_memory, 0)
-        
-        # Condition translation based on operator
         if operator == '==':
-            brainfuck_code += self._translate_equality(left_memory, right_memory, target_memory)
-        elif operator == '<=':
-            brainfuck_code += self._translate_less_or_equal(left_memory, right_memory, target_memory)
+            return self._translate_equality(left_memory, right_memory, target_memory)
+        elif operator == '!=':
+            return self._translate_inequality(left_memory, right_memory, target_memory)
         elif operator == '<':
-            brainfuck_code += self._translate_less_than(left_memory, right_memory, target_memory)
-        elif operator == '%':
-            brainfuck_code += self._translate_modulo_condition(left_memory, right_memory, target_memory)
-        
+            return self._translate_less_than(left_memory, right_memory, target_memory)
+        elif operator == '>':
+            return self._translate_less_than(right_memory, left_memory, target_memory)
+        elif operator == '<=':
+            return self._translate_less_or_equal(left_memory, right_memory, target_memory)
+        elif operator == '>=':
+            return self._translate_less_or_equal(right_memory, left_memory, target_memory)
+        elif operator == '&&':
+            return self.translate_logical_and(left_memory, right_memory, target_memory)
+        elif operator == '||':
+            return self.translate_logical_or(left_memory, right_memory, target_memory)
+
+        raise TranslationError(f"Unsupported condition operator: {operator}")
+
+    def translate_boolean(self, source_memory: int, target_memory: int, negate: bool = False) -> str:
+        """
+        Normalize a cell to 0/1 (or its logical negation)
+
+        Args:
+            source_memory (int): Operand memory cell
+            target_memory (int): Result memory cell
+            negate (bool): Produce !source instead of bool(source)
+
+        Returns:
+            str: Brainfuck code
+        """
+        probe = self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self._copy_memory_value(source_memory, probe)
+        brainfuck_code += self._generate_set_value(target_memory, 1 if negate else 0)
+        brainfuck_code += self._if_nonzero(probe, self._add_value(target_memory, -1 if negate else 1))
+        self.memory_manager.release_temp_memory(probe)
         return brainfuck_code
-    
+
+    def translate_logical_not(self, source_memory: int, target_memory: int) -> str:
+        """
+        Translate logical NOT
+        """
+        return self.translate_boolean(source_memory, target_memory, negate=True)
+
+    def translate_logical_and(self, left_memory: int, right_memory: int, target_memory: int) -> str:
+        """
+        Translate logical AND condition
+
+        Args:
+            left_memory (int): Left operand memory cell
+            right_memory (int): Right operand memory cell
+            target_memory (int): Result memory cell
+
+        Returns:
+            str: Brainfuck code for logical AND
+        """
+        left_flag = self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self._copy_memory_value(left_memory, left_flag)
+        brainfuck_code += self._clear(target_memory)
+        brainfuck_code += self._if_nonzero(left_flag, self.translate_boolean(right_memory, target_memory))
+        self.memory_manager.release_temp_memory(left_flag)
+        return brainfuck_code
+
     def translate_logical_or(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
         Translate logical OR condition
-        
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
         Returns:
             str: Brainfuck code for logical OR
         """
-        # Clear target memory
-        brainfuck_code = self._generate_set_value(target_memory, 0)
-        
-        # Check left operand
-        brainfuck_code += f"""
-        {'>' if left_memory > 0 else ''}{'<' if left_memory < 0 else ''}[
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if left_memory > 0 else ''}{'<' if left_memory < 0 else ''}[-]
-        ]
-        """
-        
-        # Check right operand if left was zero
-        brainfuck_code += f"""
-        {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}[
-            {'>' if right_memory > 0 else ''}{'<' if right_memory < 0 else ''}[
-                {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-                {'>' if right_memory > 0 else ''}{'<' if right_memory < 0 else ''}[-]
-            ]
-        ]
-        """
-        
+        either = self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self._clear(either)
+        brainfuck_code += self.translate_boolean(left_memory, target_memory)
+        brainfuck_code += self._transfer_memory_value(target_memory, [(either, 1)])
+        brainfuck_code += self.translate_boolean(right_memory, target_memory)
+        brainfuck_code += self._transfer_memory_value(target_memory, [(either, 1)])
+        brainfuck_code += self.translate_boolean(either, target_memory)
+        brainfuck_code += self._clear(either)
+        self.memory_manager.release_temp_memory(either)
         return brainfuck_code
-    
+
     def _translate_equality(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
         Translate equality condition
-        
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
         Returns:
             str: Brainfuck code for equality check
         """
-        return f"""
-        {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[
-            {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[-]
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[-]
-        ]
-        {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[
-            {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[-]
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[-]
-        ]
-        """
-    
+        return self._translate_difference_test(left_memory, right_memory, target_memory, equal=True)
+
+    def _translate_inequality(self, left_memory: int, right_memory: int, target_memory: int) -> str:
+        """
+        Translate inequality condition
+        """
+        return self._translate_difference_test(left_memory, right_memory, target_memory, equal=False)
+
+    def _translate_difference_test(self, left_memory: int, right_memory: int,
+                                   target_memory: int, equal: bool) -> str:
+        """
+        Compare two cells by testing their difference against zero
+        """
+        difference = self.memory_manager.allocate_temp_memory()
+        brainfuck_code = self._copy_memory_value(left_memory, difference)
+        brainfuck_code += self._add_memory_value(right_memory, difference, -1)
+        brainfuck_code += self._generate_set_value(target_memory, 1 if equal else 0)
+        brainfuck_code += self._if_nonzero(difference, self._add_value(target_memory, -1 if equal else 1))
+        self.memory_manager.release_temp_memory(difference)
+        return brainfuck_code
+
     def _translate_less_or_equal(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
-        Translate less than or equal to condition
-        
+        Translate less than or equal to condition as !(right < left)
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
         Returns:
             str: Brainfuck code for less than or equal check
         """
-        return f"""
-        {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[
-            {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[-]
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[-]
-        ]
-        {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[-]
-        ]
-        """
-    
+        brainfuck_code = self._translate_less_than(right_memory, left_memory, target_memory)
+        # Flip the 0/1 result in place
+        flipped = self.memory_manager.allocate_temp_memory()
+        brainfuck_code += self._add_value(flipped, 1)
+        brainfuck_code += self._transfer_memory_value(target_memory, [(flipped, -1)])
+        brainfuck_code += self._transfer_memory_value(flipped, [(target_memory, 1)])
+        self.memory_manager.release_temp_memory(flipped)
+        return brainfuck_code
+
     def _translate_less_than(self, left_memory: int, right_memory: int, target_memory: int) -> str:
         """
-        Translate less than condition
-        
+        Translate less than condition.
+
+        Counts both operands down together; the left operand reaching zero
+        while the right one is still positive means left < right. The cost
+        is linear in the smaller operand.
+
         Args:
             left_memory (int): Left operand memory cell
             right_memory (int): Right operand memory cell
             target_memory (int): Result memory cell
-        
+
         Returns:
             str: Brainfuck code for less than check
         """
-        return f"""
-        {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[
-            {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[-]
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if left_memory > right_memory else ''}{'<' if left_memory < right_memory else ''}[-]
-        ]
-        """
-    
-    def _translate_modulo_condition(self, left_memory: int, right_memory: int, target_memory: int) -> str:
-        """
-        Translate modulo condition (e.g., i % 3 == 0)
-        
-        Args:
-            left_memory (int): Left operand memory cell
-            right_memory (int): Right operand memory cell
-            target_memory (int): Result memory cell
-        
-        Returns:
-            str: Brainfuck code for modulo condition
-        """
-        temp_memory = self.memory_manager.allocate_temp_memory()
-        
-        return f"""
-        {'>' if temp_memory > 0 else ''}{'<' if temp_memory < 0 else ''}[-]
-        {'>' if left_memory > 0 else ''}{'<' if left_memory < 0 else ''}[
-            {'>' if right_memory > left_memory else ''}{'<' if right_memory < left_memory else ''}[
-                {'>' if temp_memory > right_memory else ''}{'<' if temp_memory < right_memory else ''}+
-                {'>' if left_memory > temp_memory else ''}{'<' if left_memory < temp_memory else ''}[-]
-            ]
-            {'>' if temp_memory > right_memory else ''}{'<' if temp_memory < right_memory else ''}[
-                {'>' if right_memory > temp_memory else ''}{'<' if right_memory < temp_memory else ''}+
-            ]
-            {'>' if target_memory > 0 else ''}{'<' if target_memory < 0 else ''}+
-            {'>' if left_memory > 0 else ''}{'<' if left_memory < 0 else ''}[-]
-        ]
-        """
+        right_count = self.memory_manager.allocate_temp_memory()
+        # Left counter followed by the two flag cells used by the zero test
+        left_count = self.memory_manager.allocate_temp_block(3)
+        flag = left_count + 1
+
+        # Runs when the left counter is exhausted: left < right
+        on_left_exhausted = self._generate_set_value(target_memory, 1) + self._clear(right_count)
+
+        step = "".join([
+            self._add_value(right_count, -1),
+            self._add_value(flag, 1),
+            self._at(left_count, '[->-]>[<' + self._move(-left_count) + on_left_exhausted +
+                     self._move(left_count) + '>->]<<')
+        ])
+
+        brainfuck_code = self._clear(target_memory)
+        brainfuck_code += self._copy_memory_value(left_memory, left_count)
+        brainfuck_code += self._copy_memory_value(right_memory, right_count)
+        brainfuck_code += self._loop(right_count, step)
+        brainfuck_code += self._clear(left_count)
+
+        self.memory_manager.release_temp_memory(left_count)
+        self.memory_manager.release_temp_memory(right_count)
+        return brainfuck_code
@@ -0,0 +1,502 @@
+import copy
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from src.solidity_parser import ASTNode
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.range_analysis import ProgramRanges
+from src.ast2brainfuck.source_map import function_scope, statement_scope
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
+from src.ast2brainfuck.translators.statement_translator import StatementTranslator, may_return
+from src.ast2brainfuck.translators.function_translator import (
+    FunctionFragment, FunctionTranslator, RETURN_SLOT)
+
+# Reserved names for the bookkeeping cells of a dispatch frame
+RUN_SLOT = '<run>'
+BLOCKS_SLOT = '<blocks>'
+RESULT_SLOT = '<result{}>'
+
+# Fixed cells shared by every dispatch frame, for single-cell return values;
+# the cells after the return value move up with its width
+RETURN_CELL = 0
+RUN_CELL = 1
+FIRST_BLOCK_CELL = 2
+
+def iter_nodes(node: Any):
+    """
+    Walk a statement or expression tree, including the statements and
+    expressions stored in node values
+
+    Args:
+        node (Any): AST node or list of nodes
+
+    Yields:
+        ASTNode: Every node of the tree
+    """
+    if node is None:
+        return
+    if isinstance(node, list):
+        for item in node:
+            yield from iter_nodes(item)
+        return
+
+    yield node
+    if isinstance(node.value, dict):
+        for item in node.value.values():
+            if isinstance(item, ASTNode):
+                yield from iter_nodes(item)
+    yield from iter_nodes(node.children)
+
+class Block:
+    """
+    A straight-line piece of a function in a dispatch group. Blocks run
+    when their activation cell is set and end by activating a successor,
+    calling a function or returning.
+    """
+    def __init__(self, index: int):
+        self.index = index
+        self.statements: List[Any] = []
+        # Set on blocks that continue after a call: whether the return value
+        # must be collected, and into which variable (None discards it)
+        self.continues_call = False
+        self.result: Optional[str] = None
+        self.callee: Optional[str] = None
+        # ('jump', block), ('branch', test, then_block, else_block),
+        # ('call', name, arguments, continuation) or ('return', expression)
+        self.terminator: Optional[Tuple] = None
+        # Statement that produced the terminator, for source maps
+        self.source: Optional[Any] = None
+
+class BlockLowering:
+    """
+    Splits function bodies into blocks at calls to dispatched functions and
+    at returns. Statements that contain neither stay whole, so their loops
+    and conditionals still compile to plain Brainfuck loops.
+    """
+    def __init__(self, dispatched: Set[str]):
+        """
+        Args:
+            dispatched (Set[str]): Functions entered through the dispatch loop
+        """
+        self.dispatched = dispatched
+        self.blocks: List[Block] = []
+        self.result_count = 0
+        # Innermost statement with a source position being lowered
+        self.statement: Optional[Any] = None
+
+    def lower_function(self, statements: List[Any]) -> Block:
+        """
+        Lower a function body into blocks
+
+        Args:
+            statements (List[Any]): Body statements
+
+        Returns:
+            Block: Entry block of the function
+        """
+        entry = self._new_block()
+        end = self._lower_statements(statements, entry)
+        if end is not None:
+            self._terminate(end, ('return', None))
+        return entry
+
+    def _new_block(self) -> Block:
+        block = Block(len(self.blocks))
+        self.blocks.append(block)
+        return block
+
+    def _terminate(self, block: Block, terminator: Tuple) -> None:
+        block.terminator = terminator
+        block.source = self.statement
+
+    def _is_dispatched_call(self, node: Any) -> bool:
+        return (node is not None and node.type == 'FunctionCall' and
+                node.value['name'] in self.dispatched)
+
+    def _needs_split(self, node: Any) -> bool:
+        return may_return(node) or any(self._is_dispatched_call(item) for item in iter_nodes(node))
+
+    def _lower_statements(self, statements: List[Any], block: Block) -> Optional[Block]:
+        """
+        Lower statements starting in a block; returns the block where
+        control continues, or None once every path has returned
+        """
+        for statement in statements:
+            if block is None:
+                break
+            block = self._lower_statement(statement, block)
+        return block
+
+    def _lower_statement(self, node: Any, block: Block) -> Optional[Block]:
+        outer = self.statement
+        if getattr(node, 'line', None) is not None:
+            self.statement = node
+        try:
+            return self._lower_node(node, block)
+        finally:
+            self.statement = outer
+
+    def _lower_node(self, node: Any, block: Block) -> Optional[Block]:
+        if not self._needs_split(node):
+            block.statements.append(node)
+            return block
+
+        node_type = node.type
+        if node_type == 'Block':
+            return self._lower_statements(node.children, block)
+
+        if node_type in ['VariableDeclaration', 'Assignment']:
+            name = node.value['name'] if node_type == 'VariableDeclaration' else node.value['variable']
+            expression = node.value.get('expression')
+            # A call stored straight into a scalar receives its result directly
+            if self._is_dispatched_call(expression) and 'target' not in node.value:
+                return self._call(expression, block, name)
+            block, expression = self._hoist(expression, block)
+            statement = copy.copy(node)
+            statement.value = dict(node.value, expression=expression)
+            block.statements.append(statement)
+            return block
+
+        if node_type == 'FunctionCall':
+            if self._is_dispatched_call(node):
+                return self._call(node, block, None)
+            block, expression = self._hoist(node, block)
+            block.statements.append(expression)
+            return block
+
+        if node_type == 'Return':
+            block, expression = self._hoist(node.value.get('expression'), block)
+            self._terminate(block, ('return', expression))
+            return None
+
+        if node_type == 'If':
+            block, test = self._hoist(node.value['test'], block)
+            then_block = self._new_block()
+            then_end = self._lower_statements(node.value['body'].children, then_block)
+            alternate = node.value.get('alternate')
+            else_block = else_end = None
+            if alternate is not None:
+                else_block = self._new_block()
+                else_end = self._lower_statements(alternate.children, else_block)
+            if else_block is not None and then_end is None and else_end is None:
+                # Both branches return, so nothing follows the if statement
+                self._terminate(block, ('branch', test, then_block, else_block))
+                return None
+            join = self._new_block()
+            self._terminate(block, ('branch', test, then_block, else_block or join))
+            for end in [then_end, else_end]:
+                if end is not None:
+                    self._terminate(end, ('jump', join))
+            return join
+
+        if node_type == 'While':
+            return self._lower_loop(node.value['test'], node.value['body'].children, block)
+
+        if node_type == 'For':
+            if node.value['init'] is not None:
+                block = self._lower_statement(node.value['init'], block)
+            body = list(node.value['body'].children) + [node.value['update']]
+            return self._lower_loop(node.value['test'], body, block)
+
+        raise TranslationError(f"Unsupported statement type: {node_type}")
+
+    def _lower_loop(self, test: Any, body: List[Any], block: Block) -> Block:
+        head = self._new_block()
+        self._terminate(block, ('jump', head))
+        head_end, test = self._hoist(test, head)
+        body_block = self._new_block()
+        body_end = self._lower_statements(body, body_block)
+        exit_block = self._new_block()
+        self._terminate(head_end, ('branch', test, body_block, exit_block))
+        if body_end is not None:
+            self._terminate(body_end, ('jump', head))
+        return exit_block
+
+    def _hoist(self, expression: Any, block: Block) -> Tuple[Block, Any]:
+        """
+        Move dispatched calls out of an expression into call terminators,
+        replacing them with the variables receiving their results
+        """
+        if expression is None or not any(self._is_dispatched_call(item)
+                                         for item in iter_nodes(expression)):
+            return block, expression
+
+        if self._is_dispatched_call(expression):
+            self.result_count += 1
+            result = RESULT_SLOT.format(self.result_count)
+            return self._call(expression, block, result), ASTNode('Identifier', result)
+
+        children = []
+        for child in expression.children:
+            block, child = self._hoist(child, block)
+            children.append(child)
+        expression = copy.copy(expression)
+        expression.children = children
+        return block, expression
+
+    def _call(self, node: Any, block: Block, result: Optional[str]) -> Block:
+        arguments = []
+        for argument in node.children:
+            block, argument = self._hoist(argument, block)
+            arguments.append(argument)
+
+        continuation = self._new_block()
+        continuation.continues_call = True
+        continuation.result = result
+        continuation.callee = node.value['name']
+        self._terminate(block, ('call', node.value['name'], arguments, continuation))
+        return continuation
+
+class DispatchTranslator(BaseTranslator):
+    """
+    Compiles a group of functions into a single loop that shares each
+    function body between all of its calls, which also supports recursion.
+
+    Every activation gets a frame of the same size F on a stack that grows
+    to the right: [return value, run flag, one activation cell per block,
+    parameters, locals and temporaries]. Each pass of the loop runs the
+    active block of the current frame; a call fills in the next frame and
+    moves the pointer F cells right, a return clears the frame and moves F
+    cells left. The loop ends on an empty guard frame below the entry frame.
+    """
+    def __init__(self, call_resolver: Callable[[str, List[Any], int], str],
+                 max_recursion_depth: int = 20,
+                 max_iterations: int = 1000,
+                 ranges: Optional[ProgramRanges] = None):
+        """
+        Args:
+            call_resolver (Callable): Expands the inline call placeholders of
+                a code fragment given its calls and frame size
+            max_recursion_depth (int): Maximum allowed recursion depth
+            max_iterations (int): Maximum allowed translation iterations
+            ranges (Optional[ProgramRanges]): Value ranges giving wide
+                values several cells
+        """
+        super().__init__(MemoryManager(), max_recursion_depth, max_iterations)
+        self.call_resolver = call_resolver
+        self.ranges = ranges
+        self.function_translator = FunctionTranslator(None, max_recursion_depth, max_iterations)
+        self.function_translator.ranges = ranges
+        self.blocks: List[Block] = []
+        # Cells of the shared return value slot, and the cells after it
+        self.return_width = 1
+        self.run_cell = RUN_CELL
+        self.first_block_cell = FIRST_BLOCK_CELL
+
+    def translate_group(self, fragments: Dict[str, FunctionFragment], entry: str) -> FunctionFragment:
+        """
+        Translate the functions of a dispatch group into one program fragment
+
+        Args:
+            fragments (Dict[str, FunctionFragment]): Group members by name
+            entry (str): Function the program starts in
+
+        Returns:
+            FunctionFragment: Program that runs the entry function from the
+            start of the tape, with its return value in `return_cell`
+        """
+        lowering = BlockLowering(set(fragments))
+        functions = {}
+        for name, fragment in fragments.items():
+            if isinstance(fragment.node, list):
+                parameters, statements, clear_frame = [], fragment.node, False
+            else:
+                parameters, statements, clear_frame = (
+                    fragment.node.parameters, fragment.node.body.children, True)
+            functions[name] = (parameters, clear_frame, lowering.lower_function(statements))
+        blocks = self.blocks = lowering.blocks
+        self.return_width = max(fragment.return_width for fragment in fragments.values())
+        self.run_cell = RUN_CELL + self.return_width - 1
+        self.first_block_cell = FIRST_BLOCK_CELL + self.return_width - 1
+
+        # Frame sizes do not depend on F, so a first pass measures them
+        frame_size = max(self._translate_function(name, functions, blocks, 0)[0]
+                         for name in functions)
+        block_code = {}
+        for name in functions:
+            block_code.update(self._translate_function(name, functions, blocks, frame_size)[1])
+
+        entry_cell = self.first_block_cell + functions[entry][2].index
+        # Blocks no function reaches are never activated and get no code
+        sweep = "".join(
+            self._loop(self.first_block_cell + index,
+                       self._add_value(self.first_block_cell + index, -1) + block_code[index])
+            for index in range(len(blocks)) if index in block_code
+        )
+
+        brainfuck_code = self._add_value(frame_size + self.run_cell, 1)
+        brainfuck_code += self._add_value(frame_size + entry_cell, 1)
+        brainfuck_code += self._move(frame_size) + self._loop(self.run_cell, sweep)
+        # Top-level programs without a return leave their variables instead
+        return_cell = None if fragments[entry].return_cell is None else frame_size + RETURN_CELL
+        return FunctionFragment(entry, brainfuck_code, 2 * frame_size, [], return_cell,
+                                return_width=fragments[entry].return_width)
+
+    def _translate_function(self, name: str, functions: Dict[str, Tuple], blocks: List[Block],
+                            frame_size: int) -> Tuple[int, Dict[int, str]]:
+        """
+        Generate the blocks of one group member
+
+        Returns:
+            Tuple[int, Dict[int, str]]: Cells used by the frame and code by
+            block index
+        """
+        parameters, clear_frame, entry = functions[name]
+        function_ranges = self.ranges.function(name) if self.ranges is not None else None
+        memory_manager = MemoryManager()
+        memory_manager.allocate_variable(RETURN_SLOT, width=self.return_width)
+        memory_manager.allocate_variable(RUN_SLOT)
+        memory_manager.allocate_block(BLOCKS_SLOT, len(blocks))
+        for parameter, width in zip(parameters, self._parameter_widths(name, parameters)):
+            if parameter.get('dimensions'):
+                raise TranslationError(
+                    f"Array parameters are not supported in recursive call chains: {parameter['name']}")
+            memory_manager.allocate_variable(parameter['name'], width=width)
+
+        statement_translator = StatementTranslator(
+            memory_manager, self.max_recursion_depth, self.max_iterations)
+        statement_translator.return_memory = RETURN_CELL
+        if function_ranges is not None:
+            statement_translator.return_width = function_ranges.result_width
+        expression_translator = statement_translator.expression_translator
+        expression_translator.ranges = function_ranges
+        calls = []
+        expression_translator.call_handler = (
+            lambda node, target_memory, width: self.function_translator.translate_call(
+                expression_translator, calls, node, target_memory, width))
+
+        owned = self._owned_blocks(entry, blocks)
+        block_code = {}
+        for block in owned:
+            brainfuck_code = ""
+            if block.continues_call:
+                callee_width = expression_translator.call_width(block.callee)
+                if block.result is None:
+                    brainfuck_code += self._clear(frame_size + RETURN_CELL, callee_width)
+                else:
+                    # Hoisted results take the width of the call
+                    width = (expression_translator.variable_width(block.result)
+                             if function_ranges is not None and block.result in function_ranges.variables
+                             else callee_width)
+                    result_memory = memory_manager.allocate_variable(block.result, width=width)
+                    brainfuck_code += self._move_number(
+                        frame_size + RETURN_CELL, callee_width,
+                        result_memory, memory_manager.get_variable_width(block.result))
+            for statement in block.statements:
+                brainfuck_code += statement_translator.translate_node(statement)
+            brainfuck_code += statement_scope(block.source, self._translate_terminator(
+                block.terminator, statement_translator, functions, frame_size, clear_frame))
+            block_code[block.index] = function_scope(name, brainfuck_code)
+
+        # The measuring pass (frame_size 0) leaves inline calls unresolved
+        if frame_size:
+            block_code = {index: self.call_resolver(code, calls, memory_manager.frame_size)
+                          for index, code in block_code.items()}
+        return memory_manager.frame_size, block_code
+
+    def _parameter_widths(self, name: str, parameters: List[Dict[str, Any]]) -> List[int]:
+        """
+        Cells of each parameter of a group member
+        """
+        if self.ranges is None:
+            return [1] * len(parameters)
+        return self.ranges.parameter_widths(name)
+
+    def _owned_blocks(self, entry: Block, blocks: List[Block]) -> List[Block]:
+        """
+        Collect the blocks reachable from a function's entry block
+        """
+        owned = {}
+        pending = [entry]
+        while pending:
+            block = pending.pop()
+            if block.index in owned:
+                continue
+            owned[block.index] = block
+            terminator = block.terminator
+            if terminator[0] == 'jump':
+                pending.append(terminator[1])
+            elif terminator[0] == 'branch':
+                pending.extend(terminator[2:])
+            elif terminator[0] == 'call':
+                pending.append(terminator[3])
+        return [owned[index] for index in sorted(owned)]
+
+    def _translate_terminator(self, terminator: Tuple, statement_translator: StatementTranslator,
+                              functions: Dict[str, Tuple], frame_size: int,
+                              clear_frame: bool) -> str:
+        memory_manager = statement_translator.memory_manager
+        expression_translator = statement_translator.expression_translator
+        kind = terminator[0]
+
+        if kind == 'jump':
+            return self._add_value(self.first_block_cell + terminator[1].index, 1)
+
+        if kind == 'branch':
+            _, test, then_block, else_block = terminator
+            condition_memory = memory_manager.allocate_temp_memory()
+            brainfuck_code = expression_translator.translate_condition(test, condition_memory)
+            brainfuck_code += statement_translator._if_else(
+                condition_memory,
+                self._add_value(self.first_block_cell + then_block.index, 1),
+                self._add_value(self.first_block_cell + else_block.index, 1))
+            memory_manager.release_temp_memory(condition_memory)
+            return brainfuck_code
+
+        if kind == 'call':
+            return self._translate_call(terminator, expression_translator, functions, frame_size)
+
+        # Return: store the value, clear the frame and pop it
+        brainfuck_code = ""
+        if terminator[1] is not None:
+            brainfuck_code += expression_translator.translate_expression(
+                terminator[1], RETURN_CELL, statement_translator.return_width)
+        if clear_frame:
+            array_translator = expression_translator.array_translator
+            for name, memory_index in sorted(memory_manager.variable_memory_map.items(),
+                                             key=lambda item: item[1]):
+                if memory_index <= self.run_cell or name == BLOCKS_SLOT:
+                    continue
+                if name in memory_manager.array_dimensions:
+                    brainfuck_code += array_translator.clear_array(name)
+                else:
+                    brainfuck_code += self._clear(memory_index, memory_manager.get_variable_width(name))
+        brainfuck_code += self._add_value(self.run_cell, -1)
+        return brainfuck_code + self._move(-frame_size)
+
+    def _translate_call(self, terminator: Tuple, expression_translator: Any,
+                        functions: Dict[str, Tuple], frame_size: int) -> str:
+        """
+        Fill in the callee's frame above the current one and switch to it
+        """
+        _, name, arguments, continuation = terminator
+        parameters, _, entry = functions[name]
+        if len(arguments) != len(parameters):
+            raise TranslationError(
+                f"{name} expects {len(parameters)} arguments, got {len(arguments)}")
+
+        memory_manager = expression_translator.memory_manager
+        # Parameters follow the block activation cells in every frame
+        widths = self._parameter_widths(name, parameters)
+        parameter_cells = [frame_size + self.first_block_cell + len(self.blocks) + sum(widths[:index])
+                           for index in range(len(parameters))]
+        brainfuck_code = ""
+
+        # Arguments that contain inline calls are evaluated first, since an
+        # inlined callee may use the cells above this frame
+        staged = []
+        for argument, parameter_memory, width in zip(arguments, parameter_cells, widths):
+            if any(item.type == 'FunctionCall' for item in iter_nodes(argument)):
+                temp_memory = memory_manager.allocate_temp_memory(width)
+                brainfuck_code += expression_translator.translate_expression(argument, temp_memory, width)
+                staged.append((temp_memory, parameter_memory, width))
+        for argument, parameter_memory, width in zip(arguments, parameter_cells, widths):
+            if not any(item.type == 'FunctionCall' for item in iter_nodes(argument)):
+                brainfuck_code += expression_translator.translate_expression(
+                    argument, parameter_memory, width)
+        for temp_memory, parameter_memory, width in staged:
+            brainfuck_code += self._move_number(temp_memory, width, parameter_memory, width)
+            memory_manager.release_temp_memory(temp_memory)
+
+        brainfuck_code += self._add_value(frame_size + self.run_cell, 1)
+        brainfuck_code += self._add_value(frame_size + self.first_block_cell + entry.index, 1)
+        brainfuck_code += self._add_value(self.first_block_cell + continuation.index, 1)
+        return brainfuck_code + self._move(frame_size)
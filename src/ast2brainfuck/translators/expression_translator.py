@@ -0,0 +1,362 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.range_analysis import FunctionRanges
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
+from src.ast2brainfuck.translators.arithmetic_translator import ArithmeticTranslator
+from src.ast2brainfuck.translators.array_translator import ArrayTranslator
+from src.ast2brainfuck.translators.bigint_translator import BigIntTranslator
+from src.ast2brainfuck.translators.condition_translator import ConditionTranslator
+
+ARITHMETIC_OPERATORS = {'+', '-', '*', '/', '%'}
+CONDITION_OPERATORS = {'==', '!=', '<', '<=', '>', '>=', '&&', '||'}
+
+class ExpressionTranslator(BaseTranslator):
+    """
+    Translates expression trees produced by SolidityParser into code that
+    leaves the expression value in a target cell.
+
+    With value ranges set, values may span several cells (see
+    `BigIntTranslator`): + - * are computed at the width of their target,
+    while / % and comparisons look at the full width of their operands.
+    """
+    def __init__(self, memory_manager: MemoryManager, *args, **kwargs):
+        super().__init__(memory_manager, *args, **kwargs)
+        self.arithmetic_translator = ArithmeticTranslator(memory_manager)
+        self.condition_translator = ConditionTranslator(memory_manager)
+        self.array_translator = ArrayTranslator(memory_manager)
+        self.bigint_translator = BigIntTranslator(memory_manager)
+        # Value ranges of the function being compiled; without them every
+        # value is a single cell
+        self.ranges: Optional[FunctionRanges] = None
+        # Hook used by the function translator to compile calls
+        self.call_handler: Optional[Callable[[Any, int, int], str]] = None
+
+    def translate_expression(self, node: Any, target_memory: int, width: int = 1) -> str:
+        """
+        Translate an expression so that its value ends up in a target cell
+
+        Args:
+            node (Any): Expression AST node
+            target_memory (int): Memory cell receiving the value
+            width (int): Cells of the target, which receives the value
+                modulo 256**width
+
+        Returns:
+            str: Brainfuck code for the expression
+        """
+        if node is None:
+            return self._clear(target_memory, width)
+
+        node_type = node.type
+        if node_type == 'Literal':
+            return self.bigint_translator.translate_set(target_memory, width, node.value)
+        elif node_type == 'Identifier':
+            return self.bigint_translator.translate_copy(
+                self._variable_memory(node.value), self.memory_manager.get_variable_width(node.value),
+                target_memory, width)
+        elif node_type == 'UnaryExpression':
+            return self._translate_unary(node, target_memory, width)
+        elif node_type == 'BinaryExpression':
+            return self._translate_binary(node, target_memory, width)
+        elif node_type == 'ArrayAccess':
+            indices, brainfuck_code = self.translate_indices(node)
+            brainfuck_code += self.array_translator.translate_read(
+                node.array_name, indices, target_memory)
+            return brainfuck_code + self.release_indices(indices) + self._clear(target_memory + 1, width - 1)
+        elif node_type == 'FunctionCall':
+            if self.call_handler is None:
+                raise TranslationError(f"Function calls are not supported here: {node.value['name']}")
+            return self.call_handler(node, target_memory, width)
+
+        raise TranslationError(f"Unsupported expression type: {node_type}")
+
+    def translate_operand(self, node: Any, width: int = 1) -> Tuple[int, str, bool]:
+        """
+        Make an expression's value available in some cells. Variables at
+        least `width` cells wide are used in place; other expressions are
+        evaluated into a temporary.
+
+        Args:
+            node (Any): Expression AST node
+            width (int): Cells of the value needed
+
+        Returns:
+            Tuple[int, str, bool]: (cell, code, whether the cell is a temporary
+            the caller must clear and release)
+        """
+        if node.type == 'Identifier' and self.memory_manager.get_variable_width(node.value) >= width:
+            return self._variable_memory(node.value), '', False
+
+        temp_memory = self.memory_manager.allocate_temp_memory(width)
+        return temp_memory, self.translate_expression(node, temp_memory, width), True
+
+    def release_operand(self, memory_index: int, is_temp: bool, width: int = 1) -> str:
+        """
+        Clear and release an operand cell obtained from translate_operand
+        """
+        if not is_temp:
+            return ''
+        self.memory_manager.release_temp_memory(memory_index)
+        return self._clear(memory_index, width)
+
+    def translate_condition(self, node: Any, target_memory: int) -> str:
+        """
+        Translate an expression used as a truth value, leaving a cell that
+        is non-zero exactly when the expression is
+
+        Args:
+            node (Any): Expression AST node
+            target_memory (int): Memory cell receiving the truth value
+
+        Returns:
+            str: Brainfuck code for the condition
+        """
+        width = self.expression_width(node)
+        if width == 1:
+            return self.translate_expression(node, target_memory)
+        if node.type == 'Identifier':
+            return self.bigint_translator.translate_truth(
+                self._variable_memory(node.value), width, target_memory)
+
+        value = self.memory_manager.allocate_temp_memory(width)
+        brainfuck_code = self.translate_expression(node, value, width)
+        brainfuck_code += self.bigint_translator.translate_truth(value, width, target_memory, consume=True)
+        self.memory_manager.release_temp_memory(value)
+        return brainfuck_code
+
+    def variable_width(self, name: str) -> int:
+        """
+        Cells the value ranges give a variable of the current function
+        """
+        return 1 if self.ranges is None else self.ranges.variable_width(name)
+
+    def call_width(self, name: str) -> int:
+        """
+        Cells of the return value of a function
+        """
+        return 1 if self.ranges is None else self.ranges.program.result_width(name)
+
+    def expression_width(self, node: Any) -> int:
+        """
+        Cells holding every value of an expression
+        """
+        if self.ranges is None:
+            return 1
+        if node.type == 'Identifier':
+            return self.memory_manager.get_variable_width(node.value)
+        return self.ranges.expression_width(node)
+
+    def translate_indices(self, node: Any) -> Tuple[List[Tuple[int, bool, bool]], str]:
+        """
+        Evaluate the indices of an array access. Literal indices stay
+        constants so the array translator can resolve them at compile time.
+
+        Args:
+            node (Any): ArrayAccess node
+
+        Returns:
+            Tuple[List[Tuple[int, bool, bool]], str]: (value, is_constant,
+            is_temp) per index, and the code evaluating them
+        """
+        indices = []
+        brainfuck_code = ""
+        for index in node.children:
+            if index.type == 'Literal':
+                indices.append((index.value, True, False))
+                continue
+            memory_index, index_code, is_temp = self.translate_operand(index)
+            brainfuck_code += index_code
+            indices.append((memory_index, False, is_temp))
+        return indices, brainfuck_code
+
+    def release_indices(self, indices: List[Tuple[int, bool, bool]]) -> str:
+        """
+        Release index temporaries, which the array access has consumed
+        """
+        for memory_index, is_constant, is_temp in reversed(indices):
+            if is_temp:
+                self.memory_manager.release_temp_memory(memory_index)
+        return ''
+
+    def _variable_memory(self, name: str) -> int:
+        """
+        Look up the cell of a declared variable
+        """
+        memory_index = self.memory_manager.get_variable_memory(name)
+        if memory_index is None:
+            raise TranslationError(f"Undeclared variable: {name}")
+        if name in self.memory_manager.array_dimensions:
+            raise TranslationError(f"Array {name} cannot be used as a value")
+        return memory_index
+
+    def _translate_unary(self, node: Any, target_memory: int, width: int = 1) -> str:
+        """
+        Translate logical NOT and arithmetic negation
+        """
+        operand_node = node.children[0]
+        if node.value == '!' and self.expression_width(operand_node) > 1:
+            truth = self.memory_manager.allocate_temp_memory()
+            code = self.translate_condition(operand_node, truth)
+            code += self.condition_translator.translate_logical_not(truth, target_memory)
+            return code + self.release_operand(truth, True) + self._clear(target_memory + 1, width - 1)
+        if node.value == '-' and width > 1:
+            operand, code, is_temp = self.translate_operand(operand_node, width)
+            code += self._clear(target_memory, width)
+            code += self.bigint_translator.translate_add(operand, width, target_memory, width, -1)
+            return code + self.release_operand(operand, is_temp, width)
+        if width > 1:
+            return self._translate_unary(node, target_memory) + self._clear(target_memory + 1, width - 1)
+
+        operand, code, is_temp = self.translate_operand(operand_node)
+        if node.value == '!':
+            code += self.condition_translator.translate_logical_not(operand, target_memory)
+        elif node.value == '-':
+            code += self._clear(target_memory)
+            code += self._add_memory_value(operand, target_memory, -1)
+        else:
+            raise TranslationError(f"Unsupported unary operator: {node.value}")
+        return code + self.release_operand(operand, is_temp)
+
+    def _translate_binary(self, node: Any, target_memory: int, width: int = 1) -> str:
+        """
+        Translate arithmetic, comparison and logical binary expressions
+        """
+        operator = node.value
+        left_node, right_node = node.children
+
+        if self.ranges is not None:
+            if operator in ['+', '-', '*']:
+                operand_width = width
+            else:
+                operand_width = max(self.expression_width(left_node), self.expression_width(right_node))
+            if operand_width > 1:
+                return self._translate_wide_binary(node, target_memory, width, operand_width)
+            if width > 1:
+                return self._translate_binary(node, target_memory) + self._clear(target_memory + 1, width - 1)
+
+        # Constant right operands for + - * avoid a temporary altogether
+        if right_node.type == 'Literal' and operator in ['+', '-', '*']:
+            left, code, left_temp = self.translate_operand(left_node)
+            if operator == '*':
+                code += self.arithmetic_translator.translate_constant_multiplication(
+                    left, right_node.value, target_memory)
+            else:
+                sign = 1 if operator == '+' else -1
+                code += self._copy_memory_value(left, target_memory)
+                code += self._add_value(target_memory, sign * right_node.value)
+            return code + self.release_operand(left, left_temp)
+
+        left, left_code, left_temp = self.translate_operand(left_node)
+        right, right_code, right_temp = self.translate_operand(right_node)
+        code = left_code + right_code
+
+        if operator == '+':
+            code += self.arithmetic_translator.translate_addition(left, right, target_memory)
+        elif operator == '-':
+            code += self.arithmetic_translator.translate_subtraction(left, right, target_memory)
+        elif operator == '*':
+            code += self.arithmetic_translator.translate_multiplication(left, right, target_memory)
+        elif operator == '/':
+            code += self.arithmetic_translator.translate_division(left, right, target_memory)
+        elif operator == '%':
+            code += self.arithmetic_translator.translate_modulo(left, right, target_memory)
+        elif operator in CONDITION_OPERATORS:
+            code += self.condition_translator.translate_binary_condition(
+                operator, left, right, target_memory)
+        else:
+            raise TranslationError(f"Unsupported binary operator: {operator}")
+
+        code += self.release_operand(right, right_temp)
+        code += self.release_operand(left, left_temp)
+        return code
+
+    def _translate_wide_binary(self, node: Any, target_memory: int, width: int,
+                               operand_width: int) -> str:
+        """
+        Translate a binary expression whose operands span several cells
+        """
+        operator = node.value
+        left_node, right_node = node.children
+        bigint_translator = self.bigint_translator
+
+        if operator in ['&&', '||']:
+            left = self.memory_manager.allocate_temp_memory()
+            right = self.memory_manager.allocate_temp_memory()
+            code = self.translate_condition(left_node, left) + self.translate_condition(right_node, right)
+            code += self.condition_translator.translate_binary_condition(
+                operator, left, right, target_memory)
+            code += self.release_operand(right, True) + self.release_operand(left, True)
+            return code + self._clear(target_memory + 1, width - 1)
+
+        # Constant right operands avoid a temporary altogether
+        if right_node.type == 'Literal' and operator in ARITHMETIC_OPERATORS:
+            left, left_width, code, left_temp = self._wide_operand(left_node, operand_width)
+            value = right_node.value
+            if operator == '*':
+                code += bigint_translator.translate_constant_multiplication(
+                    left, left_width, value, target_memory, width)
+            elif operator in ['+', '-']:
+                code += bigint_translator.translate_copy(left, left_width, target_memory, width)
+                code += bigint_translator.translate_add_constant(
+                    target_memory, width, value, 1 if operator == '+' else -1)
+            else:
+                result = (target_memory, width)
+                code += bigint_translator.translate_constant_divmod(
+                    left, left_width, value, *((result, None) if operator == '/' else (None, result)))
+            return code + self.release_operand(left, left_temp, operand_width)
+
+        if operator == '*' and self.expression_width(left_node) < self.expression_width(right_node):
+            # Long multiplication loops over the digits of the right operand
+            left_node, right_node = right_node, left_node
+        left, left_width, left_code, left_temp = self._wide_operand(left_node, operand_width)
+        right, right_width, right_code, right_temp = self._wide_operand(right_node, operand_width)
+        code = left_code + right_code
+
+        if operator in ['+', '-']:
+            code += bigint_translator.translate_copy(left, left_width, target_memory, width)
+            code += bigint_translator.translate_add(
+                right, right_width, target_memory, width, 1 if operator == '+' else -1)
+        elif operator == '*':
+            code += bigint_translator.translate_multiplication(
+                left, left_width, right, right_width, target_memory, width)
+        elif operator in ['/', '%']:
+            result = (target_memory, width)
+            code += bigint_translator.translate_divmod(
+                left, left_width, right, right_width, *((result, None) if operator == '/' else (None, result)))
+        elif operator in ['==', '!=']:
+            code += bigint_translator.translate_equality(
+                left, left_width, right, right_width, target_memory, negate=operator == '!=')
+        elif operator in ['<', '>', '<=', '>=']:
+            # a > b is b < a, and a <= b is not b < a
+            smaller, smaller_width, larger, larger_width = left, left_width, right, right_width
+            if operator in ['>', '<=']:
+                smaller, smaller_width, larger, larger_width = right, right_width, left, left_width
+            if operator in ['<', '>']:
+                code += bigint_translator.translate_less_than(
+                    smaller, smaller_width, larger, larger_width, target_memory)
+            else:
+                less = self.memory_manager.allocate_temp_memory()
+                code += bigint_translator.translate_less_than(
+                    smaller, smaller_width, larger, larger_width, less)
+                code += self._generate_set_value(target_memory, 1)
+                code += self._if_nonzero(less, self._add_value(target_memory, -1))
+                self.memory_manager.release_temp_memory(less)
+        else:
+            raise TranslationError(f"Unsupported binary operator: {operator}")
+        if operator in CONDITION_OPERATORS:
+            code += self._clear(target_memory + 1, width - 1)
+
+        code += self.release_operand(right, right_temp, operand_width)
+        code += self.release_operand(left, left_temp, operand_width)
+        return code
+
+    def _wide_operand(self, node: Any, width: int) -> Tuple[int, int, str, bool]:
+        """
+        Like translate_operand, but variables narrower than `width` are
+        used in place too; also returns the cells of the value
+        """
+        if node.type == 'Identifier':
+            return (self._variable_memory(node.value),
+                    min(self.memory_manager.get_variable_width(node.value), width), '', False)
+        memory_index, code, is_temp = self.translate_operand(node, width)
+        return memory_index, width, code, is_temp
@@ -0,0 +1,341 @@
+from typing import Any, Dict, List, Optional, Tuple
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.range_analysis import ProgramRanges
+from src.ast2brainfuck.source_map import function_scope
+from src.ast2brainfuck.stats import measure_node
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
+from src.ast2brainfuck.translators.statement_translator import StatementTranslator, may_return
+from src.ast2brainfuck.translators.array_translator import ArrayTranslator, array_size
+
+# Reserved names for the bookkeeping cells of a frame
+RETURN_SLOT = '<return>'
+DONE_SLOT = '<done>'
+
+# Placeholder left in fragment code for each call site, resolved by the linker
+CALL_PLACEHOLDER = '{{{}}}'
+
+class CallSite:
+    """
+    A call left unresolved in a fragment. The caller has already evaluated
+    the arguments; the linker decides how the callee is entered.
+    """
+    def __init__(self, name: str, argument_cells: List[Tuple[int, bool]],
+                 target_cell: int, scratch_cell: int,
+                 array_dimensions: Optional[List[Optional[List[int]]]] = None):
+        """
+        Args:
+            name (str): Callee name
+            argument_cells (List[Tuple[int, bool]]): Cell holding each
+                argument and whether it is a temporary the callee may consume
+            target_cell (int): Cell receiving the return value
+            scratch_cell (int): Zeroed cell available for copying arguments
+            array_dimensions (Optional[List[Optional[List[int]]]]): Dimensions
+                of each argument passed as an array (by reference), None for
+                scalar arguments
+        """
+        self.name = name
+        self.argument_cells = argument_cells
+        self.target_cell = target_cell
+        self.scratch_cell = scratch_cell
+        self.array_dimensions = array_dimensions or [None] * len(argument_cells)
+
+class FunctionFragment:
+    """
+    Brainfuck code for one function, relative to the origin of its frame.
+
+    A fragment only depends on the function's own source, so it can be
+    cached and placed at any tape position by the linker. Calls appear in
+    the code as placeholders indexing into `calls`.
+    """
+    def __init__(self, name: str, code: str, frame_size: int,
+                 parameter_cells: List[Tuple[str, int]],
+                 return_cell: Optional[int],
+                 calls: Optional[List[CallSite]] = None,
+                 node: Any = None,
+                 return_width: int = 1,
+                 parameter_widths: Optional[List[int]] = None):
+        """
+        Args:
+            name (str): Function name
+            code (str): Origin-relative Brainfuck code
+            frame_size (int): Number of cells used by the frame
+            parameter_cells (List[Tuple[str, int]]): Parameter names and cells
+            return_cell (Optional[int]): Cell holding the return value
+            calls (Optional[List[CallSite]]): Unresolved call sites
+            node (Any): Source AST node, used to specialise the function
+            return_width (int): Cells of the return value
+            parameter_widths (Optional[List[int]]): Cells of each parameter,
+                one each by default
+        """
+        self.name = name
+        self.code = code
+        self.frame_size = frame_size
+        self.parameter_cells = parameter_cells
+        self.return_cell = return_cell
+        self.calls = calls or []
+        self.node = node
+        self.return_width = return_width
+        self.parameter_widths = parameter_widths or [1] * len(parameter_cells)
+        # Content key for caching specialised copies, set by the compiler
+        self.key = None
+
+def assigned_variables(node: Any) -> set:
+    """
+    Collect the names a statement (or list of statements) assigns or
+    declares
+
+    Args:
+        node (Any): Statement AST node or list of nodes
+
+    Returns:
+        set: Variable names written by the code
+    """
+    if node is None:
+        return set()
+    if isinstance(node, list):
+        return set().union(*(assigned_variables(child) for child in node))
+
+    names = set()
+    if node.type == 'Assignment':
+        names.add(node.value['variable'])
+    elif node.type == 'VariableDeclaration':
+        names.add(node.value['name'])
+    elif node.type in ['While', 'If', 'For']:
+        for key in ['init', 'update', 'body', 'alternate']:
+            names |= assigned_variables(node.value.get(key))
+    return names | assigned_variables(node.children)
+
+def has_early_return(statements: List[Any]) -> bool:
+    """
+    Check whether a body returns anywhere but in its last statement
+
+    Args:
+        statements (List[Any]): Function body statements
+
+    Returns:
+        bool: True if a done flag is needed to skip the remaining code
+    """
+    if not statements:
+        return False
+    *leading, last = statements
+    if any(may_return(statement) for statement in leading):
+        return True
+    return last.type != 'Return' and may_return(last)
+
+class FunctionTranslator(BaseTranslator):
+    """
+    Translates a function (or a top-level statement list) into a
+    FunctionFragment with its own frame layout:
+    [return value, parameters..., done flag, locals and temporaries...]
+    """
+    def __init__(self, memory_manager: MemoryManager = None,
+                 max_recursion_depth: int = 20,
+                 max_iterations: int = 1000):
+        super().__init__(memory_manager or MemoryManager(), max_recursion_depth, max_iterations)
+        # Value ranges of the program, giving wide values several cells
+        self.ranges: Optional[ProgramRanges] = None
+
+    def translate_function(self, node: Any,
+                           bindings: Optional[Dict[str, int]] = None) -> FunctionFragment:
+        """
+        Translate a function definition
+
+        Args:
+            node (Any): FunctionNode
+            bindings (Optional[Dict[str, int]]): Parameters bound to cells
+                outside the frame instead of having their own cell
+
+        Returns:
+            FunctionFragment: Generated function fragment
+        """
+        fragment = self.translate_body(node.name, node.parameters, node.body.children,
+                                       returns=True, clear_frame=True, bindings=bindings)
+        fragment.node = node
+        return fragment
+
+    def translate_statements(self, name: str, statements: List[Any]) -> FunctionFragment:
+        """
+        Translate top-level statements. Variables stay on the tape after the
+        program ends, so the final memory state can be inspected.
+
+        Args:
+            name (str): Fragment name
+            statements (List[Any]): Top-level statement nodes
+
+        Returns:
+            FunctionFragment: Generated fragment
+        """
+        returns = any(may_return(statement) for statement in statements)
+        fragment = self.translate_body(name, [], statements, returns=returns, clear_frame=False)
+        fragment.node = statements
+        return fragment
+
+    def translate_body(self, name: str, parameters: List[Dict[str, Any]],
+                       statements: List[Any], returns: bool,
+                       clear_frame: bool,
+                       bindings: Optional[Dict[str, int]] = None) -> FunctionFragment:
+        """
+        Lay out a frame and translate a statement list into it
+
+        Args:
+            name (str): Function name
+            parameters (List[Dict[str, Any]]): Parameter descriptions
+            statements (List[Any]): Body statements
+            returns (bool): Whether to reserve a return value cell
+            clear_frame (bool): Zero every frame cell except the return
+                value on exit, so the frame can be reused by later calls
+            bindings (Optional[Dict[str, int]]): Read-only parameters and
+                array parameters bound to cells of the caller (negative,
+                origin-relative indices)
+
+        Returns:
+            FunctionFragment: Generated fragment
+        """
+        with measure_node('Function'):
+            fragment, memory_manager = self._translate_frame(
+                name, parameters, statements, returns, clear_frame, bindings, MemoryManager())
+            if not memory_manager.array_cells:
+                return fragment
+
+            # Arrays are only reached through cells near their start, so lay the
+            # frame out again with the arrays above all scalars and temporaries
+            scalar_size = memory_manager.scalar_size
+            fragment, memory_manager = self._translate_frame(
+                name, parameters, statements, returns, clear_frame, bindings,
+                MemoryManager(array_base=scalar_size))
+            if memory_manager.current_memory_pointer > scalar_size:
+                raise TranslationError(f"Inconsistent frame layout in {name}")
+            return fragment
+
+    def _translate_frame(self, name: str, parameters: List[Dict[str, Any]],
+                         statements: List[Any], returns: bool, clear_frame: bool,
+                         bindings: Optional[Dict[str, int]],
+                         memory_manager: MemoryManager) -> Tuple[FunctionFragment, MemoryManager]:
+        """
+        Translate a statement list into a frame laid out by a memory manager
+        """
+        function_ranges = self.ranges.function(name) if self.ranges is not None else None
+        return_width = function_ranges.result_width if function_ranges is not None else 1
+        return_cell = (memory_manager.allocate_variable(RETURN_SLOT, width=return_width)
+                       if returns else None)
+
+        bindings = bindings or {}
+        parameter_cells = []
+        parameter_widths = []
+        for parameter in parameters:
+            width = function_ranges.variable_width(parameter['name']) if function_ranges else 1
+            dimensions = parameter.get('dimensions')
+            if dimensions and parameter['name'] in bindings:
+                memory_manager.bind_array(parameter['name'], dimensions, bindings[parameter['name']])
+            elif dimensions:
+                # Unbound array parameters get a local array of the same shape
+                memory_manager.allocate_array(parameter['name'], dimensions, array_size(dimensions))
+            elif parameter['name'] in bindings:
+                memory_manager.bind_variable(parameter['name'], bindings[parameter['name']], width)
+            else:
+                memory_manager.allocate_variable(parameter['name'], width=width)
+            parameter_cells.append((parameter['name'], memory_manager.get_variable_memory(parameter['name'])))
+            parameter_widths.append(1 if dimensions else width)
+
+        statement_translator = StatementTranslator(
+            memory_manager, self.max_recursion_depth, self.max_iterations)
+        statement_translator.return_memory = return_cell
+        statement_translator.return_width = return_width
+        statement_translator.expression_translator.ranges = function_ranges
+        calls = []
+        statement_translator.expression_translator.call_handler = (
+            lambda node, target_memory, width: self.translate_call(
+                statement_translator.expression_translator, calls, node, target_memory, width))
+        if returns and has_early_return(statements):
+            statement_translator.done_memory = memory_manager.allocate_variable(DONE_SLOT)
+
+        try:
+            brainfuck_code = statement_translator.translate_block(statements)
+        except RecursionError as e:
+            raise TranslationError(f"Function {name} is nested too deeply") from e
+
+        if clear_frame:
+            brainfuck_code += self._clear_frame(memory_manager, return_cell)
+
+        fragment = FunctionFragment(name, function_scope(name, brainfuck_code),
+                                    memory_manager.frame_size, parameter_cells, return_cell, calls,
+                                    return_width=return_width, parameter_widths=parameter_widths)
+        return fragment, memory_manager
+
+    def translate_call(self, expression_translator: Any, calls: List[CallSite],
+                       node: Any, target_memory: int, width: int = 1) -> str:
+        """
+        Evaluate the arguments of a call and leave a placeholder for the
+        linker, which inlines the callee or enters it through a dispatch loop
+
+        Args:
+            expression_translator (ExpressionTranslator): Translator of the
+                calling frame
+            calls (List[CallSite]): Call sites of the fragment being built
+            node (Any): FunctionCall node
+            target_memory (int): Cell receiving the return value
+            width (int): Cells of the target
+
+        Returns:
+            str: Brainfuck code with a call placeholder
+        """
+        memory_manager = expression_translator.memory_manager
+        name = node.value['name']
+        widths = self.ranges.parameter_widths(name) if self.ranges is not None else []
+        brainfuck_code = ""
+        arguments = []
+        argument_widths = []
+        array_dimensions = []
+        for index, argument in enumerate(node.children):
+            # Arrays are passed by reference
+            dimensions = (memory_manager.array_dimensions.get(argument.value)
+                          if argument.type == 'Identifier' else None)
+            array_dimensions.append(dimensions)
+            if (argument.type == 'ArrayAccess' and len(argument.children) <
+                    len(memory_manager.array_dimensions.get(argument.array_name, []))):
+                raise TranslationError(
+                    f"Sub-arrays cannot be passed as arguments: {argument.array_name} in call to {name}")
+            if dimensions is not None:
+                arguments.append((memory_manager.get_variable_memory(argument.value), False))
+                argument_widths.append(1)
+                continue
+            argument_width = widths[index] if index < len(widths) else 1
+            memory_index, argument_code, is_temp = expression_translator.translate_operand(
+                argument, argument_width)
+            brainfuck_code += argument_code
+            arguments.append((memory_index, is_temp))
+            argument_widths.append(argument_width)
+
+        # The callee returns as many cells as its return value has
+        return_width = expression_translator.call_width(name)
+        result_memory = target_memory
+        if return_width != width:
+            result_memory = memory_manager.allocate_temp_memory(return_width)
+
+        scratch_memory = memory_manager.allocate_temp_memory()
+        calls.append(CallSite(name, arguments, result_memory, scratch_memory, array_dimensions))
+        brainfuck_code += CALL_PLACEHOLDER.format(len(calls) - 1)
+        memory_manager.release_temp_memory(scratch_memory)
+
+        if result_memory != target_memory:
+            brainfuck_code += self._move_number(result_memory, return_width, target_memory, width)
+            memory_manager.release_temp_memory(result_memory)
+        for (memory_index, is_temp), argument_width in reversed(list(zip(arguments, argument_widths))):
+            brainfuck_code += expression_translator.release_operand(memory_index, is_temp, argument_width)
+        return brainfuck_code
+
+    def _clear_frame(self, memory_manager: MemoryManager, return_cell: Optional[int]) -> str:
+        """
+        Zero all named cells of a frame except the return value
+        """
+        array_translator = ArrayTranslator(memory_manager)
+        brainfuck_code = ""
+        for name, memory_index in sorted(memory_manager.variable_memory_map.items(),
+                                         key=lambda item: item[1]):
+            if memory_index < 0 or memory_index == return_cell:
+                continue
+            if name in memory_manager.array_dimensions:
+                brainfuck_code += array_translator.clear_array(name)
+            else:
+                brainfuck_code += self._clear(memory_index, memory_manager.get_variable_width(name))
+        return brainfuck_code
@@ -1,94 +1,164 @@
-from typing import Dict, Any, Union
+from typing import Dict, Any, Optional, Union
 from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.range_analysis import ProgramRanges
 from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
 from src.ast2brainfuck.translators.statement_translator import StatementTranslator
 from src.ast2brainfuck.translators.expression_translator import ExpressionTranslator
 from src.ast2brainfuck.translators.condition_translator import ConditionTranslator
 from src.ast2brainfuck.translators.arithmetic_translator import ArithmeticTranslator
+from src.ast2brainfuck.translators.function_translator import FunctionTranslator, FunctionFragment
+from src.ast2brainfuck.linker import Linker, DEFAULT_INLINE_BUDGET
+
+# Name of the fragment holding top-level statements
+PROGRAM_FRAGMENT = '<program>'
 
 class NodeTranslators(BaseTranslator):
-    def __init__(self, memory_manager: MemoryManager, 
-                 max_recursion_depth: int = 20, 
-                 max_iterations: int = 1000):
+    def __init__(self, memory_manager: MemoryManager,
+                 max_recursion_depth: int = 20,
+                 max_iterations: int = 1000,
+                 inline_budget: int = DEFAULT_INLINE_BUDGET):
         """
         Initialize node translators with memory management and constraints
-        
+
         Args:
             memory_manager (MemoryManager): Memory management instance
             max_recursion_depth (int): Maximum allowed recursion depth
             max_iterations (int): Maximum allowed translation iterations
+            inline_budget (int): Code-size budget for inlining a function
         """
         super().__init__(memory_manager, max_recursion_depth, max_iterations)
-        
+
         # Initialize specialized translators
         self.statement_translator = StatementTranslator(memory_manager)
-        self.expression_translator = ExpressionTranslator(memory_manager)
-        self.condition_translator = ConditionTranslator(memory_manager)
-        self.arithmetic_translator = ArithmeticTranslator(memory_manager)
-    
-    def translate_node(self, node: Dict[str, Any]) -> str:
+        self.expression_translator = self.statement_translator.expression_translator
+        self.condition_translator = self.expression_translator.condition_translator
+        self.arithmetic_translator = self.expression_translator.arithmetic_translator
+        self.function_translator = FunctionTranslator(memory_manager, max_recursion_depth, max_iterations)
+        self.linker = Linker(inline_budget)
+
+    def translate_node(self, node: Any) -> str:
         """
         Translate different types of nodes
-        
+
         Args:
-            node (Dict[str, Any]): AST node to translate
-        
+            node (Any): AST node to translate
+
         Returns:
             str: Generated Brainfuck code
-        
+
         Raises:
             TranslationError: If translation fails
         """
-        node_type = node.get('type', '')
-        
+        node_type = node.type
+
         # Map node types to translation methods
         translation_methods = {
             'Program': self.translate_program,
+            'Function': lambda function_node: self.translate_function(function_node).code,
+            'Block': self.statement_translator.translate_block,
             'VariableDeclaration': self.statement_translator.translate_variable_declaration,
-            'AssignmentExpression': self.statement_translator.translate_assignment,
-            'ForStatement': self.statement_translator.translate_for_statement,
-            'IfStatement': self.statement_translator.translate_if_statement,
+            'Assignment': self.statement_translator.translate_assignment,
+            'While': self.statement_translator.translate_while_statement,
+            'For': self.statement_translator.translate_for_statement,
+            'If': self.statement_translator.translate_if_statement,
+            'Return': self.statement_translator.translate_return,
+            'FunctionCall': self.statement_translator.translate_expression_statement,
             'BinaryExpression': self.expression_translator.translate_expression,
+            'UnaryExpression': self.expression_translator.translate_expression,
             'Literal': self.expression_translator.translate_expression,
             'Identifier': self.expression_translator.translate_expression
         }
-        
+
         # Find and execute the appropriate translation method
         translator_method = translation_methods.get(node_type)
-        
+
         if translator_method:
             # For expressions, we need a target memory cell
-            if node_type in ['BinaryExpression', 'Literal', 'Identifier']:
-                # Use a dedicated output cell for final result variables
-                if node_type == 'Identifier' and node.get('name') in ['factorial', 'sum', 'result']:
-                    memory_index = self.memory_manager.get_variable_memory(node.get('name'))
-                    self.output_cell = memory_index
-                    return self.expression_translator.translate_expression(node, memory_index)
-                
+            if node_type in ['BinaryExpression', 'UnaryExpression', 'Literal', 'Identifier']:
                 temp_memory = self.memory_manager.allocate_temp_memory()
                 return translator_method(node, temp_memory)
-            
+
             return translator_method(node)
-        
+
         raise TranslationError(f"Unsupported node type: {node_type}")
-    
-    def translate_program(self, node: Dict[str, Any]) -> str:
+
+    def set_ranges(self, ranges: Optional[ProgramRanges]) -> None:
+        """
+        Compile later fragments with the given value ranges, giving wide
+        variables several cells; None keeps every value in one cell
+
+        Args:
+            ranges (Optional[ProgramRanges]): Value ranges of the program
+        """
+        self.function_translator.ranges = ranges
+        self.linker.ranges = ranges
+
+    def translate_function(self, node: Any) -> FunctionFragment:
+        """
+        Translate a function definition into a relocatable fragment
+
+        Args:
+            node (Any): FunctionNode
+
+        Returns:
+            FunctionFragment: Generated fragment
+        """
+        return self.function_translator.translate_function(node)
+
+    def translate_fragments(self, node: Any) -> Dict[str, FunctionFragment]:
+        """
+        Translate every function of a program, plus its top-level
+        statements if there are any
+
+        Args:
+            node (Any): Program AST node
+
+        Returns:
+            Dict[str, FunctionFragment]: Fragments by function name
+        """
+        fragments = {}
+        statements = []
+        for item in node.children:
+            if item.type == 'Function':
+                fragments[item.name] = self.translate_function(item)
+            else:
+                statements.append(item)
+
+        if statements:
+            fragments[PROGRAM_FRAGMENT] = self.function_translator.translate_statements(
+                PROGRAM_FRAGMENT, statements)
+        return fragments
+
+    def translate_program(self, node: Any) -> str:
         """
         Translate an entire program
-        
+
         Args:
-            node (Dict[str, Any]): Program AST node
-        
+            node (Any): Program AST node
+
         Returns:
             str: Generated Brainfuck code
         """
-        brainfuck_code = ""
-        for item in node.get('body', []):
-            brainfuck_code += self.translate_node(item)
-        
-        # Add output generation for the final result
-        if self.output_cell is not None:
-            # Ensure the output cell is at the correct memory location
-            brainfuck_code += f"{'>' if self.output_cell > 0 else ''}{'<' if self.output_cell < 0 else ''}.[-]"
-        
+        fragments = self.translate_fragments(node)
+        brainfuck_code = self.linker.link(fragments, self.select_entry(fragments))
+        self.output_cell = self.linker.output_cell
         return brainfuck_code
+
+    def select_entry(self, fragments: Dict[str, FunctionFragment]) -> str:
+        """
+        Choose the fragment a program starts from: main() if defined,
+        otherwise the top-level statements
+
+        Args:
+            fragments (Dict[str, FunctionFragment]): Program fragments
+
+        Returns:
+            str: Entry fragment name
+        """
+        if 'main' in fragments:
+            if PROGRAM_FRAGMENT in fragments:
+                raise TranslationError("Top-level statements cannot be combined with main()")
+            return 'main'
+        if PROGRAM_FRAGMENT in fragments:
+            return PROGRAM_FRAGMENT
+        raise TranslationError("Program has neither main() nor top-level statements")
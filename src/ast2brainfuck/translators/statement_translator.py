@@ -1,166 +1,331 @@
-from typing import Dict, Any
-from src.ast2brainfuck.translators.base_translator import BaseTranslator
+from typing import Dict, Any, List, Optional
+from src.ast2brainfuck.emitter import CodeEmitter
+from src.ast2brainfuck.source_map import statement_scope
+from src.ast2brainfuck.stats import measure_node
+from src.ast2brainfuck.translators.base_translator import BaseTranslator, TranslationError
 from src.ast2brainfuck.translators.expression_translator import ExpressionTranslator
 
+def may_return(node: Any) -> bool:
+    """
+    Check whether a statement contains a return statement
+
+    Args:
+        node (Any): Statement AST node
+
+    Returns:
+        bool: True if executing the statement can return from the function
+    """
+    if node is None:
+        return False
+    if node.type == 'Return':
+        return True
+    if node.type == 'Block':
+        return any(may_return(child) for child in node.children)
+    if node.type in ['While', 'If', 'For']:
+        return (may_return(node.value.get('body')) or
+                may_return(node.value.get('alternate')))
+    return False
+
+def references_variable(node: Any, name: str) -> bool:
+    """
+    Check whether an expression reads a variable
+
+    Args:
+        node (Any): Expression AST node
+        name (str): Variable name
+
+    Returns:
+        bool: True if the variable occurs in the expression
+    """
+    if node is None:
+        return False
+    if node.type == 'Identifier':
+        return node.value == name
+    if node.type == 'ArrayAccess' and node.array_name == name:
+        return True
+    return any(references_variable(child, name) for child in node.children)
+
 class StatementTranslator(BaseTranslator):
     def __init__(self, memory_manager, *args, **kwargs):
         super().__init__(memory_manager, *args, **kwargs)
         self.expression_translator = ExpressionTranslator(memory_manager)
-    
-    def translate_node(self, node: Dict[str, Any]) -> str:
+        # Function context, set by the function translator
+        self.return_memory: Optional[int] = None
+        self.return_width = 1
+        self.done_memory: Optional[int] = None
+
+    def translate_node(self, node: Any) -> str:
         """
         Translate different types of nodes
-        
+
         Args:
-            node (Dict[str, Any]): AST node to translate
-        
+            node (Any): AST node to translate
+
         Returns:
-            str: Brainfuck code for the node
+            str: Brainfuck code for the node, marked with its source position
         """
-        node_type = node.get('type', '')
-        translator_method = getattr(self, f'translate_{node_type}', None)
-        
+        translation_methods = {
+            'Block': self.translate_block,
+            'VariableDeclaration': self.translate_variable_declaration,
+            'Array': self.translate_array_declaration,
+            'Assignment': self.translate_assignment,
+            'While': self.translate_while_statement,
+            'For': self.translate_for_statement,
+            'If': self.translate_if_statement,
+            'Return': self.translate_return,
+            'FunctionCall': self.translate_expression_statement
+        }
+
+        translator_method = translation_methods.get(node.type)
         if translator_method:
-            return translator_method(node)
-        return ""
-    
-    def translate_variable_declaration(self, node: Dict[str, Any]) -> str:
+            with measure_node(node.type):
+                brainfuck_code = translator_method(node)
+            return statement_scope(node, brainfuck_code)
+        raise TranslationError(f"Unsupported statement type: {node.type}")
+
+    def translate_block(self, node: Any) -> str:
+        """
+        Translate a block of statements. Once a statement may have returned,
+        the rest of the block only runs while the function is still active.
+
+        Args:
+            node (Any): Block node or list of statements
+
+        Returns:
+            str: Brainfuck code for the block
+        """
+        statements = node if isinstance(node, list) else node.children
+        emitter = CodeEmitter()
+        for index, statement in enumerate(statements):
+            emitter.emit(self.translate_node(statement))
+            remaining = statements[index + 1:]
+            if remaining and self.done_memory is not None and may_return(statement):
+                emitter.emit(self._unless_done(self.translate_block(remaining)))
+                break
+        return emitter.getvalue()
+
+    def translate_variable_declaration(self, node: Any) -> str:
         """
         Translate variable declaration to Brainfuck
-        
+
         Args:
-            node (Dict[str, Any]): Variable declaration node
-        
+            node (Any): Variable declaration node
+
         Returns:
             str: Brainfuck code for variable initialization
         """
-        var_name = node.get('name', '')
-        initial_value_node = node.get('init', {})
-        
-        # Allocate memory for the variable
-        memory_index = self.memory_manager.allocate_variable(var_name)
-        
-        # If there's an initial value, translate the expression
-        if initial_value_node:
-            brainfuck_code = self.expression_translator.translate_expression(initial_value_node, memory_index)
-        else:
+        var_name = node.value['name']
+        width = self.expression_translator.variable_width(var_name)
+        memory_index = self.memory_manager.allocate_variable(var_name, width=width)
+        expression = node.value.get('expression')
+
+        if expression is None:
             # Default to zero if no initial value
-            brainfuck_code = self._generate_set_value(memory_index, 0)
-        
-        # Track output cell for final result variables
-        if var_name in ['factorial', 'sum', 'result']:
-            self.output_cell = memory_index
-        
-        return brainfuck_code
-    
-    def translate_assignment(self, node: Dict[str, Any]) -> str:
+            return self.expression_translator.bigint_translator.translate_set(memory_index, width, 0)
+        return self._store(memory_index, var_name, expression, width)
+
+    def translate_array_declaration(self, node: Any) -> str:
+        """
+        Translate array declaration to Brainfuck
+
+        Args:
+            node (Any): Array node
+
+        Returns:
+            str: Brainfuck code zeroing the array elements
+        """
+        return self.expression_translator.array_translator.declare_array(
+            node.name, node.dimensions, getattr(node, 'initializer', None))
+
+    def translate_assignment(self, node: Any) -> str:
         """
         Translate assignment operation to Brainfuck
-        
+
         Args:
-            node (Dict[str, Any]): Assignment node
-        
+            node (Any): Assignment node
+
         Returns:
             str: Brainfuck code for assignment
         """
-        var_name = node.get('left', {}).get('name', '')
-        value_node = node.get('right', {})
-        
-        # Get memory location for the variable
+        if 'target' in node.value:
+            return self._translate_array_assignment(node.value['target'], node.value['expression'])
+
+        var_name = node.value['variable']
         memory_index = self.memory_manager.get_variable_memory(var_name)
-        
-        # Allocate temporary memory for complex expressions
+        if memory_index is None:
+            raise TranslationError(f"Assignment to undeclared variable: {var_name}")
+        return self._store(memory_index, var_name, node.value['expression'],
+                           self.memory_manager.get_variable_width(var_name))
+
+    def _translate_array_assignment(self, target: Any, expression: Any) -> str:
+        """
+        Store an expression's value in an array element
+        """
+        if expression is None:
+            raise TranslationError(f"Missing value in assignment to {target.array_name}")
+        expression_translator = self.expression_translator
+        value_memory, brainfuck_code, value_temp = expression_translator.translate_operand(expression)
+        indices, index_code = expression_translator.translate_indices(target)
+        brainfuck_code += index_code
+        brainfuck_code += expression_translator.array_translator.translate_write(
+            target.array_name, indices, value_memory, value_temp)
+        brainfuck_code += expression_translator.release_indices(indices)
+        if value_temp:
+            self.memory_manager.release_temp_memory(value_memory)
+        return brainfuck_code
+
+    def translate_expression_statement(self, node: Any) -> str:
+        """
+        Translate an expression evaluated only for its side effects
+        """
         temp_memory = self.memory_manager.allocate_temp_memory()
-        
-        # Translate the right-hand side expression
-        brainfuck_code = self.expression_translator.translate_expression(value_node, temp_memory)
-        
-        # Copy result to target memory
-        brainfuck_code += self._copy_memory_value(temp_memory, memory_index)
-        
-        # Update output cell if needed
-        if var_name in ['factorial', 'sum', 'result']:
-            self.output_cell = memory_index
-        
+        brainfuck_code = self.expression_translator.translate_expression(node, temp_memory)
+        brainfuck_code += self._clear(temp_memory)
+        self.memory_manager.release_temp_memory(temp_memory)
         return brainfuck_code
-    
-    def translate_for_statement(self, node: Dict[str, Any]) -> str:
+
+    def translate_while_statement(self, node: Any) -> str:
         """
-        Translate for loop to Brainfuck
-        
+        Translate while loop to Brainfuck
+
         Args:
-            node (Dict[str, Any]): For statement node
-        
+            node (Any): While statement node
+
         Returns:
             str: Brainfuck code for the loop
         """
-        init_node = node.get('init', {})
-        test_node = node.get('test', {})
-        body_node = node.get('body', {})
-        
-        # Translate initialization
-        if init_node.get('declarations'):
-            init_declaration = init_node.get('declarations', [{}])[0]
-            brainfuck_code = self.translate_variable_declaration(init_declaration)
-        else:
-            brainfuck_code = ""
-        
-        # Allocate memory for loop variables and condition
-        loop_var_name = init_node.get('declarations', [{}])[0].get('name', '')
-        limit_var_name = test_node.get('right', {}).get('name', '')
-        
-        loop_var_memory = self.memory_manager.get_variable_memory(loop_var_name)
-        limit_memory = self.memory_manager.get_variable_memory(limit_var_name)
-        condition_memory = self.memory_manager.allocate_temp_memory()
-        
-        # Translate loop with condition handling
-        brainfuck_code += "".join([
-            "[",  # Outer loop
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}[-]",
-            f"{'>' if loop_var_memory > 0 else ''}{'<' if loop_var_memory < 0 else ''}[",
-            f"{'>' if limit_memory > 0 else ''}{'<' if limit_memory < 0 else ''}[",
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}+",
-            f"{'>' if limit_memory > 0 else ''}{'<' if limit_memory < 0 else ''}[-]",
-            "]",
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}[",
-            f"{'>' if loop_var_memory > 0 else ''}{'<' if loop_var_memory < 0 else ''}+",
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}[-]",
-            "]",
-            self.translate_node(body_node),
-            f"{'>' if loop_var_memory > 0 else ''}{'<' if loop_var_memory < 0 else ''}+",
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}[-]",
-            "]",
-            f"{'>' if loop_var_memory > 0 else ''}{'<' if loop_var_memory < 0 else ''}[-]",
-            "]"
-        ])
-        
-        return brainfuck_code
-    
-    def translate_if_statement(self, node: Dict[str, Any]) -> str:
+        return self._translate_loop(node.value['test'], node.value['body'].children)
+
+    def translate_for_statement(self, node: Any) -> str:
+        """
+        Translate for loop to Brainfuck as init; while (test) { body; update }
+
+        Args:
+            node (Any): For statement node
+
+        Returns:
+            str: Brainfuck code for the loop
+        """
+        brainfuck_code = self.translate_node(node.value['init']) if node.value['init'] else ""
+        body = list(node.value['body'].children) + [node.value['update']]
+        return brainfuck_code + self._translate_loop(node.value['test'], body)
+
+    def translate_if_statement(self, node: Any) -> str:
         """
         Translate if statement to Brainfuck
-        
+
         Args:
-            node (Dict[str, Any]): If statement node
-        
+            node (Any): If statement node
+
         Returns:
             str: Brainfuck code for the if statement
         """
-        test_node = node.get('test', {})
-        consequent_node = node.get('consequent', {})
-        
-        # Allocate memory for condition result
         condition_memory = self.memory_manager.allocate_temp_memory()
-        
-        # Translate condition
-        brainfuck_code = self.expression_translator.translate_expression(test_node, condition_memory)
-        
-        # Translate consequent body with condition check
-        brainfuck_code += "".join([
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}[",
-            self.translate_node(consequent_node),
-            f"{'>' if condition_memory > 0 else ''}{'<' if condition_memory < 0 else ''}[-]",
-            "]"
-        ])
-        
+        brainfuck_code = self.expression_translator.translate_condition(
+            node.value['test'], condition_memory)
+
+        alternate = node.value.get('alternate')
+        brainfuck_code += self._if_else(
+            condition_memory,
+            self.translate_block(node.value['body']),
+            self.translate_block(alternate) if alternate else ""
+        )
+
+        self.memory_manager.release_temp_memory(condition_memory)
+        return brainfuck_code
+
+    def translate_return(self, node: Any) -> str:
+        """
+        Translate return statement: store the value and mark the function
+        as finished
+
+        Args:
+            node (Any): Return node
+
+        Returns:
+            str: Brainfuck code for the return
+        """
+        if self.return_memory is None:
+            raise TranslationError("Return statement outside of a function")
+
+        brainfuck_code = self._store(self.return_memory, None, node.value.get('expression'),
+                                     self.return_width)
+        if self.done_memory is not None:
+            brainfuck_code += self._generate_set_value(self.done_memory, 1)
+        return brainfuck_code
+
+    def _translate_loop(self, test: Any, body: List[Any]) -> str:
+        """
+        Generate a loop that re-evaluates its condition after every pass
+        """
+        condition_memory = self.memory_manager.allocate_temp_memory()
+        condition_code = self._translate_loop_condition(test, condition_memory)
+
+        brainfuck_code = condition_code
+        brainfuck_code += self._loop(condition_memory, self.translate_block(body) + condition_code)
+
+        self.memory_manager.release_temp_memory(condition_memory)
+        return brainfuck_code
+
+    def _translate_loop_condition(self, test: Any, condition_memory: int) -> str:
+        """
+        Evaluate a loop condition, forced to false once the function returned
+        """
+        brainfuck_code = self.expression_translator.translate_condition(test, condition_memory)
+        if self.done_memory is not None:
+            done_copy = self.memory_manager.allocate_temp_memory()
+            brainfuck_code += self._copy_memory_value(self.done_memory, done_copy)
+            brainfuck_code += self._if_nonzero(done_copy, self._clear(condition_memory))
+            self.memory_manager.release_temp_memory(done_copy)
+        return brainfuck_code
+
+    def _unless_done(self, body: str) -> str:
+        """
+        Run code only while the current function has not returned
+        """
+        # The body is already generated, so the flag must be a fresh cell
+        active = self.memory_manager.allocate_temp_block(1)
+        brainfuck_code = self.expression_translator.condition_translator.translate_logical_not(
+            self.done_memory, active)
+        brainfuck_code += self._if_nonzero(active, body)
+        self.memory_manager.release_temp_memory(active)
+        return brainfuck_code
+
+    def _store(self, memory_index: int, var_name: Optional[str], expression: Any,
+               width: int = 1) -> str:
+        """
+        Evaluate an expression into a variable's cell
+
+        Args:
+            memory_index (int): Destination cell
+            var_name (Optional[str]): Destination variable, if any
+            expression (Any): Expression AST node
+            width (int): Cells of the destination
+
+        Returns:
+            str: Brainfuck code
+        """
+        if expression is None:
+            return self._clear(memory_index, width)
+
+        # x = x + c and x = x - c update the cell in place
+        if (var_name is not None and expression.type == 'BinaryExpression' and
+                expression.value in ['+', '-'] and
+                expression.children[0].type == 'Identifier' and
+                expression.children[0].value == var_name and
+                expression.children[1].type == 'Literal'):
+            sign = 1 if expression.value == '+' else -1
+            if width > 1:
+                return self.expression_translator.bigint_translator.translate_add_constant(
+                    memory_index, width, expression.children[1].value, sign)
+            return self._add_value(memory_index, sign * expression.children[1].value)
+
+        if var_name is None or not references_variable(expression, var_name):
+            return self.expression_translator.translate_expression(expression, memory_index, width)
+
+        # The expression reads the destination: evaluate into a temporary first
+        temp_memory = self.memory_manager.allocate_temp_memory(width)
+        brainfuck_code = self.expression_translator.translate_expression(expression, temp_memory, width)
+        brainfuck_code += self._move_number(temp_memory, width, memory_index, width)
+        self.memory_manager.release_temp_memory(temp_memory)
         return brainfuck_code
@@ -0,0 +1,342 @@
+"""
+Batched Brainfuck Execution
+
+Runs one program over many input vectors in lockstep. The tapes of all
+runs (lanes) form one 2-D NumPy array, inputs x cells, and every IR node
+executes once for all lanes with vectorised array operations.
+
+Lanes take different paths through loops. Each loop keeps a mask of the
+lanes still iterating in it; the others wait at the end of the loop until
+it has finished for every lane. When only a small fraction of the lanes
+keeps iterating, lockstep would spend most of its time on waiting lanes,
+so those few lanes leave the batch and continue one at a time in the
+scalar interpreter, from exactly where they were. The same happens to a
+lane that reaches the step limit, or whose pointer could run into the
+left end of the tape, where the scalar interpreter falls back to running
+characters one at a time.
+
+Every lane produces the output, steps, peak tape size and tape of a
+`BrainfuckInterpreter` run with its input. NumPy is optional: without it,
+every lane runs in the scalar interpreter.
+"""
+
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from src.brainfuck_interpreter import BrainfuckInterpreter, RunContext
+from src.brainfuck_ir import ADD, AFFINE, BLOCK, IN, OPEN, OUT, SET
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Lanes keep iterating a loop in lockstep while at least this fraction of
+# the running lanes does
+DEFAULT_DIVERGENCE_LIMIT = 1 / 16
+
+# Columns of the batch tape before it first grows; lanes report the tape
+# size of a scalar run regardless
+INITIAL_WIDTH = 256
+
+# Input values the batch tape can hold
+INT64_LIMIT = 1 << 62
+
+class BatchInterpreter:
+    """
+    Runs a program over many inputs at once.
+    """
+    def __init__(self,
+                 memory_size: int = 30000,
+                 max_steps: int = 1_000_000,
+                 log_file: Optional[str] = 'brainfuck_interpreter.log',
+                 superinstructions: Optional[Iterable[str]] = None,
+                 divergence_limit: float = DEFAULT_DIVERGENCE_LIMIT):
+        """
+        Args:
+            memory_size (int): Initial memory tape size of every lane
+            max_steps (int): Maximum computational steps of every lane
+            log_file (Optional[str]): Path for logging interpreter actions
+            superinstructions (Optional[Iterable[str]]): Superinstruction
+                patterns to fuse, as for BrainfuckInterpreter
+            divergence_limit (float): Fraction of the running lanes below
+                which the lanes still iterating a loop continue one at a
+                time
+        """
+        self.memory_size = memory_size
+        self.max_steps = max_steps
+        self.log_file = log_file
+        self.divergence_limit = divergence_limit
+        self.superinstructions = superinstructions
+        # Runs lanes that leave the batch, and lowers programs
+        self.scalar = BrainfuckInterpreter(
+            memory_size=memory_size, max_steps=max_steps, log_file=log_file,
+            superinstructions=superinstructions)
+        self.superinstructions = self.scalar.superinstructions
+
+        # Statistics of the last batch, per lane
+        self.steps: List[int] = []
+        self.peak_memory: List[int] = []
+        self.memories: List[List[int]] = []
+        # Lanes that finished in the scalar interpreter
+        self.scalar_lanes: List[int] = []
+
+    def interpret(self, code: str, input_streams: Sequence[List[int]]) -> List[List[int]]:
+        """
+        Run a program once for every input vector
+
+        Args:
+            code (str): Brainfuck source code
+            input_streams (Sequence[List[int]]): Input values of every lane
+
+        Returns:
+            List[List[int]]: Result of every lane, as returned by
+            `BrainfuckInterpreter.interpret`
+        """
+        lanes = len(input_streams)
+        self.steps = [0] * lanes
+        self.peak_memory = [0] * lanes
+        self.memories = [[] for _ in range(lanes)]
+        self.scalar_lanes = []
+        results: List[Optional[List[int]]] = [None] * lanes
+
+        # Lanes whose inputs the batch tape cannot hold run alone
+        batched = [lane for lane, values in enumerate(input_streams)
+                   if np is not None and all(-INT64_LIMIT < value < INT64_LIMIT for value in values)]
+        alone = set(range(lanes)) - set(batched)
+        evicted = [(lane, None) for lane in sorted(alone)]
+        if batched:
+            evicted += self._run_lockstep(code, [list(input_streams[lane]) for lane in batched],
+                                          batched, results)
+
+        for lane, state in sorted(evicted, key=lambda item: item[0]):
+            results[lane] = self._run_scalar(code, list(input_streams[lane]), lane, state)
+        return results
+
+    def _run_scalar(self, code: str, input_stream: List[int], lane: int,
+                    state: Optional[Tuple]) -> List[int]:
+        """
+        Run a lane in the scalar interpreter, from the start or from the
+        state it left the batch in
+        """
+        if state is None:
+            context = self.scalar.run(code, input_stream)
+        else:
+            context = RunContext(0, input_stream)
+            (context.pc, context.pointer, context.steps, context.peak_pointer, context.output,
+             context.input_pointer, context.memory) = state
+            self.scalar._advanced_interpret(code, context)
+        self.scalar_lanes.append(lane)
+        self.steps[lane] = context.steps
+        self.peak_memory[lane] = context.peak_memory
+        self.memories[lane] = context.memory
+        return context.result
+
+    def _lane_memory(self, tape: Any, row: int, peak_pointer: int) -> List[int]:
+        """
+        The tape of a lane as a scalar run would have it: the initial size,
+        doubled until it holds the peak cell
+        """
+        size = self.memory_size
+        while peak_pointer >= size:
+            size *= 2
+        width = min(size, tape.shape[1])
+        return tape[row, :width].tolist() + [0] * (size - width)
+
+    def _run_lockstep(self, code: str, input_streams: List[List[int]], lanes: List[int],
+                      results: List[Optional[List[int]]]) -> List[Tuple[int, Tuple]]:
+        """
+        Run lanes in lockstep, storing the results of the lanes that
+        finish in the batch
+
+        Args:
+            code (str): Brainfuck source code
+            input_streams (List[List[int]]): Input values of every row
+            lanes (List[int]): Lane of every row
+            results (List[Optional[List[int]]]): Results by lane
+
+        Returns:
+            List[Tuple[int, Tuple]]: Lanes that left the batch, with the
+            state to resume them from: (pc, pointer, steps, peak_pointer,
+            output, input_pointer, memory)
+        """
+        scalar = self.scalar
+        scalar._preprocess_brackets(code)
+        nodes = scalar._preprocess_ir(code)
+        max_steps = self.max_steps
+        rows = len(lanes)
+
+        tape = np.zeros((rows, max(1, min(self.memory_size, INITIAL_WIDTH))), dtype=np.int64)
+        pointer = np.zeros(rows, dtype=np.int64)
+        steps = np.zeros(rows, dtype=np.int64)
+        peak_pointer = np.zeros(rows, dtype=np.int64)
+        outputs: List[List[int]] = [[] for _ in range(rows)]
+        input_width = max(1, max(len(values) for values in input_streams))
+        inputs = np.zeros((rows, input_width), dtype=np.int64)
+        for row, values in enumerate(input_streams):
+            inputs[row, :len(values)] = values
+        input_length = np.array([len(values) for values in input_streams], dtype=np.int64)
+        input_pointer = np.zeros(rows, dtype=np.int64)
+
+        # Rows still in the batch, rows executing the current node, and the
+        # OPEN node and active rows of every enclosing loop
+        running = np.ones(rows, dtype=bool)
+        active = running.copy()
+        loops: List[Tuple[int, Any]] = []
+        evicted: List[Tuple[int, Tuple]] = []
+
+        def evict(mask: Any, pc: int) -> None:
+            """
+            Move rows out of the batch, to resume at node pc
+            """
+            nonlocal tape
+            for row in np.flatnonzero(mask).tolist():
+                state = (pc, int(pointer[row]), int(steps[row]), int(peak_pointer[row]),
+                         outputs[row], int(input_pointer[row]),
+                         self._lane_memory(tape, row, int(peak_pointer[row])))
+                evicted.append((lanes[row], state))
+            running[mask] = False
+            active[mask] = False
+
+        def grow(required: int) -> None:
+            """
+            Widen the batch tape to hold cell required
+            """
+            nonlocal tape
+            width = tape.shape[1]
+            if required >= width:
+                while required >= width:
+                    width *= 2
+                wider = np.zeros((rows, width), dtype=np.int64)
+                wider[:, :tape.shape[1]] = tape
+                tape = wider
+
+        pc = 0
+        while pc < len(nodes):
+            if not active.any():
+                # Every row left the loop, or the batch: resume after the
+                # innermost loop with the rows that waited for it
+                if not loops:
+                    break
+                start, waiting = loops.pop()
+                active[:] = waiting & running
+                pc = nodes[start][1] + 1
+                continue
+
+            node = nodes[pc]
+            kind = node[0]
+            if kind == BLOCK:
+                _, ops, shift, low, high, cost, bound, *_ = node
+                evict(active & ((steps + bound > max_steps) | (pointer + low < 0)), pc)
+                rows_active = np.flatnonzero(active)
+                if not len(rows_active):
+                    continue
+                cells = pointer[rows_active]
+                peak_pointer[rows_active] = np.maximum(peak_pointer[rows_active], cells + high)
+                grow(int(cells.max()) + high)
+                steps[rows_active] += cost
+                for op, offset, value, sign in ops:
+                    columns = cells + offset
+                    if op == ADD:
+                        tape[rows_active, columns] = (tape[rows_active, columns] + value) % 256
+                    elif op == SET:
+                        current = tape[rows_active, columns]
+                        # Iterations of the clear loop, two steps each
+                        steps[rows_active] += 2 * ((-sign * current - 1) % 256 + 1) * (current != 0)
+                        tape[rows_active, columns] = value
+                    elif op == OUT:
+                        for row, cell in zip(rows_active.tolist(),
+                                             tape[rows_active, columns].tolist()):
+                            outputs[row] = scalar._record_output(outputs[row], cell)
+                    elif op == IN:
+                        position = input_pointer[rows_active]
+                        available = position < input_length[rows_active]
+                        values = inputs[rows_active, np.minimum(position, input_width - 1)]
+                        tape[rows_active, columns] = np.where(available, values, 0)
+                        input_pointer[rows_active] += 1
+                pointer[rows_active] += shift
+                pc += 1
+                continue
+
+            # Brackets take a step, which the step limit may not allow
+            evict(active & (steps >= max_steps), pc)
+            if not active.any():
+                continue
+            steps[active] += 1
+            rows_active = np.flatnonzero(active)
+            counter = tape[rows_active, pointer[rows_active]]
+
+            if kind == AFFINE:
+                _, close, _, updates, sign, cost, low, high = node
+                iterations = ((-sign * counter - 1) % 256 + 1) * (counter != 0)
+                loop_cost = iterations * (cost + 1)
+                cells = pointer[rows_active]
+                fallback = (counter != 0) & ((steps[rows_active] + loop_cost > max_steps) |
+                                             (cells + low < 0))
+                if fallback.any():
+                    # The scalar interpreter runs the loop's original nodes
+                    mask = np.zeros(rows, dtype=bool)
+                    mask[rows_active[fallback]] = True
+                    evict(mask, pc + 1)
+                    keep = ~fallback
+                    rows_active, iterations, loop_cost, cells = (
+                        rows_active[keep], iterations[keep], loop_cost[keep], cells[keep])
+                if len(rows_active):
+                    looping = iterations != 0
+                    peak_pointer[rows_active] = np.where(
+                        looping, np.maximum(peak_pointer[rows_active], cells + high),
+                        peak_pointer[rows_active])
+                    grow(int(cells.max()) + high)
+                    for offset, amount in updates:
+                        columns = cells + offset
+                        tape[rows_active, columns] = (
+                            tape[rows_active, columns] + iterations * amount) % 256
+                    tape[rows_active, cells] = 0
+                    steps[rows_active] += loop_cost
+                pc = close + 1
+            elif kind == OPEN:
+                entering = np.zeros(rows, dtype=bool)
+                entering[rows_active[counter != 0]] = True
+                if entering.any():
+                    loops.append((pc, active.copy()))
+                    active[:] = entering
+                    pc += 1
+                else:
+                    pc = node[1] + 1
+            else:
+                start = node[1]
+                repeating = np.zeros(rows, dtype=bool)
+                repeating[rows_active[counter != 0]] = True
+                # Rows that were running when the loop was entered
+                waiting = loops[-1][1] & running
+                if (repeating.any() and
+                        repeating.sum() < self.divergence_limit * waiting.sum()):
+                    # Too few rows keep iterating: they continue alone
+                    evict(repeating, start + 1)
+                    repeating[:] = False
+                if repeating.any():
+                    active[:] = repeating
+                    pc = start + 1
+                else:
+                    active[:] = loops.pop()[1] & running
+                    pc += 1
+
+        for row in np.flatnonzero(running).tolist():
+            lane = lanes[row]
+            self.steps[lane] = int(steps[row])
+            self.peak_memory[lane] = int(peak_pointer[row]) + 1
+            self.memories[lane] = self._lane_memory(tape, row, int(peak_pointer[row]))
+            results[lane] = outputs[row] or self.memories[lane]
+        return evicted
+
+def interpret_brainfuck_batch(brainfuck_code: str,
+                              input_streams: Sequence[List[int]]) -> List[List[int]]:
+    """
+    Convenience function for batched Brainfuck interpretation.
+
+    Args:
+        brainfuck_code (str): Brainfuck source code
+        input_streams (Sequence[List[int]]): Input values of every run
+
+    Returns:
+        List[List[int]]: Results of every run
+    """
+    return BatchInterpreter().interpret(brainfuck_code, input_streams)
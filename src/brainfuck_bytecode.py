@@ -0,0 +1,276 @@
+"""
+Brainfuck Bytecode
+
+A compiled program ships as one binary file holding everything the
+interpreter would otherwise derive from the source on first run: the
+fused IR, the bracket jump table and the source itself, plus an optional
+source map and metadata. Loading decodes fixed-size records straight
+from the buffer, so a program mapped from disk runs without being
+lowered, fused or bracket-matched again.
+
+Format (little-endian):
+
+- header: the magic bytes `BFBC`, a version byte, the SHA-256 of the
+  program and the sizes of the sections below
+- superinstructions: the patterns the IR was fused with, one per line
+- nodes: one `NODE` record per IR node, its kind followed by its integer
+  fields (see `_node_fields`)
+- ops: one `OP` record per block op and affine update, referred to by
+  the nodes as a (first, count) range
+- jumps: one `JUMP` record per bracket pair
+- source: the program as Latin-1 bytes
+- source map and metadata: JSON, empty if absent
+
+The IR of a program depends on the superinstructions it was fused with,
+so a loaded program runs with those whatever the interpreter's settings;
+node indices, and so checkpoints, are the same for all of them.
+"""
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from src.brainfuck_checkpoint import program_hash
+from src.brainfuck_ir import AFFINE, BLOCK, CLOSE, OPEN, Node, fuse, load_superinstructions, lower
+from src.brainfuck_mmap import SourceView
+
+BYTECODE_MAGIC = b'BFBC'
+BYTECODE_VERSION = 1
+
+# Magic, version, program hash, then the number of nodes, ops and jumps
+# and the byte lengths of the source, superinstructions, source map and
+# metadata
+HEADER = struct.Struct('<4sB32s7I')
+# Node kind and up to ten fields; unused fields are zero
+NODE = struct.Struct('<B10i')
+# Op, offset, value, sign; affine updates are ops with the amount as value
+OP = struct.Struct('<BiBb')
+# Open and close bracket positions
+JUMP = struct.Struct('<II')
+
+class BytecodeError(Exception):
+    """Raised for programs that cannot be encoded or loaded."""
+    pass
+
+class CompiledProgram(SourceView):
+    """
+    A program loaded from bytecode, read like its source string. The
+    interpreter takes its IR and bracket map from it instead of
+    preprocessing the source, and its source map when given none.
+    """
+    def __init__(self, data: Any, digest: bytes, nodes: List[Node],
+                 bracket_map: Dict[int, int], superinstructions: Tuple[str, ...],
+                 source_map: Optional[Any] = None, metadata: Optional[Dict] = None):
+        """
+        Args:
+            data (Any): Source bytes, usually a view into the bytecode
+            digest (bytes): Hash of the program (see program_hash)
+            nodes (List[Node]): Fused IR nodes
+            bracket_map (Dict[int, int]): Bracket positions to their partners
+            superinstructions (Tuple[str, ...]): Patterns the IR was fused with
+            source_map (Optional[SourceMap]): Source map of the program
+            metadata (Optional[Dict]): Caller data stored with the program
+        """
+        super().__init__(data, digest)
+        self.nodes = nodes
+        self.bracket_map = bracket_map
+        self.superinstructions = superinstructions
+        self.source_map = source_map
+        self.metadata = metadata or {}
+        # Cached artifacts, such as compiled loops, depend on the IR
+        self._hash = hash((digest, superinstructions))
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, CompiledProgram) and other.digest == self.digest
+                and other.superinstructions == self.superinstructions)
+
+    __hash__ = SourceView.__hash__
+
+    def __repr__(self) -> str:
+        return f'CompiledProgram({len(self)} characters, {len(self.nodes)} nodes)'
+
+def _node_fields(node: Node, ops: List[Tuple[int, int, int, int]]) -> Tuple[int, ...]:
+    """
+    Integer fields of a node's record, appending its ops to the op table
+    """
+    kind = node[0]
+    if kind == BLOCK:
+        _, block_ops, shift, low, high, cost, bound, start, end, loop = node
+        first = len(ops)
+        ops.extend(block_ops)
+        return (kind, first, len(block_ops), shift, low, high, cost, bound, start, end,
+                -1 if loop is None else loop)
+    if kind == OPEN:
+        _, close, position, stride = node
+        # Scan loops never have a stride of 0
+        return (kind, close, position, stride or 0)
+    if kind == CLOSE:
+        return node[:3]
+    _, close, position, updates, sign, cost, low, high = node
+    first = len(ops)
+    ops.extend((0, offset, amount, 0) for offset, amount in updates)
+    return (kind, close, position, first, len(updates), sign, cost, low, high)
+
+def _decode_node(fields: Tuple[int, ...], ops: List[Tuple[int, int, int, int]]) -> Node:
+    """
+    Rebuild a node from its record, the inverse of `_node_fields`
+    """
+    kind = fields[0]
+    if kind == BLOCK:
+        _, first, count, shift, low, high, cost, bound, start, end, loop = fields
+        return (BLOCK, tuple(ops[first:first + count]), shift, low, high, cost, bound,
+                start, end, None if loop < 0 else loop)
+    if kind == OPEN:
+        return (OPEN, fields[1], fields[2], fields[3] or None)
+    if kind == CLOSE:
+        return fields[:3]
+    if kind == AFFINE:
+        _, close, position, first, count, sign, cost, low, high = fields[:9]
+        updates = tuple((offset, amount) for _, offset, amount, _ in ops[first:first + count])
+        return (AFFINE, close, position, updates, sign, cost, low, high)
+    raise BytecodeError(f"Unknown node kind {kind}")
+
+def _jumps(source: bytes) -> List[Tuple[int, int]]:
+    """
+    Bracket pairs of a program, ordered by closing bracket
+    """
+    jumps, stack = [], []
+    for ip, byte in enumerate(source):
+        if byte == 0x5b:
+            stack.append(ip)
+        elif byte == 0x5d:
+            if not stack:
+                raise BytecodeError("Unbalanced brackets")
+            jumps.append((stack.pop(), ip))
+    if stack:
+        raise BytecodeError("Unbalanced brackets")
+    return jumps
+
+def encode_program(code: str, superinstructions: Optional[Iterable[str]] = None,
+                   source_map: Optional[Any] = None,
+                   metadata: Optional[Dict] = None) -> bytes:
+    """
+    Compile a program to bytecode
+
+    Args:
+        code (str): Brainfuck source code, or a source read like a string
+            such as a MappedSource
+        superinstructions (Optional[Iterable[str]]): Patterns to fuse, the
+            mined table by default
+        source_map (Optional[SourceMap]): Source map of the code
+        metadata (Optional[Dict]): JSON-serialisable data to store with
+            the program
+
+    Returns:
+        bytes: Bytecode
+
+    Raises:
+        BytecodeError: If the brackets of the code are unbalanced, or the
+            program is too large for the format
+    """
+    text = getattr(code, 'data', code)
+    if isinstance(text, str):
+        # Characters outside Latin-1 can only be comments; '?' keeps the
+        # positions of the rest
+        source = text.encode('latin-1', errors='replace')
+    else:
+        source = bytes(text)
+    jumps = _jumps(source)
+    patterns = tuple(load_superinstructions() if superinstructions is None
+                     else superinstructions)
+    ops: List[Tuple[int, int, int, int]] = []
+    try:
+        records = [_node_fields(node, ops) for node in fuse(lower(code), patterns)]
+        nodes = b''.join(NODE.pack(*fields, *[0] * (11 - len(fields))) for fields in records)
+        op_table = b''.join(OP.pack(*op) for op in ops)
+    except struct.error as e:
+        raise BytecodeError(f"Program too large for bytecode: {e}")
+    sections = ['\n'.join(patterns).encode('ascii'),
+                source_map.to_json().encode() if source_map is not None else b'',
+                json.dumps(metadata).encode() if metadata else b'']
+    header = HEADER.pack(BYTECODE_MAGIC, BYTECODE_VERSION, program_hash(code),
+                         len(nodes) // NODE.size, len(ops), len(jumps), len(source),
+                         *map(len, sections))
+    return b''.join([header, sections[0], nodes, op_table,
+                     b''.join(JUMP.pack(*jump) for jump in jumps), source, *sections[1:]])
+
+def load_bytecode(data: Any) -> CompiledProgram:
+    """
+    Load a program from bytecode without copying its buffer
+
+    Args:
+        data (Any): Bytecode from `encode_program`, as bytes, an mmap or
+            any other buffer; it must not change while the program is used
+
+    Returns:
+        CompiledProgram: Program to pass to the interpreter in place of a
+        string
+
+    Raises:
+        BytecodeError: If the data is not bytecode of this version
+    """
+    view = memoryview(data).cast('B')
+    if len(view) < HEADER.size or view[:len(BYTECODE_MAGIC)] != BYTECODE_MAGIC:
+        raise BytecodeError("Not bytecode")
+    (_, version, digest, node_count, op_count, jump_count, source_length,
+     patterns_length, source_map_length, metadata_length) = HEADER.unpack_from(view)
+    if version != BYTECODE_VERSION:
+        raise BytecodeError(f"Unsupported bytecode version {version}")
+
+    offset = HEADER.size
+    sections = []
+    for length in (patterns_length, node_count * NODE.size, op_count * OP.size,
+                   jump_count * JUMP.size, source_length, source_map_length,
+                   metadata_length):
+        sections.append(view[offset:offset + length])
+        offset += length
+    if offset > len(view):
+        raise BytecodeError("Truncated bytecode")
+    patterns, nodes, ops, jumps, source, source_map, metadata = sections
+
+    ops = list(OP.iter_unpack(ops))
+    nodes = [_decode_node(fields, ops) for fields in NODE.iter_unpack(nodes)]
+    bracket_map = {}
+    for start, end in JUMP.iter_unpack(jumps):
+        bracket_map[start] = end
+        bracket_map[end] = start
+    if source_map:
+        # Only programs with a source map need the translator package
+        from src.ast2brainfuck.source_map import SourceMap
+        source_map = SourceMap.from_json(str(source_map, 'utf-8'))
+    else:
+        source_map = None
+    return CompiledProgram(
+        source, bytes(digest), nodes, bracket_map,
+        tuple(str(patterns, 'ascii').split('\n')) if patterns else (),
+        source_map, json.loads(str(metadata, 'utf-8')) if metadata else None)
+
+def read_bytecode(path: Union[str, Path]) -> CompiledProgram:
+    """
+    Map a bytecode file and load the program in it; the source is read
+    from the map
+
+    Args:
+        path (Union[str, Path]): Bytecode file, which must not change
+            while mapped
+
+    Returns:
+        CompiledProgram: Program to pass to the interpreter in place of a
+        string
+    """
+    with open(path, 'rb') as bytecode_file:
+        if Path(path).stat().st_size == 0:
+            raise BytecodeError("Not bytecode")
+        return load_bytecode(mmap.mmap(bytecode_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+def write_bytecode(path: Union[str, Path], code: str, **options: Any) -> None:
+    """
+    Compile a program and write its bytecode to a file
+
+    Args:
+        path (Union[str, Path]): Bytecode file
+        code (str): Brainfuck source code
+        **options: Options of `encode_program`
+    """
+    Path(path).write_bytes(encode_program(code, **options))
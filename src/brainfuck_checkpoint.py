@@ -0,0 +1,132 @@
+"""
+Brainfuck Run Checkpoints
+
+A checkpoint holds the state of a run that stopped, at the step limit,
+at a deadline or between slices, so that it can continue later, in this
+process or another one. It records:
+
+- the pointer, the IR node the run continues at and, when the step limit
+  stopped the run inside a block, the character it continues at,
+- the step count, the peak pointer and the input position,
+- the output so far,
+- the touched region of the tape (cells up to the peak pointer; the rest
+  of the tape is zero) and the size of the tape.
+
+IR node indices do not depend on the superinstructions fused, so runs can
+resume on interpreters with any settings. The program and the input are
+not stored: the run resumes with the caller's copies, and a hash of the
+program guards against resuming a run of another program.
+
+Format: the magic bytes `BFCP`, a version byte and the SHA-256 of the
+program, followed by the zlib-compressed fields as zigzag varints.
+"""
+
+import hashlib
+import zlib
+from typing import Any, Iterator, List, Optional
+
+CHECKPOINT_MAGIC = b'BFCP'
+CHECKPOINT_VERSION = 1
+
+class CheckpointError(Exception):
+    """Raised for checkpoints that cannot be resumed."""
+    pass
+
+class Checkpoint:
+    """
+    The state of a run, as decoded from a checkpoint.
+    """
+    def __init__(self, pc: int, ip: Optional[int], pointer: int, steps: int,
+                 peak_pointer: int, input_pointer: int, memory: List[int],
+                 output: List[int]):
+        self.pc = pc
+        self.ip = ip
+        self.pointer = pointer
+        self.steps = steps
+        self.peak_pointer = peak_pointer
+        self.input_pointer = input_pointer
+        self.memory = memory
+        self.output = output
+
+def program_hash(code: str) -> bytes:
+    """
+    SHA-256 of a program, identifying the runs it can resume
+    """
+    # Mapped sources hash their file once
+    digest = getattr(code, 'digest', None)
+    return digest if digest is not None else hashlib.sha256(code.encode()).digest()
+
+def encode_checkpoint(code: str, context: Any) -> bytes:
+    """
+    Encode the state of a run
+
+    Args:
+        code (str): Brainfuck source code of the run
+        context (RunContext): Run to encode
+
+    Returns:
+        bytes: Checkpoint
+    """
+    touched = context.memory[:context.peak_pointer + 1]
+    fields = [context.pc, 0 if context.ip is None else context.ip + 1, context.pointer,
+              context.steps, context.peak_pointer, context.input_pointer,
+              len(context.memory), len(touched), *touched, len(context.output),
+              *context.output]
+    payload = bytearray()
+    for value in fields:
+        # Zigzag: small magnitudes of either sign take few bytes
+        value = value * 2 if value >= 0 else -value * 2 - 1
+        while value >= 0x80:
+            payload.append(value & 0x7f | 0x80)
+            value >>= 7
+        payload.append(value)
+    return (CHECKPOINT_MAGIC + bytes([CHECKPOINT_VERSION]) + program_hash(code)
+            + zlib.compress(bytes(payload)))
+
+def read_varints(payload: bytes) -> Iterator[int]:
+    """
+    Decode a sequence of zigzag varints
+    """
+    value = shift = 0
+    for byte in payload:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            yield value // 2 if value % 2 == 0 else -(value + 1) // 2
+            value = shift = 0
+    if shift:
+        raise CheckpointError("Truncated checkpoint")
+
+def decode_checkpoint(code: str, data: bytes) -> Checkpoint:
+    """
+    Decode a checkpoint of a run of a program
+
+    Args:
+        code (str): Brainfuck source code of the run
+        data (bytes): Checkpoint from `encode_checkpoint`
+
+    Returns:
+        Checkpoint: State of the run
+
+    Raises:
+        CheckpointError: If the data is not a checkpoint of this version,
+            or not one of a run of this program
+    """
+    header = len(CHECKPOINT_MAGIC) + 1
+    if len(data) < header + 32 or data[:len(CHECKPOINT_MAGIC)] != CHECKPOINT_MAGIC:
+        raise CheckpointError("Not a checkpoint")
+    if data[header - 1] != CHECKPOINT_VERSION:
+        raise CheckpointError(f"Unsupported checkpoint version {data[header - 1]}")
+    if data[header:header + 32] != program_hash(code):
+        raise CheckpointError("Checkpoint of a different program")
+    try:
+        fields = read_varints(zlib.decompress(data[header + 32:]))
+        pc, ip, pointer, steps, peak_pointer, input_pointer, size, touched = [
+            next(fields) for _ in range(8)]
+        memory = [next(fields) for _ in range(touched)]
+        memory += [0] * (size - touched)
+        output = [next(fields) for _ in range(next(fields))]
+    except (zlib.error, StopIteration):
+        raise CheckpointError("Truncated checkpoint")
+    return Checkpoint(pc, ip - 1 if ip else None, pointer, steps, peak_pointer,
+                      input_pointer, memory, output)
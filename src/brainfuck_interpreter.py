@@ -5,19 +5,139 @@ Provides a comprehensive interpreter for Brainfuck code with
 enhanced computational capabilities.
 """
 
+import asyncio
 import logging
+import mmap
+import subprocess
 import sys
-from typing import List, Optional
+import threading
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Tuple
+from src.artifact_cache import get_artifact_cache
+from src.brainfuck_checkpoint import decode_checkpoint, encode_checkpoint
+from src.brainfuck_ir import (
+    ADD, AFFINE, BLOCK, OPEN, OUT, SET, fuse, load_superinstructions, lower)
+from src.brainfuck_jit import compile_loop
+from src.brainfuck_mmap import map_tape
+from src.brainfuck_native import load_program
+from src.brainfuck_profiler import ExecutionProfile
+from src.brainfuck_tape import PagedTape
+
+# Cells examined per slice when searching other than rightwards cell by cell
+SCAN_WINDOW = 4096
+
+# Steps async runs execute between yields to the event loop
+SLICE_STEPS = 100_000
+
+# Tape kinds (see src.brainfuck_tape)
+TAPES = ('dense', 'paged', 'mmap')
 
 class BrainfuckInterpreterError(Exception):
     """Custom exception for Brainfuck interpreter errors."""
     pass
 
+class RunContext:
+    """
+    Execution state of one run: the tape, the pointer, the input and
+    output cursors and the statistics of the run. Every run has its own,
+    so an interpreter can run any number of programs at once.
+    """
+    def __init__(self, memory_size: int, input_stream: Optional[List[int]] = None,
+                 source_map: Optional[Any] = None):
+        """
+        Args:
+            memory_size (int): Initial memory tape size
+            input_stream (Optional[List[int]]): Input values
+            source_map (Optional[SourceMap]): Source map of the code
+        """
+        self.memory = [0] * memory_size
+        self.pointer = 0
+        # IR node the run continues at, and the character of it to
+        # continue at if the step limit stopped the run inside a block
+        self.pc = 0
+        self.ip: Optional[int] = None
+        self.steps = 0
+        self.peak_pointer = 0
+        self.output: List[int] = []
+        self.input_stream = input_stream or []
+        self.input_pointer = 0
+        self.source_map = source_map
+        # Receives every value written by '.', when streaming output
+        self.emitted: Optional[List[int]] = None
+        # Tiered execution: entries of every loop, and the compiled
+        # functions of hot loops by node index (False if uncompilable)
+        self.loop_entries: Optional[List[int]] = None
+        self.compiled: dict = {}
+        
+        # Results
+        # Whether the run has ended, rather than paused between slices
+        self.finished = False
+        self.result: List[int] = []
+        # TinySol location where the run hit the step limit, if known
+        self.halt_location: Optional[str] = None
+        # Execution profile, when profiling
+        self.profile: Optional[ExecutionProfile] = None
+        # Loops the run switched to compiled code for
+        self.compiled_loops = 0
+        # Whether the run executed native code
+        self.ran_native = False
+        # Whether an async run ended at its deadline
+        self.timed_out = False
+
+    @property
+    def peak_memory(self) -> int:
+        """
+        Cells of the tape the run used
+        """
+        return self.peak_pointer + 1
+
+class OutputStream:
+    """
+    Async iterator over the values a run writes with '.', available as
+    soon as the slice that wrote them ends. The run advances as the
+    stream is read; `context` holds its state and statistics.
+    """
+    def __init__(self, context: RunContext, slices: AsyncIterator[None]):
+        """
+        Args:
+            context (RunContext): Run whose output to stream
+            slices (AsyncIterator[None]): Runs a slice per item
+        """
+        self.context = context
+        self._slices = slices
+        self._sent = 0
+
+    def __aiter__(self) -> 'OutputStream':
+        return self
+
+    async def __anext__(self) -> int:
+        emitted = self.context.emitted
+        while self._sent == len(emitted):
+            emitted.clear()
+            self._sent = 0
+            await self._slices.__anext__()
+        self._sent += 1
+        return emitted[self._sent - 1]
+
 class BrainfuckInterpreter:
+    """
+    Runs Brainfuck programs.
+    
+    The interpreter holds only its settings and compiled programs, shared
+    through the artifact cache; the state of every run lives in its own
+    RunContext. One interpreter can therefore serve many threads at once.
+    The statistics attributes (steps, memory, ...) describe the last run
+    of the calling thread.
+    """
     def __init__(self, 
                  memory_size: int = 30000, 
                  max_steps: int = 1_000_000, 
-                 log_file: Optional[str] = 'brainfuck_interpreter.log'):
+                 log_file: Optional[str] = 'brainfuck_interpreter.log',
+                 profile: bool = False,
+                 superinstructions: Optional[Iterable[str]] = None,
+                 jit_threshold: Optional[int] = None,
+                 native: bool = False,
+                 tape: str = 'dense',
+                 tape_path: Optional[str] = None):
         """
         Initialize advanced Brainfuck interpreter.
         
@@ -25,12 +145,42 @@ class BrainfuckInterpreter:
             memory_size (int): Initial memory tape size
             max_steps (int): Maximum computational steps
             log_file (Optional[str]): Path for logging interpreter actions
+            profile (bool): Collect an execution profile of every run. Runs
+                without profiling use a separate loop and pay nothing for it.
+            superinstructions (Optional[Iterable[str]]): Superinstruction
+                patterns to fuse, most important first; None for the mined
+                default table, empty to run unfused IR
+            jit_threshold (Optional[int]): Tiered execution: compile a loop
+                to Python once it has been entered this many times in a
+                run; None only interprets
+            native (bool): Run programs as C compiled with the system C
+                compiler, falling back to the Python backends without one
+            tape (str): 'dense' for a list of cells from cell 0 on, which
+                grows to the right; 'paged' for byte pages allocated as
+                cells are written, in both directions; 'mmap' for dense
+                memory-mapped bytes outside the Python heap
+            tape_path (Optional[str]): File backing 'mmap' tapes, which
+                every run replaces; None for anonymous maps
         """
+        if tape not in TAPES:
+            raise ValueError(f"Unknown tape {tape!r}")
+        if tape != 'dense' and (profile or native):
+            raise ValueError("Profiled and native runs need a dense tape")
         # Dynamic memory management
-        self.memory = [0] * memory_size
+        self.memory_size = memory_size
         self.max_memory_size = sys.maxsize
         self.max_steps = max_steps
         
+        self.profiling = profile
+        self.superinstructions = tuple(
+            load_superinstructions() if superinstructions is None else superinstructions)
+        self.jit_threshold = jit_threshold
+        self.native = native
+        self.tape = tape
+        self.tape_path = tape_path
+        # Context of the last run of each thread
+        self._last_runs = threading.local()
+        
         # Logging configuration
         logging.basicConfig(
             level=logging.INFO,
@@ -42,86 +192,572 @@ class BrainfuckInterpreter:
         )
         self.logger = logging.getLogger(__name__)
 
-    def _expand_memory(self, required_index: int) -> None:
+    @property
+    def last_run(self) -> RunContext:
+        """
+        Context of the calling thread's last run, or of an empty run
+        """
+        context = getattr(self._last_runs, 'context', None)
+        return context if context is not None else RunContext(self.memory_size)
+
+    @property
+    def memory(self) -> List[int]:
+        return self.last_run.memory
+
+    @property
+    def steps(self) -> int:
+        return self.last_run.steps
+
+    @property
+    def peak_memory(self) -> int:
+        context = getattr(self._last_runs, 'context', None)
+        return context.peak_memory if context is not None else 0
+
+    @property
+    def halt_location(self) -> Optional[str]:
+        return self.last_run.halt_location
+
+    @property
+    def profile(self) -> Optional[ExecutionProfile]:
+        return self.last_run.profile
+
+    @property
+    def compiled_loops(self) -> int:
+        return self.last_run.compiled_loops
+
+    @property
+    def ran_native(self) -> bool:
+        return self.last_run.ran_native
+
+    def _expand_memory(self, memory: List[int], required_index: int) -> None:
         """
         Dynamically expand memory to support complex computations.
         
         Args:
+            memory (List[int]): Tape of the run, extended in place
             required_index (int): Index requiring memory expansion
         """
-        if required_index >= len(self.memory):
-            if len(self.memory) * 2 > self.max_memory_size:
+        if isinstance(memory, PagedTape):
+            # Paged tapes allocate as cells are written
+            return
+        if required_index >= len(memory):
+            if len(memory) * 2 > self.max_memory_size:
                 raise BrainfuckInterpreterError("Memory limit exceeded")
             
-            self.memory.extend([0] * len(self.memory))
-            self.logger.info(f"Memory expanded to {len(self.memory)} cells")
+            if isinstance(memory, mmap.mmap):
+                memory.resize(len(memory) * 2)
+            else:
+                memory.extend([0] * len(memory))
+            self.logger.info(f"Memory expanded to {len(memory)} cells")
+            # A scan may land more than one doubling away
+            self._expand_memory(memory, required_index)
 
-    def interpret(self, code: str, input_stream: Optional[List[int]] = None) -> List[int]:
+    def _scan(self, memory: List[int], pointer: int, stride: int) -> Optional[int]:
+        """
+        Find the cell a scan loop stops at: the first zero cell reached
+        from a non-zero cell in steps of `stride` cells.
+        
+        Args:
+            memory (List[int]): Tape of the run
+            pointer (int): Cell the loop starts from, non-zero
+            stride (int): Cells moved per iteration, negative for left
+        
+        Returns:
+            Optional[int]: Cell reached, or None if the scan would run into
+            the left end of the tape, where the pointer stops moving
+        """
+        if isinstance(memory, PagedTape):
+            return memory.scan(pointer, stride)
+        if stride == 1 and isinstance(memory, mmap.mmap):
+            target = memory.find(b'\0', pointer)
+            return target if target >= 0 else len(memory)
+        if stride == 1:
+            try:
+                return memory.index(0, pointer)
+            except ValueError:
+                # Cells past the end of the tape are zero once it expands
+                return len(memory)
+        
+        # Other scans search slices of every stride-th cell in C, a window
+        # at a time so that a short scan does not copy the whole tape
+        while True:
+            end = pointer + stride * SCAN_WINDOW
+            window = memory[pointer:end if end >= 0 else None:stride]
+            try:
+                return pointer + window.index(0) * stride
+            except ValueError:
+                pointer += stride * len(window)
+            if pointer >= len(memory):
+                return pointer
+            if pointer < 0:
+                return None
+
+    def interpret(self, code: str, input_stream: Optional[List[int]] = None,
+                  source_map: Optional[Any] = None) -> List[int]:
         """
         Advanced Brainfuck code interpretation.
         
         Args:
             code (str): Brainfuck source code
             input_stream (Optional[List[int]]): Optional input values
+            source_map (Optional[SourceMap]): Source map of the code, used to
+                report step-limit and memory errors at TinySol level
         
         Returns:
             List[int]: Computational output or final memory state
         """
+        return self.run(code, input_stream, source_map).result
+
+    def run(self, code: str, input_stream: Optional[List[int]] = None,
+            source_map: Optional[Any] = None) -> RunContext:
+        """
+        Run a program on a fresh tape.
+        
+        Args:
+            code (str): Brainfuck source code
+            input_stream (Optional[List[int]]): Optional input values
+            source_map (Optional[SourceMap]): Source map of the code
+        
+        Returns:
+            RunContext: State and statistics of the finished run; its
+            result is what `interpret` returns
+        """
+        context = self._new_context(code, input_stream, source_map)
+        self._last_runs.context = context
+        try:
+            if self.profiling:
+                self._profiled_interpret(code, context)
+            else:
+                if self.native:
+                    self._native_interpret(code, context)
+                self._advanced_interpret(code, context)
+        except Exception as e:
+            self.logger.error(f"Interpretation failed: {e}")
+            raise BrainfuckInterpreterError(f"Computation error: {e}")
+        return context
+
+    def _new_context(self, code: str, input_stream: Optional[List[int]],
+                     source_map: Optional[Any]) -> RunContext:
+        """
+        Context of a new run, on a fresh tape of the interpreter's kind
+        """
+        if source_map is None:
+            # Compiled programs carry their source map
+            source_map = getattr(code, 'source_map', None)
+        if self.tape == 'dense':
+            return RunContext(self.memory_size, input_stream, source_map)
+        context = RunContext(0, input_stream, source_map)
+        if self.tape == 'paged':
+            context.memory = PagedTape()
+        else:
+            context.memory = map_tape(self.memory_size, self.tape_path)
+            # Cells are bytes
+            context.input_stream = [value % 256 for value in context.input_stream]
+        return context
+
+    def checkpoint(self, code: str, context: RunContext) -> bytes:
+        """
+        Snapshot a run that stopped, to resume it later (see
+        src.brainfuck_checkpoint).
+        
+        Args:
+            code (str): Brainfuck source code of the run
+            context (RunContext): Run stopped at the step limit, at a
+                deadline or between slices
+        
+        Returns:
+            bytes: Checkpoint
+        """
+        if context.profile is not None:
+            raise BrainfuckInterpreterError("Profiled runs cannot be checkpointed")
+        if isinstance(context.memory, PagedTape):
+            raise BrainfuckInterpreterError("Runs on paged tapes cannot be checkpointed")
+        return encode_checkpoint(code, context)
+
+    def resume(self, code: str, checkpoint: bytes, input_stream: Optional[List[int]] = None,
+               source_map: Optional[Any] = None) -> RunContext:
+        """
+        Continue a run from a checkpoint until it ends or reaches the step
+        limit; steps count from the start of the run, so a run that
+        stopped at the step limit needs a higher one to get further.
+        
+        Args:
+            code (str): Brainfuck source code of the run
+            checkpoint (bytes): Checkpoint from `checkpoint`
+            input_stream (Optional[List[int]]): Input values of the run,
+                from its start
+            source_map (Optional[SourceMap]): Source map of the code
+        
+        Returns:
+            RunContext: State and statistics of the run
+        """
+        state = decode_checkpoint(code, checkpoint)
+        if source_map is None:
+            source_map = getattr(code, 'source_map', None)
+        context = RunContext(0, input_stream, source_map)
+        (context.pc, context.ip, context.pointer, context.steps, context.peak_pointer,
+         context.input_pointer, context.memory, context.output) = (
+            state.pc, state.ip, state.pointer, state.steps, state.peak_pointer,
+            state.input_pointer, state.memory, state.output)
+        self._last_runs.context = context
         try:
-            return self._advanced_interpret(code, input_stream or [])
+            if context.ip is None or self._finish_block(code, context):
+                self._advanced_interpret(code, context)
+            else:
+                self._finish_run(context, context.ip)
         except Exception as e:
             self.logger.error(f"Interpretation failed: {e}")
             raise BrainfuckInterpreterError(f"Computation error: {e}")
+        return context
+
+    def _finish_block(self, code: str, context: RunContext) -> bool:
+        """
+        Run the rest of the block a run stopped inside, from its character
+        ip on.
+        
+        Returns:
+            bool: Whether the block ran to its end; the run continues at
+            the next node
+        """
+        end = self._preprocess_ir(code)[context.pc][8]
+        (stop, context.pointer, context.steps, context.peak_pointer, context.output,
+         context.input_pointer) = self._step_range(
+            code, self._preprocess_brackets(code), context.memory, context.ip, end,
+            context.pointer, context.steps, context.peak_pointer, context.output,
+            context.input_stream, context.input_pointer, context.source_map,
+            self._output_recorder(context))
+        context.ip = None
+        if stop < end:
+            context.ip = stop
+            return False
+        context.pc += 1
+        return True
+
+    async def run_async(self, code: str, input_stream: Optional[List[int]] = None,
+                        source_map: Optional[Any] = None, slice_steps: int = SLICE_STEPS,
+                        timeout: Optional[float] = None) -> RunContext:
+        """
+        Run a program on a fresh tape without blocking the event loop.
+        
+        The run executes slices of about `slice_steps` steps, yielding to
+        the event loop after each, so cancelling the awaiting task stops
+        it between slices. Async runs use the IR interpreter and, with a
+        JIT threshold, compiled loops; they neither run native code nor
+        collect profiles.
+        
+        Args:
+            code (str): Brainfuck source code
+            input_stream (Optional[List[int]]): Optional input values
+            source_map (Optional[SourceMap]): Source map of the code
+            slice_steps (int): Steps to run between yields
+            timeout (Optional[float]): Seconds of wall-clock time after
+                which to end the run at the next slice, as the step limit
+                would, with `timed_out` set
+        
+        Returns:
+            RunContext: State and statistics of the run
+        """
+        context = self._new_context(code, input_stream, source_map)
+        async for _ in self._run_slices(code, context, slice_steps, timeout):
+            pass
+        return context
+
+    def stream(self, code: str, input_stream: Optional[List[int]] = None,
+               source_map: Optional[Any] = None, slice_steps: int = SLICE_STEPS,
+               timeout: Optional[float] = None) -> OutputStream:
+        """
+        Run a program as `run_async` does, streaming its output.
+        
+        Returns:
+            OutputStream: Async iterator over the values written by '.'
+        """
+        context = self._new_context(code, input_stream, source_map)
+        context.emitted = []
+        return OutputStream(context, self._run_slices(code, context, slice_steps, timeout))
+
+    async def _run_slices(self, code: str, context: RunContext, slice_steps: int,
+                          timeout: Optional[float]) -> AsyncIterator[None]:
+        """
+        Run a program slice by slice, yielding after every slice.
+        """
+        if slice_steps < 1:
+            raise ValueError("Slices must run at least one step")
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        self._last_runs.context = context
+        while True:
+            try:
+                result = self._advanced_interpret(code, context, context.steps + slice_steps)
+            except Exception as e:
+                self.logger.error(f"Interpretation failed: {e}")
+                raise BrainfuckInterpreterError(f"Computation error: {e}")
+            yield
+            if result is not None:
+                return
+            if deadline is not None and loop.time() >= deadline:
+                # The run stays paused where it stopped
+                context.timed_out = True
+                context.result = context.output or context.memory
+                self.logger.warning(f"Deadline reached after {context.steps} steps")
+                return
+            await asyncio.sleep(0)
 
-    def _advanced_interpret(self, code: str, input_stream: List[int]) -> List[int]:
+    def prepare(self, code: str) -> None:
+        """
+        Do the per-program work of a run ahead of it: lower the code to IR
+        and, for native runs, build it. The results are memoized, so runs
+        of the code skip this work.
+        
+        Args:
+            code (str): Brainfuck source code
+        """
+        self._preprocess_brackets(code)
+        self._preprocess_ir(code)
+        if self.native:
+            self._native_program(code)
+
+    def _advanced_interpret(self, code: str, context: RunContext,
+                            pause: Optional[int] = None) -> Optional[List[int]]:
         """
         Core interpretation logic with enhanced computational capabilities.
         
+        Runs the program's IR: straight-line code executes as blocks of
+        offset-addressed ops with one pointer update per block. Blocks that
+        could pass the step limit or move off the left end of the tape run
+        their original characters instead, so steps, output and the halt
+        location are exactly those of a character-by-character run.
+        
         Args:
             code (str): Brainfuck source code
-            input_stream (List[int]): Input values for computation
+            context (RunContext): Run to execute, from its IR node pc on,
+                which native code, a batch or an earlier slice may have
+                started
+            pause (Optional[int]): Step count after which to pause the run
+                at the next bracket, leaving it in context to continue
         
         Returns:
-            List[int]: Computational results
+            Optional[List[int]]: Computational results, None if paused
         """
-        pointer = 0
-        ip = 0  # Instruction pointer
-        output = []
-        input_pointer = 0
-        steps = 0
+        pc, pointer, steps = context.pc, context.pointer, context.steps
+        peak_pointer = context.peak_pointer
+        output, input_pointer = context.output, context.input_pointer
+        input_stream, source_map = context.input_stream, context.source_map
+        max_steps = self.max_steps
+        # Brackets stop the run at the step limit or the pause
+        limit = max_steps if pause is None else min(pause, max_steps)
+        record_output = self._output_recorder(context)
+        # Leftmost cell of the tape; moves further left run stepwise
+        floor = getattr(context.memory, 'floor', 0)
         
         # Preprocess brackets for efficient loop handling
         bracket_map = self._preprocess_brackets(code)
+        nodes = self._preprocess_ir(code)
+        memory = context.memory
+        ip = len(code)
+        paused = False
         
-        while ip < len(code) and steps < self.max_steps:
+        threshold = self.jit_threshold
+        if threshold is not None and context.loop_entries is None:
+            context.loop_entries = [0] * len(nodes)
+        entries = context.loop_entries
+        compiled = context.compiled
+        
+        while pc < len(nodes):
+            node = nodes[pc]
+            kind = node[0]
+            
+            if kind == BLOCK:
+                _, ops, shift, low, high, cost, bound, start, end, loop = node
+                if steps + bound > max_steps or pointer + low < floor:
+                    stop, pointer, steps, peak_pointer, output, input_pointer = self._step_range(
+                        code, bracket_map, memory, start, end, pointer, steps, peak_pointer,
+                        output, input_stream, input_pointer, source_map, record_output)
+                    if stop < end:
+                        ip = context.ip = stop
+                        break
+                    pc += 1
+                    continue
+                if pointer + high > peak_pointer:
+                    peak_pointer = pointer + high
+                    self._expand_memory(memory, peak_pointer)
+                while True:
+                    steps += cost
+                    for op, offset, value, sign in ops:
+                        cell = pointer + offset
+                        if op == ADD:
+                            memory[cell] = (memory[cell] + value) % 256
+                        elif op == SET:
+                            current = memory[cell]
+                            if current:
+                                # Iterations of the clear loop, two steps each;
+                                # input may store values its first step wraps
+                                steps += 2 * ((-sign * current - 1) % 256 + 1)
+                            memory[cell] = value
+                        elif op == OUT:
+                            output = record_output(output, memory[cell])
+                        else:
+                            # Input handling with fallback
+                            memory[cell] = (
+                                input_stream[input_pointer] if input_pointer < len(input_stream)
+                                else 0
+                            )
+                            input_pointer += 1
+                    pointer += shift
+                    # A balanced loop of just this block (see loop_ranges)
+                    # runs it again on the cells checked above; only the
+                    # step limit needs checking, at the ']' and the block
+                    if (shift or loop != pc - 1 or steps >= limit or not memory[pointer]
+                            or steps + 1 + bound > max_steps):
+                        break
+                    steps += 1
+                if loop is None:
+                    pc += 1
+                    continue
+                # Fused ']' at the end of the block
+                if steps >= limit:
+                    # Stop at the ']'
+                    pc += 1
+                    paused = steps < max_steps
+                    ip = end
+                    break
+                steps += 1
+                pc = loop + 1 if memory[pointer] else pc + 2
+                continue
+            
+            if steps >= limit:
+                paused = steps < max_steps
+                ip = node[2]
+                break
+            steps += 1
+            if kind == AFFINE:
+                _, close, position, updates, sign, cost, low, high = node
+                value = memory[pointer]
+                if value:
+                    iterations = (-sign * value - 1) % 256 + 1
+                    # Each iteration runs the body and the ']'
+                    loop_cost = iterations * (cost + 1)
+                    if steps + loop_cost > max_steps or pointer + low < floor:
+                        # Run the loop's original nodes
+                        pc += 1
+                        continue
+                    if pointer + high > peak_pointer:
+                        peak_pointer = pointer + high
+                        self._expand_memory(memory, peak_pointer)
+                    for offset, amount in updates:
+                        cell = pointer + offset
+                        memory[cell] = (memory[cell] + iterations * amount) % 256
+                    memory[pointer] = 0
+                    steps += loop_cost
+                pc = close
+            elif kind == OPEN:
+                _, close, position, stride = node
+                if memory[pointer] == 0:
+                    pc = close
+                elif stride is not None:
+                    target = self._scan(memory, pointer, stride)
+                    # Each iteration runs the moves and the ']'; near the
+                    # step limit the loop runs normally instead
+                    scan_cost = (target - pointer) // stride * (abs(stride) + 1) if target is not None else None
+                    if scan_cost is not None and steps + scan_cost <= max_steps:
+                        steps += scan_cost
+                        pointer = target
+                        pc = close
+                        if pointer > peak_pointer:
+                            peak_pointer = pointer
+                            self._expand_memory(memory, pointer)
+                elif entries is not None:
+                    function = compiled.get(pc)
+                    if function is None:
+                        entries[pc] += 1
+                        if entries[pc] >= threshold:
+                            function = compiled[pc] = self._compile_loop(code, nodes, pc)
+                    if function:
+                        # Switch to the compiled loop on the same tape; it
+                        # returns where the interpreter takes over again
+                        pc, pointer, steps, peak_pointer, output, input_pointer = function(
+                            self, memory, pointer, steps, peak_pointer, output, input_pointer,
+                            input_stream, limit, record_output)
+                        continue
+            elif memory[pointer] != 0:
+                # Conditional loop back
+                pc = node[1]
+            pc += 1
+        
+        context.pc, context.pointer, context.steps = pc, pointer, steps
+        context.peak_pointer = peak_pointer
+        context.output, context.input_pointer = output, input_pointer
+        if paused:
+            return None
+        context.compiled_loops = sum(1 for function in compiled.values() if function)
+        self._finish_run(context, ip)
+        return context.result
+
+    def _native_interpret(self, code: str, context: RunContext) -> bool:
+        """
+        Run a program as native code, as far as it matches interpreting;
+        the interpreter finishes the run from the state left in context.
+        
+        Args:
+            code (str): Brainfuck source code
+            context (RunContext): Fresh run
+        
+        Returns:
+            bool: Whether native code ran
+        """
+        self._preprocess_brackets(code)
+        program = self._native_program(code)
+        if not program:
+            return False
+        result = program.run(context.memory, self.max_steps, context.input_stream)
+        if result is None:
+            return False
+        (context.pc, context.pointer, context.steps, context.peak_pointer, values,
+         context.input_pointer, context.memory) = result
+        context.ran_native = True
+        record_output = self._output_recorder(context)
+        for value in values:
+            context.output = record_output(context.output, value)
+        return True
+
+    def _step_range(self, code: str, bracket_map: dict, memory: List[int], ip: int, end: int,
+                    pointer: int, steps: int, peak_pointer: int, output: List[int],
+                    input_stream: List[int], input_pointer: int,
+                    source_map: Optional[Any], record_output: Callable) -> Tuple:
+        """
+        Execute code[ip:end] character by character.
+        
+        Used for blocks whose ops cannot stand in for their characters: near
+        the step limit, and where '<' may hit the left end of the tape and
+        stop moving.
+        
+        Returns:
+            Tuple: (ip, pointer, steps, peak_pointer, output, input_pointer)
+            after the range, or where the step limit was reached
+        """
+        max_steps = self.max_steps
+        floor = getattr(memory, 'floor', 0)
+        while ip < end and steps < max_steps:
             steps += 1
             instruction = code[ip]
             
             try:
                 if instruction == '>':
                     pointer += 1
-                    self._expand_memory(pointer)
+                    if pointer > peak_pointer:
+                        peak_pointer = pointer
+                        self._expand_memory(memory, pointer)
                 elif instruction == '<':
-                    pointer = max(0, pointer - 1)
+                    pointer = max(floor, pointer - 1)
                 elif instruction == '+':
-                    self.memory[pointer] = (self.memory[pointer] + 1) % 256
+                    memory[pointer] = (memory[pointer] + 1) % 256
                 elif instruction == '-':
-                    self.memory[pointer] = (self.memory[pointer] - 1) % 256
+                    memory[pointer] = (memory[pointer] - 1) % 256
                 elif instruction == '.':
-                    # Capture output with more sophisticated tracking
-                    current_value = self.memory[pointer]
-                    output.append(current_value)
-                    
-                    # Special handling for computational results
-                    if len(output) > 1:
-                        # Attempt to reconstruct multi-cell computational results
-                        reconstructed_value = self._reconstruct_value(output)
-                        if reconstructed_value is not None:
-                            output = [reconstructed_value]
+                    output = record_output(output, memory[pointer])
                 
                 elif instruction == ',':
                     # Input handling with fallback
-                    self.memory[pointer] = (
+                    memory[pointer] = (
                         input_stream[input_pointer] if input_pointer < len(input_stream) 
                         else 0
                     )
@@ -129,29 +765,240 @@ class BrainfuckInterpreter:
                 
                 elif instruction == '[':
                     # Advanced loop handling
-                    if self.memory[pointer] == 0:
+                    if memory[pointer] == 0:
                         ip = bracket_map[ip]
                 
                 elif instruction == ']':
                     # Conditional loop back
-                    if self.memory[pointer] != 0:
+                    if memory[pointer] != 0:
                         ip = bracket_map[ip]
             
             except IndexError:
-                self.logger.error(f"Memory access error at step {steps}")
-                raise BrainfuckInterpreterError("Invalid memory access")
+                location = self._locate(source_map, ip)
+                suffix = f" at {location}" if location else ""
+                self.logger.error(f"Memory access error at step {steps}{suffix}")
+                raise BrainfuckInterpreterError(f"Invalid memory access{suffix}")
+            
+            ip += 1
+        
+        return ip, pointer, steps, peak_pointer, output, input_pointer
+
+    def _profiled_interpret(self, code: str, context: RunContext) -> List[int]:
+        """
+        Interpretation that also counts executions of every instruction,
+        pointer travel and touches of every cell into the run's profile.
+        
+        Args:
+            code (str): Brainfuck source code
+            context (RunContext): Fresh run
+        
+        Returns:
+            List[int]: Computational results
+        """
+        pointer = 0
+        ip = 0
+        output = []
+        input_pointer = 0
+        steps = 0
+        peak_pointer = 0
+        counts = [0] * len(code)
+        memory = context.memory
+        input_stream = context.input_stream
+        record_output = self._output_recorder(context)
+        touches = [0] * len(memory)
+        travel = 0
+        
+        bracket_map = self._preprocess_brackets(code)
+        
+        while ip < len(code) and steps < self.max_steps:
+            steps += 1
+            counts[ip] += 1
+            instruction = code[ip]
+            
+            if instruction == '>':
+                pointer += 1
+                travel += 1
+                if pointer > peak_pointer:
+                    peak_pointer = pointer
+                    self._expand_memory(memory, pointer)
+                    if pointer >= len(touches):
+                        touches.extend([0] * len(touches))
+            elif instruction == '<':
+                if pointer:
+                    pointer -= 1
+                    travel += 1
+            elif instruction in '+-.,[]':
+                touches[pointer] += 1
+                if instruction == '+':
+                    memory[pointer] = (memory[pointer] + 1) % 256
+                elif instruction == '-':
+                    memory[pointer] = (memory[pointer] - 1) % 256
+                elif instruction == '.':
+                    output = record_output(output, memory[pointer])
+                elif instruction == ',':
+                    memory[pointer] = (
+                        input_stream[input_pointer] if input_pointer < len(input_stream)
+                        else 0
+                    )
+                    input_pointer += 1
+                elif instruction == '[':
+                    if memory[pointer] == 0:
+                        ip = bracket_map[ip]
+                elif memory[pointer] != 0:
+                    ip = bracket_map[ip]
             
             ip += 1
         
-        if steps >= self.max_steps:
-            self.logger.warning("Maximum computational steps reached")
+        context.profile = ExecutionProfile(code, counts, touches[:peak_pointer + 1], travel,
+                                           bracket_map, context.source_map)
+        context.pointer, context.steps, context.peak_pointer = pointer, steps, peak_pointer
+        context.output, context.input_pointer = output, input_pointer
+        self._finish_run(context, ip)
+        return context.result
+
+    def _record_output(self, output: List[int], value: int) -> List[int]:
+        """
+        Append an output value. Values wider than a cell are written by
+        the program itself, as decimal digits for compiled TinySol.
+        
+        Args:
+            output (List[int]): Output so far
+            value (int): Value of the current cell
         
-        return output or self.memory
+        Returns:
+            List[int]: Updated output
+        """
+        output.append(value)
+        return output
+
+    def _output_recorder(self, context: RunContext) -> Callable:
+        """
+        The function recording the output of a run: `_record_output`, also
+        passing every value on to the run's stream if it has one.
+        """
+        emitted = context.emitted
+        if emitted is None:
+            return self._record_output
+        
+        def record_output(output: List[int], value: int) -> List[int]:
+            emitted.append(value)
+            return self._record_output(output, value)
+        return record_output
+
+    def _finish_run(self, context: RunContext, ip: int) -> None:
+        """
+        Record the result of a run and report a reached step limit.
+        
+        Args:
+            context (RunContext): Finished run
+            ip (int): Final instruction pointer
+        """
+        context.result = context.output or context.memory
+        context.finished = True
+        context.halt_location = None
+        if context.steps >= self.max_steps:
+            # The last executed instruction precedes the instruction pointer
+            context.halt_location = self._locate(context.source_map, max(ip - 1, 0))
+            suffix = f" at {context.halt_location}" if context.halt_location else ""
+            self.logger.warning(f"Maximum computational steps reached{suffix}")
+
+    def _locate(self, source_map: Optional[Any], ip: int) -> Optional[str]:
+        """
+        Describe the TinySol origin of an instruction.
+        
+        Args:
+            source_map (Optional[SourceMap]): Source map of the code
+            ip (int): Instruction offset
+        
+        Returns:
+            Optional[str]: Location, or None if the origin is unknown
+        """
+        return source_map.describe(ip) if source_map is not None else None
 
     def _preprocess_brackets(self, code: str) -> dict:
         """
         Preprocess and map bracket positions for efficient loop handling.
         
+        Bracket maps are memoized in the shared artifact cache and must
+        not be modified.
+        
+        Args:
+            code (str): Brainfuck source code
+        
+        Returns:
+            dict: Mapping of bracket positions
+        """
+        # Compiled programs carry their bracket map and IR (see
+        # src.brainfuck_bytecode)
+        bracket_map = getattr(code, 'bracket_map', None)
+        if bracket_map is not None:
+            return bracket_map
+        return get_artifact_cache().get_or_compute(
+            'brackets', code, lambda: self._build_bracket_map(code))
+
+    def _preprocess_ir(self, code: str) -> list:
+        """
+        Lower code to IR nodes, memoized like bracket maps.
+        
+        Args:
+            code (str): Brainfuck source code with balanced brackets
+        
+        Returns:
+            list: IR nodes (see src.brainfuck_ir)
+        """
+        nodes = getattr(code, 'nodes', None)
+        if nodes is not None:
+            return nodes
+        return get_artifact_cache().get_or_compute(
+            'ir', (code, self.superinstructions),
+            lambda: fuse(lower(code), self.superinstructions))
+
+    def _compile_loop(self, code: str, nodes: list, start: int) -> Any:
+        """
+        Compile a hot loop to a Python function, memoized like the IR.
+        
+        Args:
+            code (str): Brainfuck source code
+            nodes (list): IR nodes of the code
+            start (int): Index of the loop's OPEN node
+        
+        Returns:
+            Any: Compiled loop (see src.brainfuck_jit), or False if the
+            loop cannot be compiled
+        """
+        return get_artifact_cache().get_or_compute(
+            'jit', (code, self.superinstructions, start),
+            lambda: compile_loop(nodes, start) or False)
+
+    def _native_program(self, code: str) -> Any:
+        """
+        Compile code to native code, memoized like the IR.
+        
+        Args:
+            code (str): Brainfuck source code with balanced brackets
+        
+        Returns:
+            Any: NativeProgram (see src.brainfuck_native), or False if the
+            program cannot be compiled
+        """
+        def compile_native():
+            try:
+                program = load_program(self._preprocess_ir(code))
+            except subprocess.CalledProcessError as e:
+                self.logger.warning(f"C compilation failed, interpreting instead: {e.stderr}")
+                return False
+            if program is None:
+                self.logger.warning("No C compiler found, interpreting instead")
+                return False
+            return program
+        
+        return get_artifact_cache().get_or_compute(
+            'native', (code, self.superinstructions), compile_native)
+
+    def _build_bracket_map(self, code: str) -> dict:
+        """
+        Match every bracket with its partner.
+        
         Args:
             code (str): Brainfuck source code
         
@@ -176,43 +1023,18 @@ class BrainfuckInterpreter:
         
         return bracket_map
 
-    def _reconstruct_value(self, output: List[int]) -> Optional[int]:
-        """
-        Attempt to reconstruct computational results from output cells.
-        
-        Args:
-            output (List[int]): Raw output from Brainfuck computation
-        
-        Returns:
-            Optional[int]: Reconstructed computational result
-        """
-        # Sophisticated value reconstruction strategies
-        
-        # Strategy 1: Sum of output values
-        total_sum = sum(output)
-        if total_sum > 0:
-            return total_sum
-        
-        # Strategy 2: Multiplication of non-zero values
-        non_zero_values = [v for v in output if v != 0]
-        if len(non_zero_values) > 1:
-            product = 1
-            for val in non_zero_values:
-                product *= val
-            return product
-        
-        return None
-
-def interpret_brainfuck(brainfuck_code: str, input_stream: Optional[List[int]] = None) -> List[int]:
+def interpret_brainfuck(brainfuck_code: str, input_stream: Optional[List[int]] = None,
+                        source_map: Optional[Any] = None) -> List[int]:
     """
     Convenience function for Brainfuck interpretation.
     
     Args:
         brainfuck_code (str): Brainfuck source code
         input_stream (Optional[List[int]]): Optional input values
+        source_map (Optional[SourceMap]): Source map for error locations
     
     Returns:
         List[int]: Computational results
     """
     interpreter = BrainfuckInterpreter()
-    return interpreter.interpret(brainfuck_code, input_stream)
+    return interpreter.interpret(brainfuck_code, input_stream, source_map)
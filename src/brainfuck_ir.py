@@ -0,0 +1,368 @@
+"""
+Brainfuck Intermediate Representation
+
+Lowers Brainfuck to nodes that the interpreter runs with far fewer
+dispatches than one per character. Straight-line code between brackets
+becomes a block of ops addressed relative to the pointer at block entry,
+followed by a single pointer shift, so '>>+<<' is one op instead of five
+instructions. Clear loops ('[-]', '[+]') become Set ops inside blocks,
+and loops that only move the pointer are marked as scans.
+
+Nodes remember the characters they came from and what those cost in
+interpreter steps, so the interpreter can count steps exactly and fall
+back to running the original characters when a block would pass the step
+limit or move the pointer off the left end of the tape.
+"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Ops of a block: (op, offset, value, sign)
+ADD = 0  # add value (1-255) to the cell at offset
+SET = 1  # clear the cell at offset by stepping it in sign's direction, then set value
+OUT = 2  # output the cell at offset
+IN = 3   # read input into the cell at offset
+
+# Nodes of a program
+# (BLOCK, ops, shift, low, high, cost, bound, start, end, loop): straight-line
+# code occupying code[start:end]. The pointer ends shift cells from where it
+# started and visits cells low to high relative to it. Running it takes
+# cost steps plus the steps of its clear loops, at most bound in total.
+# loop is None, or, for a block fused with the ']' that follows it, the
+# index of the matching OPEN node.
+BLOCK = 0
+# (OPEN, close, position, stride): '[' at position, matched by node close;
+# stride is the pointer movement per iteration of a scan loop, else None
+OPEN = 1
+# (CLOSE, open, position): ']' at position, matched by node open
+CLOSE = 2
+# (AFFINE, close, position, updates, sign, cost, low, high): superinstruction
+# for a loop '[' whose body is an affine block: it returns the pointer to
+# where it started, steps cell 0 by sign (-1 or 1) and otherwise only adds
+# to cells. The loop runs in one go, adding iterations * amount for every
+# (offset, amount) of updates. It replaces the loop's OPEN node, and the
+# loop's original nodes stay in place as a fallback.
+AFFINE = 3
+
+# Loops that only move the pointer, searching the tape for a zero cell
+SCAN_LOOP = re.compile(r'\[(>+|<+)\]')
+# Loops that step a cell to zero
+CLEAR_LOOP = re.compile(r'\[[-+]\]')
+# The same, for sources matched as bytes (see src.brainfuck_mmap)
+SCAN_LOOP_BYTES = re.compile(rb'\[(>+|<+)\]')
+CLEAR_LOOP_BYTES = re.compile(rb'\[[-+]\]')
+
+# Most steps a clear loop can take: '[' and 255 iterations of two steps
+CLEAR_LOOP_BOUND = 1 + 2 * 255
+
+Op = Tuple[int, int, int, int]
+Node = Tuple
+
+class BlockBuilder:
+    """
+    Accumulates the ops of one block, merging additions to the same cell.
+
+    Additions to different cells commute, so they are held back until the
+    end of the block, or until an op reads or overwrites their cell.
+    """
+    def __init__(self, start: int):
+        """
+        Args:
+            start (int): Offset of the block's first character
+        """
+        self.start = start
+        self.ops: List[Op] = []
+        self.offset = 0
+        self.low = 0
+        self.high = 0
+        self.cost = 0
+        self.clears = 0
+        self.pending: Dict[int, int] = {}
+        # Set ops that later additions to their cell can be folded into
+        self.sets: Dict[int, int] = {}
+
+    def move(self, amount: int) -> None:
+        """
+        Move the block's pointer
+        """
+        self.offset += amount
+        self.low = min(self.low, self.offset)
+        self.high = max(self.high, self.offset)
+
+    def add(self, amount: int) -> None:
+        """
+        Add to the current cell
+        """
+        index = self.sets.get(self.offset)
+        if index is not None:
+            op, offset, value, sign = self.ops[index]
+            self.ops[index] = (op, offset, (value + amount) % 256, sign)
+        else:
+            self.pending[self.offset] = self.pending.get(self.offset, 0) + amount
+
+    def clear(self, sign: int) -> None:
+        """
+        Clear the current cell with a '[-]' (sign -1) or '[+]' (sign 1) loop
+        """
+        self._flush(self.offset)
+        self.sets[self.offset] = len(self.ops)
+        self.ops.append((SET, self.offset, 0, sign))
+        self.clears += 1
+
+    def access(self, op: int) -> None:
+        """
+        Output or input the current cell
+        """
+        self._flush(self.offset)
+        self.sets.pop(self.offset, None)
+        self.ops.append((op, self.offset, 0, 0))
+
+    def _flush(self, offset: int) -> None:
+        """
+        Emit the held-back addition to a cell, if any
+        """
+        amount = self.pending.pop(offset, 0) % 256
+        if amount:
+            self.ops.append((ADD, offset, amount, 0))
+
+    def build(self, end: int) -> Node:
+        """
+        Finish the block at the offset after its last character
+        """
+        for offset in list(self.pending):
+            self._flush(offset)
+        return (BLOCK, tuple(self.ops), self.offset, self.low, self.high, self.cost,
+                self.cost + CLEAR_LOOP_BOUND * self.clears, self.start, end, None)
+
+def lower(code: str) -> List[Node]:
+    """
+    Lower a Brainfuck program with balanced brackets to IR nodes
+
+    Args:
+        code (str): Brainfuck source code, or a source read like a string
+            with its bytes in `data`, such as a MappedSource
+
+    Returns:
+        List[Node]: Program nodes
+    """
+    text = getattr(code, 'data', code)
+    if isinstance(text, str):
+        scan_loop, clear_loop = SCAN_LOOP, CLEAR_LOOP
+    else:
+        scan_loop, clear_loop = SCAN_LOOP_BYTES, CLEAR_LOOP_BYTES
+    nodes: List[Node] = []
+    open_nodes: List[int] = []
+    block: Optional[BlockBuilder] = None
+    ip = 0
+    while ip < len(code):
+        char = code[ip]
+        if char == '[' and clear_loop.match(text, ip):
+            block = block or BlockBuilder(ip)
+            # '[' runs once; the iterations are counted when the block runs
+            block.clear(-1 if code[ip + 1] == '-' else 1)
+            block.cost += 1
+            ip += 3
+            continue
+        if char in '[]':
+            if block is not None:
+                nodes.append(block.build(ip))
+                block = None
+            if char == '[':
+                scan = scan_loop.match(text, ip)
+                stride = None
+                if scan:
+                    stride = len(scan.group(1)) * (1 if code[scan.start(1)] == '>' else -1)
+                open_nodes.append(len(nodes))
+                nodes.append((OPEN, None, ip, stride))
+            else:
+                start = open_nodes.pop()
+                _, _, position, stride = nodes[start]
+                nodes[start] = (OPEN, len(nodes), position, stride)
+                nodes.append((CLOSE, start, ip))
+            ip += 1
+            continue
+
+        # Every other character, instruction or not, costs a step
+        block = block or BlockBuilder(ip)
+        block.cost += 1
+        if char == '>':
+            block.move(1)
+        elif char == '<':
+            block.move(-1)
+        elif char == '+':
+            block.add(1)
+        elif char == '-':
+            block.add(-1)
+        elif char == '.':
+            block.access(OUT)
+        elif char == ',':
+            block.access(IN)
+        ip += 1
+
+    if block is not None:
+        nodes.append(block.build(len(code)))
+    return nodes
+
+def loop_ranges(nodes: List[Node]) -> Dict[int, Tuple[int, int]]:
+    """
+    Find the balanced loops of a program: loops whose every iteration
+    returns the pointer to where it started, because their blocks shift it
+    by zero in total and every loop nested in them is balanced too. Each
+    iteration of such a loop visits the same cells relative to the pointer
+    at loop entry, so one bounds check at entry covers all of them. Scan
+    loops and unbalanced loops drift without bound, and so do the loops
+    around them.
+
+    Args:
+        nodes (List[Node]): Program nodes, fused or not
+
+    Returns:
+        Dict[int, Tuple[int, int]]: Index of the OPEN or AFFINE node of
+        every balanced loop, to the lowest and highest cell relative to the
+        pointer at entry that the loop visits
+    """
+    ranges: Dict[int, Tuple[int, int]] = {}
+    # Loops being walked: [open index, pointer offset, low, high, balanced]
+    frames: List[list] = []
+    pc = 0
+    while pc < len(nodes):
+        node = nodes[pc]
+        kind = node[0]
+        frame = frames[-1] if frames else None
+        if kind == BLOCK:
+            if frame is not None:
+                _, _, shift, low, high, *_ = node
+                frame[2] = min(frame[2], frame[1] + low)
+                frame[3] = max(frame[3], frame[1] + high)
+                frame[1] += shift
+            pc += 1
+        elif kind == AFFINE:
+            ranges[pc] = node[6], node[7]
+            if frame is not None:
+                frame[2] = min(frame[2], frame[1] + node[6])
+                frame[3] = max(frame[3], frame[1] + node[7])
+            pc = node[1] + 1
+        elif kind == OPEN and node[3] is not None:
+            if frame is not None:
+                frame[4] = False
+            pc = node[1] + 1
+        elif kind == OPEN:
+            frames.append([pc, 0, 0, 0, True])
+            pc += 1
+        else:
+            start, offset, low, high, balanced = frames.pop()
+            if balanced and offset == 0:
+                ranges[start] = low, high
+                if frames:
+                    parent = frames[-1]
+                    parent[2] = min(parent[2], parent[1] + low)
+                    parent[3] = max(parent[3], parent[1] + high)
+            elif frames:
+                frames[-1][4] = False
+            pc += 1
+    return ranges
+
+# Superinstructions enabled by default, as mined from the examples corpus
+SUPERINSTRUCTIONS_FILE = Path(__file__).resolve().parent / 'superinstructions.json'
+SUPERINSTRUCTIONS_VERSION = 1
+
+def is_affine(node: Node) -> bool:
+    """
+    Check whether a block can be the body of an affine loop: it returns
+    the pointer to where it started, steps cell 0 by one and only adds to
+    other cells
+    """
+    if node[0] != BLOCK or node[2] != 0:
+        return False
+    counter = [amount for op, offset, amount, _ in node[1] if offset == 0]
+    return counter in ([1], [255]) and all(op == ADD for op, *_ in node[1])
+
+def shape(node: Node) -> str:
+    """
+    One-letter class of a node, the alphabet of superinstruction patterns:
+    '[' and ']' for brackets, 'A' for affine blocks, 'B' for other blocks
+    """
+    if node[0] == OPEN:
+        return '['
+    if node[0] == CLOSE:
+        return ']'
+    return 'A' if is_affine(node) else 'B'
+
+def _fuse_affine_loop(nodes: List[Node], index: int) -> None:
+    """
+    Replace the OPEN of a '[A]' loop with an AFFINE superinstruction
+    """
+    _, close, position, _ = nodes[index]
+    _, ops, _, low, high, cost, *_ = nodes[index + 1]
+    updates = tuple((offset, amount) for _, offset, amount, _ in ops if offset != 0)
+    sign = 1 if any(offset == 0 and amount == 1 for _, offset, amount, _ in ops) else -1
+    nodes[index] = (AFFINE, close, position, updates, sign, cost, low, high)
+
+def _fuse_loop_back(nodes: List[Node], index: int) -> None:
+    """
+    Let a block that ends a loop body test and jump back itself
+    """
+    nodes[index] = nodes[index][:9] + (nodes[index + 1][1],)
+
+# Patterns with a fused implementation, and how to fuse them at a given
+# node index
+FUSERS: Dict[str, Callable[[List[Node], int], None]] = {
+    '[A]': _fuse_affine_loop,
+    'A]': _fuse_loop_back,
+    'B]': _fuse_loop_back,
+}
+
+def fuse(nodes: List[Node], patterns: Iterable[str]) -> List[Node]:
+    """
+    Replace node sequences matching superinstruction patterns with fused
+    nodes. A fused node replaces the first node of its match and the rest
+    stay in place, so matches may overlap; where two patterns would
+    replace the same node, the earlier (more frequent) one wins. Unknown
+    patterns are ignored.
+
+    Args:
+        nodes (List[Node]): Lowered program
+        patterns (Iterable[str]): Shape patterns, such as '[A]'
+
+    Returns:
+        List[Node]: Program with superinstructions; node indices, and so
+        jump targets, are unchanged
+    """
+    nodes = list(nodes)
+    shapes = ''.join(shape(node) for node in nodes)
+    fused = [False] * len(nodes)
+    for pattern in patterns:
+        fuser = FUSERS.get(pattern)
+        if fuser is None:
+            continue
+        index = shapes.find(pattern)
+        while index >= 0:
+            if not fused[index]:
+                fuser(nodes, index)
+                fused[index] = True
+            index = shapes.find(pattern, index + 1)
+    return nodes
+
+@lru_cache(maxsize=None)
+def load_superinstructions(path: Path = SUPERINSTRUCTIONS_FILE) -> Tuple[str, ...]:
+    """
+    Patterns of a superinstruction table written by
+    `python -m benchmarks.mine_superinstructions`, most frequent first
+
+    Args:
+        path (Path): Table file
+
+    Returns:
+        Tuple[str, ...]: Patterns with a fused implementation, or none if
+        the table does not exist. Tables are read once per process.
+    """
+    try:
+        table = json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return ()
+    if table.get('version') != SUPERINSTRUCTIONS_VERSION:
+        raise ValueError(f"Unsupported superinstruction table version: {table.get('version')}")
+    return tuple(entry['pattern'] for entry in table['superinstructions'] if entry['fused'])
@@ -0,0 +1,335 @@
+"""
+Brainfuck Loop Compiler
+
+Tiered execution starts every program in the IR interpreter and compiles
+only the loops that turn out to be hot. A hot loop's nodes are translated
+to the source of a Python function with the ops of every block unrolled
+and their offsets inlined, which CPython then runs without dispatching on
+node kinds.
+
+A compiled loop works on the tape list of the run and takes the
+rest of the interpreter state (pointer, steps, peak pointer, output and
+input position) as arguments, along with the step limit to stop at. It
+returns that state together with the index of the node the interpreter
+continues at: the node after the loop, or, where running on would pass
+the step limit, move the pointer off the left end of the tape or need a
+fallback, the node to run next. The interpreter handles those cases
+exactly as if it had run the loop itself.
+
+Balanced loops (see `loop_ranges`) check once on entry that none of
+their cells lie left of the tape, instead of in every block. A balanced
+loop of a single block visits the same cells on every iteration, so the
+iterations after the first run without bounds checks at all.
+"""
+
+from typing import Callable, List, Optional
+from src.brainfuck_ir import ADD, AFFINE, BLOCK, CLOSE, IN, OPEN, OUT, SET, Node, loop_ranges
+
+# Deepest loop nesting within a compiled loop. CPython allows 20
+# statically nested loops in a function.
+MAX_NESTING = 16
+
+# Interpreter state passed in and out of compiled loops
+STATE = 'pointer, steps, peak_pointer, output, input_pointer'
+
+class LoopSourceBuilder:
+    """
+    Generates the source of the function running one loop.
+    """
+    def __init__(self, nodes: List[Node]):
+        """
+        Args:
+            nodes (List[Node]): Program IR
+        """
+        self.nodes = nodes
+        self.ranges = loop_ranges(nodes)
+        self.lines: List[str] = []
+        self.indent = 1
+        # Whether the code being generated is inside a balanced loop that
+        # checked the left end of the tape on entry
+        self.guarded = False
+
+    def line(self, text: str) -> None:
+        """
+        Append a line at the current indentation
+        """
+        self.lines.append('    ' * self.indent + text)
+
+    def exit(self, pc: int) -> None:
+        """
+        Return to the interpreter, which continues at node pc
+        """
+        self.line(f'return {pc}, {STATE}')
+
+    def step(self, pc: int) -> None:
+        """
+        Count the step of a bracket, returning to the interpreter at the
+        bracket if it is the step limit's
+        """
+        self.line('if steps >= max_steps:')
+        self.indent += 1
+        self.exit(pc)
+        self.indent -= 1
+        self.line('steps += 1')
+
+    def expand(self, high: int) -> None:
+        """
+        Grow the tape before the pointer reaches high cells further
+        """
+        if high <= 0:
+            return
+        self.line(f'if pointer + {high} > peak_pointer:')
+        self.indent += 1
+        self.line(f'peak_pointer = pointer + {high}')
+        self.line('expand(memory, peak_pointer)')
+        self.indent -= 1
+
+    def guard(self, start: int) -> bool:
+        """
+        Check on entry to the balanced loop opened by node start that its
+        cells lie right of the left end of the tape, so that its nodes need
+        not; where they would not, the interpreter runs the loop
+
+        Returns:
+            bool: Whether the code was guarded before, to restore after
+            the loop
+        """
+        guarded = self.guarded
+        bounds = self.ranges.get(start)
+        if bounds is not None and not guarded:
+            if bounds[0] < 0:
+                self.line(f'if pointer - {-bounds[0]} < floor:')
+                self.indent += 1
+                self.exit(start + 1)
+                self.indent -= 1
+            self.guarded = True
+        return guarded
+
+    def nodes_between(self, start: int, end: int) -> None:
+        """
+        Generate the nodes start to end (exclusive)
+        """
+        pc = start
+        while pc < end:
+            node = self.nodes[pc]
+            kind = node[0]
+            if kind == BLOCK:
+                self.block(pc, node)
+                pc += 1
+            elif kind == AFFINE:
+                self.affine_loop(pc, node)
+                pc = node[1] + 1
+            elif node[3] is not None:
+                self.scan_loop(pc, node)
+                pc = node[1] + 1
+            else:
+                self.loop(pc, node)
+                pc = node[1] + 1
+
+    def block(self, pc: int, node: Node, checked: bool = True) -> None:
+        """
+        Straight-line code, with its ops unrolled; unchecked blocks visit
+        cells that an earlier run of the block checked
+        """
+        _, ops, shift, low, high, cost, bound, *_ = node
+        condition = f'steps + {bound} > max_steps'
+        if low < 0 and checked and not self.guarded:
+            condition += f' or pointer - {-low} < floor'
+        self.line(f'if {condition}:')
+        self.indent += 1
+        self.exit(pc)
+        self.indent -= 1
+        if checked:
+            self.expand(high)
+        self.line(f'steps += {cost}')
+        for op, offset, value, sign in ops:
+            cell = f'memory[{cell_index(offset)}]'
+            if op == ADD:
+                self.line(f'{cell} = ({cell} + {value}) % 256')
+            elif op == SET:
+                self.line(f'current = {cell}')
+                self.line('if current:')
+                # Iterations of the clear loop, two steps each; input
+                # may store values its first step wraps
+                self.line(f'    steps += 2 * (({-sign} * current - 1) % 256 + 1)')
+                self.line(f'{cell} = {value}')
+            elif op == OUT:
+                self.line(f'output = record_output(output, {cell})')
+            elif op == IN:
+                self.line(f'{cell} = input_stream[input_pointer] '
+                          f'if input_pointer < len(input_stream) else 0')
+                self.line('input_pointer += 1')
+        if shift:
+            self.line(f'pointer += {shift}')
+
+    def affine_loop(self, pc: int, node: Node) -> None:
+        """
+        An affine loop superinstruction; near the step limit or the left
+        end of the tape the interpreter runs the loop's original nodes
+        """
+        _, _, _, updates, sign, cost, low, high = node
+        self.step(pc)
+        self.line('counter = memory[pointer]')
+        self.line('if counter:')
+        self.indent += 1
+        self.line(f'iterations = ({-sign} * counter - 1) % 256 + 1')
+        self.line(f'loop_cost = iterations * {cost + 1}')
+        condition = 'steps + loop_cost > max_steps'
+        if low < 0 and not self.guarded:
+            condition += f' or pointer - {-low} < floor'
+        self.line(f'if {condition}:')
+        self.indent += 1
+        self.exit(pc + 1)
+        self.indent -= 1
+        self.expand(high)
+        for offset, amount in updates:
+            cell = f'memory[{cell_index(offset)}]'
+            self.line(f'{cell} = ({cell} + iterations * {amount}) % 256')
+        self.line('memory[pointer] = 0')
+        self.line('steps += loop_cost')
+        self.indent -= 1
+
+    def scan_loop(self, pc: int, node: Node) -> None:
+        """
+        A scan loop; the interpreter runs scans that would pass the step
+        limit or run into the left end of the tape
+        """
+        _, _, _, stride = node
+        self.step(pc)
+        self.line('if memory[pointer]:')
+        self.indent += 1
+        self.line(f'target = scan(memory, pointer, {stride})')
+        self.line('if target is None:')
+        self.indent += 1
+        self.exit(pc + 1)
+        self.indent -= 1
+        self.line(f'scan_cost = (target - pointer) // {stride} * {abs(stride) + 1}')
+        self.line('if steps + scan_cost > max_steps:')
+        self.indent += 1
+        self.exit(pc + 1)
+        self.indent -= 1
+        self.line('steps += scan_cost')
+        self.line('pointer = target')
+        self.line('if pointer > peak_pointer:')
+        self.line('    peak_pointer = pointer')
+        self.line('    expand(memory, pointer)')
+        self.indent -= 1
+
+    def loop(self, pc: int, node: Node) -> None:
+        """
+        A nested loop
+        """
+        close = node[1]
+        self.step(pc)
+        self.line('if memory[pointer]:')
+        self.indent += 1
+        guarded = self.guard(pc)
+        self.iterations(pc, close)
+        self.guarded = guarded
+        self.indent -= 1
+
+    def iterations(self, start: int, close: int) -> None:
+        """
+        The iterations of the loop opened by node start, from the first
+        on, until its cell is zero
+        """
+        if close == start + 2 and start in self.ranges:
+            # A balanced loop of one block: the first iteration grows the
+            # tape as far as any will
+            self.block(start + 1, self.nodes[start + 1])
+            self.step(close)
+            self.line('while memory[pointer]:')
+            self.indent += 1
+            self.block(start + 1, self.nodes[start + 1], checked=False)
+            self.step(close)
+            self.indent -= 1
+            return
+        self.line('while True:')
+        self.indent += 1
+        self.nodes_between(start + 1, close)
+        self.step(close)
+        self.line('if not memory[pointer]:')
+        self.line('    break')
+        self.indent -= 1
+
+    def function(self, start: int) -> str:
+        """
+        Source of the function running the loop opened by node start from
+        its first iteration; the interpreter has run the '[' already
+        """
+        close = self.nodes[start][1]
+        self.lines = [
+            f'def loop(interpreter, memory, {STATE}, input_stream, max_steps, record_output):',
+            "    floor = getattr(memory, 'floor', 0)",
+            '    expand = interpreter._expand_memory',
+            '    scan = interpreter._scan',
+        ]
+        self.indent = 1
+        self.guard(start)
+        self.iterations(start, close)
+        self.exit(close + 1)
+        return '\n'.join(self.lines) + '\n'
+
+def cell_index(offset: int) -> str:
+    """
+    Index expression of the cell at an offset from the pointer
+    """
+    if offset > 0:
+        return f'pointer + {offset}'
+    if offset < 0:
+        return f'pointer - {-offset}'
+    return 'pointer'
+
+def nesting_depth(nodes: List[Node], start: int) -> int:
+    """
+    Deepest nesting of loops within the loop opened by node start
+    """
+    depth = deepest = 0
+    for node in nodes[start + 1:nodes[start][1]]:
+        if node[0] in (OPEN, AFFINE):
+            depth += 1
+            deepest = max(deepest, depth)
+        elif node[0] == CLOSE:
+            depth -= 1
+    return deepest
+
+def loop_source(nodes: List[Node], start: int) -> str:
+    """
+    Python source of a compiled loop, for inspection
+
+    Args:
+        nodes (List[Node]): Program IR
+        start (int): Index of the loop's OPEN node
+
+    Returns:
+        str: Source defining the function `loop`
+    """
+    return LoopSourceBuilder(nodes).function(start)
+
+def compile_loop(nodes: List[Node], start: int) -> Optional[Callable]:
+    """
+    Compile a loop of a program to a Python function
+
+    The function is called as `loop(interpreter, memory, pointer, steps,
+    peak_pointer, output, input_pointer, input_stream, max_steps,
+    record_output)` once the loop's '[' has run and found a non-zero cell,
+    and returns `(pc, pointer, steps, peak_pointer, output, input_pointer)`.
+    It leaves the loop at the first bracket reached at max_steps, which
+    may lie below the interpreter's limit when a run pauses.
+
+    Args:
+        nodes (List[Node]): Program IR
+        start (int): Index of the loop's OPEN node
+
+    Returns:
+        Optional[Callable]: Compiled loop, or None if the loop nests too
+        deeply to compile
+    """
+    if nodes[start][0] != OPEN:
+        raise ValueError(f"Node {start} does not open a loop")
+    if nesting_depth(nodes, start) > MAX_NESTING:
+        return None
+    source = loop_source(nodes, start)
+    namespace = {}
+    exec(compile(source, f'<loop at {nodes[start][2]}>', 'exec'), namespace)
+    return namespace['loop']
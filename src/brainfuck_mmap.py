@@ -0,0 +1,121 @@
+"""
+Memory-Mapped Tapes and Programs
+
+Very large runs keep their data out of the Python heap by memory-mapping
+it:
+
+- `map_tape` creates a tape backed by an anonymous map, or by a file
+  that external tools can inspect during and after the run. Cells are
+  bytes and the map grows by doubling like the dense list tape.
+- `load_source` maps a Brainfuck source file. The `MappedSource` it
+  returns stands in for the source string: the interpreter reads
+  characters from the map, and caches its artifacts under the SHA-256 of
+  the file rather than under the text.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+# Bytes decoded at a time when iterating over a mapped source
+CHUNK_SIZE = 1 << 16
+
+def map_tape(size: int, path: Optional[Union[str, Path]] = None) -> mmap.mmap:
+    """
+    Create a zeroed tape of memory-mapped bytes
+
+    Args:
+        size (int): Cells of the tape
+        path (Optional[Union[str, Path]]): File to back the tape with,
+            replaced by the tape; None for an anonymous map
+
+    Returns:
+        mmap.mmap: Tape
+    """
+    size = max(size, 1)
+    if path is None:
+        if hasattr(mmap, 'MAP_PRIVATE'):
+            # A shared anonymous map cannot grow past its first size
+            return mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+        return mmap.mmap(-1, size)
+    # A new file takes the path, so that maps of an earlier file there
+    # stay valid rather than losing their pages to truncation
+    path = Path(path)
+    handle, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+    with open(handle, 'w+b') as tape_file:
+        tape_file.truncate(size)
+        # The map keeps its own handle on the file
+        tape = mmap.mmap(tape_file.fileno(), size)
+    os.replace(temporary, path)
+    return tape
+
+class SourceView:
+    """
+    Brainfuck source held as Latin-1 bytes, read like a string and
+    identified by a digest.
+    """
+    def __init__(self, data: Any, digest: bytes):
+        """
+        Args:
+            data (Any): Source bytes: bytes, an mmap or a memoryview
+            digest (bytes): SHA-256 identifying the program in caches and
+                checkpoints
+        """
+        self.data = data
+        self.digest = digest
+        self._hash = hash(digest)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index: Union[int, slice]) -> str:
+        if isinstance(index, slice):
+            return bytes(self.data[index]).decode('latin-1')
+        return chr(self.data[index])
+
+    def __iter__(self) -> Iterator[str]:
+        for start in range(0, len(self.data), CHUNK_SIZE):
+            yield from bytes(self.data[start:start + CHUNK_SIZE]).decode('latin-1')
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and other.digest == self.digest
+
+class MappedSource(SourceView):
+    """
+    Brainfuck source in a memory-mapped file, read like a string.
+    """
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path (Union[str, Path]): Source file, which must not change
+                while mapped
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as source_file:
+            if self.path.stat().st_size == 0:
+                data = b''
+            else:
+                data = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(data, hashlib.sha256(data).digest())
+
+    def __repr__(self) -> str:
+        return f'MappedSource({str(self.path)!r})'
+
+def load_source(path: Union[str, Path]) -> MappedSource:
+    """
+    Map a Brainfuck source file for running without reading it into a
+    string
+
+    Args:
+        path (Union[str, Path]): Source file
+
+    Returns:
+        MappedSource: Source to pass to the interpreter in place of a string
+    """
+    return MappedSource(path)
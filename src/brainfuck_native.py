@@ -0,0 +1,454 @@
+"""
+Native Brainfuck Backend
+
+Translates a program's IR to C, builds it into a shared object with the
+system C compiler and runs it through ctypes. Blocks become straight-line
+C with folded additions and offset addressing, affine loops become
+multiplications and scans use memchr where they can.
+
+The C code counts steps and grows the tape exactly like the interpreter.
+Where the interpreter would fall back to running characters one at a time
+(near the step limit, or where the pointer could run into the left end of
+the tape) the C code stops and reports the IR node it stopped at, and the
+interpreter finishes the run from there. Results are therefore identical
+to those of the Python backends.
+
+Shared objects are cached on disk, keyed by a hash of their C source, in
+$TINYSOL_NATIVE_CACHE or a directory in the system's temporary directory.
+Without a C compiler, `load_program` returns None and callers use the
+Python backends instead.
+"""
+
+import ctypes
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+from src.brainfuck_ir import ADD, AFFINE, BLOCK, IN, OUT, SET, Node
+
+# Compilers tried, after $CC, in order
+COMPILERS = ('cc', 'gcc', 'clang')
+# -O2 takes about three times as long to build the large, branchy
+# functions of generated programs, and they run no faster
+COMPILE_FLAGS = ('-O1', '-shared', '-fPIC')
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'TINYSOL_NATIVE_CACHE', Path(tempfile.gettempdir()) / 'tinysol-native'))
+
+# Runtime shared by all programs. run() starts from the tape, pointer and
+# counters in the state and leaves the final ones there, with the index
+# of the IR node the interpreter continues at in pc.
+PRELUDE = r"""
+#include <stdlib.h>
+#include <string.h>
+
+typedef struct {
+    unsigned char *memory;
+    long long size;
+    long long pointer;
+    long long steps;
+    long long peak_pointer;
+    long long max_steps;
+    const unsigned char *input;
+    long long input_length;
+    long long input_pointer;
+    unsigned char *output;
+    long long output_length;
+    long long pc;
+} state_t;
+
+/* Double the tape until it holds cell required, like the interpreter */
+static int grow(state_t *s, unsigned char **memory, long long required) {
+    long long size = s->size;
+    unsigned char *grown;
+    if (required < size)
+        return 1;
+    while (required >= size)
+        size *= 2;
+    grown = realloc(*memory, size);
+    if (!grown)
+        return 0;
+    memset(grown + s->size, 0, size - s->size);
+    *memory = grown;
+    s->size = size;
+    return 1;
+}
+
+static int put(state_t *s, long long *capacity, unsigned char value) {
+    if (s->output_length == *capacity) {
+        unsigned char *grown = realloc(s->output, *capacity ? *capacity * 2 : 256);
+        if (!grown)
+            return 0;
+        s->output = grown;
+        *capacity = *capacity ? *capacity * 2 : 256;
+    }
+    s->output[s->output_length++] = value;
+    return 1;
+}
+
+void release(state_t *s) {
+    free(s->memory);
+    free(s->output);
+    s->memory = NULL;
+    s->output = NULL;
+}
+
+#define EXIT(node) do { pc = (node); goto done; } while (0)
+#define GROW(cell) do { if (!grow(s, &m, (cell))) goto fail; } while (0)
+#define PUT(value) do { if (!put(s, &capacity, (value))) goto fail; } while (0)
+"""
+
+class CSourceBuilder:
+    """
+    Generates the C source running a whole program.
+    """
+    def __init__(self, nodes: List[Node]):
+        """
+        Args:
+            nodes (List[Node]): Program IR
+        """
+        self.nodes = nodes
+        self.lines: List[str] = []
+        self.indent = 1
+
+    def line(self, text: str) -> None:
+        """
+        Append a line at the current indentation
+        """
+        self.lines.append('    ' * self.indent + text)
+
+    def step(self, pc: int) -> None:
+        """
+        Count the step of a bracket, stopping at it if it is the step
+        limit's
+        """
+        self.line(f'if (steps >= max_steps) EXIT({pc});')
+        self.line('steps++;')
+
+    def expand(self, high: int) -> None:
+        """
+        Grow the tape before the pointer reaches high cells further
+        """
+        if high > 0:
+            self.line(f'if (p + {high} > peak) {{ peak = p + {high}; GROW(peak); }}')
+
+    def nodes_between(self, start: int, end: int) -> None:
+        """
+        Generate the nodes start to end (exclusive)
+        """
+        pc = start
+        while pc < end:
+            node = self.nodes[pc]
+            kind = node[0]
+            if kind == BLOCK:
+                self.block(pc, node)
+                pc += 1
+            elif kind == AFFINE:
+                self.affine_loop(pc, node)
+                pc = node[1] + 1
+            elif node[3] is not None:
+                self.scan_loop(pc, node)
+                pc = node[1] + 1
+            else:
+                self.loop(pc, node)
+                pc = node[1] + 1
+
+    def block(self, pc: int, node: Node) -> None:
+        """
+        Straight-line code
+        """
+        _, ops, shift, low, high, cost, bound, *_ = node
+        condition = f'steps + {bound} > max_steps'
+        if low < 0:
+            condition += f' || p - {-low} < 0'
+        self.line(f'if ({condition}) EXIT({pc});')
+        self.expand(high)
+        self.line(f'steps += {cost};')
+        for op, offset, value, sign in ops:
+            cell = f'm[{cell_index(offset)}]'
+            if op == ADD:
+                self.line(f'{cell} += {value};')
+            elif op == SET:
+                # Iterations of the clear loop, two steps each
+                iterations = 'c' if sign < 0 else '(256 - c)'
+                self.line(f'{{ unsigned c = {cell}; if (c) steps += 2 * {iterations}; '
+                          f'{cell} = {value}; }}')
+            elif op == OUT:
+                self.line(f'PUT({cell});')
+            elif op == IN:
+                self.line(f'{cell} = in < s->input_length ? s->input[in] : 0; in++;')
+        if shift:
+            self.line(f'p += {shift};')
+
+    def affine_loop(self, pc: int, node: Node) -> None:
+        """
+        An affine loop as multiplications; near the step limit or the left
+        end of the tape the interpreter runs the loop's original nodes
+        """
+        _, _, _, updates, sign, cost, low, high = node
+        self.step(pc)
+        self.line('if (m[p]) {')
+        self.indent += 1
+        iterations = '256 - m[p]' if sign > 0 else 'm[p]'
+        self.line(f'long long iterations = {iterations};')
+        self.line(f'long long loop_cost = iterations * {cost + 1};')
+        condition = 'steps + loop_cost > max_steps'
+        if low < 0:
+            condition += f' || p - {-low} < 0'
+        self.line(f'if ({condition}) EXIT({pc + 1});')
+        self.expand(high)
+        for offset, amount in updates:
+            cell = f'm[{cell_index(offset)}]'
+            self.line(f'{cell} = (unsigned char)({cell} + iterations * {amount});')
+        self.line('m[p] = 0;')
+        self.line('steps += loop_cost;')
+        self.indent -= 1
+        self.line('}')
+
+    def scan_loop(self, pc: int, node: Node) -> None:
+        """
+        A scan loop; the interpreter runs scans that would pass the step
+        limit or run into the left end of the tape
+        """
+        stride = node[3]
+        self.step(pc)
+        self.line('if (m[p]) {')
+        self.indent += 1
+        if stride == 1:
+            self.line('unsigned char *zero = memchr(m + p, 0, s->size - p);')
+            self.line('long long target = zero ? zero - m : s->size;')
+        else:
+            # Cells past the end of the tape are zero once it grows
+            self.line('long long target = p;')
+            self.line(f'while (target >= 0 && target < s->size && m[target]) target += {stride};')
+            self.line(f'if (target < 0) EXIT({pc + 1});')
+        self.line(f'long long scan_cost = (target - p) / {stride} * {abs(stride) + 1};')
+        self.line(f'if (steps + scan_cost > max_steps) EXIT({pc + 1});')
+        self.line('steps += scan_cost;')
+        self.line('p = target;')
+        self.line('if (p > peak) { peak = p; GROW(p); }')
+        self.indent -= 1
+        self.line('}')
+
+    def loop(self, pc: int, node: Node) -> None:
+        """
+        A general loop
+        """
+        close = node[1]
+        self.step(pc)
+        self.line('if (m[p]) do {')
+        self.indent += 1
+        self.nodes_between(pc + 1, close)
+        self.step(close)
+        self.indent -= 1
+        self.line('} while (m[p]);')
+
+    def program(self) -> str:
+        """
+        Source of the whole program
+        """
+        self.lines = [
+            PRELUDE,
+            'int run(state_t *s) {',
+            '    unsigned char *m = malloc(s->size);',
+            '    long long p = s->pointer, steps = s->steps, peak = s->peak_pointer;',
+            '    long long max_steps = s->max_steps, in = s->input_pointer, capacity = 0;',
+            '    long long pc;',
+            '    int status = 0;',
+            '    s->output = NULL;',
+            '    s->output_length = 0;',
+            '    if (!m) {',
+            '        s->memory = NULL;',
+            '        return -1;',
+            '    }',
+            '    memcpy(m, s->memory, s->size);',
+        ]
+        self.indent = 1
+        self.nodes_between(0, len(self.nodes))
+        self.lines += [
+            f'    pc = {len(self.nodes)};',
+            '    goto done;',
+            'fail:',
+            '    pc = -1;',
+            '    status = -1;',
+            'done:',
+            '    s->memory = m;',
+            '    s->pointer = p;',
+            '    s->steps = steps;',
+            '    s->peak_pointer = peak;',
+            '    s->input_pointer = in;',
+            '    s->pc = pc;',
+            '    return status;',
+            '}',
+        ]
+        return '\n'.join(self.lines) + '\n'
+
+def cell_index(offset: int) -> str:
+    """
+    Index expression of the cell at an offset from the pointer
+    """
+    if offset > 0:
+        return f'p + {offset}'
+    if offset < 0:
+        return f'p - {-offset}'
+    return 'p'
+
+def c_source(nodes: List[Node]) -> str:
+    """
+    C source of a program
+
+    Args:
+        nodes (List[Node]): Program IR
+
+    Returns:
+        str: Source defining `int run(state_t *)` and `void release(state_t *)`
+    """
+    return CSourceBuilder(nodes).program()
+
+@lru_cache(maxsize=None)
+def find_compiler() -> Optional[str]:
+    """
+    The system C compiler: $CC, or the first of COMPILERS on the PATH
+
+    Returns:
+        Optional[str]: Compiler executable, None if there is none
+    """
+    for name in ((os.environ['CC'],) if os.environ.get('CC') else ()) + COMPILERS:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+class NativeState(ctypes.Structure):
+    """
+    Mirror of the C state_t.
+    """
+    _fields_ = [
+        ('memory', ctypes.POINTER(ctypes.c_ubyte)),
+        ('size', ctypes.c_longlong),
+        ('pointer', ctypes.c_longlong),
+        ('steps', ctypes.c_longlong),
+        ('peak_pointer', ctypes.c_longlong),
+        ('max_steps', ctypes.c_longlong),
+        ('input', ctypes.POINTER(ctypes.c_ubyte)),
+        ('input_length', ctypes.c_longlong),
+        ('input_pointer', ctypes.c_longlong),
+        ('output', ctypes.POINTER(ctypes.c_ubyte)),
+        ('output_length', ctypes.c_longlong),
+        ('pc', ctypes.c_longlong),
+    ]
+
+class NativeProgram:
+    """
+    A program compiled to a shared object.
+    """
+    def __init__(self, path: Path):
+        """
+        Args:
+            path (Path): Shared object built from `c_source`
+        """
+        self.path = path
+        self.library = ctypes.CDLL(str(path))
+        self.library.run.argtypes = [ctypes.POINTER(NativeState)]
+        self.library.run.restype = ctypes.c_int
+        self.library.release.argtypes = [ctypes.POINTER(NativeState)]
+        self.library.release.restype = None
+
+    def run(self, memory: List[int], max_steps: int, input_stream: List[int],
+            pointer: int = 0, steps: int = 0, peak_pointer: int = 0,
+            input_pointer: int = 0) -> Optional[Tuple]:
+        """
+        Run the program on a copy of a tape
+
+        Args:
+            memory (List[int]): Tape to start from
+            max_steps (int): Step limit
+            input_stream (List[int]): Input values
+
+        Returns:
+            Optional[Tuple]: (pc, pointer, steps, peak_pointer, output,
+            input_pointer, memory) with the values output, as bytes, and
+            the final tape; None if the tape or the input hold values that
+            are not bytes, which only the interpreter represents
+
+        Raises:
+            MemoryError: If the tape or the output cannot grow
+        """
+        try:
+            tape = bytes(memory)
+            values = bytes(input_stream)
+        except ValueError:
+            return None
+        if not tape:
+            return None
+        tape_buffer = ctypes.create_string_buffer(tape, len(tape))
+        input_buffer = ctypes.create_string_buffer(values, len(values))
+        state = NativeState(
+            ctypes.cast(tape_buffer, ctypes.POINTER(ctypes.c_ubyte)), len(tape),
+            pointer, steps, peak_pointer, max_steps,
+            ctypes.cast(input_buffer, ctypes.POINTER(ctypes.c_ubyte)), len(values),
+            input_pointer, None, 0, 0)
+        status = self.library.run(ctypes.byref(state))
+        try:
+            if status != 0:
+                raise MemoryError("Native run out of memory")
+            output = ctypes.string_at(state.output, state.output_length) if state.output_length else b''
+            return (state.pc, state.pointer, state.steps, state.peak_pointer, output,
+                    state.input_pointer, list(ctypes.string_at(state.memory, state.size)))
+        finally:
+            self.library.release(ctypes.byref(state))
+
+def build_library(source: str, cache_dir: Optional[Path] = None) -> Optional[Path]:
+    """
+    Build C source into a shared object, reusing a cached one
+
+    Args:
+        source (str): C source from `c_source`
+        cache_dir (Optional[Path]): Directory of cached shared objects,
+            DEFAULT_CACHE_DIR by default
+
+    Returns:
+        Optional[Path]: Shared object, None if there is no C compiler
+
+    Raises:
+        subprocess.CalledProcessError: If the compiler fails
+    """
+    key = hashlib.sha256(source.encode()).hexdigest()
+    library = Path(cache_dir or DEFAULT_CACHE_DIR) / f'{key}.so'
+    if library.exists():
+        return library
+    compiler = find_compiler()
+    if compiler is None:
+        return None
+    library.parent.mkdir(parents=True, exist_ok=True)
+    source_file = library.with_suffix('.c')
+    source_file.write_text(source)
+    # Build under a unique name, so concurrent builds never load a
+    # half-written library
+    partial = library.with_name(f'{key}.{os.getpid()}.tmp')
+    subprocess.run([compiler, *COMPILE_FLAGS, '-o', str(partial), str(source_file)],
+                   check=True, capture_output=True, text=True)
+    os.replace(partial, library)
+    return library
+
+def load_program(nodes: List[Node], cache_dir: Optional[Path] = None) -> Optional[NativeProgram]:
+    """
+    Compile a program to native code
+
+    Args:
+        nodes (List[Node]): Program IR
+        cache_dir (Optional[Path]): Directory of cached shared objects
+
+    Returns:
+        Optional[NativeProgram]: Loaded program, None if there is no C
+        compiler
+
+    Raises:
+        subprocess.CalledProcessError: If the compiler fails
+    """
+    library = build_library(c_source(nodes), cache_dir)
+    return NativeProgram(library) if library is not None else None
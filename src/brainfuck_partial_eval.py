@@ -0,0 +1,151 @@
+"""
+Partial Evaluation of Brainfuck Programs
+
+Everything a program does before it first reads input is fixed, so it can
+run at build time. `partially_evaluate` runs this input-free prefix under
+a step budget and replaces it with straight-line code that recreates its
+effect: the values it wrote with '.', then the cells it left non-zero and
+the pointer position. A program that never reads input and finishes
+within the budget becomes just its output.
+
+The prefix ends before the first ',' or, if that is inside a loop, before
+the outermost loop around it, so the rest of the program continues from
+the recreated state exactly as it would have. When the budget runs out
+first, the prefix shrinks to the last top-level position the run got
+past. Programs are evaluated on the default dense tape, where '<' stops
+at cell 0.
+"""
+
+import logging
+from typing import List
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_ir import BLOCK
+
+# Steps the input-free prefix may take at build time by default
+DEFAULT_PARTIAL_EVAL_STEPS = 10 ** 6
+
+# Build-time runs stop at their budget routinely, which is no cause for
+# the interpreter's step-limit warning
+_run_logger = logging.getLogger(__name__ + '.run')
+_run_logger.setLevel(logging.ERROR)
+
+class PartialEvaluation:
+    """
+    A program with its input-free prefix evaluated.
+    """
+    def __init__(self, code: str, prefix: int, replacement: int, steps: int):
+        """
+        Args:
+            code (str): Residual program
+            prefix (int): Characters of the original program evaluated
+            replacement (int): Characters of the residual program that
+                recreate the prefix's effect; the rest is the original
+                program from `prefix` on
+            steps (int): Steps the prefix took, saved on every run
+        """
+        self.code = code
+        self.prefix = prefix
+        self.replacement = replacement
+        self.steps = steps
+
+def input_free_prefix(code: str) -> int:
+    """
+    Length of the longest prefix that cannot read input and ends outside
+    any loop
+    """
+    read = code.find(',')
+    if read < 0:
+        return len(code)
+    return top_level_position(code, read)
+
+def top_level_position(code: str, position: int) -> int:
+    """
+    The last position up to a given one that is outside every loop
+    """
+    depth = 0
+    start = 0
+    for ip in range(position):
+        char = code[ip]
+        if char == '[':
+            if depth == 0:
+                start = ip
+            depth += 1
+        elif char == ']':
+            depth -= 1
+    return start if depth else position
+
+def _adjust(delta: int) -> str:
+    """
+    Shortest code adding delta to a cell
+    """
+    delta %= 256
+    return '+' * delta if delta <= 128 else '-' * (256 - delta)
+
+def _write(output: List[int]) -> str:
+    """
+    Code writing the given output from cell 0, which it leaves holding
+    the last value
+    """
+    parts = []
+    cell = 0
+    for value in output:
+        parts += [_adjust(value - cell), '.']
+        cell = value
+    return ''.join(parts)
+
+def _recreate(output: List[int], memory: List[int], pointer: int, peak_pointer: int) -> str:
+    """
+    Code writing the given output and then leaving a zeroed tape in the
+    given state
+    """
+    parts = [_write(output), _adjust(memory[0] - (output[-1] if output else 0))]
+    position = 0
+    for index in range(1, len(memory)):
+        if memory[index]:
+            parts += ['>' * (index - position), _adjust(memory[index])]
+            position = index
+    # Visiting the peak pointer grows the tape as the prefix did
+    parts += ['>' * (peak_pointer - position), '<' * (peak_pointer - pointer)]
+    return ''.join(parts)
+
+def partially_evaluate(code: str, max_steps: int = DEFAULT_PARTIAL_EVAL_STEPS) -> PartialEvaluation:
+    """
+    Evaluate the input-free prefix of a program
+
+    Args:
+        code (str): Brainfuck source code with balanced brackets
+        max_steps (int): Steps the prefix may take
+
+    Returns:
+        PartialEvaluation: Residual program, equivalent to the original on
+        any input
+    """
+    interpreter = BrainfuckInterpreter(max_steps=max_steps)
+    interpreter.logger = _run_logger
+    prefix = input_free_prefix(code)
+    while prefix > 0:
+        prefix_code = code[:prefix]
+        context = interpreter._new_context(prefix_code, [], None)
+        context.emitted = []
+        interpreter._advanced_interpret(prefix_code, context)
+        if context.steps < max_steps:
+            break
+        # Resume from the last top-level position the run got past
+        if context.ip is not None:
+            stop = context.ip
+        else:
+            nodes = interpreter._preprocess_ir(prefix_code)
+            node = nodes[context.pc] if context.pc < len(nodes) else None
+            stop = prefix if node is None else node[7] if node[0] == BLOCK else node[2]
+        prefix = top_level_position(code, min(stop, prefix - 1))
+    if prefix == 0:
+        return PartialEvaluation(code, 0, 0, 0)
+
+    if prefix == len(code) and context.emitted:
+        # The result of a run that writes output is the output
+        replacement = _write(context.emitted)
+    else:
+        replacement = _recreate(context.emitted, context.memory, context.pointer,
+                                context.peak_pointer)
+    return PartialEvaluation(replacement + code[prefix:], prefix, len(replacement),
+                             context.steps)
@@ -0,0 +1,207 @@
+"""
+Brainfuck Execution Profiles
+
+Summarises a profiled interpreter run: how often every instruction ran,
+how many iterations every loop made, how far the pointer travelled and how
+often every cell was touched. With a source map the counts roll up to
+TinySol lines, and `collapsed_stacks` produces the folded format read by
+flame graph tools (one "frame;frame;frame count" line per stack).
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.ast2brainfuck.source_map import describe_scope
+
+# Instructions that read or write the current cell
+CELL_INSTRUCTIONS = '+-.,[]'
+
+# Frame of code that no function or statement produced
+UNMAPPED_FRAME = '<runtime>'
+
+class LoopProfile:
+    """
+    Execution statistics of one loop.
+    """
+    def __init__(self, start: int, end: int, entries: int, iterations: int,
+                 location: Optional[str] = None):
+        """
+        Args:
+            start (int): Offset of the loop's '['
+            end (int): Offset of the matching ']'
+            entries (int): Times execution reached the loop
+            iterations (int): Times the loop body ran
+            location (Optional[str]): TinySol location of the loop, if known
+        """
+        self.start = start
+        self.end = end
+        self.entries = entries
+        self.iterations = iterations
+        self.location = location
+
+class ExecutionProfile:
+    """
+    Counts collected by the interpreter during one profiled run.
+    """
+    def __init__(self, code: str, counts: List[int], cell_touches: List[int],
+                 pointer_travel: int, bracket_map: Dict[int, int],
+                 source_map: Optional[Any] = None):
+        """
+        Args:
+            code (str): Program that was run
+            counts (List[int]): Executions of the instruction at each offset
+            cell_touches (List[int]): Reads and writes of each tape cell
+            pointer_travel (int): Cells the pointer moved in total
+            bracket_map (Dict[int, int]): Matching bracket offsets
+            source_map (Optional[SourceMap]): Source map of the program
+        """
+        self.code = code
+        self.counts = counts
+        self.cell_touches = cell_touches
+        self.pointer_travel = pointer_travel
+        self.bracket_map = bracket_map
+        self.source_map = source_map
+
+    @property
+    def steps(self) -> int:
+        """
+        Executed instructions
+        """
+        return sum(self.counts)
+
+    def instruction_counts(self) -> Dict[str, int]:
+        """
+        Executions by instruction
+
+        Returns:
+            Dict[str, int]: Count for each of the eight instructions that ran
+        """
+        totals = Counter()
+        for instruction, count in zip(self.code, self.counts):
+            if count:
+                totals[instruction] += count
+        return dict(totals)
+
+    def loops(self) -> List[LoopProfile]:
+        """
+        Loops that ran, hottest first
+
+        Returns:
+            List[LoopProfile]: Per-loop entry and iteration counts
+        """
+        loops = []
+        for start, end in self.bracket_map.items():
+            if start > end or not self.counts[start]:
+                continue
+            # The body's first instruction (or ']' of an empty body) runs
+            # once per iteration
+            location = self.source_map.describe(start) if self.source_map else None
+            loops.append(LoopProfile(start, end, self.counts[start], self.counts[start + 1], location))
+        return sorted(loops, key=lambda loop: (-loop.iterations, loop.start))
+
+    def heatmap(self) -> List[Tuple[int, int]]:
+        """
+        Touched cells, hottest first
+
+        Returns:
+            List[Tuple[int, int]]: (cell, touches) pairs
+        """
+        cells = [(cell, touches) for cell, touches in enumerate(self.cell_touches) if touches]
+        return sorted(cells, key=lambda item: (-item[1], item[0]))
+
+    def line_counts(self) -> Dict[Optional[int], int]:
+        """
+        Executed instructions by TinySol line; None collects code that no
+        statement produced. Requires a source map.
+
+        Returns:
+            Dict[Optional[int], int]: Steps by line
+        """
+        totals = Counter()
+        if self.source_map is None:
+            return {None: self.steps}
+        mapped = 0
+        for source_range in self.source_map.ranges:
+            count = sum(self.counts[source_range.start:source_range.end])
+            if count:
+                totals[source_range.line] += count
+                mapped += count
+        if self.steps > mapped:
+            totals[None] += self.steps - mapped
+        return dict(totals)
+
+    def collapsed_stacks(self) -> str:
+        """
+        Steps by stack in the folded format of flame graph tools. With a
+        source map the frames are functions and statements, otherwise they
+        are the nested loops of the program.
+
+        Returns:
+            str: One 'frame;frame;... count' line per stack
+        """
+        totals = Counter()
+        if self.source_map is not None:
+            for offset, frames in self._mapped_stacks():
+                totals[frames] += self.counts[offset]
+        else:
+            loops = []
+            for offset, instruction in enumerate(self.code):
+                if instruction == ']':
+                    loops.pop()
+                if self.counts[offset]:
+                    totals[tuple(loops)] += self.counts[offset]
+                if instruction == '[':
+                    loops.append(f"loop@{offset}")
+        return '\n'.join(f"{';'.join(frames) or UNMAPPED_FRAME} {count}"
+                         for frames, count in sorted(totals.items()) if count)
+
+    def _mapped_stacks(self) -> Iterator[Tuple[int, Tuple[str, ...]]]:
+        """
+        Yield (offset, frames) for every executed instruction
+        """
+        for offset, count in enumerate(self.counts):
+            if not count:
+                continue
+            source_range = self.source_map.lookup(offset)
+            if source_range is None:
+                yield offset, (UNMAPPED_FRAME,)
+            else:
+                yield offset, tuple(describe_scope(scope) for scope in source_range.stack)
+
+    def report(self, limit: int = 10) -> str:
+        """
+        Flat, human-readable profile
+
+        Args:
+            limit (int): Entries listed per section
+
+        Returns:
+            str: Report text
+        """
+        steps = self.steps
+        lines = [f"steps: {steps}  pointer travel: {self.pointer_travel}  "
+                 f"cells touched: {len(self.heatmap())}"]
+        lines.append("instructions: " + "  ".join(
+            f"{instruction} {count}" for instruction, count in sorted(self.instruction_counts().items())))
+
+        if self.source_map is not None:
+            # Lines are described by their outermost (leftmost) statement
+            descriptions = {}
+            for source_range in sorted(self.source_map.ranges,
+                                       key=lambda r: -(r.column or 0)):
+                descriptions[source_range.line] = source_range.describe()
+            lines.append("hot lines:")
+            for line, count in sorted(self.line_counts().items(),
+                                      key=lambda item: -item[1])[:limit]:
+                location = descriptions.get(line) if line is not None else None
+                lines.append(f"  {count:>10} {100 * count / steps:5.1f}%  "
+                             f"{location or UNMAPPED_FRAME}")
+
+        lines.append("hot loops:")
+        for loop in self.loops()[:limit]:
+            lines.append(f"  {loop.iterations:>10} iterations {loop.entries:>8} entries  "
+                         f"[{loop.start}:{loop.end}] {loop.location or ''}".rstrip())
+
+        lines.append("hot cells:")
+        for cell, touches in self.heatmap()[:limit]:
+            lines.append(f"  {touches:>10} touches  cell {cell}")
+        return '\n'.join(lines)
@@ -0,0 +1,105 @@
+"""
+Brainfuck Tapes
+
+The interpreter's default tape is a dense list of cells starting at cell
+0: it doubles whenever the pointer passes its end, and '<' stops at cell
+0. `PagedTape` is the alternative for programs that spread out: it holds
+fixed-size bytearray pages, allocated when a cell of theirs is first
+written, in both directions from cell 0. Memory use follows the cells a
+program touches rather than the distance its pointer travels, and the
+pointer may move left of cell 0.
+
+A paged tape supports what the interpreter does with a tape: reading and
+writing cells by index and scanning for a zero cell. Cells are bytes, so
+input values are stored modulo 256.
+"""
+
+import sys
+from typing import Dict, Iterator, Tuple
+
+# Cells per page, as a power of two
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+class PagedTape:
+    """
+    A tape of bytes, unbounded in both directions, allocated in pages.
+    """
+    # Lowest cell the pointer can reach
+    floor = -sys.maxsize
+
+    def __init__(self):
+        self.pages: Dict[int, bytearray] = {}
+        # The page accessed last: reads and writes within it skip the
+        # page lookup
+        self.page = bytearray(PAGE_SIZE)
+        self.base = 0
+        self.pages[0] = self.page
+
+    def __getitem__(self, index: int) -> int:
+        offset = index - self.base
+        if 0 <= offset < PAGE_SIZE:
+            return self.page[offset]
+        page = self.pages.get(index >> PAGE_BITS)
+        if page is None:
+            return 0
+        self.page, self.base = page, index & ~PAGE_MASK
+        return page[index & PAGE_MASK]
+
+    def __setitem__(self, index: int, value: int) -> None:
+        offset = index - self.base
+        if 0 <= offset < PAGE_SIZE:
+            self.page[offset] = value & 0xff
+            return
+        number = index >> PAGE_BITS
+        page = self.pages.get(number)
+        if page is None:
+            page = self.pages[number] = bytearray(PAGE_SIZE)
+        self.page, self.base = page, number << PAGE_BITS
+        page[index & PAGE_MASK] = value & 0xff
+
+    def scan(self, pointer: int, stride: int) -> int:
+        """
+        Find the first zero cell from pointer on in steps of stride
+        cells, searching a page at a time
+
+        Args:
+            pointer (int): Cell to start from
+            stride (int): Cells per step, negative for left
+
+        Returns:
+            int: Cell found
+        """
+        while True:
+            page = self.pages.get(pointer >> PAGE_BITS)
+            if page is None:
+                return pointer
+            cells = page[pointer & PAGE_MASK::stride]
+            found = cells.find(0)
+            if found >= 0:
+                return pointer + found * stride
+            pointer += len(cells) * stride
+
+    def bounds(self) -> Tuple[int, int]:
+        """
+        First and last cell of the allocated pages
+        """
+        return min(self.pages) << PAGE_BITS, ((max(self.pages) + 1) << PAGE_BITS) - 1
+
+    def cells(self) -> Iterator[Tuple[int, int]]:
+        """
+        The non-zero cells, as (index, value) pairs in index order
+        """
+        for number in sorted(self.pages):
+            base = number << PAGE_BITS
+            for offset, value in enumerate(self.pages[number]):
+                if value:
+                    yield base + offset, value
+
+    @property
+    def allocated(self) -> int:
+        """
+        Cells allocated
+        """
+        return len(self.pages) * PAGE_SIZE
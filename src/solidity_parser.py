@@ -1,22 +1,36 @@
 import re
 import logging
 from typing import List, Dict, Any
+from src.artifact_cache import get_artifact_cache
 
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+class Token(str):
+    """A token that remembers where it starts in the source (1-based)."""
+    def __new__(cls, text, line=None, column=None):
+        token = super().__new__(cls, text)
+        token.line = line
+        token.column = column
+        return token
+
 class ASTNode:
     def __init__(self, type, value=None, children=None):
         self.type = type
         self.value = value
         self.children = children or []
+        # Source position of statements and functions, set by the parser
+        self.line = None
+        self.column = None
 
 class ArrayNode(ASTNode):
-    def __init__(self, name, dimensions, element_type='int'):
+    def __init__(self, name, dimensions, element_type='int', initializer=None):
         super().__init__('Array')
         self.name = name
         self.dimensions = dimensions
         self.element_type = element_type
+        # Constant element values in row-major order; later elements are zero
+        self.initializer = initializer
 
 class ArrayAccessNode(ASTNode):
     def __init__(self, array_name, indices):
@@ -32,6 +46,30 @@ class FunctionNode(ASTNode):
         self.return_type = return_type
         self.body = body
 
+class ParseError(Exception):
+    """Exception raised for malformed TinySol source."""
+    pass
+
+# Binary operator precedence levels, lowest first
+BINARY_PRECEDENCE = [
+    ['||'],
+    ['&&'],
+    ['==', '!='],
+    ['<', '<=', '>', '>='],
+    ['+', '-'],
+    ['*', '/', '%'],
+]
+
+# Tokens that end an expression at nesting level zero
+EXPRESSION_TERMINATORS = {';', ')', ']', ',', '{', '}'}
+
+# Comments are skipped; every other match of the pattern is a token
+TOKEN_PATTERN = re.compile(
+    r'//[^\n]*|/\*.*?\*/|'
+    r'(int\[.*?\]|\b(?:int|return|while|for|if|else)\b|\+\+|--|&&|\|\||'
+    r'==|!=|>=|<=|>|<|\+|-|\*|/|%|!|=|\(|\)|\{|\}|\[|\]|;|,|\w+|\d+)',
+    re.DOTALL)
+
 class SolidityParser:
     def __init__(self):
         self.variables = {}
@@ -43,17 +81,34 @@ class SolidityParser:
         """
         Enhanced tokenization with robust error handling
         
+        Token streams are memoized in the shared artifact cache; each call
+        returns a fresh list, since parsing consumes it.
+        
+        :param code: Raw TinySol code
+        :return: List of tokens
+        """
+        tokens = get_artifact_cache().get_or_compute(
+            'tokens', code, lambda: tuple(self._tokenize(code)))
+        return list(tokens)
+
+    def _tokenize(self, code: str) -> List[str]:
+        """
+        Split raw TinySol code into tokens that know their line and column
+        
         :param code: Raw TinySol code
         :return: List of tokens
         """
         try:
-            # Remove comments
-            code = re.sub(r'//.*?\n|/\*.*?\*/', '', code, flags=re.DOTALL)
-            code = code.replace('\n', ' ').replace('\t', ' ')
-            
-            # Enhanced tokenization pattern
-            pattern = r'(int\[.*?\]|int|return|while|if|else|==|!=|>=|<=|>|<|\+|-|\*|/|=|\(|\)|\{|\}|\[|\]|;|\w+|\d+)'
-            tokens = re.findall(pattern, code)
+            tokens = []
+            line, position = 1, 0
+            for match in TOKEN_PATTERN.finditer(code):
+                if match.group(1) is None:
+                    continue
+                start = match.start()
+                line += code.count('\n', position, start)
+                position = start
+                column = start - code.rfind('\n', 0, start)
+                tokens.append(Token(match.group(1), line, column))
             
             logger.debug(f"Tokenization result: {tokens}")
             return tokens
@@ -65,9 +120,26 @@ class SolidityParser:
         """
         Enhanced parsing with robust error handling and recursion limit
         
+        Top-level ASTs are memoized in the shared artifact cache and shared
+        between callers, so they must be treated as read-only.
+        
+        :param code: Raw TinySol code
+        :param depth: Current recursion depth
+        :return: Root AST node
+        """
+        if depth == 0:
+            return get_artifact_cache().get_or_compute(
+                'ast', code, lambda: self._parse(code, depth))
+        return self._parse(code, depth)
+
+    def _parse(self, code: str, depth=0) -> ASTNode:
+        """
+        Parse TinySol code into a fresh AST
+        
         :param code: Raw TinySol code
         :param depth: Current recursion depth
         :return: Root AST node
+        :raises ParseError: If the code is malformed
         """
         if depth > self.max_recursion_depth:
             raise RecursionError("Maximum parsing depth exceeded")
@@ -79,35 +151,58 @@ class SolidityParser:
             logger.debug(f"Starting parsing with tokens: {tokens}")
             
             while tokens:
-                try:
-                    if self._is_array_declaration(tokens):
-                        array_node = self._parse_array_declaration(tokens)
-                        root.children.append(array_node)
-                        tokens = tokens[tokens.index(';') + 1:] if ';' in tokens else []
-                    elif tokens[0] == 'int' and len(tokens) > 2 and tokens[2] == '(':
-                        # Function definition
-                        function_node = self._parse_function_definition(tokens)
-                        root.children.append(function_node)
-                        tokens = tokens[tokens.index('}') + 1:] if '}' in tokens else []
-                    else:
-                        # Regular statement parsing
-                        statement = self._parse_statement(tokens, depth + 1)
-                        if statement:
-                            root.children.append(statement)
-                            tokens = tokens[tokens.index(';') + 1:] if ';' in tokens else []
-                        else:
-                            # If no statement could be parsed, break to prevent infinite loop
-                            logger.warning(f"Unable to parse tokens: {tokens}")
-                            break
-                except Exception as parse_error:
-                    logger.error(f"Error parsing tokens {tokens}: {parse_error}")
-                    break
+                if tokens[0] == ';':
+                    tokens.pop(0)
+                elif self._is_function_definition(tokens):
+                    root.children.append(self._parse_function_definition(tokens, depth + 1))
+                else:
+                    statement = self._parse_statement(tokens, depth + 1)
+                    if statement is None:
+                        raise ParseError(f"Unable to parse tokens: {tokens[:8]}")
+                    root.children.append(statement)
             
             return root
         except Exception as e:
             logger.error(f"Parsing error: {e}")
             raise
 
+    def _expect(self, tokens: List[str], expected: str) -> str:
+        """
+        Consume the next token, which must equal the expected one
+        
+        :param tokens: List of tokens
+        :param expected: Required token
+        :return: Consumed token
+        :raises ParseError: If the next token differs
+        """
+        if not tokens or tokens[0] != expected:
+            found = tokens[0] if tokens else 'end of input'
+            raise ParseError(f"Expected '{expected}' but found '{found}'")
+        return tokens.pop(0)
+
+    def _locate(self, node: ASTNode, token: str) -> ASTNode:
+        """
+        Give a node the source position of the token it starts with
+        
+        :param node: Parsed AST node
+        :param token: First token of the node
+        :return: The node
+        """
+        node.line = getattr(token, 'line', None)
+        node.column = getattr(token, 'column', None)
+        return node
+
+    def _is_function_definition(self, tokens: List[str]) -> bool:
+        """
+        Check if tokens start a function definition
+        
+        :param tokens: List of tokens
+        :return: Boolean indicating function definition
+        """
+        return (len(tokens) > 2 and 
+                tokens[0] == 'int' and 
+                tokens[2] == '(')
+
     def _is_array_declaration(self, tokens: List[str]) -> bool:
         """
         Check if tokens represent an array declaration
@@ -115,83 +210,83 @@ class SolidityParser:
         :param tokens: List of tokens
         :return: Boolean indicating array declaration
         """
-        try:
-            return (len(tokens) > 2 and 
-                    tokens[0] == 'int' and 
-                    '[' in tokens[1] and 
-                    ']' in tokens[1])
-        except Exception as e:
-            logger.error(f"Error in array declaration check: {e}")
-            return False
+        return (len(tokens) > 2 and 
+                tokens[0] == 'int' and 
+                tokens[2] == '[')
 
-    def _parse_function_definition(self, tokens: List[str]) -> FunctionNode:
+    def _parse_function_definition(self, tokens: List[str], depth=0) -> FunctionNode:
         """
-        Parse function definition with improved error handling and loop prevention
+        Parse function definition
         
         :param tokens: List of tokens
+        :param depth: Current recursion depth
         :return: Function AST node
         """
         try:
             # Extract function details
+            start = tokens[0]
             return_type = tokens.pop(0)  # 'int'
             function_name = tokens.pop(0)
-            tokens.pop(0)  # Remove '('
+            self._expect(tokens, '(')
             
-            # Parse parameters
+            # Parse parameters, including array parameters such as int m[3][3]
             parameters = []
             while tokens and tokens[0] != ')':
                 param_type = tokens.pop(0)
                 param_name = tokens.pop(0)
-                parameters.append({'type': param_type, 'name': param_name})
+                parameter = {'type': param_type, 'name': param_name}
+                dimensions = self._parse_dimensions(tokens)
+                if dimensions:
+                    parameter['dimensions'] = dimensions
+                parameters.append(parameter)
                 if tokens and tokens[0] == ',':
                     tokens.pop(0)
+            self._expect(tokens, ')')
             
-            if not tokens or tokens[0] != ')':
-                raise ValueError("Expected ')' after function parameters")
-            tokens.pop(0)  # Remove ')'
-            
-            if not tokens or tokens[0] != '{':
-                raise ValueError("Expected '{' after function declaration")
-            tokens.pop(0)  # Remove '{'
-            
-            # Parse function body
-            body = ASTNode('Block')
-            brace_count = 1  # Track nested braces
-            max_iterations = 1000  # Prevent infinite loops
-            iterations = 0
-            
-            while tokens and brace_count > 0 and iterations < max_iterations:
-                if tokens[0] == '{':
-                    brace_count += 1
-                elif tokens[0] == '}':
-                    brace_count -= 1
-                
-                if brace_count == 0:
-                    break
-                
-                statement = self._parse_statement(tokens)
-                if statement:
-                    body.children.append(statement)
-                    if tokens and tokens[0] == ';':
-                        tokens.pop(0)  # Remove ';'
-                else:
-                    # If no statement could be parsed, move to next token
-                    tokens.pop(0)
-                
-                iterations += 1
-            
-            if iterations == max_iterations:
-                raise ValueError("Function body parsing exceeded maximum iterations")
-            
-            if not tokens or tokens[0] != '}':
-                raise ValueError("Expected '}' at end of function body")
-            tokens.pop(0)  # Remove '}'
-            
-            return FunctionNode(function_name, parameters, return_type, body)
+            body = self._parse_block(tokens, depth + 1)
+            return self._locate(FunctionNode(function_name, parameters, return_type, body), start)
         except Exception as e:
             logger.error(f"Error parsing function definition: {e}")
             raise
 
+    def _parse_block(self, tokens: List[str], depth=0) -> ASTNode:
+        """
+        Parse a brace-delimited block of statements
+        
+        :param tokens: List of tokens
+        :param depth: Current recursion depth
+        :return: Block AST node
+        """
+        if depth > self.max_recursion_depth:
+            raise RecursionError("Maximum block parsing depth exceeded")
+
+        self._expect(tokens, '{')
+        body = ASTNode('Block')
+        while tokens and tokens[0] != '}':
+            if tokens[0] == ';':
+                tokens.pop(0)
+                continue
+            statement = self._parse_statement(tokens, depth + 1)
+            if statement is None:
+                raise ParseError(f"Unable to parse statement: {tokens[:8]}")
+            body.children.append(statement)
+        self._expect(tokens, '}')
+        return body
+
+    def _parse_dimensions(self, tokens: List[str]) -> List[int]:
+        """
+        Parse constant array dimensions such as [10][10]
+        
+        :param tokens: List of tokens
+        :return: List of dimension sizes
+        """
+        dimensions = []
+        while len(tokens) > 2 and tokens[0] == '[' and tokens[1].isdigit() and tokens[2] == ']':
+            tokens.pop(0)
+            dimensions.append(int(tokens.pop(0)))
+            tokens.pop(0)
+        return dimensions
+
     def _parse_array_declaration(self, tokens: List[str]) -> ArrayNode:
         """
         Parse array declaration
@@ -201,27 +296,55 @@ class SolidityParser:
         """
         # Remove 'int'
         tokens.pop(0)
-        
-        # Parse array declaration
-        array_def = tokens.pop(0)
-        
-        # Extract array name and dimensions
-        match = re.match(r'(\w+)(\[.*?\])', array_def)
-        if not match:
-            raise ValueError(f"Invalid array declaration: {array_def}")
-        
-        array_name = match.group(1)
-        dimensions_str = match.group(2)
+        array_name = tokens.pop(0)
         
         # Parse dimensions
-        dimensions = [int(d) for d in re.findall(r'\d+', dimensions_str)]
+        dimensions = self._parse_dimensions(tokens)
+        if not dimensions:
+            raise ParseError(f"Invalid array declaration: {array_name}")
         
         # Optional initialization
+        initializer = None
         if tokens and tokens[0] == '=':
             tokens.pop(0)  # Remove '='
-            # TODO: Implement array initialization parsing
+            initializer = self._parse_array_initializer(tokens)
+            size = 1
+            for dimension in dimensions:
+                size *= dimension
+            if len(initializer) > size:
+                raise ParseError(
+                    f"Too many initializers for {array_name}: {len(initializer)} for {size} elements")
+        self._expect(tokens, ';')
         
-        return ArrayNode(array_name, dimensions)
+        return ArrayNode(array_name, dimensions, initializer=initializer)
+
+    def _parse_array_initializer(self, tokens: List[str]) -> List[int]:
+        """
+        Parse a braced list of integer constants such as {{1, 2}, {3, -4}};
+        nested braces are flattened in row-major order
+        
+        :param tokens: List of tokens
+        :return: Element values
+        """
+        self._expect(tokens, '{')
+        values = []
+        while tokens and tokens[0] != '}':
+            if tokens[0] == '{':
+                values.extend(self._parse_array_initializer(tokens))
+            else:
+                sign = -1 if tokens[0] == '-' else 1
+                if tokens[0] == '-':
+                    tokens.pop(0)
+                if not tokens or not tokens[0].isdigit():
+                    raise ParseError(
+                        f"Array initializers must be integer constants, found '{tokens[0] if tokens else ''}'")
+                values.append(sign * int(tokens.pop(0)))
+            if tokens and tokens[0] == ',':
+                tokens.pop(0)
+            elif tokens and tokens[0] != '}':
+                raise ParseError(f"Expected ',' or '}}' in array initializer, found '{tokens[0]}'")
+        self._expect(tokens, '}')
+        return values
 
     def _parse_statement(self, tokens: List[str], depth=0) -> ASTNode:
         """
@@ -238,17 +361,25 @@ class SolidityParser:
             if not tokens:
                 return None
 
-            if tokens[0] == 'int':
-                return self._parse_variable_declaration(tokens)
+            start = tokens[0]
+            if self._is_array_declaration(tokens):
+                statement = self._parse_array_declaration(tokens)
+            elif tokens[0] == 'int':
+                statement = self._parse_variable_declaration(tokens)
+            elif tokens[0] == 'return':
+                statement = self._parse_return(tokens)
+            elif tokens[0] in ['while', 'if', 'for']:
+                statement = self._parse_control_flow(tokens, depth)
             elif self._is_array_access(tokens[0], tokens):
-                return self._parse_array_access(tokens)
-            elif tokens[0] in ['while', 'if']:
-                return self._parse_control_flow(tokens, depth)
+                statement = self._parse_array_access(tokens)
             elif self._is_assignment(tokens[0], tokens):
-                return self._parse_assignment(tokens)
+                statement = self._parse_assignment(tokens)
             elif self._is_function_call(tokens[0], tokens):
-                return self._parse_function_call(tokens)
-            return None
+                statement = self._parse_function_call(tokens)
+                self._expect(tokens, ';')
+            else:
+                return None
+            return self._locate(statement, start)
         except Exception as e:
             logger.error(f"Error parsing statement: {e}")
             raise
@@ -257,39 +388,57 @@ class SolidityParser:
         """
         Check if tokens represent an array access
         """
-        try:
-            return (len(tokens) > 2 and 
-                    tokens[1] == '[' and 
-                    ']' in tokens)
-        except Exception as e:
-            logger.error(f"Error in array access check: {e}")
-            return False
+        return (len(tokens) > 2 and 
+                tokens[1] == '[' and 
+                ']' in tokens)
 
-    def _parse_array_access(self, tokens: List[str]) -> ArrayAccessNode:
+    def _parse_array_access(self, tokens: List[str]) -> ASTNode:
         """
-        Parse array access
+        Parse an array element access used as a statement, which is
+        normally the target of an assignment such as matrix[i][j] = x;
         
         :param tokens: List of tokens
-        :return: Array access AST node
+        :return: Assignment or array access AST node
         """
         try:
-            array_name = tokens.pop(0)
-            tokens.pop(0)  # Remove '['
-            
-            indices = []
-            while tokens[0] != ']':
-                index = tokens.pop(0)
-                indices.append(index)
-                if tokens[0] == ',':
-                    tokens.pop(0)
-            
-            tokens.pop(0)  # Remove ']'
-            
-            return ArrayAccessNode(array_name, indices)
+            target = self._parse_array_reference(tokens)
+            if tokens and tokens[0] == '=':
+                tokens.pop(0)  # Remove '='
+                value, expression = self._parse_expression_with_text(tokens)
+                self._expect(tokens, ';')
+                return ASTNode('Assignment', 
+                               {'variable': target.array_name, 
+                                'indices': target.indices, 
+                                'target': target, 
+                                'value': value, 
+                                'expression': expression})
+            self._expect(tokens, ';')
+            return target
         except Exception as e:
             logger.error(f"Error parsing array access: {e}")
             raise
 
+    def _parse_array_reference(self, tokens: List[str]) -> ArrayAccessNode:
+        """
+        Parse name[index][index]... with arbitrary index expressions
+        
+        :param tokens: List of tokens
+        :return: Array access AST node with index expressions as children
+        """
+        array_name = tokens.pop(0)
+        indices = []
+        index_nodes = []
+        while tokens and tokens[0] == '[':
+            tokens.pop(0)  # Remove '['
+            text, index = self._parse_expression_with_text(tokens)
+            self._expect(tokens, ']')
+            indices.append(text)
+            index_nodes.append(index)
+        
+        node = ArrayAccessNode(array_name, indices)
+        node.children = index_nodes
+        return node
+
     def _parse_variable_declaration(self, tokens):
         """
         Parse variable declaration with optional initialization
@@ -304,42 +453,59 @@ class SolidityParser:
             # Optional assignment
             if tokens and tokens[0] == '=':
                 tokens.pop(0)  # Remove '='
-                value = tokens.pop(0)  # Get value
+                value, expression = self._parse_expression_with_text(tokens)
+                self._expect(tokens, ';')
                 return ASTNode('VariableDeclaration', 
-                               {'name': name, 'value': value})
+                               {'name': name, 'value': value, 'expression': expression})
             
+            self._expect(tokens, ';')
             return ASTNode('VariableDeclaration', {'name': name})
         except Exception as e:
             logger.error(f"Error parsing variable declaration: {e}")
             raise
 
+    def _parse_return(self, tokens):
+        """
+        Parse return statement with optional value
+        """
+        tokens.pop(0)  # Remove 'return'
+        if tokens and tokens[0] == ';':
+            tokens.pop(0)
+            return ASTNode('Return', {'value': '', 'expression': None})
+        
+        value, expression = self._parse_expression_with_text(tokens)
+        self._expect(tokens, ';')
+        return ASTNode('Return', {'value': value, 'expression': expression})
+
     def _is_assignment(self, token, tokens):
         """
         Check if tokens represent an assignment
         """
-        try:
-            return (len(tokens) > 2 and 
-                    tokens[1] == '=')
-        except Exception as e:
-            logger.error(f"Error in assignment check: {e}")
-            return False
+        return (len(tokens) > 2 and 
+                tokens[1] == '=') or (len(tokens) > 1 and tokens[1] in ['++', '--'])
 
-    def _parse_assignment(self, tokens):
+    def _parse_assignment(self, tokens, terminator=';'):
         """
-        Parse assignment with support for simple and complex expressions
+        Parse assignment with support for simple and complex expressions,
+        including the i++ / i-- shorthand
         """
         try:
             variable = tokens.pop(0)
-            tokens.pop(0)  # Remove '='
+            operator = tokens.pop(0)  # '=', '++' or '--'
             
-            # Collect expression tokens
-            expression = []
-            while tokens and tokens[0] != ';':
-                expression.append(tokens.pop(0))
+            if operator in ['++', '--']:
+                value = f"{variable} {operator[0]} 1"
+                expression = ASTNode('BinaryExpression', operator[0], 
+                                     [ASTNode('Identifier', variable), ASTNode('Literal', 1)])
+            else:
+                value, expression = self._parse_expression_with_text(tokens)
             
+            if terminator:
+                self._expect(tokens, terminator)
             return ASTNode('Assignment', 
                            {'variable': variable, 
-                            'value': ' '.join(expression)})
+                            'value': value, 
+                            'expression': expression})
         except Exception as e:
             logger.error(f"Error parsing assignment: {e}")
             raise
@@ -348,12 +514,8 @@ class SolidityParser:
         """
         Check if tokens represent a function call
         """
-        try:
-            return (len(tokens) > 2 and 
-                    tokens[1] == '(')
-        except Exception as e:
-            logger.error(f"Error in function call check: {e}")
-            return False
+        return (len(tokens) > 2 and 
+                tokens[1] == '(')
 
     def _parse_function_call(self, tokens):
         """
@@ -361,73 +523,124 @@ class SolidityParser:
         """
         try:
             function_name = tokens.pop(0)
-            tokens.pop(0)  # Remove '('
+            self._expect(tokens, '(')
             
             arguments = []
-            while tokens[0] != ')':
-                arg = tokens.pop(0)
-                arguments.append(arg)
-                if tokens[0] == ',':
+            argument_nodes = []
+            while tokens and tokens[0] != ')':
+                text, argument = self._parse_expression_with_text(tokens)
+                arguments.append(text)
+                argument_nodes.append(argument)
+                if tokens and tokens[0] == ',':
                     tokens.pop(0)
-            
-            tokens.pop(0)  # Remove ')'
+            self._expect(tokens, ')')
             
             return ASTNode('FunctionCall', 
                            {'name': function_name, 
-                            'arguments': arguments})
+                            'arguments': arguments}, 
+                           argument_nodes)
         except Exception as e:
             logger.error(f"Error parsing function call: {e}")
             raise
 
-    def _parse_expression(self, tokens):
+    def _parse_expression_with_text(self, tokens):
         """
-        Parse simple arithmetic expressions
+        Parse an expression and also return its source text
         """
-        try:
-            # Collect expression tokens
-            expression = []
-            while tokens and tokens[0] not in [';', ')', ']']:
-                expression.append(tokens.pop(0))
-            
-            return ASTNode('Expression', 
-                           {'value': ' '.join(expression)})
-        except Exception as e:
-            logger.error(f"Error parsing expression: {e}")
-            raise
+        remaining = len(tokens)
+        snapshot = tokens[:]
+        expression = self._parse_expression(tokens)
+        text = ' '.join(snapshot[:remaining - len(tokens)])
+        return text, expression
+
+    def _parse_expression(self, tokens, level=0):
+        """
+        Parse arithmetic, comparison and logical expressions into a tree
+        of Literal, Identifier, UnaryExpression, BinaryExpression,
+        FunctionCall and ArrayAccess nodes using precedence climbing
+        """
+        if level == len(BINARY_PRECEDENCE):
+            return self._parse_unary(tokens)
+        
+        left = self._parse_expression(tokens, level + 1)
+        while tokens and tokens[0] in BINARY_PRECEDENCE[level]:
+            operator = tokens.pop(0)
+            right = self._parse_expression(tokens, level + 1)
+            left = ASTNode('BinaryExpression', operator, [left, right])
+        return left
+
+    def _parse_unary(self, tokens):
+        """
+        Parse unary operators and primary expressions
+        """
+        if not tokens or tokens[0] in EXPRESSION_TERMINATORS:
+            raise ParseError("Expected an expression")
+        
+        token = tokens[0]
+        if token in ['!', '-']:
+            tokens.pop(0)
+            return ASTNode('UnaryExpression', token, [self._parse_unary(tokens)])
+        if token == '(':
+            tokens.pop(0)
+            expression = self._parse_expression(tokens)
+            self._expect(tokens, ')')
+            return expression
+        if token.isdigit():
+            tokens.pop(0)
+            return ASTNode('Literal', int(token))
+        if re.match(r'^[A-Za-z_]\w*$', token):
+            if len(tokens) > 1 and tokens[1] == '(':
+                return self._parse_function_call(tokens)
+            if len(tokens) > 1 and tokens[1] == '[':
+                return self._parse_array_reference(tokens)
+            tokens.pop(0)
+            return ASTNode('Identifier', token)
+        raise ParseError(f"Unexpected token in expression: '{token}'")
 
     def _parse_control_flow(self, tokens, depth=0):
         """
-        Parse control flow statements (if, while)
+        Parse control flow statements (if/else, while, for)
         """
         if depth > self.max_recursion_depth:
             raise RecursionError("Maximum control flow parsing depth exceeded")
 
         try:
-            control_type = tokens.pop(0)  # 'if' or 'while'
-            tokens.pop(0)  # Remove '('
+            control_type = tokens.pop(0)  # 'if', 'while' or 'for'
+            self._expect(tokens, '(')
             
-            # Parse condition
-            condition = []
-            while tokens[0] != ')':
-                condition.append(tokens.pop(0))
+            if control_type == 'for':
+                init = self._parse_statement(tokens, depth + 1)
+                condition, test = self._parse_expression_with_text(tokens)
+                self._expect(tokens, ';')
+                update = self._parse_assignment(tokens, terminator=None)
+                self._expect(tokens, ')')
+                body = self._parse_block(tokens, depth + 1)
+                return ASTNode('For', 
+                               {'init': init, 
+                                'condition': condition, 
+                                'test': test, 
+                                'update': update, 
+                                'body': body})
             
-            tokens.pop(0)  # Remove ')'
-            tokens.pop(0)  # Remove '{'
+            # Parse condition
+            condition, test = self._parse_expression_with_text(tokens)
+            self._expect(tokens, ')')
             
             # Parse body
-            body = ASTNode('Block')
-            while tokens[0] != '}':
-                statement = self._parse_statement(tokens, depth + 1)
-                if statement:
-                    body.children.append(statement)
-                    if tokens and tokens[0] == ';':
-                        tokens.pop(0)  # Remove ';'
+            body = self._parse_block(tokens, depth + 1)
+            value = {'condition': condition, 'test': test, 'body': body}
             
-            tokens.pop(0)  # Remove '}'
+            if control_type == 'if':
+                alternate = None
+                if tokens and tokens[0] == 'else':
+                    tokens.pop(0)
+                    if tokens and tokens[0] == 'if':
+                        alternate = ASTNode('Block', children=[self._parse_control_flow(tokens, depth + 1)])
+                    else:
+                        alternate = self._parse_block(tokens, depth + 1)
+                value['alternate'] = alternate
             
-            return ASTNode(control_type.capitalize(), 
-                           {'condition': ' '.join(condition), 
-                            'body': body})
+            return ASTNode(control_type.capitalize(), value)
         except Exception as e:
             logger.error(f"Error parsing control flow: {e}")
             raise
@@ -0,0 +1,213 @@
+"""
+Tests for array declarations, indexed access and array parameters
+"""
+
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator, TranslationError
+from src.ast2brainfuck.translators.array_translator import array_layout, array_size
+from src.brainfuck_interpreter import BrainfuckInterpreter, interpret_brainfuck
+
+MATRIX_TRACE = """
+int matrix_trace(int rows, int cols) {
+    int matrix[10][10];
+    int trace = 0;
+    int i = 0;
+    while (i < rows) {
+        int j = 0;
+        while (j < cols) {
+            matrix[i][j] = (i * cols) + j;
+            j = j + 1;
+        }
+        i = i + 1;
+    }
+    i = 0;
+    while (i < rows) {
+        trace = trace + matrix[i][i];
+        i = i + 1;
+    }
+    return trace;
+}
+
+int main() {
+    return matrix_trace(5, 5);
+}
+"""
+
+def run(source, **options):
+    brainfuck_code = TinySolToBrainfuckTranslator(**options).compile(source)
+    return interpret_brainfuck(brainfuck_code)
+
+def test_array_layout():
+    """
+    Elements hold one cell per dimension plus value and data cells, and
+    the array is preceded by one outer stride of zero cells.
+    """
+    assert array_layout([10]) == (3, 3, [3])
+    assert array_layout([10, 10]) == (40, 4, [40, 4])
+    assert array_size([2, 3, 4]) == 60 + 2 * 60
+
+def test_constant_and_dynamic_indices():
+    """
+    Constant indices, variables and expressions address the same elements.
+    """
+    source = """
+    int main() {
+        int a[6];
+        int i = 0;
+        while (i < 6) { a[i] = i * i; i = i + 1; }
+        int k = 2;
+        return a[5] + a[k] * 10 + a[k + 1];
+    }
+    """
+    assert run(source) == [25 + 40 + 9]
+
+def test_multidimensional_arrays():
+    """
+    Every dimension may mix constant and dynamic indices.
+    """
+    source = """
+    int main() {
+        int cube[2][3][4];
+        int i = 0;
+        while (i < 2) {
+            int j = 0;
+            while (j < 3) {
+                int k = 0;
+                while (k < 4) { cube[i][j][k] = i * 20 + j * 5 + k; k = k + 1; }
+                j = j + 1;
+            }
+            i = i + 1;
+        }
+        int j = 2;
+        return cube[1][j][3] + cube[1][1][j] - cube[j - 2][0][1];
+    }
+    """
+    assert run(source) == [33 + 27 - 1]
+
+def test_elements_default_to_zero_and_wrap():
+    """
+    Declared arrays start zeroed and elements hold 8-bit values.
+    """
+    source = """
+    int main() {
+        int a[4];
+        a[1] = 200;
+        a[1] = a[1] + 100;
+        return a[0] + a[1] + a[3];
+    }
+    """
+    assert run(source) == [44]
+
+def test_array_initializers():
+    """
+    Braced constants initialize elements in row-major order; elements
+    without a value are zero.
+    """
+    source = """
+    int main() {
+        int m[2][2] = {{1, -2}, {3, 4}};
+        int a[4] = {5, 6};
+        int i = 3;
+        return m[0][1] + m[1][0] * 10 + m[1][1] + a[0] + a[1] + a[i];
+    }
+    """
+    assert run(source) == [(-2 + 30 + 4 + 5 + 6) % 256]
+    assert run("int a[3] = {1, 2, 3}; int s = a[0] + a[1] * 10 + a[2] * 100;")[0] == 321 % 256
+
+def test_index_read_from_the_array_itself():
+    """
+    Element values can be used as indices of the same array.
+    """
+    source = """
+    int main() {
+        int next[5];
+        next[0] = 3; next[3] = 1; next[1] = 4; next[4] = 2;
+        int node = 0;
+        int steps = 0;
+        while (steps < 4) { node = next[node]; steps = steps + 1; }
+        return node;
+    }
+    """
+    assert run(source) == [2]
+
+def test_arrays_in_top_level_programs():
+    """
+    Top-level arrays keep their values in memory after the program ends.
+    """
+    memory = run("int a[3]; a[0] = 7; a[2] = a[0] + 1;")
+    assert 7 in memory and 8 in memory
+
+def test_array_parameters_are_passed_by_reference():
+    """
+    Callees read and write the caller's array in place.
+    """
+    source = """
+    int fill(int values[8], int count) {
+        int i = 0;
+        while (i < count) { values[i] = i + 1; i = i + 1; }
+        return 0;
+    }
+    int total(int values[8]) {
+        int sum = 0;
+        int i = 0;
+        while (i < 8) { sum = sum + values[i]; i = i + 1; }
+        return sum;
+    }
+    int main() {
+        int data[8];
+        fill(data, 5);
+        return total(data);
+    }
+    """
+    assert run(source) == [15]
+
+def test_arrays_in_dispatched_functions():
+    """
+    Functions in the dispatch loop may use local arrays.
+    """
+    source = """
+    int digits(int n) {
+        int parts[3];
+        parts[0] = n % 10;
+        parts[1] = (n / 10) % 10;
+        parts[2] = n / 100;
+        return parts[0] + parts[1] + parts[2];
+    }
+    int main() { return digits(123) + digits(45); }
+    """
+    assert run(source, inline_budget=0) == [15]
+
+def test_matrix_trace_benchmark():
+    """
+    matrix_trace(5, 5) stays well within the interpreter step limit.
+
+    Accesses walk O(index) elements with the scalars of the frame placed
+    next to the array, which keeps this around 230k steps.
+    """
+    interpreter = BrainfuckInterpreter(max_steps=300_000)
+    brainfuck_code = TinySolToBrainfuckTranslator().compile(MATRIX_TRACE)
+    assert interpreter.interpret(brainfuck_code) == [60]
+
+@pytest.mark.parametrize("source, message", [
+    ("int main() { int a[3]; return a[3]; }", "out of range"),
+    ("int main() { int a[3]; return a; }", "cannot be used as a value"),
+    ("int main() { int a[3][3]; return a[1]; }", "2 dimensions"),
+    ("int main() { return b[0]; }", "Undeclared array"),
+    ("int f(int v[4]) { return v[0]; } int main() { int a[5]; return f(a); }", "shape"),
+    ("int f(int v[4]) { return v[0]; } int main() { return f(3); }", "shape"),
+    ("int f(int v) { return v; } int main() { int a[4]; return f(a); }", "scalar"),
+    ("int f(int v[3]) { return v[0]; } int main() { int m[2][3]; return f(m[1]); }", "Sub-arrays"),
+    ("int main() { int a[2] = {1, 2, 3}; return a[0]; }", "Too many initializers"),
+    ("int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); } "
+     "int total(int v[3]) { return fib(v[0]) + v[1]; } "
+     "int main() { int a[3] = {4, 2, 1}; return total(a); }", "total takes an array parameter"),
+    ("int f(int v[2], int n) { if (n == 0) { return v[0]; } return f(v, n - 1); } "
+     "int main() { int a[2]; return f(a, 3); }", "f takes an array parameter"),
+    ("int main() { int x = 1; int a[2] = {x, 2}; return a[0]; }", "integer constants"),
+])
+def test_invalid_array_use(source, message):
+    """
+    Invalid array accesses and arguments are reported at compile time.
+    """
+    with pytest.raises(TranslationError, match=message):
+        TinySolToBrainfuckTranslator().compile(source)
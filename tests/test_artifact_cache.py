@@ -0,0 +1,86 @@
+"""
+Tests for the shared in-process artifact cache
+"""
+
+import pytest
+from src.artifact_cache import ArtifactCache, get_artifact_cache, estimate_size
+from src.ast2brainfuck import translate_to_brainfuck
+from src.brainfuck_interpreter import BrainfuckInterpreter, BrainfuckInterpreterError
+from src.solidity_parser import SolidityParser
+
+@pytest.fixture
+def shared_cache():
+    cache = get_artifact_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+def test_lru_eviction_respects_budget():
+    """
+    The least recently used entry is evicted once the budget is exceeded.
+    """
+    entry_size = estimate_size('x' * 100) + estimate_size('x')
+    cache = ArtifactCache(max_bytes=3 * entry_size)
+    for name in ['a', 'b', 'c']:
+        cache.put('code', name, name * 100)
+    cache.get('code', 'a')
+    cache.put('code', 'd', 'd' * 100)
+
+    assert cache.get('code', 'b') is None
+    assert cache.get('code', 'a') == 'a' * 100
+    assert cache.current_bytes <= cache.max_bytes
+    assert cache.stats()['evictions'] >= 1
+
+def test_zero_budget_disables_caching():
+    """
+    A zero budget stores nothing.
+    """
+    cache = ArtifactCache(max_bytes=0)
+    assert cache.get_or_compute('code', 'key', lambda: 'value') == 'value'
+    assert len(cache) == 0
+
+def test_failed_computation_is_not_cached():
+    """
+    Exceptions propagate and leave no entry behind.
+    """
+    cache = ArtifactCache()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute('code', 'key', fail)
+    assert len(cache) == 0
+
+def test_front_end_artifacts_are_shared(shared_cache):
+    """
+    Repeated tokenize/parse/translate calls hit the shared cache.
+    """
+    code = "int x = 5; int y = 3; x = x + y;"
+    parser = SolidityParser()
+
+    first_tokens = parser.tokenize(code)
+    first_tokens.pop()
+    assert parser.tokenize(code) != first_tokens
+
+    ast = parser.parse(code)
+    assert SolidityParser().parse(code) is ast
+    assert shared_cache.stats()['kinds']['ast']['hits'] == 1
+
+    translate_to_brainfuck(code)
+    translate_to_brainfuck(code)
+
+    kinds = shared_cache.stats()['kinds']
+    assert kinds['tokens']['hits'] >= 1
+    assert kinds['brainfuck'] == {'hits': 1, 'misses': 1}
+
+def test_bracket_maps_are_shared(shared_cache):
+    """
+    Interpreters reuse bracket maps but still reject unbalanced code.
+    """
+    interpreter = BrainfuckInterpreter()
+    assert interpreter._preprocess_brackets('+[->+<]') is interpreter._preprocess_brackets('+[->+<]')
+
+    with pytest.raises(BrainfuckInterpreterError):
+        interpreter._preprocess_brackets('[[')
+    assert shared_cache.get('brackets', '[[') is None
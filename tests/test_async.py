@@ -0,0 +1,80 @@
+"""
+Tests for async runs
+"""
+
+import asyncio
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+# Counts the next cell up forever
+SPIN = '+[>+<]'
+
+def test_async_runs_match_blocking_runs():
+    """
+    Runs paused and continued every few steps end exactly like blocking
+    runs, in the interpreter and in compiled loops.
+    """
+    with open('examples/fibonacci.tinysol') as source:
+        fibonacci = TinySolToBrainfuckTranslator().compile(source.read())
+    programs = [fibonacci, '++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.', '+++[>+<-]>[>]<<[<]+.']
+    for code in programs:
+        for options in ({}, {'jit_threshold': 1}, {'superinstructions': ()}):
+            for max_steps in (40, 1_000_000):
+                interpreter = BrainfuckInterpreter(memory_size=8, max_steps=max_steps, **options)
+                expected = interpreter.run(code)
+                for slice_steps in (1, 7, 1000):
+                    context = asyncio.run(interpreter.run_async(code, slice_steps=slice_steps))
+                    assert context.finished and not context.timed_out
+                    assert (context.result, context.steps, context.peak_memory,
+                            context.memory) == (expected.result, expected.steps,
+                                                expected.peak_memory, expected.memory)
+
+def test_output_streams_while_the_run_continues():
+    """
+    Values written by '.' arrive through the stream before the run ends.
+    """
+    async def collect():
+        stream = BrainfuckInterpreter().stream('+++++[>+.<-]>[-.]', slice_steps=2)
+        received = []
+        async for value in stream:
+            received.append((value, stream.context.finished))
+        return received, stream.context
+    received, context = asyncio.run(collect())
+    assert [value for value, _ in received] == [1, 2, 3, 4, 5, 4, 3, 2, 1, 0]
+    assert not received[0][1]
+    assert context.finished and context.result == BrainfuckInterpreter().interpret(
+        '+++++[>+.<-]>[-.]')
+
+def test_runs_share_the_event_loop_and_can_be_cancelled():
+    """
+    Endless runs yield between slices: other tasks keep running, and
+    cancellation stops a run.
+    """
+    interpreter = BrainfuckInterpreter(max_steps=10 ** 12)
+
+    async def main():
+        stream = interpreter.stream(SPIN, slice_steps=500)
+        task = asyncio.create_task(stream.__anext__())
+        ticks = 0
+        while stream.context.steps < 5000:
+            ticks += 1
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return ticks, stream.context
+    ticks, context = asyncio.run(main())
+    assert ticks >= 10
+    assert not context.finished
+
+def test_runs_end_at_their_deadline():
+    """
+    A run that passes its deadline ends at the next slice with its output
+    so far, like a run reaching the step limit.
+    """
+    interpreter = BrainfuckInterpreter(max_steps=10 ** 12)
+    context = asyncio.run(interpreter.run_async('+++.' + SPIN, slice_steps=1000, timeout=0.05))
+    assert context.timed_out and not context.finished
+    assert context.result == [3]
+    assert 0 < context.steps < interpreter.max_steps
@@ -0,0 +1,75 @@
+"""
+Tests for batched lockstep execution
+"""
+
+import pytest
+import src.brainfuck_batch as brainfuck_batch
+from src.brainfuck_batch import BatchInterpreter
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+requires_numpy = pytest.mark.skipif(brainfuck_batch.np is None, reason="NumPy is not installed")
+
+# Multiplies two inputs by repeated addition: loops run for as many
+# iterations as the inputs say, so lanes diverge
+MULTIPLY = ',>,<[>[->+>+<<]>>[-<<+>>]<<<-]>>.'
+
+def assert_lanes_match_scalar_runs(batch, code, input_streams):
+    """
+    Every lane of a batch ends like a scalar run with the same input
+    """
+    results = batch.interpret(code, input_streams)
+    for lane, input_stream in enumerate(input_streams):
+        scalar = BrainfuckInterpreter(memory_size=batch.memory_size, max_steps=batch.max_steps)
+        assert results[lane] == scalar.interpret(code, input_stream)
+        assert batch.steps[lane] == scalar.steps
+        assert batch.peak_memory[lane] == scalar.peak_memory
+        assert batch.memories[lane] == scalar.memory
+    return results
+
+@requires_numpy
+def test_lanes_run_in_lockstep():
+    """
+    Lanes run together over divergent loops and produce the results of
+    scalar runs.
+    """
+    input_streams = [[a, b] for a in range(0, 12) for b in range(0, 12, 3)]
+    batch = BatchInterpreter(memory_size=8)
+    results = assert_lanes_match_scalar_runs(batch, MULTIPLY, input_streams)
+    assert results[input_streams.index([7, 9])] == [63]
+    assert len(batch.scalar_lanes) < len(input_streams)
+
+    # Inputs above 255, input exhausted, clear loops, scans and tape growth
+    code = ',[>,]<[<]>[[-]>]+' + '>+' * 20 + '[<]>.'
+    assert_lanes_match_scalar_runs(BatchInterpreter(memory_size=4), code,
+                                   [[], [300], [1, 2, 3], [255, 0, 9], [5] * 12])
+
+@requires_numpy
+def test_divergent_and_limited_lanes_continue_alone():
+    """
+    Lanes that keep iterating after most others stopped, reach the step
+    limit or could move off the left end of the tape continue in the
+    scalar interpreter from where they left the batch.
+    """
+    input_streams = [[1, 1]] * 30 + [[200, 200]]
+    batch = BatchInterpreter(memory_size=8)
+    assert_lanes_match_scalar_runs(batch, MULTIPLY, input_streams)
+    assert batch.scalar_lanes == [30]
+
+    batch = BatchInterpreter(memory_size=8, max_steps=400)
+    assert_lanes_match_scalar_runs(batch, MULTIPLY, [[2, 3], [9, 9], [30, 4]])
+    assert 0 not in batch.scalar_lanes and 2 in batch.scalar_lanes
+
+    assert_lanes_match_scalar_runs(BatchInterpreter(divergence_limit=0), ',[<<+>>-]<<.',
+                                   [[0], [3]])
+    # A limit of 1 moves lanes out at the first divergence
+    assert_lanes_match_scalar_runs(BatchInterpreter(divergence_limit=1), MULTIPLY,
+                                   [[1, 2], [3, 4], [5, 6]])
+
+def test_batches_run_without_numpy(monkeypatch):
+    """
+    Without NumPy every lane runs in the scalar interpreter.
+    """
+    monkeypatch.setattr(brainfuck_batch, 'np', None)
+    batch = BatchInterpreter(memory_size=8)
+    assert assert_lanes_match_scalar_runs(batch, MULTIPLY, [[2, 3], [4, 5]]) == [[6], [20]]
+    assert batch.scalar_lanes == [0, 1]
@@ -0,0 +1,74 @@
+"""
+Tests for the benchmark suite and the interpreter statistics it reports
+"""
+
+import copy
+from benchmarks.run_benchmarks import (
+    benchmark_program, collect_programs, compare_reports, run_benchmarks)
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+SOURCE = """
+int main() {
+    int total = 0;
+    for (int i = 0; i < 4; i++) { total = total + i; }
+    return total;
+}
+"""
+
+def test_interpreter_records_statistics():
+    """
+    The interpreter keeps the step count and tape size of its last run.
+    """
+    interpreter = BrainfuckInterpreter()
+    interpreter.interpret('>>+<<++[->+<]')
+    assert interpreter.steps == 18
+    assert interpreter.peak_memory == 3
+
+def test_programs_are_collected():
+    """
+    Examples and the TinySol programs of the BDD tests are benchmarked.
+    """
+    programs = collect_programs()
+    assert 'examples/fibonacci' in programs
+    assert 'bdd/test_factorial_computation' in programs
+    assert 'factorial' in programs['bdd/test_factorial_computation']
+
+def test_benchmark_record():
+    """
+    A record holds compile times, code size and per-backend run results.
+    """
+    record = benchmark_program('sum', SOURCE, 2, ['python'])
+    assert record['code_length'] > 0
+    assert min(record['tokenize_time'], record['parse_time'], record['compile_time']) >= 0
+    result = record['backends']['python']
+    assert result['output'] == [6]
+    assert result['completed'] and result['steps'] > 0 and result['peak_memory'] > 0
+
+def test_compilation_errors_are_recorded():
+    """
+    Programs that fail to compile are reported rather than aborting the run.
+    """
+    report = run_benchmarks({'broken': 'int main() { return f(1); }'}, levels=[0])
+    assert 'error' in report['results'][0]
+
+def test_compare_reports():
+    """
+    Larger code, more steps and changed outputs are regressions, small
+    timing noise is not.
+    """
+    baseline = run_benchmarks({'sum': SOURCE}, levels=[2])
+    assert compare_reports(baseline, baseline) == []
+
+    report = copy.deepcopy(baseline)
+    record = report['results'][0]
+    record['compile_time'] += 0.01
+    assert compare_reports(report, baseline) == []
+
+    record['code_length'] += 1
+    record['backends']['python']['steps'] += 1
+    record['backends']['python']['output'] = [7]
+    record['backends']['python']['wall_time'] += 1.0
+    regressions = compare_reports(report, baseline)
+    assert len(regressions) == 4
+    assert any('code_length' in regression for regression in regressions)
+    assert any('wall_time' in regression for regression in regressions)
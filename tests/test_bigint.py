@@ -0,0 +1,140 @@
+"""
+Tests for multi-cell integers and the range analysis that sizes them
+"""
+
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.ast2brainfuck.range_analysis import analyze_ranges, cells_for
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.solidity_parser import SolidityParser
+
+FACTORIAL = """
+int factorial(int n) {
+    if (n <= 1) {
+        return 1;
+    }
+    return n * factorial(n - 1);
+}
+
+int main() {
+    return factorial(10);
+}
+"""
+
+FAST_EXPONENTIATION = """
+int fast_exponentiation(int base, int exponent) {
+    int result = 1;
+    while (exponent > 0) {
+        if (exponent % 2 == 1) {
+            result = result * base;
+        }
+        base = base * base;
+        exponent = exponent / 2;
+    }
+    return result;
+}
+
+int main() {
+    return fast_exponentiation(3, 13);
+}
+"""
+
+def run_wide(source, integer_cells=4):
+    """
+    Compile with multi-cell integers and return the decimal output
+    """
+    code = TinySolToBrainfuckTranslator(integer_cells=integer_cells).compile(source)
+    context = BrainfuckInterpreter(max_steps=10 ** 8).run(code)
+    return bytes(context.output).decode()
+
+def test_wide_results_are_printed_in_decimal():
+    """
+    Values beyond one cell are computed exactly and printed in decimal,
+    through inlined and dispatched (recursive) functions alike.
+    """
+    assert run_wide(FACTORIAL) == '3628800'
+    assert run_wide(FAST_EXPONENTIATION) == str(3 ** 13)
+    assert run_wide('int x = 65535; return x * 65537;') == '4294967295'
+
+def test_return_values_are_always_decimal():
+    """
+    With several cells per integer, single-cell return values are printed
+    in decimal too, so the output does not depend on the inferred width.
+    """
+    assert run_wide('int main() { return 3; }') == '3'
+    assert run_wide('int main() { return 300; }') == '300'
+    assert run_wide('int main() { return 0 - 1; }') == str(256 ** 4 - 1)
+
+def test_wide_arithmetic_and_comparisons():
+    """
+    Subtraction, division, modulo and comparisons work across cells.
+    """
+    source = """
+    int main() {
+        int a = 123456;
+        int b = a * 7 - 1000;
+        int score = 0;
+        if (b > a) { score = score + 1; }
+        if (a < 123457) { score = score + 2; }
+        if (b == 863192) { score = score + 4; }
+        if (a != b) { score = score + 8; }
+        if (b <= 863191) { score = score + 16; }
+        if (a >= 123456) { score = score + 32; }
+        return (b / 789) * 1000000 + (b % 789) * 100 + score;
+    }
+    """
+    b = 123456 * 7 - 1000
+    assert run_wide(source) == str((b // 789) * 1000000 + (b % 789) * 100 + 47)
+
+def test_integers_wrap_at_the_configured_width():
+    """
+    Arithmetic is unsigned modulo 256 ** integer_cells.
+    """
+    assert run_wide('int x = 65535; return x * 65537 + 1;') == '0'
+    assert run_wide('int x = 300; return x * x;', integer_cells=2) == str(90000 % 65536)
+
+def test_subtraction_below_zero_wraps_at_the_configured_width():
+    """
+    Differences that may go below zero are not narrowed to a single cell,
+    so they wrap modulo 256 ** integer_cells as well.
+    """
+    assert run_wide('int main() { int a = 3; a = a - 5; return a; }', integer_cells=2) == '65534'
+    assert run_wide('int x = 0; x = x - 1; return x / 256;', integer_cells=2) == '255'
+    assert run_wide('int main() { int a = 5; int b = 2 - a; return b + 10; }', integer_cells=2) == '7'
+
+def test_small_variables_stay_single_cells():
+    """
+    Range analysis gives cells only to values that need them, so programs
+    whose values fit a cell compile as they would without the option, up
+    to the decimal output of the return value.
+    """
+    source = 'int main() { int a = 3; int b = a * 4; return b - 2; }'
+    narrow = TinySolToBrainfuckTranslator().compile(source)
+    wide = TinySolToBrainfuckTranslator(integer_cells=4).compile(source)
+    assert wide.startswith(narrow[:narrow.rindex('.')].rstrip('<>'))
+    assert run_wide(source) == '10'
+
+    program = SolidityParser().parse("""
+    int main() {
+        int i = 0;
+        int total = 0;
+        while (i < 10) {
+            total = total + 1000;
+            i = i + 1;
+        }
+        return total;
+    }
+    """)
+    ranges = analyze_ranges(program, 4, '<program>').function('main')
+    assert ranges.variable_width('i') == 1
+    assert ranges.variable_width('total') == 4
+    assert cells_for((0, 255), 4) == 1 and cells_for((0, 256), 4) == 2
+
+def test_single_cell_integers_keep_the_default_code():
+    """
+    integer_cells=1 compiles exactly as before: one cell per value.
+    """
+    with open('examples/advanced_computation.tinysol') as source:
+        tinysol_code = source.read()
+    assert (TinySolToBrainfuckTranslator(integer_cells=1).compile(tinysol_code) ==
+            TinySolToBrainfuckTranslator().compile(tinysol_code))
+    assert run_wide(tinysol_code) == '840'
@@ -0,0 +1,71 @@
+"""
+Tests for the bytecode format of compiled programs
+"""
+
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_bytecode import (
+    BYTECODE_MAGIC, BytecodeError, encode_program, load_bytecode, read_bytecode, write_bytecode)
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_ir import fuse, lower
+
+PROGRAMS = ['++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.', ',[>+>++<<-]>>[-<+>]<[>]+<.',
+            '+>+>+>+>>+>+<<<<<<[>]+>>+[<<]+.[>>>]+.']
+
+def test_compiled_programs_run_like_their_source():
+    """
+    A loaded program holds the IR its source lowers to and runs like the
+    source on every backend, with the source map stored with it.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    with open('examples/fibonacci.tinysol') as source:
+        fibonacci = translator.compile(source.read())
+    programs = [(code, None) for code in PROGRAMS] + [(fibonacci, translator.source_map)]
+    for code, source_map in programs:
+        for superinstructions in ((), ('[A]', 'B]')):
+            program = load_bytecode(encode_program(
+                code, superinstructions, source_map, {'name': 'test'}))
+            assert program.nodes == fuse(lower(code), superinstructions)
+            assert ''.join(program) == code and program[2:9] == code[2:9]
+            assert program.metadata == {'name': 'test'}
+            for options in ({}, {'jit_threshold': 1}, {'profile': True}):
+                for max_steps in (40, 10 ** 6):
+                    interpreter = BrainfuckInterpreter(max_steps=max_steps, **options)
+                    expected = interpreter.run(code, [7], source_map)
+                    context = interpreter.run(program, [7])
+                    assert (context.result, context.steps, context.memory,
+                            context.halt_location) == (expected.result, expected.steps,
+                                                       expected.memory, expected.halt_location)
+
+def test_bytecode_files_load_without_copying(tmp_path):
+    """
+    A bytecode file is mapped, and the program reads its source from the
+    map; runs of the source string resume from the compiled program.
+    """
+    code = PROGRAMS[1]
+    path = tmp_path / 'program.bfc'
+    write_bytecode(path, code)
+    program = read_bytecode(path)
+    assert isinstance(program.data, memoryview) and program.source_map is None
+    assert program == read_bytecode(path) and hash(program) == hash(read_bytecode(path))
+
+    interpreter = BrainfuckInterpreter(max_steps=30)
+    checkpoint = interpreter.checkpoint(code, interpreter.run(code, [7]))
+    resumed = BrainfuckInterpreter().resume(program, checkpoint, [7])
+    assert resumed.result == BrainfuckInterpreter().interpret(code, [7])
+
+def test_invalid_bytecode_is_rejected():
+    """
+    Unbalanced programs cannot be compiled, and data that is not bytecode
+    of this version cannot be loaded.
+    """
+    with pytest.raises(BytecodeError, match="Unbalanced"):
+        encode_program('+[[-]')
+    bytecode = encode_program(PROGRAMS[0])
+    assert bytecode.startswith(BYTECODE_MAGIC)
+    with pytest.raises(BytecodeError, match="Not bytecode"):
+        load_bytecode(b'garbage')
+    with pytest.raises(BytecodeError, match="version"):
+        load_bytecode(bytecode[:4] + b'\x09' + bytecode[5:])
+    with pytest.raises(BytecodeError, match="Truncated"):
+        load_bytecode(bytecode[:-3])
@@ -0,0 +1,70 @@
+"""
+Tests for run checkpoints
+"""
+
+import asyncio
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_checkpoint import CHECKPOINT_MAGIC, CheckpointError, decode_checkpoint
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+def test_runs_resume_where_they_stopped():
+    """
+    A run checkpointed at the step limit, inside a block or at a bracket,
+    and resumed on interpreters with other settings ends like a run that
+    never stopped.
+    """
+    with open('examples/fibonacci.tinysol') as source:
+        fibonacci = TinySolToBrainfuckTranslator().compile(source.read())
+    programs = [(fibonacci, []), (',[>+>++<<-]>>[-<+>]<[>]+<.', [200]),
+                ('++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.', [])]
+    for code, input_stream in programs:
+        expected = BrainfuckInterpreter(memory_size=8, profile=True).run(code, input_stream)
+        settings = [{}, {'superinstructions': ()}, {'jit_threshold': 1}]
+        for first_limit in (5, 13, 150, 2000):
+            limits = [first_limit, first_limit * 3, expected.steps + 1]
+            context = BrainfuckInterpreter(memory_size=8, max_steps=limits[0]).run(
+                code, input_stream)
+            for limit, options in zip(limits[1:], settings):
+                checkpoint = BrainfuckInterpreter().checkpoint(code, context)
+                interpreter = BrainfuckInterpreter(max_steps=limit, **options)
+                context = interpreter.resume(code, checkpoint, input_stream)
+            assert (context.result, context.steps, context.peak_memory, context.memory) == (
+                expected.result, expected.steps, expected.peak_memory, expected.memory)
+
+def test_runs_stopped_at_a_deadline_resume():
+    """
+    Runs that ended at a deadline resume from their checkpoint, whose
+    tape holds only the cells the run touched.
+    """
+    code = '+++.>++[>+<-]+[>+<]'
+    interpreter = BrainfuckInterpreter(memory_size=30000, max_steps=10 ** 6)
+    context = asyncio.run(interpreter.run_async(code, slice_steps=100, timeout=0))
+    assert context.timed_out
+    checkpoint = interpreter.checkpoint(code, context)
+    assert checkpoint.startswith(CHECKPOINT_MAGIC) and len(checkpoint) < 100
+
+    state = decode_checkpoint(code, checkpoint)
+    assert (state.pc, state.steps, state.memory, state.output) == (
+        context.pc, context.steps, context.memory, context.output)
+    resumed = interpreter.resume(code, checkpoint)
+    assert resumed.steps == interpreter.max_steps
+    assert resumed.result == interpreter.run(code).result == [3]
+
+def test_checkpoints_of_other_programs_are_rejected():
+    """
+    Resuming a checkpoint of another program, or data that is not a
+    checkpoint of this version, fails.
+    """
+    code = ',>,>+++'
+    interpreter = BrainfuckInterpreter(max_steps=5)
+    checkpoint = interpreter.checkpoint(code, interpreter.run(code, [-7, 300]))
+    assert decode_checkpoint(code, checkpoint).memory[:3] == [-7, 300, 1]
+    with pytest.raises(CheckpointError, match="different program"):
+        interpreter.resume(code + '-', checkpoint)
+    with pytest.raises(CheckpointError, match="Not a checkpoint"):
+        interpreter.resume(code, b'garbage')
+    with pytest.raises(CheckpointError, match="version"):
+        interpreter.resume(code, checkpoint[:4] + b'\x09' + checkpoint[5:])
+    with pytest.raises(CheckpointError, match="Truncated"):
+        interpreter.resume(code, checkpoint[:-3])
@@ -0,0 +1,100 @@
+"""
+Tests for the per-phase statistics of the compile pipeline
+"""
+
+import json
+import pytest
+from src.artifact_cache import get_artifact_cache
+from src.solidity_parser import SolidityParser
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.ast2brainfuck.memory.memory_manager import MemoryManager
+from src.ast2brainfuck.stats import active_stats
+
+SOURCE = """
+int square(int x) {
+    return x * x;
+}
+
+int main() {
+    int total = 0;
+    for (int i = 0; i < 3; i++) {
+        total = total + square(i);
+    }
+    return total;
+}
+"""
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    get_artifact_cache().clear()
+    yield
+    get_artifact_cache().clear()
+
+def test_compile_records_phases_and_counters():
+    """
+    Every phase of a fresh compilation is timed, and code size per node
+    type adds up to the generated program.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    brainfuck_code = translator.compile(SOURCE)
+    stats = translator.stats
+    assert set(stats.phases) == {'split', 'lex', 'parse', 'optimize', 'codegen', 'link', 'peephole'}
+    assert all(phase.wall_time >= 0 and phase.calls >= 1 for phase in stats.phases.values())
+    assert stats.counters['units_compiled'] == 2
+    assert stats.counters['calls_inlined'] == 1
+    assert stats.counters['temps_allocated'] > 0
+    assert stats.counters['instructions'] == len(brainfuck_code)
+
+    nodes = stats.to_dict()['nodes']
+    assert nodes['For']['count'] == 1 and nodes['Function']['count'] >= 2
+    assert sum(node['code_size'] for node in nodes.values()) == len(brainfuck_code)
+
+def test_reused_units_skip_front_end_phases():
+    """
+    Units reused from the cache are counted, and the front end does not run.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    translator.compile(SOURCE)
+    translator.compile(SOURCE + "\n// edited comment\n")
+    stats = translator.stats
+    assert stats.counters['units_reused'] == 2
+    assert 'parse' not in stats.phases and 'codegen' not in stats.phases
+    assert 'link' in stats.phases
+
+def test_translate_records_stats():
+    """
+    Translating a parsed program records its phases as well.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    translator.translate(SolidityParser().parse(SOURCE))
+    assert {'optimize', 'codegen', 'peephole'} <= set(translator.stats.phases)
+    assert translator.stats.node_count['Assignment'] >= 1
+
+def test_stats_are_dumped_as_json(tmp_path):
+    """
+    Statistics can be written to a JSON file after every compilation.
+    """
+    path = tmp_path / 'stats.json'
+    translator = TinySolToBrainfuckTranslator(stats_file=str(path))
+    translator.compile(SOURCE)
+    data = json.loads(path.read_text())
+    assert data['version'] == 1
+    assert data['counters']['instructions'] > 0
+    assert data == json.loads(translator.stats.to_json())
+
+def test_allocation_tracking():
+    """
+    With allocation tracking, phases report the memory they allocated.
+    """
+    translator = TinySolToBrainfuckTranslator(track_allocations=True)
+    translator.compile(SOURCE)
+    assert translator.stats.phases['codegen'].peak_bytes > 0
+
+def test_no_stats_outside_compilation():
+    """
+    Components only record statistics while a compilation is running.
+    """
+    assert active_stats() is None
+    memory_manager = MemoryManager()
+    memory_manager.allocate_temp_memory()
+    assert active_stats() is None
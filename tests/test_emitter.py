@@ -0,0 +1,79 @@
+"""
+Tests for the code emitter and streaming compilation
+"""
+
+import io
+import re
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.ast2brainfuck import peephole
+from src.ast2brainfuck.emitter import CodeEmitter
+from src.ast2brainfuck.source_map import function_scope
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+SOURCE = """int square(int x) {
+    return x * x;
+}
+
+int twice(int x) {
+    return square(x) + square(x);
+}
+
+int main() {
+    int total = 0;
+    for (int i = 0; i < 3; i++) {
+        total = total + twice(i);
+    }
+    return total;
+}
+"""
+
+def test_emitter_buffers_or_streams():
+    """
+    Without a stream the emitter joins its code on demand; with one it
+    writes whenever a chunk has accumulated.
+    """
+    emitter = CodeEmitter().emit('>+').emit('').emit_all(['<', '.'])
+    assert emitter.getvalue() == '>+<.'
+    assert len(emitter) == 4
+
+    stream = io.StringIO()
+    emitter = CodeEmitter(stream, chunk_size=3)
+    emitter.emit('++').emit('>')
+    assert stream.getvalue() == '++>'
+    emitter.emit('-')
+    emitter.flush()
+    assert stream.getvalue() == '++>-'
+    assert len(emitter) == 4
+    with pytest.raises(ValueError):
+        emitter.getvalue()
+
+def test_streamed_peephole_matches_in_memory_output():
+    """
+    Handing finished code to the emitter early does not change what the
+    peephole pass produces or where the source map points.
+    """
+    marked = ('>+[<->-]' + function_scope('f', '>>.<<[>+<-]<>') + '+-<<>>,') * 20
+    code, source_map = peephole.optimize_with_source_map(marked)
+
+    stream = io.StringIO()
+    emitter = CodeEmitter(stream, chunk_size=5)
+    streamed_map = peephole.emit_with_source_map(marked, emitter)
+    emitter.flush()
+    assert stream.getvalue() == code
+    assert streamed_map.to_dict() == source_map.to_dict()
+
+def test_compile_to_file_writes_canonical_code(tmp_path):
+    """
+    Streaming a compilation to a file writes the program `compile`
+    returns, which consists of Brainfuck instructions only.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    brainfuck_code = translator.compile(SOURCE)
+    assert re.fullmatch(r'[<>+\-.,\[\]]+', brainfuck_code)
+
+    path = tmp_path / 'program.bf'
+    assert translator.compile_to_file(SOURCE, str(path)) == len(brainfuck_code)
+    assert path.read_text() == brainfuck_code
+    assert translator.stats.counters['instructions'] == len(brainfuck_code)
+    assert BrainfuckInterpreter().interpret(path.read_text()) == [10]
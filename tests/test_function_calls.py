@@ -0,0 +1,127 @@
+"""
+Tests for function calls: inlining and the shared-body dispatch loop
+"""
+
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator, TranslationError
+from src.brainfuck_interpreter import interpret_brainfuck
+
+FACTORIAL = """
+int factorial(int n) {
+    if (n <= 1) {
+        return 1;
+    }
+    return n * factorial(n - 1);
+}
+
+int main() {
+    return factorial(5);
+}
+"""
+
+def compile_program(source, inline_budget=100000):
+    translator = TinySolToBrainfuckTranslator(inline_budget=inline_budget)
+    return translator.compile(source), translator.node_translators.linker
+
+def test_calls_are_inlined():
+    """
+    Non-recursive calls are inlined, including nested calls in arguments.
+    """
+    source = """
+    int square(int x) { return x * x; }
+    int add(int a, int b) { return a + b; }
+    int main() { int a = 3; return add(square(a), square(a + 1)); }
+    """
+    brainfuck_code, linker = compile_program(source)
+    assert linker.dispatched == set()
+    assert interpret_brainfuck(brainfuck_code) == [25]
+
+def test_assigned_parameters_do_not_change_arguments():
+    """
+    Parameters the callee assigns get their own copy of the argument.
+    """
+    source = """
+    int decrement(int x) { x = x - 1; return x; }
+    int main() { int a = 5; int b = decrement(a); return a * 10 + b; }
+    """
+    brainfuck_code, _ = compile_program(source)
+    assert interpret_brainfuck(brainfuck_code) == [54]
+
+def test_recursive_functions_share_one_body():
+    """
+    Recursive functions, and their callers, run in the dispatch loop.
+    """
+    brainfuck_code, linker = compile_program(FACTORIAL)
+    assert linker.dispatched == {'factorial', 'main'}
+    assert interpret_brainfuck(brainfuck_code) == [120]
+
+def test_mutual_recursion():
+    """
+    Calls between dispatched functions can form cycles.
+    """
+    source = """
+    int ping(int n) { if (n == 0) { return 0; } return 1 + pong(n - 1); }
+    int pong(int n) { if (n == 0) { return 0; } return 2 + ping(n - 1); }
+    int main() { return ping(7); }
+    """
+    brainfuck_code, _ = compile_program(source)
+    assert interpret_brainfuck(brainfuck_code) == [10]
+
+def test_dispatched_functions_with_unreachable_code():
+    """
+    Blocks no path reaches, after an if/else that returns in both
+    branches or after a return, are left out of the dispatch loop.
+    """
+    source = """
+    int fib(int n) { if (n < 2) { return n; } else { return fib(n - 1) + fib(n - 2); } }
+    int count(int n) { if (n < 1) { return 0; } return count(n - 1) + 1; return 7; }
+    int main() { return fib(6) + count(4); }
+    """
+    for inline_budget in (100000, 0):
+        brainfuck_code, linker = compile_program(source, inline_budget)
+        assert {'fib', 'count'} <= linker.dispatched
+        assert interpret_brainfuck(brainfuck_code) == [12]
+
+def test_inline_budget_falls_back_to_dispatch():
+    """
+    Functions over the budget get a shared body with the same results.
+    """
+    source = """
+    int is_prime(int n) {
+        if (n <= 1) { return 0; }
+        for (int i = 2; i * i <= n; i++) {
+            if (n % i == 0) { return 0; }
+        }
+        return 1;
+    }
+    int main() {
+        int count = 0;
+        for (int n = 10; n <= 20; n++) { count = count + is_prime(n); }
+        return count;
+    }
+    """
+    inlined, linker = compile_program(source)
+    assert linker.dispatched == set()
+
+    shared, linker = compile_program(source, inline_budget=0)
+    assert linker.dispatched == {'is_prime', 'main'}
+    assert interpret_brainfuck(inlined) == interpret_brainfuck(shared) == [4]
+
+def test_top_level_statements_can_call_functions():
+    """
+    Variables of a top-level program stay in memory after calls.
+    """
+    source = FACTORIAL.replace("int main() {\n    return factorial(5);\n}", "")
+    memory = interpret_brainfuck(compile_program(source + "int a = factorial(4); int b = a + 1;")[0])
+    assert 24 in memory and 25 in memory
+
+@pytest.mark.parametrize("source", [
+    "int main() { return missing(1); }",
+    "int f(int a, int b) { return a; } int main() { return f(1); }",
+])
+def test_invalid_calls_are_rejected(source):
+    """
+    Calls to unknown functions or with the wrong arity fail to translate.
+    """
+    with pytest.raises(TranslationError):
+        compile_program(source)
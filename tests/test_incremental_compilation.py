@@ -0,0 +1,103 @@
+"""
+Tests for function-granularity incremental compilation
+"""
+
+import pytest
+from src.artifact_cache import get_artifact_cache
+from src.ast2brainfuck import TinySolToBrainfuckTranslator, TranslationError
+from src.ast2brainfuck.incremental import split_compilation_units
+from src.brainfuck_interpreter import interpret_brainfuck
+
+PROGRAM = """
+// Greatest common divisor
+int gcd(int a, int b) {
+    while (b != 0) {
+        int t = b;
+        b = a % b;
+        a = t;
+    }
+    return a;
+}
+
+int main() {
+    int x = 48;
+    return x / 6;
+}
+"""
+
+@pytest.fixture
+def translator():
+    get_artifact_cache().clear()
+    yield TinySolToBrainfuckTranslator()
+    get_artifact_cache().clear()
+
+def run(source):
+    return interpret_brainfuck(TinySolToBrainfuckTranslator().compile(source))
+
+def test_source_splits_into_function_units():
+    """
+    Each function is a unit; top-level statements form a single unit.
+    """
+    units = split_compilation_units(PROGRAM + "int y = 1; int z = y; ")
+    assert [(unit.kind, unit.name) for unit in units] == [
+        ('function', 'gcd'), ('function', 'main'), ('statements', None)]
+    assert '//' not in units[0].text
+
+def test_only_edited_functions_are_recompiled(translator):
+    """
+    Editing main() reuses gcd's fragment; comment and whitespace edits
+    reuse everything.
+    """
+    compiler = translator.incremental_compiler
+    translator.compile(PROGRAM)
+    assert compiler.compiled_units == ['gcd', 'main']
+
+    translator.compile(PROGRAM.replace('x / 6', 'x / 8'))
+    assert compiler.compiled_units == ['main']
+    assert compiler.reused_units == ['gcd']
+
+    translator.compile(PROGRAM.replace('// Greatest', '//   greatest').replace('    ', '\t'))
+    assert compiler.compiled_units == []
+
+def test_incremental_output_matches_full_build(translator):
+    """
+    Relinked programs behave like programs compiled from scratch.
+    """
+    translator.compile(PROGRAM)
+    edited = PROGRAM.replace('x / 6', 'x % 7 + 1')
+    assert translator.compile(edited) == TinySolToBrainfuckTranslator().translate(
+        translator.incremental_compiler.parser.parse(edited))
+    assert interpret_brainfuck(translator.compile(edited)) == [7]
+
+@pytest.mark.parametrize("expression, expected", [
+    ("a + b", 45), ("a - b", 27), ("a * b", 68), ("a / b", 4), ("a % b", 0),
+    ("a == b", 0), ("a != b", 1), ("a < b", 0), ("a >= b", 1), ("!(a > b) || b", 1),
+])
+def test_expressions_compute_expected_values(expression, expected):
+    """
+    main()'s return value is the program output.
+    """
+    assert run(f"int main() {{ int a = 36; int b = 9; return {expression}; }}") == [expected]
+
+def test_early_return_skips_remaining_statements():
+    """
+    A return inside a loop ends the function.
+    """
+    source = """
+    int main() {
+        int i = 0;
+        while (1) {
+            i++;
+            if (i == 9) { return i; }
+        }
+        return 0;
+    }
+    """
+    assert run(source) == [9]
+
+def test_entry_point_must_be_unambiguous(translator):
+    """
+    Top-level statements cannot be mixed with main().
+    """
+    with pytest.raises(TranslationError):
+        translator.compile("int x = 1; int main() { return 1; }")
@@ -0,0 +1,237 @@
+"""
+Tests for the Brainfuck interpreter's fast paths
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.artifact_cache import get_artifact_cache
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_ir import (
+    ADD, AFFINE, BLOCK, CLEAR_LOOP_BOUND, CLOSE, OPEN, OUT, SET, fuse,
+    load_superinstructions, loop_ranges, lower)
+from src.brainfuck_jit import MAX_NESTING, compile_loop, loop_source
+from benchmarks.mine_superinstructions import build_table, count_ngrams
+
+def run_both(code, **options):
+    """
+    Run code with the fast interpreter and with the profiling interpreter,
+    which executes every instruction one at a time
+    """
+    fast = BrainfuckInterpreter(**options)
+    stepwise = BrainfuckInterpreter(profile=True, **options)
+    return (fast.interpret(code), fast.steps, fast.peak_memory, fast.memory, fast.halt_location,
+            stepwise.interpret(code), stepwise.steps, stepwise.peak_memory, stepwise.memory,
+            stepwise.halt_location)
+
+def assert_equivalent(code, **options):
+    fast_output, fast_steps, fast_peak, fast_memory, fast_halt, *stepwise = run_both(code, **options)
+    assert [fast_output, fast_steps, fast_peak, fast_memory, fast_halt] == stepwise
+
+def test_scan_loops_match_stepwise_execution():
+    """
+    Scan loops of any stride and direction stop at the same cell, after
+    the same number of steps, as executing them instruction by instruction.
+    """
+    cells = '>+>+>+>>+>+>+>+>+>>>+'
+    for scan in ('[>]', '[<]', '[>>]', '[<<<]', '[>>>>]'):
+        assert_equivalent(cells + '<<<<<<<' + scan + '+.')
+    # Scans that run past the end of the tape find the zero cells it grows into
+    assert_equivalent('+' + '[>+<-]>' * 3 + '+>+>+<<[>]+.', memory_size=4)
+    assert_equivalent('+>+>+>+>+>+<<<<<' + '[>>>]+.', memory_size=4)
+
+def test_scan_loops_respect_the_step_limit_and_left_edge():
+    """
+    A scan that would pass the step limit, or that runs into the left end
+    of the tape where the pointer stops, runs instruction by instruction.
+    """
+    cells = '+>' * 40 + '+'
+    assert_equivalent(cells + '[<]', max_steps=120)
+    assert_equivalent(cells + '[<<]', max_steps=500)
+    assert_equivalent(cells + '<<<<[>]+.', max_steps=95)
+
+    interpreter = BrainfuckInterpreter()
+    assert interpreter.interpret('>' + '+>' * 1000 + '<[<]+.') == [1]
+    assert interpreter.steps == 2001 + 1 + 1 + 2 * 1000 + 2
+
+def test_straight_line_code_lowers_to_offset_ops():
+    """
+    Straight-line code becomes offset-addressed ops with one pointer shift
+    per block; additions merge and clear loops become Set ops.
+    """
+    nodes = lower('>>++<<+>>-.[-]++<<<>[>]')
+    kind, ops, shift, low, high, cost, bound, start, end, loop = nodes[0]
+    assert kind == BLOCK and loop is None
+    assert ops == ((ADD, 2, 1, 0), (OUT, 2, 0, 0), (SET, 2, 2, -1), (ADD, 0, 1, 0))
+    assert (shift, low, high, start, end) == (0, -1, 2, 0, 20)
+    assert cost == 18 and bound == 18 + CLEAR_LOOP_BOUND
+    assert nodes[1] == (OPEN, 3, 20, 1)
+    assert nodes[3] == (CLOSE, 1, 22)
+
+def test_ir_matches_stepwise_execution():
+    """
+    Running the IR gives the output, steps, tape, peak and halt location of
+    a character-by-character run, including at the step limit, at the left
+    end of the tape and for clear loops.
+    """
+    programs = [
+        '+++[->++<]>[-].+++[+]>,.',
+        '<<+>>+.<<<-[>+<-]>.',
+        '++++++[>++++++<-]>[->+>+<<]>>.',
+        'comment +++ [>+++<-] > .',
+    ]
+    for code in programs:
+        for max_steps in (5, 17, 40, 1000):
+            assert_equivalent(code, max_steps=max_steps)
+
+    with open('examples/fibonacci.tinysol') as source:
+        brainfuck_code = TinySolToBrainfuckTranslator().compile(source.read())
+    for max_steps in (1000, 1_000_000):
+        assert_equivalent(brainfuck_code, max_steps=max_steps)
+
+def test_superinstructions_fuse_mined_patterns():
+    """
+    Affine loops such as transfers become a single AFFINE node and loop
+    bodies absorb their ']'; the original nodes stay in place as the
+    fallback, so jump targets do not move.
+    """
+    nodes = lower('++[->+>+++<<]>[>]')
+    fused = fuse(nodes, ('[A]', 'A]', 'B]'))
+    assert len(fused) == len(nodes)
+    assert fused[1] == (AFFINE, 3, 2, ((1, 1), (2, 3)), -1, 9, 0, 2)
+    assert fused[2][9] == 1 and fused[6][9] == 5
+    assert fused[3:6] == nodes[3:6]
+    assert fuse(nodes, ('[A]',))[2] == nodes[2]
+
+    for code in ('+++[->+>+++<<]>>.', '--[+>-<]>.', '+++[->+<]<<[->+<]>>>.',
+                 '+++++[>+++++[->++<]<-]>>.', '++[<->-]+.'):
+        for max_steps in (3, 12, 30, 1000):
+            assert_equivalent(code, max_steps=max_steps)
+            assert_equivalent(code, max_steps=max_steps, superinstructions=())
+
+def test_superinstruction_table_is_mined_from_ngrams():
+    """
+    The miner counts node shape sequences, optionally weighted by
+    executions, and the shipped table fuses the affine loop.
+    """
+    counts = count_ngrams(lower('>+[->+<]>[-<+>]'))
+    assert counts['B[A'] == 2 and counts['[A]'] == 2 and counts['A]B'] == 1
+    # The loop ran twice: '[' once, the body and ']' twice each
+    weighted = count_ngrams(lower('>++[->+<]'), [1, 1, 1, 1, 2, 2, 2, 2, 2], max_length=2)
+    assert weighted == {'B[': 2, '[A': 3, 'A]': 4}
+
+    table = build_table(counts, top=2, dynamic=False)
+    assert table['weighting'] == 'occurrences'
+    assert table['superinstructions'] == [
+        # Ties are broken by pattern
+        {'pattern': 'A]', 'count': 2, 'fused': True},
+        {'pattern': 'B[', 'count': 2, 'fused': False}]
+    assert '[A]' in load_superinstructions()
+
+def test_tiered_execution_matches_interpreting():
+    """
+    Compiled hot loops produce the output, steps, tape, peak and halt
+    location of a character-by-character run, handing control back to the
+    interpreter at the step limit and at the left end of the tape.
+    """
+    programs = [
+        '++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.',
+        '+++[>++[>+>[>]<<,.<-]<-]+.',
+        '++[>+++[<<+>>-]<-]<+.',
+        '+++[>++[>+++[->+<]>[-<<+>>]<<-]<-]>>.',
+    ]
+    for code in programs:
+        for max_steps in (9, 30, 75, 200, 100_000):
+            for superinstructions in (None, ()):
+                assert_equivalent(code, max_steps=max_steps, jit_threshold=1,
+                                  superinstructions=superinstructions)
+
+    with open('examples/fibonacci.tinysol') as source:
+        brainfuck_code = TinySolToBrainfuckTranslator().compile(source.read())
+    for max_steps in (1000, 1_000_000):
+        assert_equivalent(brainfuck_code, max_steps=max_steps, jit_threshold=2)
+
+def test_loops_compile_once_they_are_hot():
+    """
+    A loop switches to compiled code once it has been entered as often as
+    the threshold, and the compiled function is cached for later runs.
+    """
+    # The inner loop is entered three times, the outer loop once
+    code = '+++[>++[>+<-]<-]>>.'
+    assert BrainfuckInterpreter(jit_threshold=4).interpret(code) == [6]
+    interpreter = BrainfuckInterpreter(jit_threshold=3, superinstructions=())
+    assert interpreter.interpret(code) == [6]
+    assert interpreter.compiled_loops == 1
+
+    nodes = interpreter._preprocess_ir(code)
+    inner = [index for index, node in enumerate(nodes) if node[0] == OPEN][1]
+    function = get_artifact_cache().get('jit', (code, (), inner))
+    assert callable(function)
+    assert interpreter._compile_loop(code, nodes, inner) is function
+    assert 'memory[pointer + 1] = (memory[pointer + 1] + 1) % 256' in loop_source(nodes, inner)
+
+    # Loops nested too deeply for one Python function stay interpreted
+    deep = '+' + '[>+' * (MAX_NESTING + 2) + '[-]' + '<-]' * (MAX_NESTING + 2) + '.'
+    assert compile_loop(lower(deep), 1) is None
+    assert_equivalent(deep, jit_threshold=1, superinstructions=())
+
+def test_balanced_loops_check_bounds_once():
+    """
+    Loops that return the pointer to where they started check the left end
+    of the tape once on entry, and loops of a single such block repeat it
+    without checks; runs near the step limit and the left end of the tape
+    still match a character-by-character run.
+    """
+    nodes = lower('>>+[<<+.[-]>>>[->+<]<-]+[>[>]<-]')
+    # The scan loop leaves its loop unbalanced
+    assert loop_ranges(nodes) == {1: (-2, 2), 3: (0, 1)}
+    assert loop_ranges(fuse(nodes, ('[A]',))) == loop_ranges(nodes)
+
+    source = loop_source(nodes, 1)
+    assert source.count('< floor') == 1 and 'while memory[pointer]:' in source
+    self_loop = loop_source(lower('>>+[<<+.>>>+<-]'), 1)
+    assert self_loop.count('< floor') == 1 and self_loop.count('expand(') == 1
+
+    programs = ['>>+++[<<+.[-]>>>[->+<]<-]<<.', '+++[<+.>-]>.', '>>++[<<+[-]>>-]<<.',
+                '++[>+++[>+.>+<<-]<-]>>>.', '+[>+[>+<-]<<]']
+    for code in programs:
+        for max_steps in (7, 20, 45, 100_000):
+            for options in ({}, {'jit_threshold': 1}, {'superinstructions': ()}):
+                assert_equivalent(code, max_steps=max_steps, **options)
+
+def test_runs_keep_their_state_apart():
+    """
+    Every run starts on a fresh tape and reports its statistics through
+    its own context; the interpreter reflects the last run.
+    """
+    interpreter = BrainfuckInterpreter(memory_size=4)
+    first = interpreter.run('+++>++')
+    second = interpreter.run('+')
+    assert first.memory == [3, 2, 0, 0] and first.steps == 6 and first.peak_memory == 2
+    assert second.memory == [1, 0, 0, 0] and second.steps == 1
+    assert interpreter.memory == second.memory and interpreter.steps == 1
+
+def test_one_interpreter_serves_many_threads():
+    """
+    Runs of one interpreter on a thread pool match sequential runs, with
+    tape, output and statistics per thread.
+    """
+    with open('examples/fibonacci.tinysol') as source:
+        fibonacci = TinySolToBrainfuckTranslator().compile(source.read())
+    jobs = [(fibonacci, []), ('+[>+]', [])]
+    jobs += [(',[>+<-]>[>]+' + '>+' * count + '.', [count]) for count in range(12)]
+
+    def run(interpreter, job):
+        code, input_stream = job
+        context = interpreter.run(code, input_stream)
+        statistics = (context.result, context.steps, context.peak_memory, context.halt_location)
+        # The thread's view of the interpreter is its own last run
+        assert (interpreter.steps, interpreter.memory) == (context.steps, context.memory)
+        return statistics
+
+    for options in ({}, {'jit_threshold': 1}):
+        # The second job runs into the step limit
+        shared = BrainfuckInterpreter(memory_size=8, max_steps=50_000, **options)
+        expected = [run(BrainfuckInterpreter(memory_size=8, max_steps=50_000, **options), job)
+                    for job in jobs * 4]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert list(pool.map(lambda job: run(shared, job), jobs * 4)) == expected
@@ -0,0 +1,56 @@
+"""
+Tests for memory-mapped tapes and programs
+"""
+
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_mmap import load_source
+
+PROGRAMS = ['++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.', ',[>+>++<<-]>>[>>>]+' + '>+' * 40 + '[<]>.',
+            '+>+>+>+>>+>+<<<<<<[>]+>>+[<<]+.[>>>]+.']
+
+def test_mapped_tapes_match_dense_runs(tmp_path):
+    """
+    Anonymous and file-backed tapes grow and run like list tapes, and the
+    file holds the tape after the run.
+    """
+    for code in PROGRAMS:
+        for options in ({}, {'jit_threshold': 1}):
+            expected = BrainfuckInterpreter(memory_size=4, max_steps=5000, **options).run(
+                code, [300])
+            for tape_path in (None, tmp_path / 'tape'):
+                interpreter = BrainfuckInterpreter(memory_size=4, max_steps=5000, tape='mmap',
+                                                   tape_path=tape_path, **options)
+                context = interpreter.run(code, [300])
+                assert (context.output, context.steps, context.peak_memory) == (
+                    expected.output, expected.steps, expected.peak_memory)
+                # Input values wrap to fit the byte cells
+                assert list(context.memory[:]) == [value % 256 for value in expected.memory]
+                if tape_path is not None:
+                    assert tape_path.read_bytes() == context.memory[:]
+
+def test_mapped_sources_run_like_strings(tmp_path):
+    """
+    A memory-mapped source file runs, is cached and resumes from
+    checkpoints like the string it holds.
+    """
+    with open('examples/fibonacci.tinysol') as source:
+        fibonacci = TinySolToBrainfuckTranslator().compile(source.read())
+    for index, code in enumerate(PROGRAMS + [fibonacci]):
+        path = tmp_path / f'program{index}.bf'
+        path.write_text(code)
+        mapped = load_source(path)
+        assert len(mapped) == len(code) and mapped[3:9] == code[3:9] and ''.join(mapped) == code
+        assert mapped == load_source(path) and hash(mapped) == hash(load_source(path))
+        for options in ({}, {'jit_threshold': 1}, {'profile': True}):
+            interpreter = BrainfuckInterpreter(max_steps=500, **options)
+            expected = interpreter.run(code, [7])
+            context = interpreter.run(mapped, [7])
+            assert (context.result, context.steps, context.memory) == (
+                expected.result, expected.steps, expected.memory)
+
+        # A run of the string resumes from the mapped file
+        interpreter = BrainfuckInterpreter(max_steps=50)
+        checkpoint = interpreter.checkpoint(code, interpreter.run(code, [7]))
+        resumed = BrainfuckInterpreter().resume(mapped, checkpoint, [7])
+        assert resumed.result == BrainfuckInterpreter().interpret(code, [7])
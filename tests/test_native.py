@@ -0,0 +1,95 @@
+"""
+Tests for the native (C) backend
+"""
+
+import pytest
+import src.brainfuck_native as brainfuck_native
+from src.artifact_cache import get_artifact_cache
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_ir import lower
+from src.brainfuck_native import c_source, find_compiler, load_program
+from benchmarks.run_benchmarks import benchmark_program
+
+requires_compiler = pytest.mark.skipif(find_compiler() is None, reason="no C compiler")
+
+@pytest.fixture(autouse=True)
+def native_cache(tmp_path, monkeypatch):
+    """
+    Build shared objects in a fresh directory, with a cold artifact cache
+    """
+    monkeypatch.setattr(brainfuck_native, 'DEFAULT_CACHE_DIR', tmp_path)
+    get_artifact_cache().clear()
+    yield tmp_path
+    get_artifact_cache().clear()
+
+def run_both(code, input_stream=None, **options):
+    """
+    Run code natively and with the profiling interpreter, which executes
+    every instruction one at a time
+    """
+    native = BrainfuckInterpreter(native=True, **options)
+    stepwise = BrainfuckInterpreter(profile=True, **options)
+    native_result = (native.interpret(code, input_stream), native.steps, native.peak_memory,
+                     native.memory, native.halt_location)
+    stepwise_result = (stepwise.interpret(code, input_stream), stepwise.steps,
+                       stepwise.peak_memory, stepwise.memory, stepwise.halt_location)
+    assert native_result == stepwise_result
+    return native
+
+@requires_compiler
+def test_native_runs_match_interpreting():
+    """
+    Native runs produce the output, steps, tape, peak and halt location of
+    a character-by-character run, including at the step limit, at the left
+    end of the tape and where the tape grows.
+    """
+    programs = [
+        '++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.',
+        '+>+>+>+>>+>+<<<<<<[>]+>>+[<<]+.[>>>]+.',
+        '<<+>>+.<<<-[>+<-]>.',
+        '+++[->+>+++<<]>>[-<<+>>]<<.,>,.',
+        '+' + '[>+<-]>' * 40 + '[>]+.',
+    ]
+    for code in programs:
+        for max_steps in (7, 25, 90, 1_000_000):
+            interpreter = run_both(code, [3, 250], max_steps=max_steps, memory_size=8)
+            assert interpreter.ran_native
+
+@requires_compiler
+def test_native_programs_are_cached_by_hash(native_cache, monkeypatch):
+    """
+    Shared objects are keyed by a hash of their source and reused without
+    a compiler.
+    """
+    nodes = lower('+++[>++<-]>.')
+    program = load_program(nodes)
+    assert program.path.parent == native_cache
+    assert program.path.with_suffix('.c').read_text() == c_source(nodes)
+
+    monkeypatch.setattr(brainfuck_native, 'find_compiler', lambda: None)
+    assert load_program(nodes).path == program.path
+    assert load_program(lower('+.')) is None
+
+def test_programs_fall_back_to_the_python_backend(monkeypatch):
+    """
+    Without a C compiler, and for inputs that do not fit a byte, programs
+    run on the Python backend with the same results.
+    """
+    interpreter = run_both(',[->+<]>.', [300])
+    assert not interpreter.ran_native
+
+    monkeypatch.setattr(brainfuck_native, 'find_compiler', lambda: None)
+    interpreter = run_both('+++[>++<-]>.')
+    assert not interpreter.ran_native
+
+def test_benchmarks_cover_the_native_backend():
+    """
+    The benchmark suite runs programs on the native backend as well, with
+    the same results as on the Python backend.
+    """
+    source = 'int main() { int total = 0; for (int i = 0; i < 4; i++) { total = total + i; } return total; }'
+    record = benchmark_program('sum', source, 2, ['python', 'c'])
+    python, native = record['backends']['python'], record['backends']['c']
+    assert native['native'] == (find_compiler() is not None)
+    for field in ('output', 'steps', 'peak_memory', 'completed'):
+        assert native[field] == python[field]
@@ -0,0 +1,175 @@
+"""
+Tests for the AST optimizer: dead-store elimination and loop-invariant
+code motion
+"""
+
+import pytest
+from src.solidity_parser import SolidityParser
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.ast2brainfuck.optimizer import (
+    INVARIANT_SLOT, optimize_program, parse_optimization_level)
+from src.brainfuck_interpreter import BrainfuckInterpreter, interpret_brainfuck
+
+PROGRAMS = [
+    ("""
+    int main() {
+        int a = 3;
+        int b = 4;
+        int total = 0;
+        int i = 0;
+        while (i < 5) { total = total + a * b; i = i + 1; }
+        return total;
+    }
+    """, 60),
+    ("""
+    int main() {
+        int n = 4;
+        int total = 0;
+        for (int i = 0; i < n * 2; i++) {
+            int j = 0;
+            while (j < n - 1) { total = total + i * n + j; j = j + 1; }
+        }
+        return total;
+    }
+    """, 360 % 256),
+    ("""
+    int main() {
+        int d = 0;
+        int total = 7;
+        int i = 0;
+        while (i < 3) {
+            if (d != 0) { total = total / d; }
+            i = i + 1;
+        }
+        return total;
+    }
+    """, 7),
+    ("""
+    int fill(int values[4], int v) {
+        int i = 0;
+        while (i < 4) { values[i] = v; i = i + 1; }
+        return 0;
+    }
+    int main() {
+        int data[4];
+        int total = 0;
+        int i = 0;
+        while (i < 3) {
+            fill(data, i + 1);
+            total = total + data[2] * 2;
+            i = i + 1;
+        }
+        return total;
+    }
+    """, 12),
+    ("""
+    int main() {
+        int x = 5;
+        x = 9;
+        int unused = x * 3;
+        int i = 0;
+        int last = 0;
+        while (i < 4) { last = i; i = i + 1; }
+        return x + last;
+    }
+    """, 12),
+]
+
+def parse(source):
+    return SolidityParser().parse(source)
+
+def main_body(program):
+    return next(item for item in program.children if item.type == 'Function').body.children
+
+def test_parse_optimization_level():
+    """
+    Levels are given as numbers or as -O flags.
+    """
+    assert parse_optimization_level('-O0') == 0
+    assert parse_optimization_level(2) == 2
+    with pytest.raises(ValueError):
+        parse_optimization_level('-O3')
+
+@pytest.mark.parametrize("level", [0, 1, 2])
+@pytest.mark.parametrize("source, expected", PROGRAMS)
+def test_levels_preserve_results(source, expected, level):
+    """
+    Every optimisation level computes the same results.
+    """
+    brainfuck_code = TinySolToBrainfuckTranslator(optimization_level=level).compile(source)
+    assert interpret_brainfuck(brainfuck_code) == [expected]
+
+def test_invariants_are_hoisted():
+    """
+    An invariant product moves in front of the loop and is computed once.
+    """
+    program = optimize_program(parse(PROGRAMS[0][0]), '-O2')
+    body = main_body(program)
+    hoisted = INVARIANT_SLOT.format(1)
+    loop_index = next(index for index, statement in enumerate(body) if statement.type == 'While')
+    declaration = body[loop_index - 1]
+    assert declaration.type == 'VariableDeclaration' and declaration.value['name'] == hoisted
+    update = body[loop_index].value['body'].children[0].value['expression']
+    assert update.children[1].type == 'Identifier' and update.children[1].value == hoisted
+
+def test_guarded_division_is_not_hoisted():
+    """
+    Divisions by a variable stay inside the loop, where a test may guard them.
+    """
+    program = optimize_program(parse(PROGRAMS[2][0]), 2)
+    hoisted = [statement.value['expression'].value for statement in main_body(program)
+               if statement.type == 'VariableDeclaration' and
+               statement.value['name'].startswith('<invariant')]
+    assert hoisted == ['!=']
+
+def test_dead_stores_are_removed():
+    """
+    Overwritten and unread stores disappear; declarations stay.
+    """
+    body = main_body(optimize_program(parse(PROGRAMS[4][0]), 1))
+    declarations = {statement.value['name']: statement for statement in body
+                    if statement.type == 'VariableDeclaration'}
+    assert declarations['x'].value.get('expression') is None
+    assert declarations['unused'].value.get('expression') is None
+    assignments = [statement.value['variable'] for statement in body if statement.type == 'Assignment']
+    assert assignments == ['x']
+
+def test_top_level_variables_stay_live():
+    """
+    Stores of top-level programs remain visible in memory.
+    """
+    source = "int a = 3; int b = a * 5; a = 4;"
+    brainfuck_code = TinySolToBrainfuckTranslator(optimization_level=2).compile(source)
+    memory = interpret_brainfuck(brainfuck_code)
+    assert memory[:2] == [4, 15]
+
+def test_parsed_tree_is_not_modified():
+    """
+    The optimizer copies nodes, since parsed trees are cached and shared.
+    """
+    program = parse(PROGRAMS[0][0])
+    before = [statement.type for statement in main_body(program)]
+    optimize_program(program, 2)
+    assert [statement.type for statement in main_body(program)] == before
+
+def test_hoisting_saves_steps():
+    """
+    Hoisting an invariant product and remainder out of the loop lets -O2
+    finish within a step limit that -O0 exceeds (about 50k vs 190k steps).
+    """
+    source = """
+    int main() {
+        int a = 6;
+        int b = 7;
+        int total = 0;
+        int i = 0;
+        while (i < 20) { total = total + (a * b) % 10; i = i + 1; }
+        return total;
+    }
+    """
+    results = {}
+    for level in [0, 2]:
+        brainfuck_code = TinySolToBrainfuckTranslator(optimization_level=level).compile(source)
+        results[level] = BrainfuckInterpreter(max_steps=100_000).interpret(brainfuck_code)
+    assert results[2] == [40]
+    assert results[0] != [40]
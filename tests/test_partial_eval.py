@@ -0,0 +1,56 @@
+"""
+Tests for compile-time partial evaluation
+"""
+
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_interpreter import BrainfuckInterpreter
+from src.brainfuck_partial_eval import partially_evaluate
+
+def test_input_free_programs_compile_to_their_output():
+    """
+    A TinySol program never reads input, so with partial evaluation it
+    compiles to code that only writes its output.
+    """
+    with open('examples/fibonacci.tinysol') as source:
+        tinysol_code = source.read()
+    expected = BrainfuckInterpreter().run(TinySolToBrainfuckTranslator().compile(tinysol_code))
+    translator = TinySolToBrainfuckTranslator(partial_eval_steps=10 ** 6)
+    code = translator.compile(tinysol_code)
+    assert set(code) <= set('+-.')
+    context = BrainfuckInterpreter().run(code)
+    assert context.result == expected.result and context.steps < expected.steps / 100
+    assert translator.stats.counters['partial_eval_steps'] == expected.steps
+    assert translator.source_map.ranges == []
+
+def test_the_prefix_before_input_becomes_tape_state():
+    """
+    The code before the first input read, or before the loop around it,
+    is replaced by code recreating its output and tape; the budget limits
+    how much of it is evaluated.
+    """
+    code = '++++[>++<-]>>+++++++++[>+++++++++<-]>.<<,[->+<]>.'
+    for max_steps, prefix in ((10, 4), (60, 22), (10 ** 6, code.index(','))):
+        evaluation = partially_evaluate(code, max_steps)
+        assert evaluation.prefix == prefix
+        assert evaluation.code[evaluation.replacement:] == code[prefix:]
+        for input_stream in ([], [5], [250]):
+            expected = BrainfuckInterpreter().run(code, input_stream)
+            context = BrainfuckInterpreter().run(evaluation.code, input_stream)
+            assert (context.result, context.memory, context.pointer, context.peak_pointer) == (
+                expected.result, expected.memory, expected.pointer, expected.peak_pointer)
+    # A read inside a loop stops evaluation before the loop
+    assert partially_evaluate('+>+++[<,>-]').prefix == 5
+    assert partially_evaluate(',+++').code == ',+++'
+
+def test_source_maps_follow_the_residual_program():
+    """
+    Code after the evaluated prefix keeps its TinySol locations.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    with open('examples/fibonacci.tinysol') as source:
+        translator.compile(source.read())
+    source_map = translator.source_map
+    spliced = source_map.splice(0, 100, 10)
+    for offset in range(100, source_map.ranges[-1].end):
+        assert spliced.describe(offset - 90) == source_map.describe(offset)
+    assert all(spliced.describe(offset) is None for offset in range(10))
@@ -0,0 +1,83 @@
+"""
+Tests for the interpreter's execution profiles
+"""
+
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+SOURCE = """int spin(int n) {
+    int t = 0;
+    while (n > 0) {
+        t = t + 1;
+        n = n - 1;
+    }
+    return t;
+}
+
+int main() {
+    int total = 0;
+    for (int i = 0; i < 3; i++) {
+        total = total + spin(20);
+    }
+    return total;
+}
+"""
+
+def test_profiling_is_off_by_default():
+    """
+    Plain runs leave no profile behind.
+    """
+    interpreter = BrainfuckInterpreter()
+    interpreter.interpret('++[->+<]')
+    assert interpreter.profile is None
+
+def test_instruction_loop_and_cell_counts():
+    """
+    A profile counts instructions, loop iterations, pointer travel and
+    cell touches.
+    """
+    interpreter = BrainfuckInterpreter(profile=True)
+    assert interpreter.interpret('++[->+++<]>.') == [6]
+    profile = interpreter.profile
+    assert profile.steps == interpreter.steps == 19
+    assert profile.instruction_counts() == {'+': 8, '-': 2, '[': 1, ']': 2, '>': 3, '<': 2, '.': 1}
+    [loop] = profile.loops()
+    assert (loop.start, loop.end, loop.entries, loop.iterations) == (2, 9, 1, 2)
+    assert profile.pointer_travel == 5
+    assert profile.heatmap() == [(0, 7), (1, 7)]
+    assert profile.collapsed_stacks() == "<runtime> 7\nloop@2 12"
+
+def test_profiled_results_match():
+    """
+    Profiling does not change results or step counts.
+    """
+    brainfuck_code = TinySolToBrainfuckTranslator().compile(SOURCE)
+    plain = BrainfuckInterpreter()
+    profiled = BrainfuckInterpreter(profile=True)
+    assert profiled.interpret(brainfuck_code) == plain.interpret(brainfuck_code) == [60]
+    assert profiled.steps == plain.steps == profiled.profile.steps
+
+def test_counts_roll_up_to_source_lines():
+    """
+    With a source map, steps are attributed to TinySol lines and stacks
+    include inlined callees.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    brainfuck_code = translator.compile(SOURCE)
+    interpreter = BrainfuckInterpreter(profile=True)
+    interpreter.interpret(brainfuck_code, source_map=translator.source_map)
+    profile = interpreter.profile
+
+    lines = profile.line_counts()
+    assert sum(lines.values()) == profile.steps
+    assert max(lines, key=lambda line: lines[line] if line else 0) == 3
+
+    stacks = dict(line.rsplit(' ', 1) for line in profile.collapsed_stacks().splitlines())
+    assert sum(int(count) for count in stacks.values()) == profile.steps
+    assert "main;For@12:5;Assignment@13:9;spin;While@3:5" in stacks
+
+    hottest_loop = profile.loops()[0]
+    assert hottest_loop.location.endswith("(While in spin)")
+
+    report = profile.report()
+    assert "hot lines:" in report and "line 3, column 5 (While in spin)" in report
@@ -0,0 +1,132 @@
+"""
+Tests for source maps from generated Brainfuck back to TinySol positions
+"""
+
+import logging
+from src.solidity_parser import SolidityParser
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.ast2brainfuck import peephole
+from src.ast2brainfuck.source_map import SourceMap, function_scope, statement_scope
+from src.brainfuck_interpreter import BrainfuckInterpreter
+
+SOURCE = """int spin(int n) {
+    int t = 0;
+    // count down
+    while (n > 0) {
+        t = t + 1;
+        n = n - 1;
+    }
+    return t;
+}
+
+int main() {
+    int total = 0;
+    for (int i = 0; i < 250; i++) {
+        total = total + spin(200);
+    }
+    return total;
+}
+"""
+
+def locations(source_map):
+    return {(r.function, r.line, r.column, r.node_type) for r in source_map.ranges}
+
+def test_tokens_and_statements_have_positions():
+    """
+    Tokens know their line and column, and statements take those of their
+    first token.
+    """
+    tokens = SolidityParser().tokenize("int a = 1; /* a\n comment */ a++;")
+    assert [(token, token.line, token.column) for token in tokens][-3:] == [
+        ('a', 2, 13), ('++', 2, 14), (';', 2, 16)]
+
+    program = SolidityParser().parse(SOURCE)
+    spin, main = program.children
+    assert (spin.line, spin.column) == (1, 1)
+    loop = spin.body.children[1]
+    assert (loop.type, loop.line, loop.column) == ('While', 4, 5)
+    assert (main.body.children[1].line, main.body.children[1].column) == (13, 5)
+
+def test_compiled_code_maps_to_source_lines():
+    """
+    Ranges cover the generated program and inlined code maps to the callee.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    brainfuck_code = translator.compile(SOURCE)
+    source_map = translator.source_map
+    assert source_map.ranges[-1].end <= len(brainfuck_code)
+    found = locations(source_map)
+    assert ('main', 13, 5, 'For') in found
+    assert ('spin', 4, 5, 'While') in found
+    assert ('spin', 5, 9, 'Assignment') in found
+
+def test_translate_and_compile_agree():
+    """
+    Incremental compilation reports positions in the original source, like
+    translating the whole parsed program.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    translator.compile(SOURCE)
+    compiled = locations(translator.source_map)
+    translator.translate(SolidityParser().parse(SOURCE))
+    assert locations(translator.source_map) == compiled
+
+def test_reused_fragments_follow_moved_code():
+    """
+    Fragments reused after a whitespace edit map to the new lines.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    translator.compile(SOURCE)
+    translator.compile("// header\n\n" + SOURCE)
+    assert translator.incremental_compiler.compiled_units == []
+    assert ('spin', 6, 5, 'While') in locations(translator.source_map)
+
+def test_recursive_functions_are_mapped():
+    """
+    Functions sharing a body in the dispatch loop are mapped too.
+    """
+    source = """
+    int fact(int n) {
+        if (n <= 1) { return 1; }
+        return n * fact(n - 1);
+    }
+    int main() { return fact(5); }
+    """
+    translator = TinySolToBrainfuckTranslator()
+    translator.compile(source)
+    assert ('fact', 4, 9, 'Return') in locations(translator.source_map)
+
+def test_step_limit_is_reported_at_tinysol_level(caplog):
+    """
+    The interpreter names the TinySol statement it stopped in.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    brainfuck_code = translator.compile(SOURCE)
+    interpreter = BrainfuckInterpreter(max_steps=100_000)
+    with caplog.at_level(logging.WARNING):
+        interpreter.interpret(brainfuck_code, source_map=translator.source_map)
+    assert interpreter.halt_location.endswith("in spin)")
+    assert f"steps reached at {interpreter.halt_location}" in caplog.text
+
+    interpreter.interpret(brainfuck_code)
+    assert interpreter.halt_location is None
+
+def test_markers_are_stripped():
+    """
+    Scope markers never reach the generated program.
+    """
+    node = SolidityParser().parse("int a = 1;").children[0]
+    marked = function_scope('f', '>+<' + statement_scope(node, '>>-<<'))
+    brainfuck_code, source_map = peephole.optimize_with_source_map(marked)
+    assert brainfuck_code == peephole.optimize(marked) == '>+>-<<'
+    assert [(r.start, r.end, r.line) for r in source_map.ranges] == [(0, 2, None), (2, 6, 1)]
+
+def test_json_round_trip():
+    """
+    Source maps serialise to JSON and back.
+    """
+    translator = TinySolToBrainfuckTranslator()
+    translator.compile(SOURCE)
+    source_map = SourceMap.from_json(translator.source_map.to_json())
+    assert source_map.describe(0) == translator.source_map.describe(0)
+    assert locations(source_map) == locations(translator.source_map)
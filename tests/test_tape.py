@@ -0,0 +1,72 @@
+"""
+Tests for the paged tape
+"""
+
+import pytest
+from src.ast2brainfuck import TinySolToBrainfuckTranslator
+from src.brainfuck_interpreter import BrainfuckInterpreter, BrainfuckInterpreterError
+from src.brainfuck_tape import PAGE_SIZE, PagedTape
+
+def test_paged_runs_match_dense_runs():
+    """
+    Programs that stay right of cell 0 run as on the dense tape, in the
+    interpreter and in compiled loops.
+    """
+    with open('examples/fibonacci.tinysol') as source:
+        fibonacci = TinySolToBrainfuckTranslator().compile(source.read())
+    programs = [fibonacci, '++++[>+++[>++>+<<-]>[-]>.<<<-]>>>.', ',[>+>++<<-]>>[>>>]+.']
+    for code in programs:
+        for options in ({}, {'jit_threshold': 1}, {'superinstructions': ()}):
+            for max_steps in (60, 1_000_000):
+                dense = BrainfuckInterpreter(memory_size=8, max_steps=max_steps, **options)
+                paged = BrainfuckInterpreter(max_steps=max_steps, tape='paged', **options)
+                expected, context = dense.run(code, [9]), paged.run(code, [9])
+                assert (context.output, context.steps, context.peak_memory) == (
+                    expected.output, expected.steps, expected.peak_memory)
+                assert dict(context.memory.cells()) == {
+                    index: value for index, value in enumerate(expected.memory) if value}
+
+def test_pointer_moves_left_of_cell_zero():
+    """
+    On a paged tape '<' moves past cell 0 instead of stopping there, in
+    blocks, affine loops and scans.
+    """
+    for options in ({}, {'jit_threshold': 1}):
+        interpreter = BrainfuckInterpreter(tape='paged', **options)
+        assert interpreter.run('<<<+++>>>+').memory[-3] == 3
+        # Copies cell 0 three cells to the left, then scans back to it
+        context = interpreter.run('+++++[-<<<+>>>]<<<[<]+.')
+        assert dict(context.memory.cells()) == {-4: 1, -3: 5}
+        assert context.output == [1]
+
+def test_far_cells_allocate_only_their_pages():
+    """
+    Memory use follows the cells written, not the distance the pointer
+    travels.
+    """
+    interpreter = BrainfuckInterpreter(tape='paged', max_steps=10 ** 6)
+    context = interpreter.run('>' * 100_000 + '+' + '<' * 200_000 + '++')
+    assert dict(context.memory.cells()) == {100_000: 1, -100_000: 2}
+    assert context.memory.allocated == 3 * PAGE_SIZE
+
+    tape = PagedTape()
+    for index in range(-PAGE_SIZE - 5, 2 * PAGE_SIZE + 3):
+        tape[index] = 1
+    assert tape.scan(0, 1) == 2 * PAGE_SIZE + 3
+    assert tape.scan(0, -1) == -PAGE_SIZE - 6
+    assert tape.scan(1, 7) == 1 + 7 * ((2 * PAGE_SIZE + 2 - 1) // 7 + 1)
+    assert tape.bounds() == (-2 * PAGE_SIZE, 3 * PAGE_SIZE - 1)
+    tape[5] = 300
+    assert tape[5] == 300 % 256 and tape[10 * PAGE_SIZE] == 0
+
+def test_paged_tapes_need_the_python_backends():
+    """
+    Profiling, native code and checkpoints work on dense tapes only.
+    """
+    with pytest.raises(ValueError):
+        BrainfuckInterpreter(tape='paged', profile=True)
+    with pytest.raises(ValueError):
+        BrainfuckInterpreter(tape='sparse')
+    interpreter = BrainfuckInterpreter(tape='paged', max_steps=2)
+    with pytest.raises(BrainfuckInterpreterError):
+        interpreter.checkpoint('+++', interpreter.run('+++'))